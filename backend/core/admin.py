@@ -14,6 +14,7 @@ from .models import (
     PlanoAssinatura,
     AssinaturaEmpresa,
     WebhookLog,
+    Job,
 )
 
 # =========================
@@ -124,6 +125,21 @@ class ContaBancariaAdmin(admin.ModelAdmin):
         'criado_em'
     )
     list_filter = ('company',)
+    readonly_fields = ('saldo_inicial',)
+
+    def save_model(self, request, obj, form, change):
+        if not change or 'saldo_atual' not in form.changed_data:
+            return super().save_model(request, obj, form, change)
+
+        from django.db import transaction
+        from .services.saldos import ajustar_saldo_manual
+
+        with transaction.atomic():
+            saldo_anterior = ContaBancaria.objects.select_for_update().values_list(
+                'saldo_atual', flat=True
+            ).get(pk=obj.pk)
+            super().save_model(request, obj, form, change)
+            ajustar_saldo_manual(obj, obj.saldo_atual - saldo_anterior)
 
 
 # =========================
@@ -189,3 +205,11 @@ class WebhookLogAdmin(admin.ModelAdmin):
     list_display = ('event_type', 'asaas_subscription_id', 'processed', 'recebido_em')
     list_filter = ('processed', 'event_type')
     readonly_fields = ('recebido_em',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'company', 'status', 'progresso', 'tentativas', 'criado_em', 'finalizado_em')
+    list_filter = ('status', 'tipo')
+    exclude = ('arquivo', 'resultado_arquivo')
+    readonly_fields = ('criado_em', 'iniciado_em', 'finalizado_em', 'worker')
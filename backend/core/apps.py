@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Sinais do resumo mensal e da versão dos dados (cache de relatórios)
+        from .services import resumo, versao  # noqa: F401
@@ -0,0 +1,78 @@
+"""
+Normalização de nomes para comparação com observações de extrato.
+
+Usado pela conciliação bancária e para manter as colunas `nome_normalizado`
+e `nome_tokens` de Cliente, Funcionario e Custodia, e o documento de busca
+(`busca`) dos modelos pesquisáveis.
+"""
+
+import re
+import unicodedata
+
+STOP_WORDS = frozenset({
+    'de', 'da', 'do', 'dos', 'das', 'para', 'pra', 'em', 'no', 'na', 'nos', 'nas',
+    'com', 'por', 'a', 'o', 'e', 'ou', 'um', 'uma', 'ao', 'aos', 'as',
+    'pix', 'ted', 'transferencia', 'recebido', 'enviado', 'pagamento', 'recebimento',
+    'valor', 'ref', 'referente', 'ltda', 'me', 'sa', 'eireli'
+})
+
+PALAVRA_RE = re.compile(r'\b\w+\b')
+
+
+def normalizar_string(texto) -> str:
+    """Remove acentos e converte para lowercase para comparação"""
+    if not texto:
+        return ''
+    texto_nfd = unicodedata.normalize('NFD', str(texto))
+    texto_sem_acentos = ''.join(
+        char for char in texto_nfd
+        if unicodedata.category(char) != 'Mn'
+    )
+    return texto_sem_acentos.lower().strip()
+
+
+def palavras_significativas(texto_normalizado: str) -> frozenset:
+    """
+    Palavras de 3+ letras de um texto já normalizado, sem preposições e sem
+    termos bancários comuns (pix, ted, recebido...).
+    """
+    return frozenset(
+        palavra for palavra in PALAVRA_RE.findall(texto_normalizado)
+        if len(palavra) >= 3 and palavra not in STOP_WORDS
+    )
+
+
+def indexar_nome(nome) -> tuple:
+    """Retorna (nome_normalizado, tokens ordenados) prontos para gravar no modelo."""
+    nome_normalizado = normalizar_string(nome)
+    return nome_normalizado, sorted(palavras_significativas(nome_normalizado))
+
+
+def documento_busca(partes) -> str:
+    """Texto de busca de uma linha: as partes preenchidas, normalizadas e separadas por espaço."""
+    return ' '.join(filter(None, (normalizar_string(parte) for parte in partes)))
+
+
+def normalize_money_search(s: str) -> str:
+    """Converte um termo de busca monetário em formato BR para o formato
+    armazenado no banco (ex.: "1.500,00" → "1500.00", "R$ 1500" → "1500",
+    "1.500" → "1500").
+
+    Mantém strings que não parecem valores (sem dígitos) inalteradas para não
+    quebrar buscas textuais.
+    """
+    if not s:
+        return s
+    raw = str(s).strip().replace('R$', '').replace(' ', '')
+    if not any(ch.isdigit() for ch in raw):
+        return s
+    if ',' in raw:
+        # Vírgula é separador decimal; pontos são separadores de milhar
+        return raw.replace('.', '').replace(',', '.')
+    if '.' in raw:
+        # Sem vírgula: pontos são separadores de milhar em BR se cada grupo
+        # após o primeiro tem exatamente 3 dígitos (ex.: 1.500, 12.345.678).
+        parts = raw.split('.')
+        if all(p.isdigit() for p in parts) and all(len(p) == 3 for p in parts[1:]):
+            return raw.replace('.', '')
+    return raw
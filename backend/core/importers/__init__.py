@@ -0,0 +1,35 @@
+"""
+Importadores de extratos bancários.
+
+Cada formato tem um parser registrado em `registry` (XLSX, CSV e OFX). Todos
+entregam as linhas pelo mesmo passo de normalização (`base.normalizar_linha`),
+no formato (line_index, data, valor_com_sinal, descricao), consumido por
+`services.extrato`.
+"""
+
+from .base import (
+    ExtratoInvalido,
+    LINHAS_BUSCA_CABECALHO,
+    detectar_colunas,
+    normalizar_data,
+    normalizar_linha,
+    normalizar_valor,
+)
+from .registry import PARSERS, detectar_formato, formatos_suportados, ler_extrato, registrar
+
+# Importados pelo efeito colateral de registrar os parsers
+from . import delimitado, ofx, xlsx  # noqa: E402,F401
+
+__all__ = [
+    'ExtratoInvalido',
+    'LINHAS_BUSCA_CABECALHO',
+    'PARSERS',
+    'detectar_colunas',
+    'detectar_formato',
+    'formatos_suportados',
+    'ler_extrato',
+    'normalizar_data',
+    'normalizar_linha',
+    'normalizar_valor',
+    'registrar',
+]
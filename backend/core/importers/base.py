@@ -0,0 +1,245 @@
+"""
+Normalização compartilhada pelos parsers de extrato.
+
+Todo parser entrega as células cruas de cada lançamento para `normalizar_linha`,
+que devolve a tupla (line_index, data, valor_com_sinal, descricao) ou registra
+o erro e descarta a linha. Assim data, valor e descrição seguem exatamente as
+mesmas regras em XLSX, CSV e OFX.
+"""
+
+import decimal
+import unicodedata
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain
+
+LINHAS_BUSCA_CABECALHO = 30
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y', '%Y%m%d')
+
+
+class ExtratoInvalido(Exception):
+    """Arquivo de extrato ilegível ou sem as colunas obrigatórias."""
+
+
+def _sem_acentos(texto: str) -> str:
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', texto.lower().strip())
+        if unicodedata.category(c) != 'Mn'
+    )
+
+
+def fonte_arquivo(file):
+    """Usa o caminho do arquivo temporário do upload quando existir (evita cópia em memória)."""
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return file
+
+
+# ──────────────────────────────────────────────
+# Normalização de células
+# ──────────────────────────────────────────────
+
+def normalizar_data(value):
+    """Converte a célula de data em `date`. Levanta ValueError se não reconhecer o formato."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    date_str = str(value).strip()
+    for fmt in FORMATOS_DATA:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'formato de data inválido: {value}')
+
+
+def normalizar_valor(value) -> Decimal:
+    """
+    Converte a célula de valor em Decimal com 2 casas (sinal preservado).
+    Aceita números ou strings em formato brasileiro (1.234,56 / R$ -10,00).
+    """
+    if isinstance(value, (int, float, Decimal)):
+        # Converte para string primeiro para evitar problemas de precisão de float
+        valor_num = Decimal(str(value))
+    else:
+        valor_str = str(value).strip()
+        valor_str = valor_str.replace('R$', '').replace(' ', '').replace('\xa0', '')
+
+        # Formato brasileiro: remove pontos (milhar) e troca vírgula por ponto
+        if ',' in valor_str:
+            valor_str = valor_str.replace('.', '').replace(',', '.')
+
+        try:
+            valor_num = Decimal(valor_str)
+        except (ValueError, decimal.InvalidOperation) as e:
+            raise ValueError(f'formato de valor inválido: {value} (erro: {str(e)})')
+
+    return valor_num.quantize(Decimal('0.01'))
+
+
+def normalizar_linha(idx, date_value, value_raw, desc_raw, erros: list, rotulo='Linha'):
+    """
+    Passo único de normalização de um lançamento.
+
+    Retorna (idx, data, valor_com_sinal, descricao), ou None quando a linha deve
+    ser ignorada (sem data, valor vazio/zero) ou é inválida — neste caso o erro
+    vai para `erros`.
+    """
+    if not date_value:
+        return None
+    try:
+        data_pagamento = normalizar_data(date_value)
+    except ValueError as e:
+        erros.append(f'{rotulo} {idx}: {e}')
+        return None
+
+    if value_raw is None or value_raw == '' or value_raw == 0:
+        return None
+    try:
+        valor = normalizar_valor(value_raw)
+    except ValueError as e:
+        erros.append(f'{rotulo} {idx}: {e}')
+        return None
+    if not valor:
+        return None
+
+    descricao = str(desc_raw).strip() if desc_raw else ''
+    return idx, data_pagamento, valor, descricao
+
+
+# ──────────────────────────────────────────────
+# Formatos tabulares (XLSX, CSV)
+# ──────────────────────────────────────────────
+
+def detectar_colunas(row, colunas=None) -> dict:
+    """
+    Procura as colunas de data, valor e descrição numa linha do cabeçalho,
+    preenchendo apenas as que ainda não foram encontradas em `colunas`
+    (o cabeçalho pode estar espalhado por mais de uma linha).
+    Formato BTG: "Data de lançamento | Descrição do lançamento | Entradas / Saídas (R$) | Saldo (R$)"
+    """
+    colunas = colunas or {'date_col': None, 'value_col': None, 'desc_col': None}
+
+    for col_idx, cell_value in enumerate(row):
+        if not cell_value or not isinstance(cell_value, str):
+            continue
+        cell_normalized = _sem_acentos(cell_value)
+
+        # Coluna de data (Data de lançamento, Data, etc.)
+        if colunas['date_col'] is None and 'data' in cell_normalized:
+            colunas['date_col'] = col_idx
+
+        # Coluna de valor (Entradas/Saídas, Valor, etc.), ignorando "Saldo"
+        if colunas['value_col'] is None and 'saldo' not in cell_normalized:
+            if any(kw in cell_normalized for kw in ['entrada', 'saida', 'valor', 'movimentacao']):
+                colunas['value_col'] = col_idx
+
+        # Coluna de descrição (mas não a de data)
+        # Prioriza "Descrição do lançamento" (formato BTG) ou "Histórico"
+        if colunas['desc_col'] is None and 'data' not in cell_normalized:
+            if 'lancamento' in cell_normalized and 'descri' in cell_normalized:
+                colunas['desc_col'] = col_idx
+            elif any(kw in cell_normalized for kw in ['descri', 'historico']):
+                colunas['desc_col'] = col_idx
+
+    return colunas
+
+
+def _celula(row, col):
+    if col is None or col >= len(row):
+        return None
+    return row[col]
+
+
+def _mapeamento_confere(cabecalho, mapeamento) -> bool:
+    """
+    Confere, sem varrer o cabeçalho inteiro, se as linhas até `header_row`
+    têm rótulos nas colunas salvas de data e valor.
+    """
+    def tem_rotulo(col, palavras):
+        for row in cabecalho:
+            cell = _celula(row, col)
+            if isinstance(cell, str) and any(p in _sem_acentos(cell) for p in palavras):
+                return True
+        return False
+
+    return (
+        len(cabecalho) == mapeamento['header_row']
+        and tem_rotulo(mapeamento['date_col'], ['data'])
+        and tem_rotulo(mapeamento['value_col'], ['entrada', 'saida', 'valor', 'movimentacao'])
+    )
+
+
+def ler_tabular(rows, erros: list, mapeamento=None):
+    """
+    Lê um extrato tabular a partir de um iterador de linhas (tuplas de células).
+
+    Com `mapeamento` salvo ({'header_row', 'date_col', 'value_col', 'desc_col'})
+    pula direto para os dados depois de conferir os rótulos; se o layout do
+    arquivo mudou, cai na detecção por palavras-chave nas primeiras
+    LINHAS_BUSCA_CABECALHO linhas.
+
+    Levanta ExtratoInvalido se faltar a coluna de data/valor.
+    Retorna (mapeamento_detectado, gerador de linhas normalizadas).
+    """
+    rows = iter(rows)
+    cabecalho = []
+
+    if mapeamento:
+        for row in rows:
+            cabecalho.append(row)
+            if len(cabecalho) >= mapeamento['header_row']:
+                break
+        if _mapeamento_confere(cabecalho, mapeamento):
+            return dict(mapeamento), _iter_tabular(rows, mapeamento, erros)
+
+    colunas = None
+    header_row = None
+    buffer = iter(cabecalho)
+    for idx, row in enumerate(chain(buffer, rows), start=1):
+        if row and any(row):
+            colunas = detectar_colunas(row, colunas)
+            if colunas['date_col'] is not None and colunas['value_col'] is not None:
+                header_row = idx
+                break
+        if idx >= LINHAS_BUSCA_CABECALHO:
+            break
+
+    if header_row is None:
+        if colunas is None or colunas['date_col'] is None:
+            raise ExtratoInvalido('Não foi possível identificar a coluna de data no extrato.')
+        raise ExtratoInvalido('Não foi possível identificar a coluna de valor (Entradas/Saídas) no extrato.')
+
+    detectado = dict(colunas, header_row=header_row)
+    # Linhas já lidas para o buffer e que ficaram depois do cabeçalho.
+    # (chain, e não um gerador: fechar um gerador com `yield from` fecharia `rows`)
+    restantes = chain(buffer, rows)
+    return detectado, _iter_tabular(restantes, detectado, erros)
+
+
+def _iter_tabular(rows, colunas, erros):
+    date_col = colunas['date_col']
+    value_col = colunas['value_col']
+    desc_col = colunas['desc_col']
+
+    for idx, row in enumerate(rows, start=colunas['header_row'] + 1):
+        if not row or not any(row):
+            continue
+        try:
+            linha = normalizar_linha(
+                idx,
+                _celula(row, date_col),
+                _celula(row, value_col),
+                _celula(row, desc_col),
+                erros,
+            )
+        except Exception as e:
+            erros.append(f'Linha {idx}: {str(e)}')
+            continue
+        if linha is not None:
+            yield linha
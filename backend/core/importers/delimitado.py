@@ -0,0 +1,66 @@
+"""Parser de extratos CSV/TXT delimitados (ponto e vírgula, vírgula, tab ou pipe)."""
+
+import codecs
+import csv
+
+from .base import ExtratoInvalido, ler_tabular
+from .registry import registrar
+
+TAMANHO_AMOSTRA = 64 * 1024
+DELIMITADORES = ';,\t|'
+LINHAS_AMOSTRA = 30
+
+
+def _abrir_binario(file):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return getattr(file, 'file', file)
+
+
+def _detectar_encoding(amostra: bytes) -> str:
+    try:
+        amostra.decode('utf-8-sig')
+        return 'utf-8-sig'
+    except UnicodeDecodeError as e:
+        # A amostra pode ter cortado um caractere multibyte no final
+        if e.start >= len(amostra) - 3:
+            return 'utf-8-sig'
+        # Exportações de bancos brasileiros costumam vir em Windows-1252
+        return 'cp1252'
+
+
+def _detectar_delimitador(amostra: str) -> str:
+    # Só linhas completas: uma linha cortada no fim da amostra confunde o Sniffer
+    linhas = amostra.splitlines()[:LINHAS_AMOSTRA]
+    try:
+        return csv.Sniffer().sniff('\n'.join(linhas), delimiters=DELIMITADORES).delimiter
+    except csv.Error:
+        # Sniffer não decidiu: usa o delimitador mais frequente no início do arquivo
+        trecho = '\n'.join(linhas)
+        return max(DELIMITADORES, key=trecho.count)
+
+
+@registrar('csv', extensoes=('.csv', '.txt'))
+def ler_csv(file, erros: list, mapeamento=None):
+    """
+    Lê o CSV linha a linha (sem carregar o arquivo inteiro), detectando
+    encoding e delimitador numa amostra do início do arquivo.
+    """
+    binario = _abrir_binario(file)
+    amostra = binario.read(TAMANHO_AMOSTRA)
+    if not amostra.strip():
+        raise ExtratoInvalido('Arquivo CSV vazio.')
+    if b'\x00' in amostra:
+        raise ExtratoInvalido('Arquivo inválido. Por favor, envie um arquivo CSV de texto.')
+    binario.seek(0)
+
+    encoding = _detectar_encoding(amostra)
+    # StreamReader (e não TextIOWrapper) para não fechar o arquivo do upload
+    texto = codecs.getreader(encoding)(binario, errors='replace')
+
+    delimitador = _detectar_delimitador(amostra.decode(encoding, errors='ignore'))
+    if mapeamento and mapeamento.get('delimitador') != delimitador:
+        mapeamento = None
+
+    detectado, linhas = ler_tabular(csv.reader(texto, delimiter=delimitador), erros, mapeamento)
+    return dict(detectado, delimitador=delimitador), linhas
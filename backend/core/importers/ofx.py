@@ -0,0 +1,127 @@
+"""
+Parser de extratos OFX (1.x SGML e 2.x XML).
+
+Não monta a árvore do documento: o arquivo é lido em blocos e as tags são
+tokenizadas em sequência, emitindo um lançamento a cada <STMTTRN> fechado.
+"""
+
+import codecs
+import html
+import re
+
+from .base import ExtratoInvalido, fonte_arquivo, normalizar_linha
+from .registry import registrar
+
+TAMANHO_BLOCO = 64 * 1024
+
+# <TAG>valor  |  </TAG>  (no SGML do OFX 1.x as tags de valor não são fechadas)
+TOKEN_RE = re.compile(r'<(/?)([A-Za-z0-9_.]+)>([^<]*)')
+# Cabeçalho do OFX 1.x (ENCODING:USASCII|UTF-8 e CHARSET:1252|NONE|...) e
+# declaração XML do OFX 2.x
+ENCODING_RE = re.compile(rb'ENCODING:\s*([A-Za-z0-9-]+)', re.IGNORECASE)
+CHARSET_RE = re.compile(rb'CHARSET:\s*([A-Za-z0-9-]+)', re.IGNORECASE)
+XML_ENCODING_RE = re.compile(rb'encoding="([^"]+)"', re.IGNORECASE)
+
+
+def _encoding(cabecalho: bytes) -> str:
+    xml = XML_ENCODING_RE.search(cabecalho)
+    if xml:
+        return xml.group(1).decode()
+
+    # ENCODING decide primeiro: UTF-8 ignora o CHARSET (em geral NONE)
+    encoding = ENCODING_RE.search(cabecalho)
+    if encoding and encoding.group(1).decode().upper().replace('-', '') == 'UTF8':
+        return 'utf-8'
+
+    # USASCII: o CHARSET diz a página de código (1252 → cp1252); NONE ou
+    # desconhecido cai no padrão dos bancos brasileiros
+    charset = CHARSET_RE.search(cabecalho)
+    if charset:
+        nome = charset.group(1).decode()
+        nome = 'cp' + nome if nome.isdigit() else nome
+        try:
+            return codecs.lookup(nome).name
+        except LookupError:
+            pass
+    return 'cp1252'
+
+
+def _data_ofx(valor: str) -> str:
+    # DTPOSTED vem como AAAAMMDD[HHMMSS[.XXX]][[-3:BRT]]; só a data interessa
+    return valor.strip()[:8]
+
+
+def _tokens(binario, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    resto = ''
+    while True:
+        bloco = binario.read(TAMANHO_BLOCO)
+        if not bloco:
+            break
+        if isinstance(bloco, bytes):
+            bloco = decoder.decode(bloco)
+        texto = resto + bloco
+        # Guarda o último token (pode estar incompleto) para o próximo bloco
+        corte = texto.rfind('<')
+        resto = texto[corte:] if corte != -1 else ''
+        yield from TOKEN_RE.finditer(texto[:corte] if corte != -1 else texto)
+    yield from TOKEN_RE.finditer(resto)
+
+
+def _iter_transacoes(binario, encoding, erros):
+    numero = 0
+    atual = None
+    for token in _tokens(binario, encoding):
+        fechamento, tag, valor = token.group(1), token.group(2).upper(), html.unescape(token.group(3).strip())
+
+        if tag == 'STMTTRN':
+            if not fechamento:
+                atual = {}
+                continue
+            if atual is not None:
+                numero += 1
+                descricao = atual.get('MEMO') or atual.get('NAME') or ''
+                linha = normalizar_linha(
+                    numero,
+                    _data_ofx(atual.get('DTPOSTED', '')),
+                    atual.get('TRNAMT'),
+                    descricao,
+                    erros,
+                    rotulo='Transação',
+                )
+                if linha is not None:
+                    yield linha
+            atual = None
+            continue
+
+        if atual is not None and not fechamento and valor:
+            atual[tag] = valor
+
+
+@registrar('ofx', extensoes=('.ofx', '.qfx'))
+def ler_ofx(file, erros: list, mapeamento=None):
+    """
+    Lê os lançamentos <STMTTRN> do OFX. O layout é fixo, então não há
+    mapeamento de colunas a detectar ou salvar.
+    """
+    fonte = fonte_arquivo(file)
+    binario = open(fonte, 'rb') if isinstance(fonte, str) else fonte
+
+    cabecalho = binario.read(1024)
+    if b'OFX' not in cabecalho.upper():
+        if isinstance(fonte, str):
+            binario.close()
+        raise ExtratoInvalido('Arquivo inválido. Por favor, envie um arquivo OFX válido.')
+    binario.seek(0)
+
+    linhas = _iter_transacoes(binario, _encoding(cabecalho), erros)
+    if isinstance(fonte, str):
+        linhas = _fechar_ao_final(binario, linhas)
+    return None, linhas
+
+
+def _fechar_ao_final(binario, linhas):
+    try:
+        yield from linhas
+    finally:
+        binario.close()
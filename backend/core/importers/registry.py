@@ -0,0 +1,67 @@
+"""
+Registro de parsers de extrato.
+
+Cada parser é uma função `ler(file, erros, mapeamento=None)` que devolve
+(mapeamento_detectado, gerador de linhas normalizadas) e é registrada com o
+nome do formato e as extensões de arquivo que aceita.
+"""
+
+import os
+
+from .base import ExtratoInvalido
+
+PARSERS = {}
+EXTENSOES = {}
+
+
+def registrar(formato: str, extensoes=()):
+    """Decorator que registra um parser para `formato` e suas extensões."""
+    def decorator(func):
+        PARSERS[formato] = func
+        for ext in extensoes:
+            EXTENSOES[ext.lower()] = formato
+        return func
+    return decorator
+
+
+def formatos_suportados() -> list:
+    return sorted(PARSERS)
+
+
+def detectar_formato(nome_arquivo: str, formato=None) -> str:
+    """
+    Resolve o formato pelo parâmetro explícito ou pela extensão do arquivo.
+    Levanta ExtratoInvalido se não houver parser para ele.
+    """
+    if formato:
+        formato = formato.lower()
+        if formato not in PARSERS:
+            raise ExtratoInvalido(
+                f'Formato de extrato não suportado: {formato}. '
+                f'Formatos aceitos: {", ".join(formatos_suportados())}.'
+            )
+        return formato
+
+    ext = os.path.splitext(nome_arquivo or '')[1].lower()
+    if ext not in EXTENSOES:
+        raise ExtratoInvalido(
+            'Formato de arquivo não suportado. Envie um extrato XLSX, CSV ou OFX.'
+        )
+    return EXTENSOES[ext]
+
+
+def ler_extrato(file, erros: list, formato=None, mapeamento=None):
+    """
+    Escolhe o parser pelo formato/extensão e lê o extrato.
+
+    `mapeamento` só é repassado quando foi salvo para o mesmo formato
+    (ver ContaBancaria.mapeamento_extrato).
+    Retorna (formato, mapeamento_detectado, gerador de linhas normalizadas).
+    """
+    formato = detectar_formato(getattr(file, 'name', ''), formato)
+    if mapeamento and mapeamento.get('formato') != formato:
+        mapeamento = None
+    detectado, linhas = PARSERS[formato](file, erros, mapeamento=mapeamento)
+    if detectado is not None:
+        detectado = dict(detectado, formato=formato)
+    return formato, detectado, linhas
@@ -0,0 +1,40 @@
+"""Parser de extratos XLSX (layout BTG e similares), lido em streaming."""
+
+import zipfile
+
+from .base import ExtratoInvalido, fonte_arquivo, ler_tabular
+from .registry import registrar
+
+
+@registrar('xlsx', extensoes=('.xlsx', '.xlsm'))
+def ler_xlsx(file, erros: list, mapeamento=None):
+    """
+    Abre o XLSX em modo read_only (direto do arquivo temporário do upload) e
+    delega a detecção de cabeçalho e a normalização para `ler_tabular`.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        wb = load_workbook(fonte_arquivo(file), read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError):
+        raise ExtratoInvalido('Arquivo inválido. Por favor, envie um arquivo XLSX válido.')
+
+    try:
+        ws = wb.active
+        # Alguns bancos gravam a dimensão da planilha errada; sem isso o modo
+        # read_only truncaria as linhas.
+        ws.reset_dimensions()
+        detectado, linhas = ler_tabular(ws.iter_rows(values_only=True), erros, mapeamento)
+    except Exception:
+        wb.close()
+        raise
+
+    return detectado, _fechar_ao_final(wb, linhas)
+
+
+def _fechar_ao_final(wb, linhas):
+    try:
+        yield from linhas
+    finally:
+        wb.close()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from core.helpers.texto import indexar_nome
+from core.models import Cliente, Custodia, Funcionario
+
+
+class Command(BaseCommand):
+    help = (
+        'Preenche nome_normalizado e nome_tokens de Clientes, Funcionários e Custódias '
+        '(linhas antigas ou gravadas sem passar pelo save()).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Quantidade de linhas por lote (padrão: 1000)'
+        )
+        parser.add_argument(
+            '--todos', action='store_true',
+            help='Recalcula todas as linhas, não só as que estão desatualizadas'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in (Cliente, Funcionario, Custodia):
+            atualizados = 0
+            lote = []
+            linhas = model.objects.only('id', 'nome', 'nome_normalizado', 'nome_tokens').order_by('id')
+
+            for obj in linhas.iterator(chunk_size=batch_size):
+                nome_normalizado, tokens = indexar_nome(obj.nome)
+                if not options['todos'] and obj.nome_normalizado == nome_normalizado and obj.nome_tokens == tokens:
+                    continue
+                obj.nome_normalizado = nome_normalizado
+                obj.nome_tokens = tokens
+                lote.append(obj)
+                if len(lote) >= batch_size:
+                    model.objects.bulk_update(lote, ['nome_normalizado', 'nome_tokens'])
+                    atualizados += len(lote)
+                    lote = []
+
+            if lote:
+                model.objects.bulk_update(lote, ['nome_normalizado', 'nome_tokens'])
+                atualizados += len(lote)
+
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {atualizados} atualizado(s)')
+
+        self.stdout.write(self.style.SUCCESS('Pronto!'))
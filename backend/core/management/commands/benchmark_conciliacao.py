@@ -0,0 +1,197 @@
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.helpers.texto import indexar_nome
+from core.models import Allocation, Cliente, Company, ContaBancaria, Despesa, Funcionario, Payment, Receita
+from core.services.conciliacao import conciliar_mes
+from core.services.conciliacao_periodo import conciliar_periodo
+
+PRENOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fabio', 'Gabriela', 'Heitor', 'Iara', 'Joao']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Nunes', 'Lima', 'Barros']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a conciliação bancária em meses sintéticos com milhares de contas em aberto '
+        '(matches 1:1, um PIX para várias contas, contas pagas em partes e ruído). '
+        'Com um mês, tudo é criado numa transação desfeita no final. Com --meses > 1 '
+        'roda a conciliação por período em processos paralelos, que só enxergam dados '
+        'commitados: a massa é gravada e apagada no final, por isso exige DEBUG ou --force.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--itens', type=int, default=3000, help='Receitas e despesas em aberto por mês (padrão: 3000 de cada)')
+        parser.add_argument('--contrapartes', type=int, default=300, help='Clientes e fornecedores (padrão: 300 de cada)')
+        parser.add_argument('--meses', type=int, default=1, help='Meses de backlog, terminando no atual (padrão: 1)')
+        parser.add_argument('--contas', type=int, default=1, help='Contas bancárias (padrão: 1)')
+        parser.add_argument('--workers', type=int, default=None, help='Processos da conciliação por período (padrão: um por núcleo)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--sem-agrupar', action='store_true', help='Desliga as sugestões agrupadas')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Permite --meses > 1 fora do DEBUG (grava a massa sintética no banco configurado)',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['itens'], options['contrapartes'], options['meses'], options['contas']) < 1:
+            raise CommandError('--itens, --contrapartes, --meses e --contas devem ser positivos')
+        if options['meses'] > 1 and not (settings.DEBUG or options['force']):
+            raise CommandError(
+                'Com --meses > 1 a massa sintética é commitada no banco configurado '
+                '(apagada no final, mas não se o processo for morto). '
+                'Rode num banco de desenvolvimento (DEBUG) ou confirme com --force.'
+            )
+
+        if options['meses'] == 1:
+            try:
+                with transaction.atomic():
+                    company, meses = self._criar_massa(options)
+                    self._medir(company, meses, options)
+                    raise _Rollback
+            except _Rollback:
+                pass
+        else:
+            # Criação atômica: se falhar no meio, nada fica gravado
+            with transaction.atomic():
+                company, meses = self._criar_massa(options)
+            try:
+                self._medir(company, meses, options)
+            finally:
+                self._apagar(company)
+
+        self.stdout.write(self.style.SUCCESS('Pronto! (dados sintéticos descartados)'))
+
+    def _criar_massa(self, options):
+        rnd = random.Random(options['seed'])
+        hoje = date.today()
+        atual = hoje.year * 12 + hoje.month - 1
+        meses = [date(i // 12, i % 12 + 1, 1) for i in range(atual - options['meses'] + 1, atual + 1)]
+        inicio = time.monotonic()
+
+        company = Company.objects.create(name='Benchmark conciliação', cnpj='00000000000000')
+        contas_bancarias = [
+            ContaBancaria.objects.create(company=company, nome=f'Conta benchmark {i}', saldo_atual=Decimal('0.00'))
+            for i in range(options['contas'])
+        ]
+
+        def pessoas(model, **extra):
+            objetos = []
+            for i in range(options['contrapartes']):
+                nome = f'{rnd.choice(PRENOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)} {i:04d}'
+                nome_normalizado, tokens = indexar_nome(nome)
+                objetos.append(model(
+                    company=company, nome=nome, nome_normalizado=nome_normalizado, nome_tokens=tokens, **extra
+                ))
+            return model.objects.bulk_create(objetos, batch_size=1000)
+
+        clientes = pessoas(Cliente, tipo='F')
+        fornecedores = pessoas(Funcionario, tipo='O')
+
+        payments = []
+        esperados = {'1:1': 0, '1:N': 0, 'N:1': 0}
+
+        def no_mes(mes):
+            return mes.replace(day=rnd.randint(1, 28))
+
+        def contas(model, campo_pessoa, lista_pessoas, tipo_payment, mes):
+            objetos = [
+                model(
+                    company=company,
+                    **{campo_pessoa: lista_pessoas[i % len(lista_pessoas)]},
+                    nome=f'{model._meta.verbose_name} {mes:%m/%Y} {i}',
+                    data_vencimento=no_mes(mes),
+                    valor=Decimal(rnd.randrange(5000, 500000)) / 100,
+                    tipo='F',
+                    situacao='A',
+                )
+                for i in range(options['itens'])
+            ]
+            objetos = model.objects.bulk_create(objetos, batch_size=1000)
+
+            por_pessoa = {}
+            for obj in objetos:
+                por_pessoa.setdefault(getattr(obj, f'{campo_pessoa}_id'), []).append(obj)
+
+            def payment(valor, observacao):
+                payments.append(Payment(
+                    company=company, conta_bancaria=rnd.choice(contas_bancarias), tipo=tipo_payment,
+                    valor=valor, data_pagamento=no_mes(mes), observacao=observacao,
+                ))
+
+            for pessoa in lista_pessoas:
+                abertas = por_pessoa.get(pessoa.id, [])
+                rnd.shuffle(abertas)
+                observacao = f'PIX {pessoa.nome.upper()}'
+                while abertas:
+                    sorteio = rnd.random()
+                    if sorteio < 0.5:
+                        payment(abertas.pop().valor, observacao)
+                        esperados['1:1'] += 1
+                    elif sorteio < 0.65 and len(abertas) >= 3:
+                        payment(sum(abertas.pop().valor for _ in range(3)), observacao)
+                        esperados['1:N'] += 1
+                    elif sorteio < 0.8:
+                        valor = abertas.pop().valor
+                        parte = (valor * Decimal('0.4')).quantize(Decimal('0.01'))
+                        payment(parte, observacao)
+                        payment(valor - parte, observacao)
+                        esperados['N:1'] += 1
+                    else:
+                        abertas.pop()  # continua em aberto
+
+            # Ruído: payments sem contraparte reconhecível
+            for _ in range(options['itens'] // 10):
+                payment(Decimal(rnd.randrange(1000, 100000)) / 100, 'TARIFA BANCARIA')
+
+        for mes in meses:
+            contas(Receita, 'cliente', clientes, 'E', mes)
+            contas(Despesa, 'responsavel', fornecedores, 'S', mes)
+        Payment.objects.bulk_create(payments, batch_size=1000)
+
+        self.stdout.write(
+            f'Massa criada em {time.monotonic() - inicio:.2f}s: {len(meses)} mês(es), '
+            f'{2 * options["itens"] * len(meses)} contas, {len(payments)} payments '
+            f'(esperado: {esperados["1:1"]} 1:1, {esperados["1:N"]} um-para-vários, '
+            f'{esperados["N:1"]} vários-para-um)'
+        )
+        return company, meses
+
+    def _medir(self, company, meses, options):
+        agrupar = not options['sem_agrupar']
+        inicio = time.monotonic()
+        if len(meses) == 1:
+            resultado = conciliar_mes(company, meses[0].month, meses[0].year, agrupar=agrupar)
+        else:
+            resultado = conciliar_periodo(
+                company, meses[0].month, meses[0].year, meses[-1].month, meses[-1].year,
+                agrupar=agrupar, paralelo=True, workers=options['workers'],
+            )
+        duracao = time.monotonic() - inicio
+
+        agrupadas = resultado['sugestoes_agrupadas']
+        self.stdout.write(
+            f'Conciliação em {duracao:.2f}s: {resultado["matches"]["total"]} matches, '
+            f'{resultado["total_sugestoes"]} sugestões, {len(agrupadas)} sugestões agrupadas '
+            f'({sum(1 for g in agrupadas if len(g["payment_ids"]) == 1)} um-para-vários, '
+            f'{sum(1 for g in agrupadas if len(g["payment_ids"]) > 1)} vários-para-um)'
+        )
+        if 'particoes' in resultado:
+            self.stdout.write(f'{len(resultado["particoes"])} partições, {resultado["total_conflitos"]} conflito(s)')
+        if resultado['debug']['busca_agrupada_interrompida']:
+            self.stdout.write(self.style.WARNING('Busca agrupada interrompida pelo limite de tempo'))
+
+    def _apagar(self, company):
+        # Alocações, payments e contas usam PROTECT: apaga na ordem inversa das dependências
+        for model in (Allocation, Payment, Receita, Despesa, Cliente, Funcionario, ContaBancaria):
+            model.objects.filter(company=company).delete()
+        company.delete()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from core.services.status import marcar_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava a situação "Vencida" nas Receitas e Despesas em aberto com vencimento passado. '
+        'Rodar uma vez por dia (as leituras já calculam a situação vigente sem gravar).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID da empresa (padrão: todas)')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.filter(id=options['company']).first()
+            if company is None:
+                raise CommandError(f'Empresa {options["company"]} não encontrada.')
+
+        resultado = marcar_vencidas(company=company)
+
+        for nome, total in resultado.items():
+            self.stdout.write(f'{nome}: {total} marcada(s) como vencida(s)')
+        self.stdout.write(self.style.SUCCESS('Pronto!'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from core.services.resumo import reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = 'Refaz o resumo mensal (ResumoMensal) a partir dos pagamentos, alocações, receitas e despesas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID da empresa (padrão: todas)')
+
+    def handle(self, *args, **options):
+        empresas = Company.objects.order_by('id')
+        if options['company']:
+            empresas = empresas.filter(id=options['company'])
+            if not empresas.exists():
+                raise CommandError(f'Empresa {options["company"]} não encontrada.')
+
+        total_empresas = 0
+        total_linhas = 0
+        for company in empresas.iterator():
+            total_linhas += reconstruir_resumo(company)
+            total_empresas += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronto! {total_linhas} linha(s) de resumo gravadas em {total_empresas} empresa(s).'
+        ))
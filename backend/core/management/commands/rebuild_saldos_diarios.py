@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ContaBancaria
+from core.services.saldos import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = 'Refaz a tabela de saldos diários (SaldoDiario) a partir dos pagamentos e do saldo atual das contas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID da empresa (padrão: todas)')
+        parser.add_argument('--conta', type=int, help='ID da conta bancária (padrão: todas)')
+
+    def handle(self, *args, **options):
+        contas = ContaBancaria.objects.order_by('company_id', 'id')
+        if options['company']:
+            contas = contas.filter(company_id=options['company'])
+        if options['conta']:
+            contas = contas.filter(id=options['conta'])
+            if not contas.exists():
+                raise CommandError(f'Conta bancária {options["conta"]} não encontrada.')
+
+        total_contas = 0
+        total_dias = 0
+        for conta in contas.iterator():
+            total_dias += reconstruir_saldos(conta)
+            total_contas += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronto! {total_dias} dia(s) de saldo gravados em {total_contas} conta(s).'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from core.services.status import recalcular_status
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula em lote a situação de Receitas e Despesas e o status de Custódias e '
+        'Transferências (reparo depois de migrações ou cargas de dados).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID da empresa (padrão: todas)')
+        parser.add_argument(
+            '--recalcular-totais', action='store_true',
+            help='Refaz antes os totais alocados a partir das alocações'
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.filter(id=options['company']).first()
+            if company is None:
+                raise CommandError(f'Empresa {options["company"]} não encontrada.')
+
+        resultado = recalcular_status(company=company, recalcular_totais_alocados=options['recalcular_totais'])
+
+        for nome, total in resultado.items():
+            self.stdout.write(f'{nome}: {total} alterada(s)')
+        self.stdout.write(self.style.SUCCESS('Pronto!'))
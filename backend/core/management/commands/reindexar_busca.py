@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from core.helpers.texto import documento_busca
+from core.models import Cliente, Custodia, Despesa, Funcionario, Payment, Receita
+
+
+class Command(BaseCommand):
+    help = (
+        'Refaz o documento de busca (coluna busca) de Clientes, Funcionários, Receitas, '
+        'Despesas, Custódias e Pagamentos (linhas gravadas sem passar pelo save()).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Quantidade de linhas por lote (padrão: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in (Cliente, Funcionario, Receita, Despesa, Custodia, Payment):
+            atualizados = 0
+            lote = []
+            linhas = model.objects.only('id', 'busca', *model.CAMPOS_BUSCA).order_by('id')
+
+            for obj in linhas.iterator(chunk_size=batch_size):
+                busca = documento_busca(getattr(obj, campo) for campo in model.CAMPOS_BUSCA)
+                if obj.busca == busca:
+                    continue
+                obj.busca = busca
+                lote.append(obj)
+                if len(lote) >= batch_size:
+                    model.objects.bulk_update(lote, ['busca'])
+                    atualizados += len(lote)
+                    lote = []
+
+            if lote:
+                model.objects.bulk_update(lote, ['busca'])
+                atualizados += len(lote)
+
+            self.stdout.write(f'{model.__name__}: {atualizados} atualizado(s)')
+
+        self.stdout.write(self.style.SUCCESS('Pronto!'))
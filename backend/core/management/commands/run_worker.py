@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from core.services.jobs import (
+    executar_job, limpar_jobs_antigos, nome_worker, reenfileirar_travados, reservar_proximo_job,
+)
+from core.services.status import marcar_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        'Processa a fila de jobs em background (importação de extrato, conciliação, '
+        'geração de mês e PDFs). Vários workers podem rodar em paralelo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Processa os jobs pendentes e sai quando a fila esvaziar'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2.0,
+            help='Segundos de espera quando a fila está vazia (padrão: 2)'
+        )
+        parser.add_argument(
+            '--max-jobs', type=int, default=0,
+            help='Sai depois de processar N jobs (0 = sem limite)'
+        )
+        parser.add_argument(
+            '--timeout-travado', type=int, default=30,
+            help='Minutos sem sinal de vida para considerar travado um job em execução (padrão: 30)'
+        )
+
+    def handle(self, *args, **options):
+        worker = nome_worker()
+        processados = 0
+        ultima_manutencao = 0.0
+        dia_vencidas = None
+
+        self.stdout.write(f'Worker {worker} iniciado.')
+
+        try:
+            while True:
+                # Manutenção da fila no máximo uma vez por minuto
+                if time.monotonic() - ultima_manutencao > 60:
+                    reenfileirados = reenfileirar_travados(options['timeout_travado'])
+                    if reenfileirados:
+                        self.stdout.write(self.style.WARNING(f'{reenfileirados} job(s) travado(s) devolvido(s) à fila.'))
+                    limpar_jobs_antigos()
+                    # Varredura de vencidas uma vez por dia (idempotente entre workers)
+                    if dia_vencidas != timezone.now().date():
+                        dia_vencidas = timezone.now().date()
+                        marcar_vencidas()
+                    ultima_manutencao = time.monotonic()
+
+                # Conexões de vida longa caem no Railway; fora de transação, renova
+                if not connection.in_atomic_block:
+                    close_old_connections()
+                job = reservar_proximo_job(worker)
+
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+
+                self.stdout.write(f'Executando job #{job.pk} ({job.tipo})...')
+                executar_job(job)
+                processados += 1
+
+                if job.status == 'concluido':
+                    self.stdout.write(self.style.SUCCESS(f'  Job #{job.pk} concluído.'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'  Job #{job.pk} falhou: {job.erro}'))
+
+                if options['max_jobs'] and processados >= options['max_jobs']:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write('Interrompido.')
+
+        self.stdout.write(self.style.SUCCESS(f'Pronto! {processados} job(s) processado(s).'))
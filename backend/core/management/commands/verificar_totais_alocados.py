@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company, Custodia, Despesa, Payment, Receita
+from core.services.alocacoes import recalcular_totais, totais_divergentes
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere os totais alocados gravados em Pagamentos, Receitas, Despesas e Custódias '
+        'contra a soma das alocações e, com --corrigir, regrava os divergentes. '
+        'Percorre as empresas em lotes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID da empresa (padrão: todas)')
+        parser.add_argument('--corrigir', action='store_true', help='Regrava os totais divergentes')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Quantidade de empresas por lote (padrão: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser positivo')
+
+        empresas = Company.objects.order_by('id')
+        if options['company']:
+            empresas = empresas.filter(id=options['company'])
+            if not empresas.exists():
+                raise CommandError(f'Empresa {options["company"]} não encontrada.')
+
+        divergentes = dict.fromkeys((Payment, Receita, Despesa, Custodia), 0)
+        corrigidos = 0
+        ultima = 0
+        while True:
+            lote = list(empresas.filter(id__gt=ultima).values_list('id', flat=True)[:options['batch_size']])
+            if not lote:
+                break
+
+            for model in divergentes:
+                ids = totais_divergentes(model, lote)
+                if not ids:
+                    continue
+                divergentes[model] += len(ids)
+                self.stdout.write(self.style.WARNING(
+                    f'{model.__name__}: {len(ids)} divergente(s) '
+                    f'(ids {", ".join(map(str, ids[:20]))}{"..." if len(ids) > 20 else ""})'
+                ))
+                if options['corrigir']:
+                    corrigidos += recalcular_totais(model, ids)
+            ultima = lote[-1]
+
+        resumo = ', '.join(f'{model.__name__}: {total}' for model, total in divergentes.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronto! Divergências - {resumo}. {corrigidos} linha(s) corrigida(s).'
+        ))
@@ -0,0 +1,89 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from core.services.saldos import corrigir_saldo, verificar_saldos
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere o saldo atual de cada conta bancária contra saldo inicial + pagamentos '
+        '(uma consulta agrupada por empresa) e, com --corrigir, grava o saldo calculado. '
+        'Percorre as empresas em lotes; com --checkpoint retoma de onde parou.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID da empresa (padrão: todas)')
+        parser.add_argument('--corrigir', action='store_true', help='Grava o saldo calculado nas contas divergentes')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Quantidade de empresas por lote (padrão: 500)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Arquivo com a última empresa processada; a execução retoma dali e o apaga ao terminar'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser positivo')
+
+        empresas = Company.objects.order_by('id')
+        if options['company']:
+            empresas = empresas.filter(id=options['company'])
+            if not empresas.exists():
+                raise CommandError(f'Empresa {options["company"]} não encontrada.')
+
+        checkpoint = options['checkpoint']
+        ultima = self._ler_checkpoint(checkpoint) if checkpoint else 0
+        if ultima:
+            self.stdout.write(f'Retomando depois da empresa {ultima}')
+
+        total_empresas = 0
+        divergentes = 0
+        corrigidas = 0
+        while True:
+            lote = list(empresas.filter(id__gt=ultima).values_list('id', flat=True)[:options['batch_size']])
+            if not lote:
+                break
+
+            for company_id in lote:
+                for divergencia in verificar_saldos(company_id):
+                    divergentes += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'Empresa {company_id}, conta {divergencia["conta_id"]} ({divergencia["nome"]}): '
+                        f'saldo {divergencia["saldo_atual"]}, calculado {divergencia["saldo_calculado"]} '
+                        f'(diferença {divergencia["diferenca"]})'
+                    ))
+                    if options['corrigir'] and corrigir_saldo(divergencia['conta_id']):
+                        corrigidas += 1
+            total_empresas += len(lote)
+            ultima = lote[-1]
+            if checkpoint:
+                self._gravar_checkpoint(checkpoint, ultima)
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronto! {total_empresas} empresa(s) verificada(s), {divergentes} conta(s) divergente(s), '
+            f'{corrigidas} corrigida(s).'
+        ))
+
+    def _ler_checkpoint(self, caminho):
+        if not os.path.exists(caminho):
+            return 0
+        try:
+            with open(caminho) as arquivo:
+                return int(json.load(arquivo)['ultima_company_id'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise CommandError(f'Checkpoint inválido em {caminho}: {e}')
+
+    def _gravar_checkpoint(self, caminho, company_id):
+        # Grava num temporário e renomeia: uma interrupção no meio não corrompe o checkpoint
+        temporario = f'{caminho}.tmp'
+        with open(temporario, 'w') as arquivo:
+            json.dump({'ultima_company_id': company_id}, arquivo)
+        os.replace(temporario, caminho)
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_backfill_email_verified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contabancaria',
+            name='mapeamento_extrato',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_contabancaria_mapeamento_extrato'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('arquivo', models.BinaryField(blank=True, null=True)),
+                ('arquivo_nome', models.CharField(blank=True, max_length=255)),
+                ('progresso', models.PositiveSmallIntegerField(default=0)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('resultado_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('resultado_arquivo', models.BinaryField(blank=True, null=True)),
+                ('resultado_content_type', models.CharField(blank=True, max_length=100)),
+                ('resultado_nome', models.CharField(blank=True, max_length=255)),
+                ('erro', models.TextField(blank=True)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('finalizado_em', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.company')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='job_status_criado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:41
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def preencher_saldos_diarios(apps, schema_editor):
+    """
+    Monta os saldos diários a partir dos pagamentos existentes
+    (mesma lógica de services.saldos.reconstruir_saldos).
+    """
+    ContaBancaria = apps.get_model('core', 'ContaBancaria')
+    Payment = apps.get_model('core', 'Payment')
+    SaldoDiario = apps.get_model('core', 'SaldoDiario')
+
+    for conta in ContaBancaria.objects.all().iterator():
+        dias = (
+            Payment.objects.filter(conta_bancaria=conta)
+            .values('data_pagamento')
+            .annotate(entradas=Sum('valor', filter=Q(tipo='E')), saidas=Sum('valor', filter=Q(tipo='S')))
+            .order_by('-data_pagamento')
+        )
+        saldo = conta.saldo_atual
+        linhas = []
+        for dia in dias:
+            entradas = dia['entradas'] or Decimal('0.00')
+            saidas = dia['saidas'] or Decimal('0.00')
+            linhas.append(SaldoDiario(
+                company_id=conta.company_id,
+                conta_bancaria=conta,
+                data=dia['data_pagamento'],
+                entradas=entradas,
+                saidas=saidas,
+                saldo=saldo,
+            ))
+            saldo -= entradas - saidas
+        SaldoDiario.objects.bulk_create(linhas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_nome_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('saidas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('saldo', models.DecimalField(decimal_places=2, help_text='Saldo da conta no fim do dia', max_digits=12)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.company')),
+                ('conta_bancaria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_diarios', to='core.contabancaria')),
+            ],
+            options={
+                'verbose_name': 'Saldo Diário',
+                'verbose_name_plural': 'Saldos Diários',
+                'constraints': [models.UniqueConstraint(fields=('conta_bancaria', 'data'), name='saldo_diario_conta_data_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_saldos_diarios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:46
+
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def preencher_saldo_inicial(apps, schema_editor):
+    """Parte do saldo atual como correto: saldo_inicial = saldo_atual - líquido dos pagamentos."""
+    ContaBancaria = apps.get_model('core', 'ContaBancaria')
+
+    contas = ContaBancaria.objects.annotate(
+        liquido=Coalesce(
+            Sum(Case(
+                When(payments__tipo='E', then=F('payments__valor')),
+                When(payments__tipo='S', then=-F('payments__valor')),
+            )),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+    for conta in contas.iterator():
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo_inicial=conta.saldo_atual - conta.liquido)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_saldo_diario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contabancaria',
+            name='saldo_inicial',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(preencher_saldo_inicial, migrations.RunPython.noop),
+    ]
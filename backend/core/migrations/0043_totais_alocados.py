@@ -0,0 +1,64 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:49
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_totais(apps, schema_editor):
+    """Soma as alocações existentes em cada pagamento, receita, despesa e custódia."""
+    Allocation = apps.get_model('core', 'Allocation')
+
+    def soma(campo, **filtros):
+        alocacoes = Allocation.objects.filter(**{campo: OuterRef('pk')}, **filtros)
+        return Coalesce(
+            Subquery(alocacoes.values(campo).annotate(total=Sum('valor')).values('total')),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    apps.get_model('core', 'Payment').objects.update(total_alocado=soma('payment'))
+    apps.get_model('core', 'Receita').objects.update(total_alocado=soma('receita'))
+    apps.get_model('core', 'Despesa').objects.update(total_alocado=soma('despesa'))
+    apps.get_model('core', 'Custodia').objects.update(
+        total_entradas=soma('custodia', payment__tipo='E'),
+        total_saidas=soma('custodia', payment__tipo='S'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_saldo_inicial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='custodia',
+            name='total_entradas',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='custodia',
+            name='total_saidas',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='despesa',
+            name='total_alocado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='total_alocado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='receita',
+            name='total_alocado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
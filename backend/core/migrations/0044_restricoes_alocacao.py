@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_totais_alocados'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='allocation',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('custodia__isnull', True), ('despesa__isnull', True), ('receita__isnull', False), ('transfer__isnull', True)), models.Q(('custodia__isnull', True), ('despesa__isnull', False), ('receita__isnull', True), ('transfer__isnull', True)), models.Q(('custodia__isnull', False), ('despesa__isnull', True), ('receita__isnull', True), ('transfer__isnull', True)), models.Q(('custodia__isnull', True), ('despesa__isnull', True), ('receita__isnull', True), ('transfer__isnull', False)), _connector='OR'), name='alocacao_uma_conta'),
+        ),
+        migrations.AddConstraint(
+            model_name='allocation',
+            constraint=models.CheckConstraint(condition=models.Q(('valor__gt', 0)), name='alocacao_valor_positivo'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.CheckConstraint(condition=models.Q(('total_alocado__gte', 0), ('total_alocado__lte', models.F('valor'))), name='payment_total_alocado_ate_valor'),
+        ),
+    ]
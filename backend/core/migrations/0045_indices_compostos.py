@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_restricoes_alocacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='allocation',
+            index=models.Index(condition=models.Q(('transfer__isnull', False)), fields=['payment'], name='alocacao_transfer_pay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['company', 'situacao', 'data_vencimento'], name='despesa_emp_sit_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['company', 'tipo', 'data_vencimento'], name='despesa_emp_tipo_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['company', 'data_vencimento'], name='despesa_emp_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['company', 'data_pagamento'], name='payment_emp_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['company', 'tipo', 'data_pagamento'], name='payment_emp_tipo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('total_alocado', 0)), fields=['company', 'data_pagamento'], name='payment_pendente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receita',
+            index=models.Index(fields=['company', 'situacao', 'data_vencimento'], name='receita_emp_sit_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receita',
+            index=models.Index(fields=['company', 'data_vencimento'], name='receita_emp_venc_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+from core.helpers.texto import documento_busca
+
+# Modelo: campos que compõem o documento de busca (CAMPOS_BUSCA de cada modelo)
+CAMPOS_BUSCA = {
+    'Cliente': ('nome', 'cpf', 'email', 'telefone'),
+    'Funcionario': ('nome', 'cpf', 'email', 'telefone'),
+    'Receita': ('nome', 'descricao'),
+    'Despesa': ('nome', 'descricao'),
+    'Custodia': ('nome', 'descricao'),
+    'Payment': ('observacao',),
+}
+
+
+def preencher_busca(apps, schema_editor):
+    for nome_modelo, campos in CAMPOS_BUSCA.items():
+        model = apps.get_model('core', nome_modelo)
+        lote = []
+        for obj in model.objects.only('id', *campos).order_by('id').iterator(chunk_size=1000):
+            obj.busca = documento_busca(getattr(obj, campo) for campo in campos)
+            lote.append(obj)
+            if len(lote) >= 1000:
+                model.objects.bulk_update(lote, ['busca'])
+                lote = []
+        if lote:
+            model.objects.bulk_update(lote, ['busca'])
+
+
+def criar_indices_trigram(apps, schema_editor):
+    # GIN de trigramas só existe no PostgreSQL; nos demais bancos a busca faz varredura
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nome_modelo in CAMPOS_BUSCA:
+        tabela = apps.get_model('core', nome_modelo)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {tabela}_busca_trgm ON {tabela} USING gin (busca gin_trgm_ops)'
+        )
+
+
+def remover_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nome_modelo in CAMPOS_BUSCA:
+        tabela = apps.get_model('core', nome_modelo)._meta.db_table
+        schema_editor.execute(f'DROP INDEX IF EXISTS {tabela}_busca_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_indices_compostos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='custodia',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='despesa',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='funcionario',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='receita',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indices_trigram, remover_indices_trigram),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 6.0.1 on 2026-10-17 08:24
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+
+def preencher_resumo_mensal(apps, schema_editor):
+    """
+    Monta o resumo mensal a partir dos dados existentes
+    (mesma lógica de services.resumo.reconstruir_resumo).
+    """
+    Payment = apps.get_model('core', 'Payment')
+    Allocation = apps.get_model('core', 'Allocation')
+    Receita = apps.get_model('core', 'Receita')
+    Despesa = apps.get_model('core', 'Despesa')
+    ResumoMensal = apps.get_model('core', 'ResumoMensal')
+
+    def mes(valor):
+        return date(valor.year, valor.month, 1)
+
+    caixa = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')])
+    pagamentos = Payment.objects.exclude(allocations__transfer__isnull=False)
+    nao_alocados = (
+        pagamentos.filter(total_alocado__lt=F('valor'))
+        .annotate(mes=TruncMonth('data_pagamento'))
+        .values('company_id', 'mes', 'conta_bancaria_id', 'tipo')
+        .annotate(total=Sum(F('valor') - F('total_alocado')))
+        .order_by()
+    )
+    for linha in nao_alocados:
+        chave = (linha['company_id'], mes(linha['mes']), linha['conta_bancaria_id'], 'NA')
+        caixa[chave][0 if linha['tipo'] == 'E' else 1] += linha['total']
+    alocados = (
+        Allocation.objects.filter(payment__in=pagamentos)
+        .annotate(mes=TruncMonth('payment__data_pagamento'))
+        .values('payment__company_id', 'mes', 'payment__conta_bancaria_id', 'payment__tipo',
+                'receita__tipo', 'despesa__tipo')
+        .annotate(total=Sum('valor'))
+        .order_by()
+    )
+    for linha in alocados:
+        if linha['receita__tipo']:
+            categoria = 'R' + linha['receita__tipo']
+        elif linha['despesa__tipo']:
+            categoria = 'D' + linha['despesa__tipo']
+        else:
+            categoria = 'CU'
+        chave = (linha['payment__company_id'], mes(linha['mes']), linha['payment__conta_bancaria_id'], categoria)
+        caixa[chave][0 if linha['payment__tipo'] == 'E' else 1] += linha['total']
+
+    linhas = [
+        ResumoMensal(
+            company_id=company_id, mes=mes_linha, conta_bancaria_id=conta_id,
+            categoria=categoria, entradas=entradas, saidas=saidas,
+        )
+        for (company_id, mes_linha, conta_id, categoria), (entradas, saidas) in caixa.items()
+        if entradas or saidas
+    ]
+    for model, prefixo in ((Receita, 'R'), (Despesa, 'D')):
+        totais = (
+            model.objects.annotate(mes=TruncMonth('data_vencimento'))
+            .values('company_id', 'mes', 'tipo')
+            .annotate(total=Sum('valor'))
+            .order_by()
+        )
+        linhas += [
+            ResumoMensal(
+                company_id=linha['company_id'], mes=mes(linha['mes']),
+                categoria=prefixo + linha['tipo'], competencia=linha['total'],
+            )
+            for linha in totais
+            if linha['total']
+        ]
+    ResumoMensal.objects.bulk_create(linhas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_documento_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês')),
+                ('categoria', models.CharField(choices=[('RF', 'Receita Fixa'), ('RV', 'Receita Variável'), ('RE', 'Estorno'), ('DF', 'Despesa Fixa'), ('DV', 'Despesa Variável'), ('DC', 'Comissionamento'), ('DR', 'Reembolso'), ('CU', 'Custódia'), ('NA', 'Não Alocado')], max_length=2)),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('saidas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('competencia', models.DecimalField(decimal_places=2, default=0, help_text='Valor das contas com vencimento no mês', max_digits=14)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.company')),
+                ('conta_bancaria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='core.contabancaria')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal',
+                'verbose_name_plural': 'Resumos Mensais',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('conta_bancaria__isnull', False)), fields=('company', 'mes', 'conta_bancaria', 'categoria'), name='resumo_mensal_caixa_uniq'), models.UniqueConstraint(condition=models.Q(('conta_bancaria__isnull', True)), fields=('company', 'mes', 'categoria'), name='resumo_mensal_competencia_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_resumo_mensal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 08:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def criar_versoes(apps, schema_editor):
+    """Uma linha por empresa existente (as novas ganham a sua na primeira gravação)."""
+    Company = apps.get_model('core', 'Company')
+    VersaoDados = apps.get_model('core', 'VersaoDados')
+    VersaoDados.objects.bulk_create(
+        [VersaoDados(company_id=pk) for pk in Company.objects.values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_resumo_mensal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoDados',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='versao_dados', serialize=False, to='core.company')),
+                ('versao', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versão dos Dados',
+                'verbose_name_plural': 'Versões dos Dados',
+            },
+        ),
+        migrations.RunPython(criar_versoes, migrations.RunPython.noop),
+    ]
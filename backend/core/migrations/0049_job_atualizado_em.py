@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_versao_dados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='atualizado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -2,9 +2,12 @@ from .identity import Company, CustomUser
 from .people import Cliente, FormaCobranca, Funcionario, ClienteComissao
 from .revenue import Receita, ReceitaComissao, ReceitaRecorrente, ReceitaRecorrenteComissao
 from .expense import Despesa, DespesaRecorrente
-from .banking import ContaBancaria, Payment, Transfer
+from .banking import ContaBancaria, Payment, SaldoDiario, Transfer
 from .custody import Custodia, Allocation
+from .resumo import ResumoMensal
+from .versao import VersaoDados
 from .subscription import PlanoAssinatura, AssinaturaEmpresa, WebhookLog
+from .jobs import Job
 
 __all__ = [
     'Company',
@@ -21,10 +24,14 @@ __all__ = [
     'DespesaRecorrente',
     'ContaBancaria',
     'Payment',
+    'SaldoDiario',
     'Transfer',
     'Custodia',
     'Allocation',
+    'ResumoMensal',
+    'VersaoDados',
     'PlanoAssinatura',
     'AssinaturaEmpresa',
     'WebhookLog',
+    'Job',
 ]
@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class TotaisAlocados(models.Model):
+    """
+    Base dos modelos que guardam a soma das próprias alocações (campos em
+    `CAMPOS_TOTAIS`), para que listas e relatórios leiam uma coluna em vez
+    de agregar `allocations` com join.
+
+    Os totais só mudam por UPDATE ... SET campo = campo + delta
+    (services/alocacoes.py), na mesma transação que grava ou apaga a
+    alocação. Por isso o save() de uma instância carregada antes não regrava
+    esses campos. Conferência e correção: `manage.py verificar_totais_alocados`.
+    """
+    CAMPOS_TOTAIS = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CAMPOS_TOTAIS
+            ]
+        super().save(*args, **kwargs)
+
+    def atualizar_totais(self):
+        """Relê do banco os totais alocados (a instância pode estar desatualizada)."""
+        self.refresh_from_db(fields=self.CAMPOS_TOTAIS)
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from decimal import Decimal
 from django.db.models import Sum
+from .alocado import TotaisAlocados
+from .busca import Buscavel
 from .identity import Company
 
 
@@ -9,6 +11,11 @@ class ContaBancaria(models.Model):
     nome = models.CharField(max_length=100)
     descricao = models.TextField(blank=True, null=True)
     saldo_atual = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Saldo antes de qualquer pagamento: saldo_atual = saldo_inicial + líquido dos pagamentos.
+    # Só muda quando o saldo é editado à mão (ver services/saldos.py e verify_balances)
+    saldo_inicial = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Layout do último extrato importado (formato, linha do cabeçalho, colunas)
+    mapeamento_extrato = models.JSONField(default=dict, blank=True)
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
@@ -19,8 +26,14 @@ class ContaBancaria(models.Model):
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        # Conta nova ainda não tem pagamentos: o saldo informado é o inicial
+        if self._state.adding:
+            self.saldo_inicial = self.saldo_atual
+        super().save(*args, **kwargs)
 
-class Payment(models.Model):
+
+class Payment(Buscavel, TotaisAlocados):
     """
     Pagamento neutro que representa entrada ou saída de caixa.
     A alocação para Receitas/Despesas/Passivos é feita via modelo Allocation.
@@ -41,15 +54,75 @@ class Payment(models.Model):
     data_pagamento = models.DateField()
     observacao = models.TextField(blank=True, null=True)
     criado_em = models.DateTimeField(auto_now_add=True)
+    # Soma das alocações deste pagamento (ver TotaisAlocados)
+    total_alocado = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
+    CAMPOS_TOTAIS = ('total_alocado',)
+    CAMPOS_BUSCA = ('observacao',)
 
     def __str__(self):
         tipo_display = "Entrada" if self.tipo == 'E' else "Saída"
         return f"{tipo_display} de R$ {self.valor} em {self.data_pagamento}"
 
+    def delete(self, *args, **kwargs):
+        from ..services.alocacoes import aplicar_totais, movimento_da_alocacao
+        from ..services.resumo import resumo_em_lote
+
+        # As alocações saem em cascata sem passar pelo Allocation.delete()
+        with transaction.atomic(), resumo_em_lote():
+            movimentos = [movimento_da_alocacao(a, self.tipo) for a in self.allocations.all()]
+            resultado = super().delete(*args, **kwargs)
+            aplicar_totais(movimentos, sinal=-1)
+        return resultado
+
     class Meta:
         verbose_name = "Pagamento"
         verbose_name_plural = "Pagamentos"
         ordering = ['-data_pagamento', '-criado_em']
+        indexes = [
+            # Lista padrão (-data_pagamento) e filtros de período
+            models.Index(fields=['company', 'data_pagamento'], name='payment_emp_data_idx'),
+            # Entradas/saídas do período (dashboard, fluxo de caixa)
+            models.Index(fields=['company', 'tipo', 'data_pagamento'], name='payment_emp_tipo_data_idx'),
+            # Pagamentos sem alocação (carga da conciliação)
+            models.Index(
+                fields=['company', 'data_pagamento'], condition=models.Q(total_alocado=0),
+                name='payment_pendente_idx',
+            ),
+        ]
+        constraints = [
+            # Soma das alocações <= valor: total_alocado muda na mesma transação de cada alocação
+            models.CheckConstraint(
+                condition=models.Q(total_alocado__gte=0, total_alocado__lte=models.F('valor')),
+                name='payment_total_alocado_ate_valor',
+            ),
+        ]
+
+
+class SaldoDiario(models.Model):
+    """
+    Saldo de fechamento de uma conta bancária num dia com movimentação.
+
+    Mantido junto com `saldo_atual` (ver services/saldos.py) para que o saldo
+    numa data seja a consulta de uma linha, sem somar os pagamentos
+    posteriores. Reconstruível com `manage.py rebuild_saldos_diarios`.
+    """
+    company = models.ForeignKey('Company', on_delete=models.CASCADE)
+    conta_bancaria = models.ForeignKey('ContaBancaria', on_delete=models.CASCADE, related_name='saldos_diarios')
+    data = models.DateField()
+    entradas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    saidas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=12, decimal_places=2, help_text="Saldo da conta no fim do dia")
+
+    class Meta:
+        verbose_name = "Saldo Diário"
+        verbose_name_plural = "Saldos Diários"
+        constraints = [
+            models.UniqueConstraint(fields=['conta_bancaria', 'data'], name='saldo_diario_conta_data_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.conta_bancaria_id} em {self.data}: R$ {self.saldo}"
 
 
 class Transfer(models.Model):
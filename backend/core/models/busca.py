@@ -0,0 +1,31 @@
+from django.db import models
+
+from ..helpers.texto import documento_busca
+
+
+class Buscavel(models.Model):
+    """
+    Mantém `busca`: os campos de texto de `CAMPOS_BUSCA` sem acentos e em
+    minúsculas, numa coluna só. As buscas das listas e o /busca/ comparam o
+    termo normalizado com essa coluna (services/busca.py), que no PostgreSQL
+    tem índice GIN de trigramas.
+
+    Atualizado no save(); para linhas gravadas por bulk_create/update use o
+    comando `reindexar_busca`.
+    """
+    CAMPOS_BUSCA = ()
+
+    busca = models.TextField(blank=True, default='', editable=False)
+
+    class Meta:
+        abstract = True
+
+    def atualizar_busca(self):
+        self.busca = documento_busca(getattr(self, campo) for campo in self.CAMPOS_BUSCA)
+
+    def save(self, *args, **kwargs):
+        self.atualizar_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_BUSCA):
+            kwargs['update_fields'] = {*update_fields, 'busca'}
+        super().save(*args, **kwargs)
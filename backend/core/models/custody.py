@@ -1,11 +1,14 @@
-from django.db import models
-from django.db.models import Sum
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q, Sum
 from django.core.exceptions import ValidationError
 from decimal import Decimal
+from .alocado import TotaisAlocados
+from .busca import Buscavel
 from .identity import Company
+from .nome import NomeIndexado
 
 
-class Custodia(models.Model):
+class Custodia(NomeIndexado, Buscavel, TotaisAlocados):
     """
     Representa valores de terceiros (ativos e passivos de custódia).
     - Passivo: valores que a empresa deve repassar a terceiros
@@ -45,9 +48,16 @@ class Custodia(models.Model):
     valor_total = models.DecimalField(max_digits=10, decimal_places=2)
     valor_liquidado = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='A')
+    # Soma das alocações por tipo de pagamento (ver TotaisAlocados): o status
+    # depende das entradas e das saídas separadas
+    total_entradas = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    total_saidas = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    CAMPOS_TOTAIS = ('total_entradas', 'total_saidas')
+    CAMPOS_BUSCA = ('nome', 'descricao')
+
     class Meta:
         verbose_name = "Custódia"
         verbose_name_plural = "Custódias"
@@ -59,19 +69,17 @@ class Custodia(models.Model):
         tipo_display = 'Passivo' if self.tipo == 'P' else 'Ativo'
         return f'{self.nome} ({tipo_display}) - {pessoa}'
 
-    def atualizar_status(self):
-        total_entradas = self.allocations.filter(
-            payment__tipo='E'
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+    @property
+    def total_alocado(self):
+        return self.total_entradas + self.total_saidas
 
-        total_saidas = self.allocations.filter(
-            payment__tipo='S'
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+    def atualizar_status(self):
+        self.atualizar_totais()
 
         if self.tipo == 'P':
-            self.valor_liquidado = min(total_entradas, total_saidas)
+            self.valor_liquidado = min(self.total_entradas, self.total_saidas)
         else:
-            self.valor_liquidado = min(total_saidas, total_entradas)
+            self.valor_liquidado = min(self.total_saidas, self.total_entradas)
 
         if self.valor_liquidado >= self.valor_total:
             self.status = 'L'
@@ -83,6 +91,14 @@ class Custodia(models.Model):
         self.save()
 
 
+CONTAS_ALOCACAO = ('receita', 'despesa', 'custodia', 'transfer')
+
+
+def _somente_conta(campo):
+    """Q: `campo` preenchido e as demais contas da alocação vazias."""
+    return Q(**{f'{conta}__isnull': conta != campo for conta in CONTAS_ALOCACAO})
+
+
 class Allocation(models.Model):
     """
     Alocação de um pagamento a uma conta (Receita, Despesa, Custódia ou Transferência).
@@ -131,10 +147,34 @@ class Allocation(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    # Regras garantidas pelo banco (valem também para bulk_create e UPDATE em lote).
+    # A soma das alocações até o valor do pagamento fica na restrição de Payment.
+    MENSAGENS_RESTRICOES = {
+        'alocacao_uma_conta': (
+            "A alocação só pode estar vinculada a uma única conta (Receita, Despesa, Custódia ou Transferência)."
+        ),
+        'alocacao_valor_positivo': "O valor da alocação deve ser maior que zero.",
+        'payment_total_alocado_ate_valor': "O valor total alocado excede o valor do pagamento.",
+    }
+
     class Meta:
         verbose_name = "Alocação"
         verbose_name_plural = "Alocações"
         ordering = ['-criado_em']
+        indexes = [
+            # "Pagamento tem alocação em transferência" (exclusão das transferências nos totais)
+            models.Index(fields=['payment'], condition=Q(transfer__isnull=False), name='alocacao_transfer_pay_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    _somente_conta('receita') | _somente_conta('despesa')
+                    | _somente_conta('custodia') | _somente_conta('transfer')
+                ),
+                name='alocacao_uma_conta',
+            ),
+            models.CheckConstraint(condition=Q(valor__gt=0), name='alocacao_valor_positivo'),
+        ]
 
     def __str__(self):
         if self.receita:
@@ -182,7 +222,35 @@ class Allocation(models.Model):
                 )
 
     def save(self, *args, **kwargs):
+        from ..services.alocacoes import aplicar_totais, movimento_da_alocacao
+        from ..services.resumo import resumo_em_lote
+
         if self.valor is not None:
             self.valor = Decimal(self.valor).quantize(Decimal('0.01'))
-        self.clean()
-        super().save(*args, **kwargs)
+
+        # As regras do clean() são verificadas pelo banco; aqui só se traduz o erro
+        try:
+            with transaction.atomic(), resumo_em_lote():
+                # Alteração: estorna dos totais a versão gravada antes de somar a nova
+                anterior = None
+                if self.pk is not None:
+                    anterior = Allocation.objects.select_related('payment').filter(pk=self.pk).first()
+                super().save(*args, **kwargs)
+                if anterior is not None:
+                    aplicar_totais([movimento_da_alocacao(anterior)], sinal=-1)
+                aplicar_totais([movimento_da_alocacao(self)])
+        except IntegrityError as e:
+            for restricao, mensagem in self.MENSAGENS_RESTRICOES.items():
+                if restricao in str(e):
+                    raise ValidationError(mensagem) from e
+            raise
+
+    def delete(self, *args, **kwargs):
+        from ..services.alocacoes import aplicar_totais, movimento_da_alocacao
+        from ..services.resumo import resumo_em_lote
+
+        with transaction.atomic(), resumo_em_lote():
+            movimento = movimento_da_alocacao(self)
+            resultado = super().delete(*args, **kwargs)
+            aplicar_totais([movimento], sinal=-1)
+        return resultado
@@ -1,13 +1,13 @@
 from django.db import models
-from django.db.models import Sum
 from django.utils import timezone
-from decimal import Decimal
+from .alocado import TotaisAlocados
+from .busca import Buscavel
 from .identity import Company
 from .people import Funcionario
 from .revenue import Receita
 
 
-class Despesa(models.Model):
+class Despesa(Buscavel, TotaisAlocados):
     TIPO_CHOICES = (
         ('F', 'Despesa Fixa'),
         ('V', 'Despesa Variável'),
@@ -37,6 +37,19 @@ class Despesa(models.Model):
         blank=True,
         related_name='despesas_comissao'
     )
+    # Soma das alocações (ver TotaisAlocados)
+    total_alocado = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
+    CAMPOS_TOTAIS = ('total_alocado',)
+    CAMPOS_BUSCA = ('nome', 'descricao')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'situacao', 'data_vencimento'], name='despesa_emp_sit_venc_idx'),
+            # Relatórios por tipo (comissões, fixas/variáveis) no período
+            models.Index(fields=['company', 'tipo', 'data_vencimento'], name='despesa_emp_tipo_venc_idx'),
+            models.Index(fields=['company', 'data_vencimento'], name='despesa_emp_venc_idx'),
+        ]
 
     def __str__(self):
         return f'{self.nome} - {self.responsavel.nome}'
@@ -45,7 +58,8 @@ class Despesa(models.Model):
         super().save(*args, **kwargs)
 
     def atualizar_status(self):
-        total_pago = self.allocations.aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+        self.atualizar_totais()
+        total_pago = self.total_alocado
 
         if total_pago > self.valor:
             self.valor = total_pago
@@ -0,0 +1,54 @@
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    Trabalho pesado (importação, conciliação, geração de mês, PDFs) executado
+    fora do request pelo comando `run_worker`.
+
+    A fila é a própria tabela: o worker reserva o próximo job pendente com
+    SELECT ... FOR UPDATE SKIP LOCKED, então não há broker externo.
+    """
+    STATUS_CHOICES = (
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluido', 'Concluído'),
+        ('erro', 'Erro'),
+    )
+
+    company = models.ForeignKey('Company', on_delete=models.CASCADE, related_name='jobs')
+    usuario = models.ForeignKey(
+        'CustomUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs'
+    )
+    tipo = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente')
+    parametros = models.JSONField(default=dict, blank=True)
+    # Arquivo enviado no request original (ex.: extrato)
+    arquivo = models.BinaryField(null=True, blank=True)
+    arquivo_nome = models.CharField(max_length=255, blank=True)
+    progresso = models.PositiveSmallIntegerField(default=0)
+    # Resposta do endpoint: JSON em `resultado` ou binário (PDF) em `resultado_arquivo`
+    resultado = models.JSONField(null=True, blank=True)
+    resultado_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    resultado_arquivo = models.BinaryField(null=True, blank=True)
+    resultado_content_type = models.CharField(max_length=100, blank=True)
+    resultado_nome = models.CharField(max_length=255, blank=True)
+    erro = models.TextField(blank=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    # Sinal de vida do worker durante a execução (travado = sem sinal recente)
+    atualizado_em = models.DateTimeField(null=True, blank=True)
+    finalizado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['status', 'criado_em'], name='job_status_criado_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo} #{self.pk} ({self.status})'
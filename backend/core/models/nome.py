@@ -0,0 +1,29 @@
+from django.db import models
+
+from ..helpers.texto import indexar_nome
+
+
+class NomeIndexado(models.Model):
+    """
+    Mantém o nome normalizado (sem acentos, minúsculo) e as palavras
+    significativas dele, usados pela conciliação bancária para comparar com
+    a observação dos pagamentos sem retokenizar o nome a cada execução.
+
+    Atualizados no save(); para linhas gravadas por bulk_create/update use o
+    comando `backfill_nomes_normalizados`.
+    """
+    nome_normalizado = models.CharField(max_length=255, blank=True, default='', editable=False)
+    nome_tokens = models.JSONField(default=list, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def atualizar_nome_indexado(self):
+        self.nome_normalizado, self.nome_tokens = indexar_nome(self.nome)
+
+    def save(self, *args, **kwargs):
+        self.atualizar_nome_indexado()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nome_normalizado', 'nome_tokens'}
+        super().save(*args, **kwargs)
@@ -1,8 +1,10 @@
 from django.db import models
 from .identity import Company
+from .busca import Buscavel
+from .nome import NomeIndexado
 
 
-class Cliente(models.Model):
+class Cliente(NomeIndexado, Buscavel):
     TIPO_CHOICES = (
         ('F', 'Fixo'),
         ('A', 'Avulso'),
@@ -16,6 +18,8 @@ class Cliente(models.Model):
     aniversario = models.DateField(blank=True, null=True)
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
 
+    CAMPOS_BUSCA = ('nome', 'cpf', 'email', 'telefone')
+
     def __str__(self):
         return self.nome
 
@@ -40,7 +44,7 @@ class FormaCobranca(models.Model):
         return "Forma de Cobrança"
 
 
-class Funcionario(models.Model):
+class Funcionario(NomeIndexado, Buscavel):
     TIPO_CHOICES = (
         ('F', 'Funcionário'),
         ('P', 'Parceiro'),
@@ -56,6 +60,8 @@ class Funcionario(models.Model):
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
     salario_mensal = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
+    CAMPOS_BUSCA = ('nome', 'cpf', 'email', 'telefone')
+
     def __str__(self):
         return self.nome
 
@@ -0,0 +1,63 @@
+from django.db import models
+from django.db.models import Q
+
+
+class ResumoMensal(models.Model):
+    """
+    Totais do mês por empresa, conta bancária e categoria, para os relatórios
+    mensais (dashboard, DRE, balanço) lerem algumas dezenas de linhas em vez
+    de somar os pagamentos e as contas do período.
+
+    Dois tipos de linha:
+    - Caixa (conta_bancaria preenchida): entradas e saídas dos pagamentos do
+      mês na conta, pela categoria da alocação (receita/despesa por tipo,
+      custódia) ou 'Não Alocado' para a parte sem alocação. Pagamentos com
+      alocação em transferência ficam de fora (se anulam entre as contas).
+    - Competência (conta_bancaria vazia): soma do valor das receitas e
+      despesas com vencimento no mês, por tipo.
+
+    Mantido pelos caminhos de gravação (ver services/resumo.py) e
+    reconstruível com `manage.py rebuild_resumo_mensal`.
+    """
+    CATEGORIA_CHOICES = (
+        ('RF', 'Receita Fixa'),
+        ('RV', 'Receita Variável'),
+        ('RE', 'Estorno'),
+        ('DF', 'Despesa Fixa'),
+        ('DV', 'Despesa Variável'),
+        ('DC', 'Comissionamento'),
+        ('DR', 'Reembolso'),
+        ('CU', 'Custódia'),
+        ('NA', 'Não Alocado'),
+    )
+
+    company = models.ForeignKey('Company', on_delete=models.CASCADE)
+    mes = models.DateField(help_text="Primeiro dia do mês")
+    conta_bancaria = models.ForeignKey(
+        'ContaBancaria', on_delete=models.CASCADE, null=True, blank=True, related_name='resumos_mensais'
+    )
+    categoria = models.CharField(max_length=2, choices=CATEGORIA_CHOICES)
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saidas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    competencia = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Valor das contas com vencimento no mês"
+    )
+
+    class Meta:
+        verbose_name = "Resumo Mensal"
+        verbose_name_plural = "Resumos Mensais"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'mes', 'conta_bancaria', 'categoria'],
+                condition=Q(conta_bancaria__isnull=False),
+                name='resumo_mensal_caixa_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['company', 'mes', 'categoria'],
+                condition=Q(conta_bancaria__isnull=True),
+                name='resumo_mensal_competencia_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} {self.mes:%m/%Y} {self.categoria}"
@@ -1,12 +1,12 @@
 from django.db import models
-from django.db.models import Sum
 from django.utils import timezone
-from decimal import Decimal
+from .alocado import TotaisAlocados
+from .busca import Buscavel
 from .identity import Company
 from .people import Cliente
 
 
-class Receita(models.Model):
+class Receita(Buscavel, TotaisAlocados):
     FORMA_CHOICES = (
         ('P', 'Pix'),
         ('B', 'Boleto'),
@@ -33,12 +33,26 @@ class Receita(models.Model):
     forma_pagamento = models.CharField(max_length=1, choices=FORMA_CHOICES, blank=True, null=True)
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
     situacao = models.CharField(max_length=1, choices=SITUACAO_CHOICES, default='A')
+    # Soma das alocações (ver TotaisAlocados)
+    total_alocado = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
+    CAMPOS_TOTAIS = ('total_alocado',)
+    CAMPOS_BUSCA = ('nome', 'descricao')
+
+    class Meta:
+        indexes = [
+            # Listas por situação, vencidas e projeções (situacao + faixa de vencimento)
+            models.Index(fields=['company', 'situacao', 'data_vencimento'], name='receita_emp_sit_venc_idx'),
+            # Faixas de vencimento sem situação (gráficos mensais, DRE, PDFs)
+            models.Index(fields=['company', 'data_vencimento'], name='receita_emp_venc_idx'),
+        ]
 
     def __str__(self):
         return f'{self.nome} - {self.cliente.nome}'
 
     def atualizar_status(self):
-        total_pago = self.allocations.aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+        self.atualizar_totais()
+        total_pago = self.total_alocado
 
         if total_pago > self.valor:
             self.valor = total_pago
@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class VersaoDados(models.Model):
+    """
+    Contador de versão dos dados financeiros da empresa.
+
+    Sobe na mesma transação de qualquer gravação que afete relatórios
+    (ver services/versao.py); o cache de relatórios usa o valor na chave, de
+    modo que uma entrada nunca fica desatualizada nem precisa ser apagada.
+    """
+    company = models.OneToOneField(
+        'Company', on_delete=models.CASCADE, primary_key=True, related_name='versao_dados'
+    )
+    versao = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versão dos Dados"
+        verbose_name_plural = "Versões dos Dados"
+
+    def __str__(self):
+        return f"{self.company_id} v{self.versao}"
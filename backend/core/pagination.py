@@ -1,7 +1,148 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core import signing
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+SALT_CURSOR = 'core.pagination.cursor'
+
+
+def _ordenacao(queryset):
+    """Campos de ordenação do queryset, sempre terminando na pk (desempate estável)."""
+    campos = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    if any(not isinstance(campo, str) or campo.startswith('?') for campo in campos):
+        raise NotFound('Ordenação não suportada na paginação por cursor.')
+    campos = [campo.replace('pk', 'id') if campo.lstrip('-') == 'pk' else campo for campo in campos]
+    if not campos or campos[-1].lstrip('-') != 'id':
+        campos.append('id')
+    return campos
+
+
+def _serializar(valor):
+    """Valor de ordenação em JSON sem perda (datas completas, Decimal como texto)."""
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _depois_de(ordenacao, valores) -> Q:
+    """
+    Linhas posteriores à chave `valores` na `ordenacao` (nulos por último):
+    (a > x) OU (a = x E b > y) OU ... — o "keyset" da última linha da página.
+    """
+    condicao = Q(pk__in=[])
+    iguais = Q()
+    for campo, valor in zip(ordenacao, valores):
+        nome = campo.lstrip('-')
+        if valor is None:
+            # Depois de um nulo só vêm outros nulos (decididos pelos campos seguintes)
+            iguais &= Q(**{f'{nome}__isnull': True})
+            continue
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        depois = Q(**{f'{nome}__{operador}': valor}) | Q(**{f'{nome}__isnull': True})
+        condicao |= iguais & depois
+        iguais &= Q(**{nome: valor})
+    return condicao
+
+
+def contagem_estimada(queryset) -> int:
+    """
+    Total aproximado sem COUNT(*): no PostgreSQL, a estimativa de linhas do
+    planejador (EXPLAIN); nos demais bancos, a contagem exata.
+    """
+    queryset = queryset.order_by()
+    conexao = connections[queryset.db]
+    if conexao.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with conexao.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]['Plan']['Plan Rows'])
 
 
 class DynamicPageSizePagination(PageNumberPagination):
     page_size = 10  # valor padrão
     page_size_query_param = 'page_size'  # permite que o frontend controle isso
-    max_page_size = 100  # limite máximo de segurança
\ No newline at end of file
+    max_page_size = 100  # limite máximo de segurança
+
+    # Paginação por cursor (opcional): ?paginacao=cursor inicia, `next` traz ?cursor=...
+    # Sem COUNT(*) nem OFFSET: cada página filtra a partir da chave da última linha,
+    # na mesma ordenação do get_queryset() da view. ?contagem=estimada devolve
+    # `estimated_count` (estimativa do planejador no PostgreSQL).
+    modo_query_param = 'paginacao'
+    cursor_query_param = 'cursor'
+    contagem_query_param = 'contagem'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.modo_cursor = (
+            request.query_params.get(self.modo_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.modo_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginar_por_cursor(queryset, request)
+
+    def _paginar_por_cursor(self, queryset, request):
+        self.request = request
+        ordenacao = _ordenacao(queryset)
+
+        self.estimated_count = None
+        if request.query_params.get(self.contagem_query_param) == 'estimada':
+            self.estimated_count = contagem_estimada(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                chave = signing.loads(cursor, salt=SALT_CURSOR)
+            except signing.BadSignature:
+                raise NotFound('Cursor inválido.')
+            # Cursor de outra ordenação (ordering mudou entre as páginas)
+            if chave.get('o') != ordenacao:
+                raise NotFound('Cursor inválido.')
+            queryset = queryset.filter(_depois_de(ordenacao, chave['v']))
+
+        queryset = queryset.annotate(
+            **{f'cursor_{i}': F(campo.lstrip('-')) for i, campo in enumerate(ordenacao)}
+        ).order_by(*[
+            F(campo[1:]).desc(nulls_last=True) if campo.startswith('-') else F(campo).asc(nulls_last=True)
+            for campo in ordenacao
+        ])
+
+        tamanho = self.get_page_size(request)
+        linhas = list(queryset[:tamanho + 1])
+        self.proximo_cursor = None
+        if len(linhas) > tamanho:
+            linhas = linhas[:tamanho]
+            ultima = linhas[-1]
+            self.proximo_cursor = signing.dumps(
+                {'o': ordenacao, 'v': [_serializar(getattr(ultima, f'cursor_{i}')) for i in range(len(ordenacao))]},
+                salt=SALT_CURSOR,
+            )
+        return linhas
+
+    def get_next_link(self):
+        if not getattr(self, 'modo_cursor', False):
+            return super().get_next_link()
+        if self.proximo_cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.proximo_cursor)
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'modo_cursor', False):
+            return super().get_paginated_response(data)
+        resposta = {'next': self.get_next_link(), 'results': data}
+        if self.estimated_count is not None:
+            resposta['estimated_count'] = self.estimated_count
+        return Response(resposta)
@@ -16,7 +16,12 @@ from datetime import datetime, timedelta, date
 from django.db.models import Sum, Q, F, DecimalField, Prefetch
 from django.db.models.functions import Coalesce
 
+from .views.cache import relatorio_em_cache
+from .views.jobs import aceita_async
 from .models import Receita, Despesa, Payment, ContaBancaria, Cliente, Funcionario, Company, Allocation, Custodia
+from .services.resumo import caixa_do_mes
+from .services.saldos import saldo_em
+from .services.status import situacao_vigente
 from .helpers.pdf import (
     PDFReportBase, format_currency, format_date, truncate_text, TableBuilder
 )
@@ -38,6 +43,8 @@ def format_date_br(date_obj) -> str:
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_receitas_pagas')
 def relatorio_receitas_pagas(request):
     try:
         company = get_company_from_request(request)
@@ -168,6 +175,8 @@ def calcular_juros_compostos(valor_principal, percentual_juros_mensal, dias_atra
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_cliente_especifico')
 def relatorio_cliente_especifico(request):
     try:
         company = get_company_from_request(request)
@@ -203,19 +212,12 @@ def relatorio_cliente_especifico(request):
             company=company,
             cliente=cliente,
             situacao__in=["A", "V"]
-        ).prefetch_related(
-            "allocations"
         ).order_by("data_vencimento")
 
         rows.append({"is_section": True, "section_title": "Contas a Receber"})
 
         for r in receitas_abertas:
-            total_recebido = sum(
-                (alloc.valor for alloc in r.allocations.all()),
-                Decimal("0.00")
-            )
-
-            valor_aberto = r.valor - total_recebido
+            valor_aberto = r.valor - r.total_alocado
 
             # ❌ Não mostrar receitas quitadas
             if valor_aberto <= 0:
@@ -441,6 +443,8 @@ def relatorio_cliente_especifico(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_despesas_pagas')
 def relatorio_despesas_pagas(request):
     try:
         company = get_company_from_request(request)
@@ -524,6 +528,8 @@ def relatorio_despesas_pagas(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_despesas_a_pagar')
 def relatorio_despesas_a_pagar(request):
     """
     Relatório de Despesas a Pagar
@@ -545,8 +551,6 @@ def relatorio_despesas_a_pagar(request):
         situacao__in=["A", "V"]
     ).select_related(
         "responsavel"
-    ).prefetch_related(
-        "allocations"
     ).order_by("data_vencimento")
 
     if responsavel_id:
@@ -562,12 +566,7 @@ def relatorio_despesas_a_pagar(request):
     total = Decimal("0.00")
 
     for despesa in despesas:
-        total_pago = sum(
-            (alloc.valor for alloc in despesa.allocations.all()),
-            Decimal("0.00")
-        )
-
-        valor_aberto = despesa.valor - total_pago
+        valor_aberto = despesa.valor - despesa.total_alocado
 
         # ❌ Não mostrar despesas totalmente quitadas
         if valor_aberto <= 0:
@@ -641,6 +640,8 @@ def relatorio_despesas_a_pagar(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_receitas_a_receber')
 def relatorio_receitas_a_receber(request):
     """
     Relatório de Receitas a Receber
@@ -662,8 +663,6 @@ def relatorio_receitas_a_receber(request):
         situacao__in=["A", "V"]
     ).select_related(
         "cliente"
-    ).prefetch_related(
-        "allocations"
     ).order_by("data_vencimento")
 
     if cliente_id:
@@ -679,12 +678,7 @@ def relatorio_receitas_a_receber(request):
     total = Decimal("0.00")
 
     for receita in receitas:
-        total_recebido = sum(
-            (alloc.valor for alloc in receita.allocations.all()),
-            Decimal("0.00")
-        )
-
-        valor_aberto = receita.valor - total_recebido
+        valor_aberto = receita.valor - receita.total_alocado
 
         # ❌ Não mostrar receitas totalmente quitadas
         if valor_aberto <= 0:
@@ -759,6 +753,8 @@ def relatorio_receitas_a_receber(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_fluxo_de_caixa')
 def relatorio_fluxo_de_caixa(request):
     """
     Relatório de Fluxo de Caixa Realizado
@@ -848,24 +844,15 @@ def relatorio_fluxo_de_caixa(request):
             })
 
     # ── Saldo inicial / final ─────────────────────────────────────────────────
-    bancos = ContaBancaria.objects.filter(company=company)
-    if conta_bancaria_id:
-        bancos = bancos.filter(id=conta_bancaria_id)
-    saldo_atual = bancos.aggregate(total=Sum('saldo_atual'))['total'] or Decimal("0.00")
-
-    impacto_futuro = Decimal("0.00")
+    # Saldo no fim de data_fim: uma consulta na tabela de saldos diários
+    conta_ids = [conta_bancaria_id] if conta_bancaria_id else None
     if data_fim:
-        futuros = Payment.objects.filter(
-            company=company,
-            conta_bancaria__isnull=False,
-            data_pagamento__gt=data_fim
-        )
-        if conta_bancaria_id:
-            futuros = futuros.filter(conta_bancaria_id=conta_bancaria_id)
-        for fp in futuros:
-            impacto_futuro += fp.valor if fp.tipo == 'E' else -fp.valor
-
-    saldo_final   = saldo_atual - impacto_futuro
+        saldo_final = saldo_em(company, data_fim, conta_ids)
+    else:
+        bancos = ContaBancaria.objects.filter(company=company)
+        if conta_ids:
+            bancos = bancos.filter(id__in=conta_ids)
+        saldo_final = bancos.aggregate(total=Sum('saldo_atual'))['total'] or Decimal("0.00")
     saldo_inicial = saldo_final - total_entrada + total_saida
 
     # ── Montar PDF ────────────────────────────────────────────────────────────
@@ -1056,6 +1043,8 @@ def relatorio_fluxo_de_caixa(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_funcionario_especifico')
 def relatorio_funcionario_especifico(request):
     try:
         company = get_company_from_request(request)
@@ -1083,20 +1072,13 @@ def relatorio_funcionario_especifico(request):
             company=company,
             responsavel=funcionario,
             situacao__in=["A", "V"]
-        ).prefetch_related(
-            "allocations"
         ).order_by("data_vencimento")
 
         total_aberto = Decimal("0.00")
         rows.append({"is_section": True, "section_title": "Despesas a Pagar"})
 
         for d in despesas_abertas:
-            total_pago = sum(
-                (alloc.valor for alloc in d.allocations.all()),
-                Decimal("0.00")
-            )
-
-            valor_aberto = d.valor - total_pago
+            valor_aberto = d.valor - d.total_alocado
 
             # ❌ Não mostrar despesas quitadas
             if valor_aberto <= 0:
@@ -1297,64 +1279,40 @@ from datetime import datetime, timedelta, date
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_dre_consolidado')
 def relatorio_dre_consolidado(request):
     """
     Gera relatório de DRE consolidado em PDF
 
-    Query Parameters:
-    - mes: Mês (1-12)
-    - ano: Ano (YYYY)
+    Query Parameters (os mesmos de /relatorios/dre/, ver services/dre.py):
+    - mes: Mês (1-12) e ano: Ano (YYYY) → um mês
+    - ano sem mes → o ano inteiro
+    - inicio / fim: AAAA-MM → intervalo de meses
     """
+    from .services.dre import LINHAS_DESPESAS, LINHAS_RECEITAS, calcular_dre, periodo_dre
 
     try:
         company = get_company_from_request(request)
     except PermissionError as e:
         return Response({"error": str(e)}, status=403)
 
-    mes = request.query_params.get('mes')
-    ano = request.query_params.get('ano')
-
-    if not mes or not ano:
-        hoje = datetime.now()
-        mes = hoje.month
-        ano = hoje.year
-    else:
-        mes = int(mes)
-        ano = int(ano)
-
-    data_inicio = f"{ano}-{str(mes).zfill(2)}-01"
-    if mes == 12:
-        data_fim = f"{ano + 1}-01-01"
-    else:
-        data_fim = f"{ano}-{str(mes + 1).zfill(2)}-01"
-    data_fim = (datetime.strptime(data_fim, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    receitas = Receita.objects.filter(
-        company=company,
-        data_vencimento__gte=data_inicio,
-        data_vencimento__lte=data_fim
-    )
-    despesas = Despesa.objects.filter(
-        company=company,
-        data_vencimento__gte=data_inicio,
-        data_vencimento__lte=data_fim
-    )
-
-    receitas_fixas    = receitas.filter(tipo='F').aggregate(Sum('valor'))['valor__sum'] or Decimal('0.00')
-    receitas_variaveis = receitas.filter(tipo='V').aggregate(Sum('valor'))['valor__sum'] or Decimal('0.00')
-    estornos          = receitas.filter(tipo='E').aggregate(Sum('valor'))['valor__sum'] or Decimal('0.00')
-    total_receitas    = float(receitas_fixas) + float(receitas_variaveis) + float(estornos)
-
-    despesas_fixas    = despesas.filter(tipo='F').aggregate(Sum('valor'))['valor__sum'] or Decimal('0.00')
-    despesas_variaveis = despesas.filter(tipo='V').aggregate(Sum('valor'))['valor__sum'] or Decimal('0.00')
-    comissoes         = despesas.filter(tipo='C').aggregate(Sum('valor'))['valor__sum'] or Decimal('0.00')
-    total_despesas    = float(despesas_fixas) + float(despesas_variaveis) + float(comissoes)
+    try:
+        inicio, fim = periodo_dre(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
 
-    resultado = total_receitas - total_despesas
+    dre = calcular_dre(company.id, inicio, fim)
+    receitas = dre['receitas']
+    despesas = dre['despesas']
+    resultado = float(dre['resultado'])
 
     # ── PDF ────────────────────────────────────────────────────────────────────
     response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f"inline; filename=dre_{mes:02d}_{ano}.pdf"
+    if inicio == fim:
+        response["Content-Disposition"] = f"inline; filename=dre_{inicio:%m_%Y}.pdf"
+    else:
+        response["Content-Disposition"] = f"inline; filename=dre_{inicio:%m_%Y}_a_{fim:%m_%Y}.pdf"
 
     pdf = canvas.Canvas(response, pagesize=A4)
     width, height = A4
@@ -1404,9 +1362,13 @@ def relatorio_dre_consolidado(request):
         "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
         "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"
     ]
+    def nome_mes(mes):
+        return f"{meses_nomes[mes.month - 1]} de {mes.year}"
+
+    periodo = nome_mes(inicio) if inicio == fim else f"{nome_mes(inicio)} a {nome_mes(fim)}"
     pdf.setFont("Helvetica", 9)
     pdf.setFillColor(C_MUTED)
-    pdf.drawCentredString(width / 2, y, f"{meses_nomes[mes - 1]} de {ano}")
+    pdf.drawCentredString(width / 2, y, periodo)
     y -= 10
 
     pdf.setStrokeColor(C_LINE)
@@ -1444,19 +1406,17 @@ def relatorio_dre_consolidado(request):
 
     # ── RECEITAS ──────────────────────────────────────────────────────────────
     y = section_header("RECEITAS", y)
-    y = item_row("Receitas Fixas",     receitas_fixas,     y)
-    y = item_row("Receitas Variáveis", receitas_variaveis, y)
-    y = item_row("Estornos",           estornos,           y)
-    y = subtotal_row("Total de Receitas", total_receitas,  y)
+    for chave, _, rotulo in LINHAS_RECEITAS:
+        y = item_row(rotulo, receitas[chave], y)
+    y = subtotal_row("Total de Receitas", receitas['total'], y)
 
     y -= 10
 
     # ── DESPESAS ──────────────────────────────────────────────────────────────
     y = section_header("DESPESAS", y)
-    y = item_row("Despesas Fixas",    despesas_fixas,    y)
-    y = item_row("Despesas Variáveis", despesas_variaveis, y)
-    y = item_row("Comissões",         comissoes,         y)
-    y = subtotal_row("Total de Despesas", total_despesas, y)
+    for chave, _, rotulo in LINHAS_DESPESAS:
+        y = item_row(rotulo, despesas[chave], y)
+    y = subtotal_row("Total de Despesas", despesas['total'], y)
 
     y -= 18
 
@@ -1474,12 +1434,46 @@ def relatorio_dre_consolidado(request):
     pdf.drawRightString(right_col, y, format_currency(resultado))
 
     # ── Rodapé ────────────────────────────────────────────────────────────────
-    pdf.setFont("Helvetica", 7)
-    pdf.setFillColor(C_MUTED)
-    pdf.drawString(margin, margin, f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}")
-    pdf.drawRightString(right_col, margin, "Página 1")
+    def rodape(pagina):
+        pdf.setFont("Helvetica", 7)
+        pdf.setFillColor(C_MUTED)
+        pdf.drawString(margin, margin, f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}")
+        pdf.drawRightString(right_col, margin, f"Página {pagina}")
 
+    rodape(1)
     pdf.showPage()
+
+    # ── Mês a mês (intervalos) ────────────────────────────────────────────────
+    if len(dre['meses']) > 1:
+        y = height - margin
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.setFillColor(C_BLACK)
+        pdf.drawCentredString(width / 2, y, "RESULTADO MÊS A MÊS")
+        y -= 16
+        pdf.setFont("Helvetica", 9)
+        pdf.setFillColor(C_MUTED)
+        pdf.drawCentredString(width / 2, y, periodo)
+        y -= 30
+
+        colunas = [right_col - 240, right_col - 120, right_col]
+        y = section_header("Mês", y)
+        pdf.setFont("Helvetica-Bold", 10)
+        for x, rotulo in zip(colunas, ("Receitas", "Despesas", "Resultado")):
+            pdf.drawRightString(x, y + 28, rotulo)
+
+        pdf.setFont("Helvetica", 10)
+        for coluna in dre['meses']:
+            pdf.setFillColor(C_BLACK)
+            pdf.drawString(margin + 8, y, nome_mes(coluna['mes']))
+            valores = (coluna['receitas']['total'], coluna['despesas']['total'], coluna['resultado'])
+            for x, valor in zip(colunas, valores):
+                pdf.drawRightString(x, y, format_currency(float(valor)))
+            y -= 17
+
+        y = subtotal_row("Total do Período", dre['resultado'], y)
+        rodape(2)
+        pdf.showPage()
+
     pdf.save()
 
     return response
@@ -1519,6 +1513,8 @@ def format_currency(value):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('recibo_pagamento')
 def recibo_pagamento(request):
     """
     Gera recibo de honorários advocatícios em PDF (formato FRS)
@@ -1788,6 +1784,8 @@ def recibo_pagamento(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_comissionamento_pdf')
 def relatorio_comissionamento_pdf(request):
     """
     Relatório PDF de comissionamento com detalhes dos pagamentos por comissionado.
@@ -2045,6 +2043,8 @@ def relatorio_comissionamento_pdf(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_balanco_pdf')
 def relatorio_balanco_pdf(request):
     """
     Relatório PDF do Fluxo de Caixa Realizado (estilo balanço).
@@ -2075,105 +2075,16 @@ def relatorio_balanco_pdf(request):
     else:
         mes, ano = int(mes_param), int(ano_param)
 
-    data_inicio = f"{ano}-{str(mes).zfill(2)}-01"
-    if mes == 12:
-        data_fim_raw = f"{ano + 1}-01-01"
-    else:
-        data_fim_raw = f"{ano}-{str(mes + 1).zfill(2)}-01"
-    data_fim = (datetime.strptime(data_fim_raw, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    # ── Buscar dados (mesma lógica do balanco_patrimonial) ────────────────────
-    payment_ids_transferencia = Allocation.objects.filter(
-        payment__company=company,
-        payment__data_pagamento__gte=data_inicio,
-        payment__data_pagamento__lte=data_fim,
-        transfer__isnull=False
-    ).values_list('payment_id', flat=True)
-
-    pagamentos = Payment.objects.filter(
-        company=company,
-        data_pagamento__gte=data_inicio,
-        data_pagamento__lte=data_fim
-    ).exclude(
-        id__in=payment_ids_transferencia
-    ).select_related('conta_bancaria').prefetch_related(
-        'allocations__receita', 'allocations__despesa', 'allocations__custodia'
-    )
+    # ── Buscar dados (mesmo serviço do balanco_patrimonial, em Decimal) ──────
+    caixa = caixa_do_mes(company.id, date(ano, mes, 1), incluir_custodias)
 
-    allocations = Allocation.objects.filter(
-        payment__company=company,
-        payment__data_pagamento__gte=data_inicio,
-        payment__data_pagamento__lte=data_fim,
-        transfer__isnull=True
-    ).select_related('payment', 'payment__conta_bancaria', 'receita', 'despesa', 'custodia')
-
-    entradas_por_banco = {}
-    saidas_por_banco   = {}
-    entradas_por_tipo  = {}
-    saidas_por_tipo    = {}
-
-    TIPO_RECEITA_MAP = {'F': 'Receita Fixa', 'V': 'Receita Variável', 'E': 'Estorno'}
-    TIPO_DESPESA_MAP = {'F': 'Despesa Fixa', 'V': 'Despesa Variável',
-                        'C': 'Comissionamento', 'R': 'Reembolso'}
-
-    for pag in pagamentos:
-        banco = pag.conta_bancaria.nome
-        valor = float(pag.valor)
-        if pag.tipo == 'E':
-            entradas_por_banco[banco] = entradas_por_banco.get(banco, 0) + valor
-        elif pag.tipo == 'S':
-            saidas_por_banco[banco] = saidas_por_banco.get(banco, 0) + valor
-
-    pagamentos_alocados = set()
-    for alloc in allocations:
-        valor = float(alloc.valor)
-        tipo_pag = alloc.payment.tipo
-        pagamentos_alocados.add(alloc.payment.id)
-
-        if alloc.receita:
-            tipo_nome = TIPO_RECEITA_MAP.get(alloc.receita.tipo, 'Outro')
-        elif alloc.despesa:
-            tipo_nome = TIPO_DESPESA_MAP.get(alloc.despesa.tipo, 'Outro')
-        elif alloc.custodia:
-            tipo_nome = 'Valores Reembolsados' if tipo_pag == 'E' else 'Valores Reembolsáveis'
-        else:
-            tipo_nome = 'Não Alocado'
-
-        if tipo_pag == 'E':
-            entradas_por_tipo[tipo_nome] = entradas_por_tipo.get(tipo_nome, 0) + valor
-        elif tipo_pag == 'S':
-            saidas_por_tipo[tipo_nome] = saidas_por_tipo.get(tipo_nome, 0) + valor
-
-    for pag in pagamentos:
-        if pag.id not in pagamentos_alocados:
-            valor = float(pag.valor)
-            if pag.tipo == 'E':
-                entradas_por_tipo['Não Alocado'] = entradas_por_tipo.get('Não Alocado', 0) + valor
-            elif pag.tipo == 'S':
-                saidas_por_tipo['Não Alocado'] = saidas_por_tipo.get('Não Alocado', 0) + valor
-
-    ORDEM_ENTRADAS = ['Receita Fixa', 'Receita Variável', 'Valores Reembolsados', 'Estorno', 'Não Alocado']
-    ORDEM_SAIDAS   = ['Despesa Fixa', 'Despesa Variável', 'Valores Reembolsáveis',
-                      'Comissionamento', 'Reembolso', 'Não Alocado']
-
-    def ordered_list(d, ordem):
-        result = [(k, d[k]) for k in ordem if k in d]
-        result += [(k, v) for k, v in d.items() if k not in ordem]
-        return result
-
-    if agrupamento == 'banco':
-        entradas_items = list(entradas_por_banco.items())
-        saidas_items   = list(saidas_por_banco.items())
-    else:
-        entradas_items = ordered_list(entradas_por_tipo, ORDEM_ENTRADAS)
-        saidas_items   = ordered_list(saidas_por_tipo,   ORDEM_SAIDAS)
-        if not incluir_custodias:
-            entradas_items = [(k, v) for k, v in entradas_items if k != 'Valores Reembolsados']
-            saidas_items   = [(k, v) for k, v in saidas_items   if k != 'Valores Reembolsáveis']
+    grupo = 'por_banco' if agrupamento == 'banco' else 'por_tipo'
+    entradas_items = list(caixa['entradas'][grupo].items())
+    saidas_items   = list(caixa['saidas'][grupo].items())
 
-    total_entradas = sum(v for _, v in entradas_items)
-    total_saidas   = sum(v for _, v in saidas_items)
-    resultado      = total_entradas - total_saidas
+    total_entradas = caixa['entradas']['total']
+    total_saidas   = caixa['saidas']['total']
+    resultado      = caixa['resultado']
 
     # ── PDF ───────────────────────────────────────────────────────────────────
     response = HttpResponse(content_type="application/pdf")
@@ -2319,24 +2230,24 @@ def relatorio_balanco_pdf(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_dre_detalhe')
 def relatorio_dre_detalhe(request):
     """
     Gera um relatório PDF detalhado com todos os lançamentos de um tipo específico da DRE.
 
     Query Parameters:
-    - mes: Mês (1-12)
-    - ano: Ano (YYYY)
+    - período: os mesmos da DRE (mes/ano, ano, inicio/fim; ver services/dre.py)
     - tipo_relatorio: 'receita' ou 'despesa'
     - tipo: código do tipo ('F', 'V', 'E' para receitas; 'F', 'V', 'C', 'R' para despesas)
     """
+    from .services.dre import periodo_dre, ultimo_dia
 
     try:
         company = get_company_from_request(request)
     except PermissionError as e:
         return Response({"error": str(e)}, status=403)
 
-    mes = request.query_params.get('mes')
-    ano = request.query_params.get('ano')
     tipo_relatorio = request.query_params.get('tipo_relatorio', '').lower()
     tipo = request.query_params.get('tipo', '')
 
@@ -2346,26 +2257,23 @@ def relatorio_dre_detalhe(request):
     if not tipo:
         return Response({"error": "Parâmetro 'tipo' é obrigatório."}, status=400)
 
-    if not mes or not ano:
-        hoje = datetime.now()
-        mes = hoje.month
-        ano = hoje.year
-    else:
-        mes = int(mes)
-        ano = int(ano)
+    # Mesmo período da DRE que originou o detalhe (mês, ano ou intervalo)
+    try:
+        inicio, fim = periodo_dre(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
 
-    data_inicio = f"{ano}-{str(mes).zfill(2)}-01"
-    if mes == 12:
-        data_fim_raw = f"{ano + 1}-01-01"
-    else:
-        data_fim_raw = f"{ano}-{str(mes + 1).zfill(2)}-01"
-    data_fim = (datetime.strptime(data_fim_raw, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    data_inicio = inicio
+    data_fim = ultimo_dia(fim)
 
     meses_nomes = [
         "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
         "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"
     ]
-    periodo_str = f"{meses_nomes[mes - 1]} de {ano}"
+    periodo_str = f"{meses_nomes[inicio.month - 1]} de {inicio.year}"
+    if fim != inicio:
+        periodo_str += f" a {meses_nomes[fim.month - 1]} de {fim.year}"
+    sufixo = f"{inicio:%m_%Y}" if inicio == fim else f"{inicio:%m_%Y}_a_{fim:%m_%Y}"
 
     SITUACAO_MAP = {'P': 'Pago', 'A': 'Em Aberto', 'V': 'Vencido'}
 
@@ -2382,20 +2290,20 @@ def relatorio_dre_detalhe(request):
             tipo=tipo,
             data_vencimento__gte=data_inicio,
             data_vencimento__lte=data_fim,
-        ).select_related('cliente').order_by('data_vencimento')
+        ).annotate(situacao_vigente=situacao_vigente()).select_related('cliente').order_by('data_vencimento')
 
         for receita in qs:
             rows.append({
                 'data': format_date_br(receita.data_vencimento),
                 'pessoa': truncate_text(receita.cliente.nome, 28),
                 'descricao': truncate_text(receita.nome, 38),
-                'situacao': SITUACAO_MAP.get(receita.situacao, receita.situacao),
+                'situacao': SITUACAO_MAP.get(receita.situacao_vigente, receita.situacao_vigente),
                 'valor': receita.valor,
             })
             total += receita.valor
 
         col_pessoa_label = "Cliente"
-        filename = f"dre_receitas_{tipo.lower()}_{mes:02d}_{ano}.pdf"
+        filename = f"dre_receitas_{tipo.lower()}_{sufixo}.pdf"
 
     else:  # despesa
         TIPO_LABEL_MAP = {'F': 'Despesas Fixas', 'V': 'Despesas Variáveis', 'C': 'Comissões', 'R': 'Reembolsos'}
@@ -2407,20 +2315,20 @@ def relatorio_dre_detalhe(request):
             tipo=tipo,
             data_vencimento__gte=data_inicio,
             data_vencimento__lte=data_fim,
-        ).select_related('responsavel').order_by('data_vencimento')
+        ).annotate(situacao_vigente=situacao_vigente()).select_related('responsavel').order_by('data_vencimento')
 
         for despesa in qs:
             rows.append({
                 'data': format_date_br(despesa.data_vencimento),
                 'pessoa': truncate_text(despesa.responsavel.nome, 28),
                 'descricao': truncate_text(despesa.nome, 38),
-                'situacao': SITUACAO_MAP.get(despesa.situacao, despesa.situacao),
+                'situacao': SITUACAO_MAP.get(despesa.situacao_vigente, despesa.situacao_vigente),
                 'valor': despesa.valor,
             })
             total += despesa.valor
 
         col_pessoa_label = "Favorecido"
-        filename = f"dre_despesas_{tipo.lower()}_{mes:02d}_{ano}.pdf"
+        filename = f"dre_despesas_{tipo.lower()}_{sufixo}.pdf"
 
     # ── PDF ────────────────────────────────────────────────────────────────────
     response = HttpResponse(content_type="application/pdf")
@@ -2467,6 +2375,8 @@ def relatorio_dre_detalhe(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_balanco_detalhe')
 def relatorio_balanco_detalhe(request):
     """
     Gera um PDF detalhado com todos os pagamentos de um tipo ou banco específico
@@ -2745,6 +2655,8 @@ def relatorio_balanco_detalhe(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@aceita_async('pdf')
+@relatorio_em_cache('relatorio_conciliacao_bancaria_pdf')
 def relatorio_conciliacao_bancaria_pdf(request):
     """
     Gera PDF do relatório de conciliação bancária.
@@ -2755,7 +2667,6 @@ def relatorio_conciliacao_bancaria_pdf(request):
     - modo: 'completo' | 'pendentes'  (padrão: 'completo')
     """
     from reportlab.lib import colors
-    from django.db.models import Count
 
     try:
         company = get_company_from_request(request)
@@ -2786,10 +2697,6 @@ def relatorio_conciliacao_bancaria_pdf(request):
             data_pagamento__lte=data_fim,
         )
         .select_related('conta_bancaria')
-        .annotate(
-            num_allocations=Count('allocations'),
-            total_alocado=Sum('allocations__valor'),
-        )
     )
 
     allocations = list(
@@ -2797,8 +2704,8 @@ def relatorio_conciliacao_bancaria_pdf(request):
         .select_related('payment', 'receita', 'despesa', 'custodia')
     )
 
-    conciliados = [p for p in pagamentos if p.total_alocado is not None and abs(float(p.total_alocado) - float(p.valor)) < 0.01]
-    nao_conciliados = [p for p in pagamentos if p.total_alocado is None or abs(float(p.total_alocado) - float(p.valor)) >= 0.01]
+    conciliados = [p for p in pagamentos if abs(float(p.total_alocado) - float(p.valor)) < 0.01]
+    nao_conciliados = [p for p in pagamentos if abs(float(p.total_alocado) - float(p.valor)) >= 0.01]
 
     # Ordenar por data (mais antigo primeiro)
     conciliados.sort(key=lambda p: p.data_pagamento)
@@ -2830,7 +2737,7 @@ def relatorio_conciliacao_bancaria_pdf(request):
                 'conciliados': 0, 'pendentes': 0, 'entradas': 0, 'saidas': 0,
             }
         contas_resumo[bid]['total'] += 1
-        is_conc = p.total_alocado is not None and abs(float(p.total_alocado) - float(p.valor)) < 0.01
+        is_conc = abs(float(p.total_alocado) - float(p.valor)) < 0.01
         if is_conc:
             contas_resumo[bid]['conciliados'] += 1
         else:
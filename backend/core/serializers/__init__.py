@@ -28,6 +28,7 @@ from .subscription import (
     PlanoAssinaturaSerializer,
     AssinaturaEmpresaSerializer,
 )
+from .jobs import JobSerializer
 
 __all__ = [
     'CompanySerializer',
@@ -51,4 +52,5 @@ __all__ = [
     'AllocationSerializer',
     'PlanoAssinaturaSerializer',
     'AssinaturaEmpresaSerializer',
+    'JobSerializer',
 ]
@@ -90,6 +90,10 @@ class PaymentSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'valor': 'O valor do pagamento deve ser maior que zero.'
             })
+        if valor and self.instance and valor < self.instance.total_alocado:
+            raise serializers.ValidationError({
+                'valor': f'O valor do pagamento não pode ser menor que o total já alocado (R$ {self.instance.total_alocado}).'
+            })
         return data
 
 
@@ -386,10 +390,10 @@ class AllocationSerializer(serializers.ModelSerializer):
 
         payment = data.get('payment')
         if payment and valor:
-            total_alocado = Allocation.objects.filter(payment=payment)
-            if self.instance:
-                total_alocado = total_alocado.exclude(pk=self.instance.pk)
-            total_alocado = total_alocado.aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+            # Total gravado no pagamento (o banco recusa ultrapassar o valor)
+            total_alocado = payment.total_alocado
+            if self.instance and self.instance.payment_id == payment.id:
+                total_alocado -= self.instance.valor
 
             if total_alocado + valor > payment.valor:
                 raise serializers.ValidationError({
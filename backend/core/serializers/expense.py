@@ -1,11 +1,11 @@
 from rest_framework import serializers
-from decimal import Decimal
 from ..models import Despesa, DespesaRecorrente, Funcionario
 from .identity import CompanySerializer
+from .mixins import SituacaoVigenteMixin
 from .people import FuncionarioSerializer
 
 
-class DespesaSerializer(serializers.ModelSerializer):
+class DespesaSerializer(SituacaoVigenteMixin, serializers.ModelSerializer):
     company = CompanySerializer(read_only=True)
     responsavel_id = serializers.PrimaryKeyRelatedField(
         queryset=Funcionario.objects.all(), source='responsavel'
@@ -40,11 +40,7 @@ class DespesaAbertaSerializer(DespesaSerializer):
         pass
 
     def get_valor_aberto(self, obj):
-        total_pago = sum(
-            (alloc.valor for alloc in obj.allocations.all()),
-            Decimal("0.00")
-        )
-        return obj.valor - total_pago
+        return obj.valor - obj.total_alocado
 
 
 class DespesaRecorrenteSerializer(serializers.ModelSerializer):
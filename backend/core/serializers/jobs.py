@@ -0,0 +1,26 @@
+from rest_framework import serializers
+from ..models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    tem_arquivo = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = (
+            'id',
+            'tipo',
+            'status',
+            'progresso',
+            'resultado',
+            'resultado_status_code',
+            'resultado_content_type',
+            'resultado_nome',
+            'tem_arquivo',
+            'erro',
+            'tentativas',
+            'criado_em',
+            'iniciado_em',
+            'finalizado_em',
+        )
+        read_only_fields = fields
@@ -0,0 +1,14 @@
+class SituacaoVigenteMixin:
+    """
+    Para Receita/Despesa: quando a linha vem com a anotação `situacao_vigente`
+    (services/status.situacao_vigente), devolve essa situação no lugar da
+    gravada, para as vencidas aparecerem como tal antes da varredura diária.
+    """
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        situacao = getattr(instance, 'situacao_vigente', None)
+        if situacao and situacao != data.get('situacao'):
+            data['situacao'] = situacao
+            data['situacao_display'] = dict(instance._meta.get_field('situacao').choices)[situacao]
+        return data
@@ -1,7 +1,7 @@
 from rest_framework import serializers
-from decimal import Decimal
 from ..models import Receita, ReceitaComissao, ReceitaRecorrente, ReceitaRecorrenteComissao, Funcionario, Cliente
 from .identity import CompanySerializer
+from .mixins import SituacaoVigenteMixin
 from .people import ClienteSerializer
 
 
@@ -29,7 +29,7 @@ class ReceitaRecorrenteComissaoSerializer(serializers.ModelSerializer):
         fields = ('id', 'funcionario_id', 'funcionario_nome', 'percentual')
 
 
-class ReceitaSerializer(serializers.ModelSerializer):
+class ReceitaSerializer(SituacaoVigenteMixin, serializers.ModelSerializer):
     company = CompanySerializer(read_only=True)
     cliente_id = serializers.PrimaryKeyRelatedField(
         queryset=Cliente.objects.all(),
@@ -87,11 +87,7 @@ class ReceitaAbertaSerializer(ReceitaSerializer):
         pass
 
     def get_valor_aberto(self, obj):
-        total_pago = sum(
-            (alloc.valor for alloc in obj.allocations.all()),
-            Decimal("0.00")
-        )
-        return obj.valor - total_pago
+        return obj.valor - obj.total_alocado
 
 
 class ReceitaRecorrenteSerializer(serializers.ModelSerializer):
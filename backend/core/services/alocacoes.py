@@ -0,0 +1,258 @@
+"""
+Totais alocados denormalizados (Payment/Receita/Despesa.total_alocado e
+Custodia.total_entradas/total_saidas).
+
+Toda criação, alteração ou exclusão de Allocation aplica aqui a diferença,
+com UPDATE ... SET total = total + delta na mesma transação: Allocation.save()
+e Allocation.delete() para uma alocação, `aplicar_totais` direto nos caminhos
+em lote (bulk_create da conciliação, exclusão em cascata do pagamento).
+Transferências não guardam total. Cada aplicação soma também no resumo
+mensal (services/resumo.py) a mudança de categoria do valor alocado.
+
+`totais_divergentes`/`recalcular_totais` conferem e refazem os totais a partir
+das alocações (comando verificar_totais_alocados).
+
+`criar_alocacoes_em_lote` grava várias alocações de uma vez (POST
+/alocacoes/bulk/): valida todas contra um retrato dos pagamentos e das contas
+lido em poucas consultas, em vez do clean() e do serializer por alocação.
+"""
+
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from ..models import Allocation, Custodia, Despesa, Payment, Receita, Transfer
+from .resumo import somar_alocacoes
+from .versao import incrementar_versoes
+
+ZERO = Decimal('0.00')
+LOTE_UPDATE = 500
+LIMITE_LOTE = 1000
+VALOR_MAXIMO = Decimal('99999999.99')  # Allocation.valor: 10 dígitos, 2 decimais
+
+# Campos de conta da Allocation que têm total denormalizado
+CAMPOS_CONTA = ('receita', 'despesa', 'custodia')
+
+# Contas aceitas por uma alocação, na ordem do Allocation.clean()
+DESTINOS = (('receita', Receita), ('despesa', Despesa), ('custodia', Custodia), ('transfer', Transfer))
+
+
+class AlocacoesInvalidas(Exception):
+    """Lote de alocações recusado. `erros`: {índice do item: mensagem}."""
+
+    def __init__(self, erros):
+        super().__init__('Alocações inválidas')
+        self.erros = erros
+
+
+def movimento_da_alocacao(allocation, tipo_payment=None):
+    """
+    (payment_id, tipo do payment, campo da conta, id da conta, valor) de uma
+    alocação, o formato aceito por `aplicar_totais`.
+    """
+    campo, entidade_id = None, None
+    for nome in CAMPOS_CONTA:
+        if getattr(allocation, f'{nome}_id'):
+            campo, entidade_id = nome, getattr(allocation, f'{nome}_id')
+            break
+    if tipo_payment is None:
+        tipo_payment = allocation.payment.tipo
+    return allocation.payment_id, tipo_payment, campo, entidade_id, allocation.valor
+
+
+def _somar(deltas, model, campo):
+    """Um UPDATE por lote de ids: campo = campo + CASE pk WHEN ... THEN delta END."""
+    ids = [pk for pk, delta in deltas.items() if delta]
+    for inicio in range(0, len(ids), LOTE_UPDATE):
+        lote = ids[inicio:inicio + LOTE_UPDATE]
+        model.objects.filter(pk__in=lote).update(**{
+            campo: F(campo) + Case(
+                *[When(pk=pk, then=Value(deltas[pk])) for pk in lote],
+                default=Value(ZERO),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        })
+
+
+def aplicar_totais(movimentos, sinal: int = 1):
+    """
+    Soma (sinal=1) ou estorna (sinal=-1) alocações nos totais do pagamento e
+    da conta. `movimentos`: tuplas de `movimento_da_alocacao`. Deve rodar na
+    transação que grava/apaga as alocações.
+    """
+    por_campo = defaultdict(lambda: defaultdict(Decimal))
+    for payment_id, tipo_payment, campo, entidade_id, valor in movimentos:
+        valor = valor * sinal
+        por_campo[(Payment, 'total_alocado')][payment_id] += valor
+        if campo == 'receita':
+            por_campo[(Receita, 'total_alocado')][entidade_id] += valor
+        elif campo == 'despesa':
+            por_campo[(Despesa, 'total_alocado')][entidade_id] += valor
+        elif campo == 'custodia':
+            total = 'total_entradas' if tipo_payment == 'E' else 'total_saidas'
+            por_campo[(Custodia, total)][entidade_id] += valor
+
+    for (model, campo), deltas in por_campo.items():
+        _somar(deltas, model, campo)
+    # O valor alocado muda de categoria no caixa do mês do pagamento
+    somar_alocacoes(movimentos, sinal)
+
+
+def _soma_alocacoes(campo_conta, **filtros):
+    alocacoes = Allocation.objects.filter(**{campo_conta: OuterRef('pk')}, **filtros)
+    return Coalesce(
+        Subquery(alocacoes.values(campo_conta).annotate(total=Sum('valor')).values('total')),
+        Value(ZERO),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def totais_calculados(model) -> dict:
+    """{campo: expressão com a soma das alocações} para anotar ou gravar."""
+    if model is Payment:
+        return {'total_alocado': _soma_alocacoes('payment')}
+    if model is Receita:
+        return {'total_alocado': _soma_alocacoes('receita')}
+    if model is Despesa:
+        return {'total_alocado': _soma_alocacoes('despesa')}
+    if model is Custodia:
+        return {
+            'total_entradas': _soma_alocacoes('custodia', payment__tipo='E'),
+            'total_saidas': _soma_alocacoes('custodia', payment__tipo='S'),
+        }
+    raise ValueError(f'{model.__name__} não guarda totais alocados')
+
+
+def totais_divergentes(model, company_ids) -> list:
+    """Ids das linhas de `model` (das empresas informadas) cujo total gravado difere das alocações."""
+    calculados = totais_calculados(model)
+    divergente = Q()
+    for campo in calculados:
+        divergente |= ~Q(**{campo: F(f'calculado_{campo}')})
+    return list(
+        model.objects.filter(company_id__in=company_ids)
+        .annotate(**{f'calculado_{campo}': expressao for campo, expressao in calculados.items()})
+        .filter(divergente)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def recalcular_totais(model, ids=None) -> int:
+    """
+    Regrava os totais a partir das alocações num único UPDATE e sobe a versão
+    das empresas das linhas. Retorna as linhas atualizadas.
+    """
+    linhas = model.objects.all() if ids is None else model.objects.filter(pk__in=ids)
+    atualizadas = linhas.update(**totais_calculados(model))
+    if atualizadas:
+        incrementar_versoes(linhas.values('company_id'))
+    return atualizadas
+
+
+def _ler_item(item):
+    """(payment_id, campo, id da conta, valor, observação) de um item do lote; ValueError com a mensagem."""
+    if not isinstance(item, dict):
+        raise ValueError('Cada alocação deve ser um objeto.')
+    try:
+        payment_id = int(item.get('payment_id'))
+    except (TypeError, ValueError):
+        raise ValueError('payment_id inválido.')
+
+    destinos = [(campo, item[f'{campo}_id']) for campo, _ in DESTINOS if item.get(f'{campo}_id')]
+    if not destinos:
+        raise ValueError('A alocação deve estar vinculada a uma Receita, Despesa, Custódia ou Transferência.')
+    if len(destinos) > 1:
+        raise ValueError(
+            'A alocação só pode estar vinculada a uma única conta (Receita, Despesa, Custódia ou Transferência).'
+        )
+    campo, entidade_id = destinos[0]
+    try:
+        entidade_id = int(entidade_id)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo}_id inválido.')
+
+    try:
+        valor = Decimal(str(item.get('valor'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError('valor inválido.')
+    if valor <= 0:
+        raise ValueError('O valor da alocação deve ser maior que zero.')
+    if valor > VALOR_MAXIMO:
+        raise ValueError('valor inválido.')
+
+    return payment_id, campo, entidade_id, valor, item.get('observacao') or None
+
+
+def criar_alocacoes_em_lote(company, itens) -> list:
+    """
+    Valida e cria as alocações de `itens` (dicts com payment_id, um entre
+    receita_id/despesa_id/custodia_id/transfer_id, valor e observacao).
+
+    As regras são as do Allocation.clean(), conferidas contra um retrato
+    único: os pagamentos (travados, com o total já alocado) e os ids das
+    contas da empresa, uma consulta por modelo. Tudo ou nada: qualquer item
+    inválido levanta AlocacoesInvalidas com os erros de todos. Depois do
+    bulk_create, os totais são somados em lote e o status de cada conta
+    tocada é recalculado uma vez.
+    """
+    from .status import marcar_alocacoes, status_em_lote
+    from .versao import incrementar_versao
+
+    erros = {}
+    lidos = {}
+    for indice, item in enumerate(itens):
+        try:
+            lidos[indice] = _ler_item(item)
+        except ValueError as e:
+            erros[indice] = str(e)
+
+    with status_em_lote():
+        payments = Payment.objects.select_for_update().filter(
+            company=company, pk__in={payment_id for payment_id, *_ in lidos.values()}
+        ).only('id', 'tipo', 'valor', 'total_alocado').order_by().in_bulk()
+
+        ids_por_campo = defaultdict(set)
+        for _, campo, entidade_id, _, _ in lidos.values():
+            ids_por_campo[campo].add(entidade_id)
+        existentes = {
+            campo: set(model.objects.filter(company=company, pk__in=ids_por_campo[campo]).values_list('pk', flat=True))
+            for campo, model in DESTINOS if ids_por_campo[campo]
+        }
+
+        # O saldo de cada pagamento vai sendo consumido na ordem dos itens
+        alocado = {pk: payment.total_alocado for pk, payment in payments.items()}
+        for indice, (payment_id, campo, entidade_id, valor, _) in lidos.items():
+            payment = payments.get(payment_id)
+            if payment is None:
+                erros[indice] = f'Pagamento {payment_id} não encontrado.'
+            elif entidade_id not in existentes[campo]:
+                erros[indice] = f'{campo}_id {entidade_id} não encontrado.'
+            elif alocado[payment_id] + valor > payment.valor:
+                erros[indice] = (
+                    f'O valor total alocado (R$ {alocado[payment_id] + valor}) '
+                    f'excede o valor do pagamento (R$ {payment.valor}).'
+                )
+            else:
+                alocado[payment_id] += valor
+
+        if erros:
+            raise AlocacoesInvalidas(dict(sorted(erros.items())))
+
+        alocacoes = Allocation.objects.bulk_create([
+            Allocation(
+                company=company, payment_id=payment_id, valor=valor, observacao=observacao,
+                **{f'{campo}_id': entidade_id}
+            )
+            for payment_id, campo, entidade_id, valor, observacao in lidos.values()
+        ])
+        aplicar_totais([
+            (payment_id, payments[payment_id].tipo, campo, entidade_id, valor)
+            for payment_id, campo, entidade_id, valor, _ in lidos.values()
+        ])
+        marcar_alocacoes(alocacoes)
+        incrementar_versao(company.pk)  # bulk_create não dispara os sinais
+
+    return alocacoes
@@ -0,0 +1,242 @@
+"""
+Busca das listas (?search=) e do endpoint unificado /busca/.
+
+O texto é quebrado em termos e todos precisam casar. Cada termo casa por:
+- texto: a coluna `busca` (documento sem acentos, ver models/busca.py)
+  contém o termo normalizado, na própria linha ou nas ligadas (cliente,
+  responsável, contas alocadas...), por subconsulta sobre a `busca` delas;
+- valor ("1.500,00", "R$ 1500"): igualdade, ou o real inteiro quando o
+  termo não tem centavos ("1500" → 1500,00 a 1500,99);
+- data ("15/03/2024", "2024-03-15", "03/2024", "2024-03"): o dia ou o mês
+  no campo de data do modelo.
+Termos de valor e data também valem como texto (número na observação...).
+
+Como `busca` já está normalizada, a comparação é `LIKE '%termo%'` sem
+UPPER(), que no PostgreSQL usa o índice GIN de trigramas (migração 0046).
+Valor e data usam os índices comuns das colunas. No /busca/ a relevância
+também é calculada no banco, que devolve os melhores de cada tipo.
+"""
+
+import calendar
+import re
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from ..helpers.texto import normalize_money_search, normalizar_string
+from ..models import Allocation, Cliente, ContaBancaria, Custodia, Despesa, Funcionario, Payment, Receita
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 50
+
+# texto normalizado, faixa de valor (mín, máx) ou None, faixa de datas (início, fim) ou None
+Termo = namedtuple('Termo', 'texto valor data')
+
+DATA_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+DATA_ISO_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+MES_RE = re.compile(r'^(\d{1,2})/(\d{4})$')
+MES_ISO_RE = re.compile(r'^(\d{4})-(\d{1,2})$')
+VALOR_RE = re.compile(r'^\d+(\.\d{1,2})?$')
+
+# Por modelo: {campo FK: modelo relacionado com `busca`}, campo de valor, campo de data
+CAMPOS = {
+    Cliente: ({}, None, None),
+    Funcionario: ({}, None, None),
+    Receita: ({'cliente': Cliente}, 'valor', 'data_vencimento'),
+    Despesa: ({'responsavel': Funcionario}, 'valor', 'data_vencimento'),
+    Custodia: ({'cliente': Cliente, 'funcionario': Funcionario}, 'valor_total', None),
+    Payment: ({}, 'valor', 'data_pagamento'),
+}
+
+
+def _mes(ano, mes):
+    return date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+
+def _faixa_data(termo):
+    try:
+        if m := DATA_RE.match(termo):
+            dia = date(int(m[3]), int(m[2]), int(m[1]))
+            return dia, dia
+        if m := DATA_ISO_RE.match(termo):
+            dia = date(int(m[1]), int(m[2]), int(m[3]))
+            return dia, dia
+        if m := MES_RE.match(termo):
+            return _mes(int(m[2]), int(m[1]))
+        if m := MES_ISO_RE.match(termo):
+            return _mes(int(m[1]), int(m[2]))
+    except ValueError:
+        pass
+    return None
+
+
+def _faixa_valor(termo):
+    normalizado = normalize_money_search(termo)
+    if not VALOR_RE.match(normalizado):
+        return None
+    valor = Decimal(normalizado)
+    if '.' in normalizado:
+        return valor, valor
+    return valor, valor + Decimal('0.99')
+
+
+def termos_da_busca(texto) -> list:
+    """Termos (Termo) de um texto de busca."""
+    return [
+        Termo(normalizar_string(parte), _faixa_valor(parte), _faixa_data(parte))
+        for parte in str(texto or '').replace('R$', ' ').split()
+    ]
+
+
+def _ids_por_busca(model, company, termo):
+    linhas = model.objects.filter(busca__contains=termo)
+    if company is not None:
+        linhas = linhas.filter(company=company)
+    return linhas.values('pk')
+
+
+def _condicao_termo(model, termo, company) -> Q:
+    relacionados, campo_valor, campo_data = CAMPOS[model]
+
+    condicao = Q(busca__contains=termo.texto)
+    for campo, relacionado in relacionados.items():
+        condicao |= Q(**{f'{campo}__in': _ids_por_busca(relacionado, company, termo.texto)})
+
+    if model is Payment:
+        # Banco do pagamento e contas alocadas (receita, despesa, custódia, bancos da transferência)
+        contas = ContaBancaria.objects.filter(nome__icontains=termo.texto)
+        alocacoes = Allocation.objects.all()
+        if company is not None:
+            contas = contas.filter(company=company)
+            alocacoes = alocacoes.filter(company=company)
+        alocacoes = alocacoes.filter(
+            Q(receita__in=_ids_por_busca(Receita, company, termo.texto))
+            | Q(despesa__in=_ids_por_busca(Despesa, company, termo.texto))
+            | Q(custodia__in=_ids_por_busca(Custodia, company, termo.texto))
+            | Q(transfer__from_bank__in=contas.values('pk'))
+            | Q(transfer__to_bank__in=contas.values('pk'))
+        )
+        condicao |= Q(conta_bancaria__in=contas.values('pk')) | Q(pk__in=alocacoes.values('payment_id'))
+
+    if campo_valor and termo.valor:
+        condicao |= Q(**{f'{campo_valor}__range': termo.valor})
+    if campo_data and termo.data:
+        condicao |= Q(**{f'{campo_data}__range': termo.data})
+    return condicao
+
+
+def filtro_busca(model, texto, company=None) -> Q:
+    """Q que exige que todos os termos de `texto` casem com a linha de `model`."""
+    condicao = Q()
+    for termo in termos_da_busca(texto):
+        if termo.texto:
+            condicao &= _condicao_termo(model, termo, company)
+    return condicao
+
+
+# ──────────────────────────────────────────────
+# Busca unificada (/busca/)
+# ──────────────────────────────────────────────
+
+def _pessoa(obj):
+    return obj.nome, obj.cpf or obj.email or '', None, None
+
+
+def _pagamento(obj):
+    titulo = obj.observacao or f'{"Entrada" if obj.tipo == "E" else "Saída"} de R$ {obj.valor}'
+    return titulo, obj.conta_bancaria.nome, obj.valor, obj.data_pagamento
+
+
+def _custodia(obj):
+    pessoa = obj.cliente or obj.funcionario
+    return obj.nome, pessoa.nome if pessoa else '', obj.valor_total, None
+
+
+# tipo, modelo, select_related, (obj → título, detalhe, valor, data)
+ENTIDADES = (
+    ('cliente', Cliente, (), _pessoa),
+    ('funcionario', Funcionario, (), _pessoa),
+    ('receita', Receita, ('cliente',), lambda o: (o.nome, o.cliente.nome, o.valor, o.data_vencimento)),
+    ('despesa', Despesa, ('responsavel',), lambda o: (o.nome, o.responsavel.nome, o.valor, o.data_vencimento)),
+    ('custodia', Custodia, ('cliente', 'funcionario'), _custodia),
+    ('pagamento', Payment, ('conta_bancaria',), _pagamento),
+)
+TIPOS = tuple(tipo for tipo, *_ in ENTIDADES)
+
+
+def _casa_palavra(model, padrao) -> Q:
+    """Q: a regex `padrao` casa com a `busca` da linha ou das ligadas que aparecem no resultado."""
+    relacionados, _, _ = CAMPOS[model]
+    condicao = Q(busca__regex=padrao)
+    for campo in relacionados:
+        condicao |= Q(**{f'{campo}__busca__regex': padrao})
+    if model is Payment:
+        condicao |= Q(conta_bancaria__nome__iregex=padrao)
+    return condicao
+
+
+def _relevancia(model, termos):
+    """
+    Expressão com os pontos de cada linha, somados por termo: 3 quando casa
+    exatamente (palavra inteira, valor ou data), 2 quando é começo de
+    palavra, 1 quando só aparece no meio ou numa linha ligada (alocação...).
+    Calculada no banco para que cada tipo traga os mais relevantes, e não só
+    os mais recentes. A fronteira de palavra é `(^|\\W)`, que vale igual no
+    `re` do Python (SQLite) e nas regex do PostgreSQL, onde `\\b` não existe.
+    """
+    _, campo_valor, campo_data = CAMPOS[model]
+    pontos = Value(0)
+    for termo in termos:
+        inicio = rf'(^|\W){re.escape(termo.texto)}'
+        exato = _casa_palavra(model, rf'{inicio}(\W|$)')
+        if campo_valor and termo.valor:
+            exato |= Q(**{f'{campo_valor}__range': termo.valor})
+        if campo_data and termo.data:
+            exato |= Q(**{f'{campo_data}__range': termo.data})
+        pontos = pontos + Case(
+            When(exato, then=Value(3)),
+            When(_casa_palavra(model, inicio), then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    return pontos
+
+
+def buscar(company, texto, tipos=TIPOS, limite=LIMITE_PADRAO) -> list:
+    """
+    Busca `texto` nas entidades de `tipos` da empresa e devolve até `limite`
+    resultados, dos mais relevantes para os menos (empate: na ordem de
+    ENTIDADES e, em cada tipo, os mais recentes). Cada tipo contribui com os
+    seus `limite` mais relevantes, ordenados no banco.
+    """
+    termos = [termo for termo in termos_da_busca(texto) if termo.texto]
+    if not termos:
+        return []
+
+    resultados = []
+    for tipo, model, relacionados, exibir in ENTIDADES:
+        if tipo not in tipos:
+            continue
+        linhas = (
+            model.objects.filter(company=company)
+            .filter(filtro_busca(model, texto, company))
+            .select_related(*relacionados)
+            .annotate(relevancia=_relevancia(model, termos))
+            .order_by('-relevancia', '-pk')[:limite]
+        )
+        for obj in linhas:
+            titulo, detalhe, valor, data = exibir(obj)
+            resultados.append({
+                'tipo': tipo,
+                'id': obj.pk,
+                'titulo': titulo,
+                'detalhe': detalhe,
+                'valor': valor,
+                'data': data,
+                'relevancia': obj.relevancia,
+            })
+
+    resultados.sort(key=lambda r: -r['relevancia'])
+    return resultados[:limite]
@@ -14,6 +14,7 @@ from datetime import date
 from decimal import Decimal
 
 from ..models import Allocation, Despesa
+from .status import recalcular_despesas
 
 
 def calcular_comissoes_mes(company, mes: int, ano: int) -> dict:
@@ -88,6 +89,7 @@ def gerar_despesas_comissao(company, mes: int, ano: int) -> list[dict]:
     ).exclude(responsavel_id__in=ids_ativos).delete()
 
     resultado = []
+    despesa_ids = []
     for entry in comissionados.values():
         comissionado = entry['comissionado']
         valor_comissao = entry['valor_comissao']
@@ -112,8 +114,7 @@ def gerar_despesas_comissao(company, mes: int, ano: int) -> list[dict]:
                 'situacao': 'A',
             },
         )
-        # Recalcula situacao baseado nas alocações existentes (preserva 'P' se já pago)
-        despesa.atualizar_status()
+        despesa_ids.append(despesa.id)
 
         resultado.append({
             'id': comissionado.id,
@@ -121,4 +122,8 @@ def gerar_despesas_comissao(company, mes: int, ano: int) -> list[dict]:
             'valor': float(valor_comissao),
         })
 
+    # Recalcula situacao baseado nas alocações existentes (preserva 'P' se já pago)
+    if despesa_ids:
+        recalcular_despesas(ids=despesa_ids)
+
     return resultado
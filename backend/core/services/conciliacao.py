@@ -0,0 +1,692 @@
+"""
+Conciliação bancária automática (payments sem alocação x contas em aberto).
+
+Regras (as mesmas do endpoint original):
+  - Entrada: receita com valor EXATO e saldo disponível cujo cliente/nome
+    apareça na observação; senão, custódia Ativo com valor_total exato.
+  - Saída: despesa (responsável/nome) e depois custódia Passivo.
+  - Sem match automático: sugestões só por valor (receitas/despesas com o
+    mesmo valor e saldo; custódias cujo valor restante é igual ao payment).
+
+Em vez de varrer todas as contas abertas para cada payment, tudo é carregado
+uma única vez em memória e indexado:
+  - receitas/despesas livres por valor exato (dict valor -> entradas);
+  - custódias por valor_total (match) e por valor restante (sugestões), com
+    o restante atualizado a cada alocação feita no loop;
+  - nomes: Cliente/Funcionario/Custodia já trazem `nome_normalizado` e
+    `nome_tokens` gravados (ver NomeIndexado); com eles é montado um índice
+    invertido token -> nomes, e o match por palavras comuns vira uma contagem
+    de interseção por payment em vez de comparar com cada conta aberta.
+As alocações são gravadas em lote no final, numa transação.
+
+Sugestões agrupadas (opcional, `agrupar=True`): para os payments que sobraram,
+procura combinações pequenas dentro de cada contraparte citada na observação
+- um payment que quita várias contas (três mensalidades num PIX) ou vários
+payments que somam uma conta (mensalidade paga em duas partes). A busca é um
+subset-sum por programação dinâmica em centavos (uma tabela de somas por
+contraparte, consultada por valor), limitada a MAX_ITENS_GRUPO
+itens, MAX_CANDIDATOS_GRUPO candidatos por contraparte e a um tempo máximo por
+busca e por execução. Essas sugestões nunca são gravadas automaticamente:
+`confirmar_agrupada` aplica a que o usuário escolher.
+"""
+
+import time
+from bisect import insort
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from ..helpers.texto import indexar_nome, normalizar_string, palavras_significativas
+from ..models import Allocation, Custodia, Despesa, Payment, Receita
+from .alocacoes import aplicar_totais
+from .resumo import resumo_em_lote
+from .status import recalcular_custodias, recalcular_despesas, recalcular_receitas
+from .versao import incrementar_versao
+
+ZERO = Decimal('0.00')
+
+# Limites da busca de sugestões agrupadas
+MAX_ITENS_GRUPO = 6
+MAX_CANDIDATOS_GRUPO = 40
+TEMPO_BUSCA_GRUPO = 0.05     # segundos por busca (uma contraparte x um alvo)
+TEMPO_TOTAL_GRUPOS = 2.0     # segundos para todas as buscas da execução
+
+
+class SugestaoInvalida(Exception):
+    """Sugestão agrupada que não pode ser aplicada (valores não batem, já alocada...)."""
+
+
+# ──────────────────────────────────────────────
+# Índice de nomes
+# ──────────────────────────────────────────────
+
+class IndiceNomes:
+    """
+    Nomes das contrapartes (e das próprias contas) de uma execução.
+
+    Cada nome recebe uma chave; `por_token` é o índice invertido
+    token -> chaves, usado para achar de uma vez todos os nomes que têm 2+
+    palavras significativas em comum com a observação de um payment.
+    """
+
+    def __init__(self):
+        self.normalizados = {}
+        self.por_token = {}
+
+    def adicionar(self, chave, nome, nome_normalizado='', tokens=None) -> tuple:
+        """
+        Registra o nome (uma vez por chave) e devolve ((chave, nome_normalizado),)
+        para guardar na entidade. Usa as colunas gravadas quando existirem.
+        """
+        if not nome:
+            return ()
+        if chave not in self.normalizados:
+            if not nome_normalizado:
+                # Linha ainda sem backfill: calcula na hora
+                nome_normalizado, tokens = indexar_nome(nome)
+            self.normalizados[chave] = nome_normalizado
+            for token in tokens or ():
+                self.por_token.setdefault(token, set()).add(chave)
+        return ((chave, self.normalizados[chave]),)
+
+    def chaves_com_palavras_comuns(self, obs_tokens) -> set:
+        """Chaves cujos nomes têm 2 ou mais palavras significativas em comum com a observação."""
+        if len(obs_tokens) < 2:
+            return set()
+        contagem = Counter()
+        for token in obs_tokens:
+            contagem.update(self.por_token.get(token, ()))
+        return {chave for chave, comuns in contagem.items() if comuns >= 2}
+
+    def chaves_citadas(self, obs_norm: str, obs_tokens, modelo: str) -> list:
+        """
+        Chaves do `modelo` ('cliente'/'funcionario') citadas na observação, em
+        ordem estável: as de nome completo contido nela; se não houver nenhuma,
+        as com 2+ palavras em comum (mais frouxo, pode trazer homônimos).
+        """
+        contagem = Counter()
+        for token in obs_tokens:
+            contagem.update(chave for chave in self.por_token.get(token, ()) if chave[0] == modelo)
+        exatas = sorted(chave for chave in contagem if self.normalizados[chave] in obs_norm)
+        return exatas or sorted(chave for chave, comuns in contagem.items() if comuns >= 2)
+
+
+def nome_confere(obs_norm: str, chaves_comuns: set, nomes: tuple) -> bool:
+    """
+    Algum nome aparece na observação?
+    1. Match exato (nome completo contido na observação) - mais confiável
+    2. Match por palavras comuns (2+ palavras, via índice invertido) - mais flexível
+    """
+    if not obs_norm:
+        return False
+    for chave, nome_norm in nomes:
+        if nome_norm and nome_norm in obs_norm:
+            return True
+    return any(chave in chaves_comuns for chave, _ in nomes)
+
+
+# ──────────────────────────────────────────────
+# Carga e índices
+# ──────────────────────────────────────────────
+
+def _carregar_payments(company, mes, ano, conta_ids=None):
+    payments = Payment.objects.filter(
+        company=company,
+        data_pagamento__year=ano,
+        data_pagamento__month=mes,
+        total_alocado=0,
+    )
+    if conta_ids is not None:
+        payments = payments.filter(conta_bancaria_id__in=conta_ids)
+    return list(
+        payments.order_by('data_pagamento', 'id').values_list(
+            'id', 'tipo', 'valor', 'data_pagamento', 'observacao', 'conta_bancaria__nome'
+        )
+    )
+
+
+def _carregar_contas(model, campo_pessoa, modelo_pessoa, company, mes, ano, nomes):
+    """Receitas/despesas em aberto ou vencidas do mês, com o total já alocado."""
+    linhas = model.objects.filter(
+        company=company,
+        data_vencimento__year=ano,
+        data_vencimento__month=mes,
+        situacao__in=['A', 'V']  # Em Aberto ou Vencida
+    ).order_by('data_vencimento', 'id').values_list(
+        'id', 'nome', 'valor', 'data_vencimento', 'total_alocado',
+        f'{campo_pessoa}_id', f'{campo_pessoa}__nome',
+        f'{campo_pessoa}__nome_normalizado', f'{campo_pessoa}__nome_tokens',
+    )
+
+    tipo_conta = model._meta.model_name
+    contas = []
+    for conta_id, nome, valor, vencimento, total_alocado, pessoa_id, pessoa, pessoa_norm, pessoa_tokens in linhas:
+        contas.append({
+            'id': conta_id,
+            'nome': nome,
+            'pessoa': pessoa,
+            'valor': valor,
+            'vencimento': vencimento,
+            'alocado': total_alocado,
+            'pessoa_chave': (modelo_pessoa, pessoa_id) if pessoa_id else None,
+            'nomes': (
+                nomes.adicionar((modelo_pessoa, pessoa_id), pessoa, pessoa_norm, pessoa_tokens)
+                + nomes.adicionar((tipo_conta, conta_id), nome)
+            ),
+        })
+    return contas
+
+
+def _carregar_custodias(company, nomes):
+    linhas = Custodia.objects.filter(
+        company=company,
+        status='A'
+    ).annotate(
+        valor_restante=F('valor_total') - F('valor_liquidado'),
+    ).filter(
+        valor_restante__gt=0
+    ).order_by('-criado_em', '-id').values_list(
+        'id', 'tipo', 'nome', 'nome_normalizado', 'nome_tokens', 'valor_total',
+        'total_entradas', 'total_saidas',
+        'cliente_id', 'cliente__nome', 'cliente__nome_normalizado', 'cliente__nome_tokens',
+        'funcionario_id', 'funcionario__nome', 'funcionario__nome_normalizado', 'funcionario__nome_tokens',
+    )
+
+    custodias = []
+    for ordem, linha in enumerate(linhas):
+        (cid, tipo, nome, nome_norm, nome_tokens, valor_total, entradas, saidas,
+         cliente_id, cliente, cliente_norm, cliente_tokens,
+         funcionario_id, funcionario, funcionario_norm, funcionario_tokens) = linha
+        custodias.append({
+            'ordem': ordem,
+            'id': cid,
+            'tipo': tipo,
+            'nome': nome,
+            'valor_total': valor_total,
+            'contraparte': cliente or funcionario,
+            'entradas': entradas,
+            'saidas': saidas,
+            'nomes': (
+                nomes.adicionar(('cliente', cliente_id), cliente, cliente_norm, cliente_tokens)
+                + nomes.adicionar(('funcionario', funcionario_id), funcionario, funcionario_norm, funcionario_tokens)
+                + nomes.adicionar(('custodia', cid), nome, nome_norm, nome_tokens)
+            ),
+        })
+    return custodias
+
+
+def _restante(custodia) -> Decimal:
+    return custodia['valor_total'] - min(custodia['entradas'], custodia['saidas'])
+
+
+def _indexar_por_valor_livre(contas) -> dict:
+    """
+    valor -> contas ainda sem nenhuma alocação (na ordem de vencimento).
+    Match e sugestão exigem valor == payment.valor e saldo >= payment.valor,
+    ou seja, conta sem alocação; contas parcialmente pagas nunca casam.
+    """
+    indice = {}
+    for conta in contas:
+        if conta['alocado'] <= 0:
+            indice.setdefault(conta['valor'], []).append(conta)
+    return indice
+
+
+class _IndiceCustodias:
+    """Custódias de um tipo ('A' ou 'P') indexadas por valor_total e por valor restante."""
+
+    def __init__(self, custodias):
+        self.por_valor_total = {}
+        self.por_restante = {}
+        for custodia in custodias:
+            self.por_valor_total.setdefault(custodia['valor_total'], []).append(custodia)
+            self.por_restante.setdefault(_restante(custodia), []).append(custodia)
+
+    def alocar(self, custodia, campo, valor):
+        """Registra a alocação e move a custódia para o balde do novo restante."""
+        antes = _restante(custodia)
+        custodia[campo] += valor
+        depois = _restante(custodia)
+        if antes == depois:
+            return
+        balde = self.por_restante[antes]
+        balde.remove(custodia)
+        if not balde:
+            del self.por_restante[antes]
+        insort(self.por_restante.setdefault(depois, []), custodia, key=lambda c: c['ordem'])
+
+
+# ──────────────────────────────────────────────
+# Subset-sum (sugestões agrupadas)
+# ──────────────────────────────────────────────
+
+def _centavos(valor: Decimal) -> int:
+    return int(valor * 100)
+
+
+def somas_por_combinacao(valores, limite: Decimal, max_itens=MAX_ITENS_GRUPO, prazo=None) -> dict:
+    """
+    Tabela soma_em_centavos -> índices (em ordem crescente) de 2 a `max_itens`
+    valores que somam exatamente aquilo, para todas as somas até `limite`.
+
+    Programação dinâmica sobre as somas alcançáveis em centavos: para cada soma
+    guarda só a combinação com menos itens (em empate, a que usa as primeiras
+    posições - vencimentos mais antigos). Montada uma vez por contraparte, cada
+    payment/conta vira uma consulta no dicionário. O número de estados é
+    limitado pelo limite em centavos e pelo de combinações; se `prazo`
+    (time.monotonic) passar, devolve o que foi montado até ali.
+    """
+    limite_c = _centavos(limite)
+    alcancaveis = {0: ()}  # soma -> menor combinação (inclusive de 1 item, para estender)
+    combinacoes = {}       # soma -> menor combinação com 2+ itens
+    for i, valor in enumerate(valores):
+        if prazo is not None and time.monotonic() > prazo:
+            break
+        c = _centavos(valor)
+        if c <= 0 or c > limite_c:
+            continue
+        novos = {}
+        for soma, itens in alcancaveis.items():
+            nova = soma + c
+            if len(itens) >= max_itens or nova > limite_c:
+                continue
+            combinacao = itens + (i,)
+            atual = novos.get(nova) or alcancaveis.get(nova)
+            if atual is None or len(combinacao) < len(atual):
+                novos[nova] = combinacao
+            if len(combinacao) >= 2:
+                atual = combinacoes.get(nova)
+                if atual is None or len(combinacao) < len(atual):
+                    combinacoes[nova] = combinacao
+        alcancaveis.update(novos)
+    return combinacoes
+
+
+def combinacao_por_soma(valores, alvo: Decimal, max_itens=MAX_ITENS_GRUPO, prazo=None):
+    """Índices de 2 a `max_itens` valores cuja soma é exatamente `alvo`, ou None."""
+    return somas_por_combinacao(valores, alvo, max_itens, prazo).get(_centavos(alvo))
+
+
+def _sugerir_agrupadas(pendentes, contas, nomes, tipo_display, limite_tempo):
+    """
+    Sugestões 1 payment -> N contas e N payments -> 1 conta, buscadas só dentro
+    de cada contraparte citada na observação. Cada payment e cada conta entram
+    em no máximo uma sugestão agrupada.
+
+    Retorna (sugestoes, interrompida) - interrompida quando o tempo total acabou.
+    """
+    fim = time.monotonic() + limite_tempo
+    livres = {}  # pessoa_chave -> contas sem alocação, em ordem de vencimento
+    for conta in contas:
+        if conta['pessoa_chave'] is not None and conta['alocado'] <= 0:
+            livres.setdefault(conta['pessoa_chave'], []).append(conta)
+
+    por_pessoa = {}  # pessoa_chave -> payments pendentes que a citam
+    for p in pendentes:
+        modelo = 'cliente' if p['tipo'] == 'E' else 'funcionario'
+        for chave in nomes.chaves_citadas(p['obs_norm'], p['obs_tokens'], modelo):
+            if chave in livres:
+                por_pessoa.setdefault(chave, []).append(p)
+
+    campos_pessoa = {'cliente': ('receita', 'entidade_cliente'), 'funcionario': ('despesa', 'entidade_responsavel')}
+    reservadas = set()   # (tipo_conta, id)
+    usados = set()       # ids de payments
+    sugestoes = []
+
+    def tabela(valores, limite):
+        return somas_por_combinacao(valores, limite, prazo=min(time.monotonic() + TEMPO_BUSCA_GRUPO, fim))
+
+    def sugerir(tipo_conta, campo_pessoa, payments_grupo, contas_grupo):
+        usados.update(p['id'] for p in payments_grupo)
+        reservadas.update((tipo_conta, c['id']) for c in contas_grupo)
+        sugestoes.append({
+            'tipo': tipo_conta,
+            'payment_ids': [p['id'] for p in payments_grupo],
+            'entidade_ids': [c['id'] for c in contas_grupo],
+            'contraparte': contas_grupo[0]['pessoa'],
+            'valor_total': str(sum(p['valor'] for p in payments_grupo)),
+            'payments': [
+                {
+                    'payment_id': p['id'],
+                    'payment_tipo': tipo_display[p['tipo']],
+                    'payment_valor': str(p['valor']),
+                    'payment_data': p['data'].isoformat(),
+                    'payment_observacao': p['observacao'] or '',
+                    'payment_conta': p['conta'],
+                }
+                for p in payments_grupo
+            ],
+            'entidades': [_sugestao_conta(tipo_conta, c, campo_pessoa) for c in contas_grupo],
+        })
+
+    for chave, payments_pessoa in por_pessoa.items():
+        if time.monotonic() > fim:
+            return sugestoes, True
+        tipo_conta, campo_pessoa = campos_pessoa[chave[0]]
+
+        # 1. Um payment quitando várias contas da contraparte
+        candidatas = None
+        for p in payments_pessoa:
+            if p['id'] in usados:
+                continue
+            if candidatas is None:
+                candidatas = [c for c in livres[chave] if (tipo_conta, c['id']) not in reservadas][:MAX_CANDIDATOS_GRUPO]
+                somas = tabela([c['valor'] for c in candidatas], max(p['valor'] for p in payments_pessoa))
+            combinacao = somas.get(_centavos(p['valor']))
+            if combinacao:
+                sugerir(tipo_conta, campo_pessoa, [p], [candidatas[i] for i in combinacao])
+                candidatas = None  # contas reservadas: remonta a tabela
+
+        # 2. Vários payments da contraparte somando uma conta
+        candidatos = None
+        for conta in livres[chave]:
+            if (tipo_conta, conta['id']) in reservadas:
+                continue
+            if candidatos is None:
+                candidatos = [p for p in payments_pessoa if p['id'] not in usados][:MAX_CANDIDATOS_GRUPO]
+                if len(candidatos) < 2:
+                    break
+                somas = tabela([p['valor'] for p in candidatos], max(c['valor'] for c in livres[chave]))
+            combinacao = somas.get(_centavos(conta['valor']))
+            if combinacao:
+                sugerir(tipo_conta, campo_pessoa, [candidatos[i] for i in combinacao], [conta])
+                candidatos = None
+
+    return sugestoes, False
+
+
+# ──────────────────────────────────────────────
+# Conciliação
+# ──────────────────────────────────────────────
+
+def _sugestao_conta(tipo, conta, campo_pessoa):
+    return {
+        'tipo': tipo,
+        'entidade_id': conta['id'],
+        'entidade_nome': conta['nome'],
+        campo_pessoa: conta['pessoa'],
+        'entidade_valor': str(conta['valor']),
+        'entidade_vencimento': conta['vencimento'].isoformat()
+    }
+
+
+def _sugestao_custodia(custodia, valor_restante):
+    return {
+        'tipo': 'custodia',
+        'entidade_id': custodia['id'],
+        'entidade_nome': custodia['nome'],
+        'entidade_contraparte': custodia['contraparte'],
+        'entidade_valor': str(valor_restante),
+        'entidade_tipo': 'Ativo' if custodia['tipo'] == 'A' else 'Passivo'
+    }
+
+
+def calcular_conciliacao(company, mes: int, ano: int, conta_ids=None, agrupar: bool = True,
+                         limite_tempo_grupos: float = TEMPO_TOTAL_GRUPOS) -> dict:
+    """
+    Calcula matches e sugestões dos payments sem alocação do mês (opcionalmente
+    só das contas bancárias `conta_ids`), sem gravar nada.
+
+    Retorna um dicionário serializável (pode vir de outro processo) com as
+    alocações (payment_id, campo, entidade_id, valor), a data de cada payment
+    alocado, o estado das custódias em memória, as sugestões e os totais.
+    """
+    payments = _carregar_payments(company, mes, ano, conta_ids)
+    nomes = IndiceNomes()
+    receitas = _carregar_contas(Receita, 'cliente', 'cliente', company, mes, ano, nomes)
+    despesas = _carregar_contas(Despesa, 'responsavel', 'funcionario', company, mes, ano, nomes)
+    custodias = _carregar_custodias(company, nomes)
+
+    receitas_por_valor = _indexar_por_valor_livre(receitas)
+    despesas_por_valor = _indexar_por_valor_livre(despesas)
+    custodias_por_tipo = {
+        'A': _IndiceCustodias([c for c in custodias if c['tipo'] == 'A']),
+        'P': _IndiceCustodias([c for c in custodias if c['tipo'] == 'P']),
+    }
+
+    # Por tipo de payment: (índice de contas, tipo da sugestão, campo da pessoa,
+    # tipo de custódia, campo da custódia que o payment movimenta)
+    regras = {
+        'E': (receitas_por_valor, 'receita', 'entidade_cliente', 'A', 'entradas'),
+        'S': (despesas_por_valor, 'despesa', 'entidade_responsavel', 'P', 'saidas'),
+    }
+    tipo_display = dict(Payment.TIPO_CHOICES)
+
+    alocacoes = []  # (payment_id, campo, entidade_id, valor)
+    datas = {}      # payment_id -> data_pagamento dos payments alocados
+    sugestoes = []
+    pendentes = []  # payments sem match automático, para as sugestões agrupadas
+
+    for payment_id, tipo, valor, data_pagamento, observacao, conta_nome in payments:
+        if tipo not in regras:
+            continue
+        contas_por_valor, tipo_conta, campo_pessoa, tipo_custodia, campo_custodia = regras[tipo]
+        indice_custodias = custodias_por_tipo[tipo_custodia]
+
+        obs_norm = normalizar_string(observacao)
+        obs_tokens = palavras_significativas(obs_norm)
+        chaves_comuns = nomes.chaves_com_palavras_comuns(obs_tokens)
+
+        # 1. Receita/despesa com valor exato e nome na observação
+        candidatas = contas_por_valor.get(valor, [])
+        conta = next((c for c in candidatas if nome_confere(obs_norm, chaves_comuns, c['nomes'])), None)
+        if conta is not None:
+            candidatas.remove(conta)
+            conta['alocado'] += valor
+            alocacoes.append((payment_id, tipo_conta, conta['id'], valor))
+            datas[payment_id] = data_pagamento
+            continue
+
+        # 2. Custódia com valor_total exato, saldo disponível e nome na observação
+        custodia = next(
+            (
+                c for c in indice_custodias.por_valor_total.get(valor, ())
+                if _restante(c) >= valor and nome_confere(obs_norm, chaves_comuns, c['nomes'])
+            ),
+            None,
+        )
+        if custodia is not None:
+            indice_custodias.alocar(custodia, campo_custodia, valor)
+            alocacoes.append((payment_id, 'custodia', custodia['id'], valor))
+            datas[payment_id] = data_pagamento
+            continue
+
+        # 3. Sem match automático: sugestões apenas por valor
+        pendentes.append({
+            'id': payment_id,
+            'tipo': tipo,
+            'valor': valor,
+            'data': data_pagamento,
+            'observacao': observacao,
+            'conta': conta_nome,
+            'obs_norm': obs_norm,
+            'obs_tokens': obs_tokens,
+        })
+        opcoes = [_sugestao_conta(tipo_conta, c, campo_pessoa) for c in candidatas]
+        opcoes.extend(
+            _sugestao_custodia(c, valor) for c in indice_custodias.por_restante.get(valor, ())
+        )
+        if opcoes:
+            sugestoes.append({
+                'payment_id': payment_id,
+                'payment_tipo': tipo_display[tipo],
+                'payment_valor': str(valor),
+                'payment_data': data_pagamento.isoformat(),
+                'payment_observacao': observacao or '',
+                'payment_conta': conta_nome,
+                'opcoes': opcoes
+            })
+
+    sugestoes_agrupadas, busca_interrompida = [], False
+    if agrupar and pendentes:
+        sugestoes_agrupadas, busca_interrompida = _sugerir_agrupadas(
+            pendentes, receitas + despesas, nomes, tipo_display, limite_tempo_grupos
+        )
+
+    return {
+        'payments_entrada': sum(1 for p in payments if p[1] == 'E'),
+        'payments_saida': sum(1 for p in payments if p[1] == 'S'),
+        'total_payments': len(payments),
+        'total_receitas_abertas': len(receitas),
+        'total_despesas_abertas': len(despesas),
+        'total_custodias_abertas': len(custodias),
+        'alocacoes': alocacoes,
+        'datas': datas,
+        'custodias': custodias,
+        'sugestoes': sugestoes,
+        'sugestoes_agrupadas': sugestoes_agrupadas,
+        'busca_agrupada_interrompida': busca_interrompida,
+    }
+
+
+def gravar_e_resumir(company, calculo: dict) -> dict:
+    """
+    Grava as alocações de um cálculo (de um mês ou já mesclado de várias
+    partições) e monta o corpo da resposta do endpoint (sem 'success'/'mes'/'ano'):
+    total_payments_processados, matches, sugestoes, total_sugestoes,
+    sugestoes_agrupadas, total_sugestoes_agrupadas, debug, erros.
+    """
+    alocacoes = calculo['alocacoes']
+    matches = Counter(campo for _, campo, _, _ in alocacoes)
+
+    erros = []
+    if alocacoes:
+        try:
+            gravar_alocacoes(company, alocacoes, calculo['custodias'])
+        except Exception as e:
+            erros.append(f'Erro ao gravar alocações: {str(e)}')
+            matches = Counter()
+
+    return {
+        'total_payments_processados': calculo['total_payments'],
+        'matches': {
+            'receitas': matches['receita'],
+            'despesas': matches['despesa'],
+            'custodias': matches['custodia'],
+            'total': sum(matches.values())
+        },
+        'sugestoes': calculo['sugestoes'],
+        'total_sugestoes': len(calculo['sugestoes']),
+        'sugestoes_agrupadas': calculo['sugestoes_agrupadas'],
+        'total_sugestoes_agrupadas': len(calculo['sugestoes_agrupadas']),
+        'debug': {
+            'total_receitas_abertas': calculo['total_receitas_abertas'],
+            'total_despesas_abertas': calculo['total_despesas_abertas'],
+            'total_custodias_abertas': calculo['total_custodias_abertas'],
+            'payments_entrada': calculo['payments_entrada'],
+            'payments_saida': calculo['payments_saida'],
+            'busca_agrupada_interrompida': calculo['busca_agrupada_interrompida'],
+        },
+        'erros': erros
+    }
+
+
+def conciliar_mes(company, mes: int, ano: int, agrupar: bool = True,
+                  limite_tempo_grupos: float = TEMPO_TOTAL_GRUPOS) -> dict:
+    """Concilia os payments sem alocação do mês e grava as alocações encontradas."""
+    calculo = calcular_conciliacao(
+        company, mes, ano, agrupar=agrupar, limite_tempo_grupos=limite_tempo_grupos
+    )
+    return gravar_e_resumir(company, calculo)
+
+
+def gravar_alocacoes(company, alocacoes, custodias):
+    """
+    Cria as alocações em lote, soma os totais alocados e recalcula o status
+    das contas tocadas em lote (o mesmo resultado de `atualizar_status`).
+    """
+    ids_por_campo = {'receita': set(), 'despesa': set(), 'custodia': set()}
+    for _, campo, entidade_id, _ in alocacoes:
+        ids_por_campo[campo].add(entidade_id)
+
+    # Receita casa com entrada, despesa com saída; custódia ativa com entrada, passiva com saída
+    tipo_custodia = {c['id']: c['tipo'] for c in custodias}
+    movimentos = [
+        (
+            payment_id,
+            'E' if campo == 'receita' or (campo == 'custodia' and tipo_custodia[entidade_id] == 'A') else 'S',
+            campo, entidade_id, valor,
+        )
+        for payment_id, campo, entidade_id, valor in alocacoes
+    ]
+
+    with transaction.atomic(), resumo_em_lote():
+        Allocation.objects.bulk_create(
+            [
+                Allocation(company=company, payment_id=payment_id, valor=valor, **{f'{campo}_id': entidade_id})
+                for payment_id, campo, entidade_id, valor in alocacoes
+            ],
+            batch_size=1000,
+        )
+        aplicar_totais(movimentos)
+
+        # Um UPDATE por modelo tocado, a partir dos totais recém-somados
+        if ids_por_campo['receita']:
+            recalcular_receitas(ids=ids_por_campo['receita'])
+        if ids_por_campo['despesa']:
+            recalcular_despesas(ids=ids_por_campo['despesa'])
+        if ids_por_campo['custodia']:
+            recalcular_custodias(ids=ids_por_campo['custodia'])
+        incrementar_versao(company.pk)  # bulk_create não dispara os sinais
+
+
+def confirmar_agrupada(company, tipo: str, payment_ids, entidade_ids) -> list:
+    """
+    Aplica uma sugestão agrupada: um payment para várias receitas/despesas ou
+    vários payments para uma. Cada conta recebe o seu valor inteiro e fica paga.
+
+    Levanta SugestaoInvalida (400) ou DoesNotExist do modelo (404).
+    Retorna os nomes das contas vinculadas.
+    """
+    modelos = {'receita': (Receita, 'E'), 'despesa': (Despesa, 'S')}
+    if tipo not in modelos:
+        raise SugestaoInvalida('Sugestões agrupadas aceitam apenas receita ou despesa')
+    model, tipo_payment = modelos[tipo]
+
+    payment_ids = set(payment_ids)
+    entidade_ids = set(entidade_ids)
+    if not payment_ids or not entidade_ids:
+        raise SugestaoInvalida('Informe ao menos um pagamento e uma conta')
+    if len(payment_ids) > 1 and len(entidade_ids) > 1:
+        raise SugestaoInvalida('Use um pagamento para várias contas ou vários pagamentos para uma conta')
+
+    with transaction.atomic(), resumo_em_lote():
+        payments = list(
+            Payment.objects.select_for_update().filter(company=company, id__in=payment_ids).order_by('id')
+        )
+        if len(payments) != len(payment_ids):
+            raise Payment.DoesNotExist('Pagamento não encontrado')
+        if any(p.tipo != tipo_payment for p in payments):
+            raise SugestaoInvalida(f'Os pagamentos não são do tipo correto para {tipo}')
+        if any(p.total_alocado > 0 for p in payments):
+            raise SugestaoInvalida('Um dos pagamentos já possui alocação')
+
+        contas = list(
+            model.objects.select_for_update().filter(
+                company=company, id__in=entidade_ids
+            ).order_by('data_vencimento', 'id')
+        )
+        if len(contas) != len(entidade_ids):
+            raise model.DoesNotExist(f'{tipo.capitalize()} não encontrada')
+        if any(c.total_alocado > 0 for c in contas):
+            raise SugestaoInvalida(f'Uma das contas ({tipo}) já possui alocação')
+
+        if sum(p.valor for p in payments) != sum(c.valor for c in contas):
+            raise SugestaoInvalida('A soma dos pagamentos não corresponde à soma das contas')
+
+        if len(payments) == 1:
+            pares = [(payments[0], c, c.valor) for c in contas]
+        else:
+            pares = [(p, contas[0], p.valor) for p in payments]
+        Allocation.objects.bulk_create([
+            Allocation(company=company, payment=p, valor=valor, **{tipo: c})
+            for p, c, valor in pares
+        ])
+        aplicar_totais([(p.id, tipo_payment, tipo, c.id, valor) for p, c, valor in pares])
+        (recalcular_receitas if tipo == 'receita' else recalcular_despesas)(ids=[c.id for c in contas])
+        incrementar_versao(company.pk)
+
+    return [c.nome for c in contas]
+
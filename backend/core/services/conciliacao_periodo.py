@@ -0,0 +1,209 @@
+"""
+Conciliação bancária de um período (vários meses), opcionalmente só de
+algumas contas bancárias.
+
+O trabalho é dividido em partições independentes (conta bancária x mês), cada
+uma calculada por `calcular_conciliacao` sem gravar nada. Com paralelo=True
+(worker da fila de jobs e comandos de gerenciamento) elas rodam num pool de
+processos; no request HTTP, em série: fazer fork de dentro de uma thread do
+gunicorn não é seguro. Partições diferentes podem propor a
+mesma receita/despesa (payments de duas contas bancárias no mesmo mês) ou a
+mesma custódia (que não tem mês), então os resultados são mesclados no
+processo principal em ordem determinística, (data_pagamento, payment_id):
+cada alocação só é aceita se a conta ainda estiver livre e a custódia ainda
+tiver saldo. O resultado não depende da ordem em que as partições terminam.
+Alocações recusadas na mescla voltam como conflito; o payment continua sem
+alocação para a próxima execução.
+
+Como cada partição só vê os payments da sua conta bancária, as sugestões
+agrupadas de vários payments para uma conta só juntam payments do mesmo banco.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from ..models import Payment
+from .conciliacao import (
+    IndiceNomes,
+    _carregar_custodias,
+    _restante,
+    calcular_conciliacao,
+    gravar_e_resumir,
+)
+
+MAX_MESES_PERIODO = 24
+
+
+def meses_do_periodo(mes_inicio: int, ano_inicio: int, mes_fim: int, ano_fim: int) -> list:
+    """Lista de (ano, mes) do período, inclusive, em ordem."""
+    inicio = ano_inicio * 12 + mes_inicio - 1
+    fim = ano_fim * 12 + mes_fim - 1
+    return [(i // 12, i % 12 + 1) for i in range(inicio, fim + 1)]
+
+
+def _particoes(company, meses, conta_ids=None) -> list:
+    """(conta_bancaria_id, ano, mes) que têm payments sem alocação, em ordem estável."""
+    ano_fim, mes_fim = meses[-1]
+    fim = date(ano_fim + 1, 1, 1) if mes_fim == 12 else date(ano_fim, mes_fim + 1, 1)
+    payments = Payment.objects.filter(
+        company=company,
+        data_pagamento__gte=date(meses[0][0], meses[0][1], 1),
+        data_pagamento__lt=fim,
+        total_alocado=0,
+    )
+    if conta_ids is not None:
+        payments = payments.filter(conta_bancaria_id__in=conta_ids)
+    return list(
+        payments.annotate(
+            ano=ExtractYear('data_pagamento'), mes=ExtractMonth('data_pagamento')
+        ).values_list('conta_bancaria_id', 'ano', 'mes').distinct().order_by('ano', 'mes', 'conta_bancaria_id')
+    )
+
+
+def _calcular_particao(company_id, conta_id, ano, mes, agrupar):
+    return calcular_conciliacao(company_id, mes, ano, conta_ids=[conta_id], agrupar=agrupar)
+
+
+def _numero_workers(workers, particoes: int) -> int:
+    workers = workers or settings.CONCILIACAO_WORKERS or os.cpu_count() or 1
+    return max(1, min(workers, particoes))
+
+
+def _calcular_particoes(company_id, particoes, agrupar, workers) -> list:
+    """
+    Calcula as partições, na mesma ordem de `particoes`.
+
+    Em série quando só há um worker ou dentro de uma transação (os processos
+    filhos não enxergariam dados ainda não commitados, como nos testes).
+    Só deve ser chamada com workers > 1 fora do servidor web.
+    """
+    tarefas = [(company_id, conta_id, ano, mes, agrupar) for conta_id, ano, mes in particoes]
+    if (
+        workers <= 1
+        or connection.in_atomic_block
+        or 'fork' not in multiprocessing.get_all_start_methods()
+    ):
+        return [_calcular_particao(*tarefa) for tarefa in tarefas]
+
+    # Cada processo filho abre a própria conexão (não compartilha o socket do pai)
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        return list(pool.map(_calcular_particao, *zip(*tarefas)))
+
+
+def _mesclar(company, particoes, calculos) -> tuple:
+    """Junta os cálculos das partições num só, aceitando as alocações em ordem determinística."""
+    propostas = sorted(
+        (calculo['datas'][alocacao[0]], alocacao[0], alocacao, particao)
+        for particao, calculo in zip(particoes, calculos)
+        for alocacao in calculo['alocacoes']
+    )
+
+    # Estado atual das custódias, atualizado conforme as alocações são aceitas
+    custodias = _carregar_custodias(company, IndiceNomes())
+    custodias_por_id = {c['id']: c for c in custodias}
+    ocupadas = set()  # (campo, entidade_id) de receitas/despesas já alocadas
+
+    aceitas = []
+    conflitos = []
+    matches_por_particao = dict.fromkeys(particoes, 0)
+    for data_pagamento, payment_id, alocacao, particao in propostas:
+        _, campo, entidade_id, valor = alocacao
+        if campo == 'custodia':
+            custodia = custodias_por_id.get(entidade_id)
+            if custodia is None or _restante(custodia) < valor:
+                conflitos.append(payment_id)
+                continue
+            custodia['entradas' if custodia['tipo'] == 'A' else 'saidas'] += valor
+        else:
+            if (campo, entidade_id) in ocupadas:
+                conflitos.append(payment_id)
+                continue
+            ocupadas.add((campo, entidade_id))
+        aceitas.append(alocacao)
+        matches_por_particao[particao] += 1
+
+    # Sugestões que apontam para contas alocadas por outra partição saem do relatório
+    sugestoes = []
+    for calculo in calculos:
+        for sugestao in calculo['sugestoes']:
+            opcoes = [o for o in sugestao['opcoes'] if (o['tipo'], o['entidade_id']) not in ocupadas]
+            if opcoes:
+                sugestoes.append({**sugestao, 'opcoes': opcoes})
+    sugestoes.sort(key=lambda s: (s['payment_data'], s['payment_id']))
+
+    agrupadas = []
+    reservadas = set(ocupadas)
+    candidatas = sorted(
+        (g for calculo in calculos for g in calculo['sugestoes_agrupadas']),
+        key=lambda g: (g['payments'][0]['payment_data'], g['payment_ids'][0]),
+    )
+    for grupo in candidatas:
+        chaves = {(grupo['tipo'], entidade_id) for entidade_id in grupo['entidade_ids']}
+        if chaves & reservadas:
+            continue
+        reservadas |= chaves
+        agrupadas.append(grupo)
+
+    # Receitas/despesas abertas são as mesmas em todas as partições do mês
+    por_mes = {}
+    for (_, ano, mes), calculo in zip(particoes, calculos):
+        por_mes.setdefault((ano, mes), calculo)
+
+    mesclado = {
+        'payments_entrada': sum(c['payments_entrada'] for c in calculos),
+        'payments_saida': sum(c['payments_saida'] for c in calculos),
+        'total_payments': sum(c['total_payments'] for c in calculos),
+        'total_receitas_abertas': sum(c['total_receitas_abertas'] for c in por_mes.values()),
+        'total_despesas_abertas': sum(c['total_despesas_abertas'] for c in por_mes.values()),
+        'total_custodias_abertas': len(custodias),
+        'alocacoes': aceitas,
+        'custodias': custodias,
+        'sugestoes': sugestoes,
+        'sugestoes_agrupadas': agrupadas,
+        'busca_agrupada_interrompida': any(c['busca_agrupada_interrompida'] for c in calculos),
+    }
+    return mesclado, sorted(conflitos), matches_por_particao
+
+
+def conciliar_periodo(company, mes_inicio: int, ano_inicio: int, mes_fim: int, ano_fim: int,
+                      conta_ids=None, agrupar: bool = True, paralelo: bool = False,
+                      workers=None) -> dict:
+    """
+    Concilia os payments sem alocação de um período (e das contas `conta_ids`,
+    se informadas) e grava as alocações aceitas numa única transação.
+
+    Retorna o mesmo corpo de `conciliar_mes`, mais `particoes` (payments e
+    matches por conta x mês) e `conflitos` (payments cujo match foi recusado
+    porque outra partição, anterior na ordem, ficou com a conta).
+
+    `paralelo` liga o pool de processos (com `workers` processos, padrão
+    settings.CONCILIACAO_WORKERS); só use fora do servidor web.
+    """
+    meses = meses_do_periodo(mes_inicio, ano_inicio, mes_fim, ano_fim)
+    particoes = _particoes(company, meses, conta_ids)
+    workers = _numero_workers(workers, len(particoes)) if paralelo else 1
+    calculos = _calcular_particoes(company.pk, particoes, agrupar, workers)
+
+    mesclado, conflitos, matches_por_particao = _mesclar(company, particoes, calculos)
+    resultado = gravar_e_resumir(company, mesclado)
+
+    resultado['particoes'] = [
+        {
+            'conta_bancaria_id': conta_id,
+            'ano': ano,
+            'mes': mes,
+            'payments': calculo['total_payments'],
+            'matches': matches_por_particao[(conta_id, ano, mes)],
+        }
+        for (conta_id, ano, mes), calculo in zip(particoes, calculos)
+    ]
+    resultado['conflitos'] = conflitos
+    resultado['total_conflitos'] = len(conflitos)
+    return resultado
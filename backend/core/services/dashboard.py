@@ -0,0 +1,232 @@
+"""
+Dados do dashboard (GET /dashboard/) em poucas consultas agrupadas, com o
+resultado guardado no cache por empresa.
+
+Consultas (frio):
+1. Resumo mensal de caixa dos últimos 6 meses (services/resumo.py) por mês e
+   categoria: gráfico de fluxo, resultado do mês e recebido/pago por tipo.
+2. Receitas e despesas (UNION de duas agregações por mês de vencimento):
+   gráfico receita x despesa, projeções de 30 dias e vencidas.
+3. Pagamentos dos últimos 30 dias (sem transferências): fluxo realizado.
+4. Saldo total das contas.
+5. Aniversariantes do dia (UNION clientes/funcionários).
+6. Próximos vencimentos (UNION receitas/despesas dos próximos 7 dias).
+
+Cache: a view guarda o resultado com @relatorio_em_cache (views/cache.py),
+na chave da versão dos dados da empresa e do dia (services/versao.py).
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import CharField, Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from ..models import Cliente, ContaBancaria, Despesa, Funcionario, Payment, Receita, ResumoMensal
+from .status import filtro_situacao
+
+ZERO = Decimal('0.00')
+MESES_GRAFICO = 6
+DINHEIRO = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _somar_meses(dia, meses):
+    mes = dia.month - 1 + meses
+    return date(dia.year + mes // 12, mes % 12 + 1, 1)
+
+
+def _mes(valor):
+    """Chave (ano, mês) de um TruncMonth (date ou datetime, conforme o banco)."""
+    return valor.year, valor.month
+
+
+def _agregado_contas(model, origem, company_id, hoje, inicio_grafico, fim_mes):
+    """Receitas ou despesas agrupadas por mês de vencimento (um lado da UNION)."""
+    em_aberto = F('valor') - F('total_alocado')
+    no_grafico = Q(data_vencimento__gte=inicio_grafico, data_vencimento__lte=fim_mes)
+    projetada = Q(
+        data_vencimento__gte=hoje, data_vencimento__lte=hoje + timedelta(days=30), situacao__in=['A', 'V']
+    )
+    vencida = filtro_situacao(['V'], hoje)
+    return (
+        model.objects.filter(company_id=company_id)
+        .filter(no_grafico | projetada | vencida)
+        .annotate(origem=Value(origem, output_field=CharField()), mes=TruncMonth('data_vencimento'))
+        .values('origem', 'mes')
+        .annotate(
+            total=Sum('valor', filter=no_grafico, output_field=DINHEIRO),
+            projetado=Sum(em_aberto, filter=projetada, output_field=DINHEIRO),
+            vencidas=Count('id', filter=vencida),
+            valor_vencidas=Sum(em_aberto, filter=vencida, output_field=DINHEIRO),
+        )
+        .order_by()
+    )
+
+
+def calcular_dashboard(company_id, hoje) -> dict:
+    """Monta o payload do dashboard (ver docstring do módulo para as consultas)."""
+    inicio_mes = date(hoje.year, hoje.month, 1)
+    fim_mes = _somar_meses(inicio_mes, 1) - timedelta(days=1)
+    inicio_grafico = _somar_meses(inicio_mes, -(MESES_GRAFICO - 1))
+    meses = [_somar_meses(inicio_grafico, i) for i in range(MESES_GRAFICO)]
+    data_30_dias_atras = hoje - timedelta(days=30)
+
+    # 1. Caixa por mês e categoria (resumo mensal, já sem transferências)
+    caixa = (
+        ResumoMensal.objects.filter(
+            company_id=company_id, mes__gte=inicio_grafico, mes__lte=inicio_mes, conta_bancaria__isnull=False,
+        )
+        .values('mes', 'categoria')
+        .annotate(entradas=Sum('entradas'), saidas=Sum('saidas'))
+        .order_by()
+    )
+    fluxo_por_mes = {}
+    totais_receita_tipo, totais_despesa_tipo = {}, {}
+    for linha in caixa:
+        mes = _mes(linha['mes'])
+        entradas, saidas = fluxo_por_mes.get(mes, (ZERO, ZERO))
+        fluxo_por_mes[mes] = (entradas + linha['entradas'], saidas + linha['saidas'])
+        # Recebido / pago no mês atual pelo tipo da receita/despesa alocada
+        categoria = linha['categoria']
+        if mes == _mes(inicio_mes) and categoria[0] in 'RD':
+            totais = totais_receita_tipo if categoria[0] == 'R' else totais_despesa_tipo
+            totais[categoria[1]] = linha['entradas'] + linha['saidas']
+
+    receitas_mes_atual, despesas_mes_atual = fluxo_por_mes.get(_mes(inicio_mes), (ZERO, ZERO))
+
+    # 2. Receitas e despesas por mês de vencimento
+    contas = _agregado_contas(Receita, 'R', company_id, hoje, inicio_grafico, fim_mes).union(
+        _agregado_contas(Despesa, 'D', company_id, hoje, inicio_grafico, fim_mes), all=True
+    )
+    vencimento_por_mes = {}
+    totais = {origem: {'projetado': ZERO, 'vencidas': 0, 'valor_vencidas': ZERO} for origem in 'RD'}
+    for linha in contas:
+        if linha['total'] is not None:
+            vencimento_por_mes[(linha['origem'], _mes(linha['mes']))] = linha['total']
+        total = totais[linha['origem']]
+        total['projetado'] += linha['projetado'] or ZERO
+        total['vencidas'] += linha['vencidas']
+        total['valor_vencidas'] += linha['valor_vencidas'] or ZERO
+
+    # 3. Fluxo realizado nos últimos 30 dias (exceto transferências)
+    ultimos_30 = (
+        Payment.objects.filter(company_id=company_id, data_pagamento__gte=data_30_dias_atras, data_pagamento__lte=hoje)
+        .exclude(allocations__transfer__isnull=False)
+        .aggregate(entradas=Sum('valor', filter=Q(tipo='E')), saidas=Sum('valor', filter=Q(tipo='S')))
+    )
+    fluxo_caixa_realizado = (ultimos_30['entradas'] or ZERO) - (ultimos_30['saidas'] or ZERO)
+
+    # 4. Saldo das contas
+    saldo_total = (
+        ContaBancaria.objects.filter(company_id=company_id).aggregate(total=Sum('saldo_atual'))['total'] or ZERO
+    )
+
+    # 5. Aniversariantes do dia
+    def _aniversariantes(model, origem):
+        return model.objects.filter(
+            company_id=company_id, aniversario__month=hoje.month, aniversario__day=hoje.day
+        ).values('id', 'nome', 'email', 'telefone', 'tipo', origem=Value(origem, output_field=CharField()))
+
+    tipos_funcionario = dict(Funcionario.TIPO_CHOICES)
+    aniversariantes = {'clientes': [], 'funcionarios': []}
+    for pessoa in _aniversariantes(Cliente, 'C').union(_aniversariantes(Funcionario, 'F'), all=True):
+        cliente = pessoa['origem'] == 'C'
+        aniversariantes['clientes' if cliente else 'funcionarios'].append({
+            'id': pessoa['id'],
+            'nome': pessoa['nome'],
+            'tipo': 'Cliente' if cliente else tipos_funcionario.get(pessoa['tipo'], pessoa['tipo']),
+            'email': pessoa['email'],
+            'telefone': pessoa['telefone'],
+        })
+
+    # 6. Próximos vencimentos (7 dias), os 5 primeiros de cada lado
+    def _proximas(model, origem, pessoa):
+        return model.objects.filter(
+            company_id=company_id,
+            data_vencimento__gte=hoje,
+            data_vencimento__lte=hoje + timedelta(days=7),
+            situacao__in=['A', 'V'],
+        ).values(
+            'id', 'nome', 'valor', 'total_alocado', 'data_vencimento', 'situacao',
+            pessoa=F(pessoa), origem=Value(origem, output_field=CharField()),
+        )
+
+    proximas = {'R': [], 'D': []}
+    for conta in _proximas(Receita, 'R', 'cliente__nome').union(
+        _proximas(Despesa, 'D', 'responsavel__nome'), all=True
+    ).order_by('data_vencimento', 'id'):
+        if len(proximas[conta['origem']]) < 5:
+            proximas[conta['origem']].append(conta)
+
+    def _proxima(conta, campo_pessoa):
+        return {
+            'id': conta['id'],
+            'nome': conta['nome'],
+            campo_pessoa: conta['pessoa'],
+            'valor': float(conta['valor'] - conta['total_alocado']),
+            'dataVencimento': conta['data_vencimento'].isoformat(),
+            'situacao': conta['situacao'],
+        }
+
+    return {
+        # Saldo e Fluxo
+        'saldoTotal': float(saldo_total),
+        'saldo30DiasAtras': float(saldo_total - fluxo_caixa_realizado),
+        'fluxoCaixaRealizado': float(fluxo_caixa_realizado),
+
+        # Projeções (próximos 30 dias)
+        'receitasProjetadas': float(totais['R']['projetado']),
+        'despesasProjetadas': float(totais['D']['projetado']),
+
+        # Resultado do mês atual
+        'resultadoMesAtual': float(receitas_mes_atual - despesas_mes_atual),
+
+        # Alertas
+        'despesasVencidas': totais['D']['vencidas'],
+        'receitasVencidas': totais['R']['vencidas'],
+        'valorDespesasVencidas': float(totais['D']['valor_vencidas']),
+        'valorReceitasVencidas': float(totais['R']['valor_vencidas']),
+
+        # Aniversariantes
+        'aniversariantes': aniversariantes,
+
+        # Gráficos
+        'receitaVsDespesaData': [
+            {
+                'mes': mes.strftime('%b'),
+                'receita': float(vencimento_por_mes.get(('R', _mes(mes)), ZERO)),
+                'despesa': float(vencimento_por_mes.get(('D', _mes(mes)), ZERO)),
+            }
+            for mes in meses
+        ],
+        'fluxoCaixaData': [
+            {
+                'mes': mes.strftime('%b'),
+                'fluxo': float(entradas - saidas),
+                'receita': float(entradas),
+                'despesa': float(saidas),
+            }
+            for mes in meses
+            for entradas, saidas in [fluxo_por_mes.get(_mes(mes), (ZERO, ZERO))]
+        ],
+        'receitaPorTipoData': [
+            {'name': label, 'value': float(totais_receita_tipo[tipo])}
+            for tipo, label in Receita.TIPO_CHOICES
+            if totais_receita_tipo.get(tipo, ZERO) > 0
+        ],
+        'despesaPorTipoData': [
+            {'name': label, 'value': float(totais_despesa_tipo[tipo])}
+            for tipo, label in Despesa.TIPO_CHOICES
+            if totais_despesa_tipo.get(tipo, ZERO) > 0
+        ],
+
+        # Próximos vencimentos
+        'receitasProximas': [_proxima(conta, 'cliente') for conta in proximas['R']],
+        'despesasProximas': [_proxima(conta, 'responsavel') for conta in proximas['D']],
+    }
+
+
+def dados_dashboard(company_id) -> dict:
+    """Dashboard da empresa calculado para hoje."""
+    return calcular_dashboard(company_id, timezone.localdate())
@@ -0,0 +1,109 @@
+"""
+DRE (regime de competência) de um intervalo de meses.
+
+Os totais por mês e tipo vêm das linhas de competência do resumo mensal
+(services/resumo.py) numa única consulta, qualquer que seja o intervalo: a
+DRE anual custa o mesmo que a mensal. O resultado é uma matriz mês ×
+categoria, com o total de cada coluna (receitas, despesas e resultado do
+mês) e o consolidado do período.
+
+Usada por GET /relatorios/dre/ e pelo PDF /pdf/dre/.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .resumo import competencia_por_mes, inicio_do_mes
+
+ZERO = Decimal('0.00')
+MAX_MESES = 36
+
+# (chave no payload, categoria do resumo, rótulo)
+LINHAS_RECEITAS = (
+    ('fixas', 'RF', 'Receitas Fixas'),
+    ('variaveis', 'RV', 'Receitas Variáveis'),
+    ('estornos', 'RE', 'Estornos'),
+)
+LINHAS_DESPESAS = (
+    ('fixas', 'DF', 'Despesas Fixas'),
+    ('variaveis', 'DV', 'Despesas Variáveis'),
+    ('comissoes', 'DC', 'Comissões'),
+    ('reembolsos', 'DR', 'Reembolsos'),
+)
+
+
+def _ler_mes(valor) -> date:
+    ano, mes = valor.split('-')
+    return date(int(ano), int(mes), 1)
+
+
+def _somar_meses(mes, quantidade):
+    indice = mes.month - 1 + quantidade
+    return date(mes.year + indice // 12, indice % 12 + 1, 1)
+
+
+def periodo_dre(params, hoje=None):
+    """
+    (primeiro mês, último mês) pedidos na query string:
+    - inicio=AAAA-MM&fim=AAAA-MM: intervalo de meses;
+    - ano=AAAA (sem mes): o ano inteiro;
+    - mes=M&ano=AAAA: um mês;
+    - nada: o mês atual.
+    Levanta ValueError se o período for inválido ou passar de MAX_MESES.
+    """
+    mes, ano = params.get('mes'), params.get('ano')
+    if params.get('inicio') or params.get('fim'):
+        inicio = _ler_mes(params.get('inicio') or params.get('fim'))
+        fim = _ler_mes(params.get('fim') or params.get('inicio'))
+    elif ano and not mes:
+        inicio, fim = date(int(ano), 1, 1), date(int(ano), 12, 1)
+    elif mes and ano:
+        inicio = fim = date(int(ano), int(mes), 1)
+    else:
+        inicio = fim = inicio_do_mes(hoje or date.today())
+
+    if fim < inicio:
+        raise ValueError('O mês final deve ser igual ou posterior ao inicial.')
+    if _somar_meses(inicio, MAX_MESES) <= fim:
+        raise ValueError(f'O período da DRE é limitado a {MAX_MESES} meses.')
+    return inicio, fim
+
+
+def ultimo_dia(mes) -> date:
+    """Último dia do mês (para filtrar lançamentos por data no período)."""
+    return _somar_meses(mes, 1) - timedelta(days=1)
+
+
+def _coluna(totais) -> dict:
+    receitas = {chave: totais.get(categoria, ZERO) for chave, categoria, _ in LINHAS_RECEITAS}
+    despesas = {chave: totais.get(categoria, ZERO) for chave, categoria, _ in LINHAS_DESPESAS}
+    receitas['total'] = sum(receitas.values(), ZERO)
+    despesas['total'] = sum(despesas.values(), ZERO)
+    return {'receitas': receitas, 'despesas': despesas, 'resultado': receitas['total'] - despesas['total']}
+
+
+def calcular_dre(company_id, inicio, fim) -> dict:
+    """
+    DRE de `inicio` a `fim` (meses, inclusive), em Decimal:
+    {'receitas': {...}, 'despesas': {...}, 'resultado': ..., 'meses': [
+        {'mes': date, 'receitas': {...}, 'despesas': {...}, 'resultado': ...}, ...]}
+    com uma coluna para cada mês do intervalo, inclusive os sem lançamentos.
+    """
+    inicio, fim = inicio_do_mes(inicio), inicio_do_mes(fim)
+    por_mes = competencia_por_mes(company_id, inicio, fim)
+
+    meses = []
+    mes = inicio
+    while mes <= fim:
+        meses.append(mes)
+        mes = _somar_meses(mes, 1)
+
+    periodo = {}
+    for totais in por_mes.values():
+        for categoria, valor in totais.items():
+            periodo[categoria] = periodo.get(categoria, ZERO) + valor
+
+    return {
+        **_coluna(periodo),
+        'meses': [{'mes': mes, **_coluna(por_mes.get(mes, {}))} for mes in meses],
+    }
@@ -0,0 +1,204 @@
+"""
+Motor de importação de extratos bancários.
+
+Leitura: feita pelos parsers de `core.importers` (XLSX, CSV, OFX), que
+devolvem um gerador de linhas normalizadas (line_index, data, valor, descricao).
+O layout detectado fica salvo na conta (`salvar_mapeamento`).
+
+Gravação (set-based):
+  1. Carrega, numa única query, as chaves (data, valor, tipo, observacao) dos
+     pagamentos existentes da empresa no intervalo de datas do extrato.
+  2. Classifica cada linha como nova, duplicata exata ou duplicata potencial
+     usando apenas lookups em dicionários.
+  3. Grava os pagamentos novos com bulk_create e aplica um único ajuste
+     líquido no saldo da conta (e no saldo diário), tudo dentro de uma
+     transação.
+
+Internamente cada linha é uma tupla compacta
+(line_index, data_pagamento, valor, tipo, observacao), com valor sempre
+positivo e tipo 'E' ou 'S' derivado do sinal.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from ..helpers.texto import documento_busca
+from ..models import ContaBancaria, Payment
+from .resumo import somar_caixa
+from .saldos import registrar_movimentos
+from .versao import incrementar_versao
+
+
+def salvar_mapeamento(conta_bancaria, mapeamento):
+    """
+    Guarda o layout detectado no extrato (formato, linha do cabeçalho e
+    colunas) para que a próxima importação da conta leia em uma passada só.
+    """
+    if mapeamento is None or mapeamento == conta_bancaria.mapeamento_extrato:
+        return
+    ContaBancaria.objects.filter(pk=conta_bancaria.pk).update(mapeamento_extrato=mapeamento)
+    conta_bancaria.mapeamento_extrato = mapeamento
+
+
+# ──────────────────────────────────────────────
+# Classificação e gravação
+# ──────────────────────────────────────────────
+
+def preparar_linhas(linhas_lidas) -> list:
+    """
+    Converte (line_index, data, valor_com_sinal, descricao) nas tuplas internas
+    (line_index, data, valor, tipo, observacao). Valor positivo é Entrada.
+    """
+    preparadas = []
+    for idx, data_pagamento, valor_num, descricao in linhas_lidas:
+        if valor_num > 0:
+            preparadas.append((idx, data_pagamento, valor_num, 'E', descricao))
+        else:
+            preparadas.append((idx, data_pagamento, abs(valor_num), 'S', descricao))
+    return preparadas
+
+
+def carregar_pagamentos_existentes(company, linhas) -> dict:
+    """
+    Indexa os pagamentos existentes da empresa (em QUALQUER banco) que caem no
+    intervalo de datas das linhas.
+
+    Retorna um dict (data, valor, tipo) -> lista de (id, observacao, banco), na
+    mesma ordem do Meta.ordering de Payment (mais recentes primeiro), para que
+    o "primeiro" candidato a duplicata seja o mesmo que o `.first()` antigo.
+    """
+    if not linhas:
+        return {}
+
+    data_min = min(linha[1] for linha in linhas)
+    data_max = max(linha[1] for linha in linhas)
+    existentes = Payment.objects.filter(
+        company=company,
+        data_pagamento__gte=data_min,
+        data_pagamento__lte=data_max,
+    ).order_by('-data_pagamento', '-criado_em').values_list(
+        'id', 'data_pagamento', 'valor', 'tipo', 'observacao', 'conta_bancaria__nome'
+    )
+
+    indice = {}
+    for pid, data_pagamento, valor, tipo, observacao, banco in existentes.iterator(chunk_size=2000):
+        indice.setdefault((data_pagamento, valor, tipo), []).append((pid, observacao, banco))
+    return indice
+
+
+def classificar_linhas(company, conta_bancaria, linhas, confirmed=False, force_import_lines=()) -> dict:
+    """
+    Classifica as linhas do extrato contra os pagamentos já existentes.
+
+    - Duplicata exata (data + valor + tipo + observação): ignorada.
+    - Duplicata potencial (data + valor + tipo, observação diferente):
+        * primeira passagem (confirmed=False): vai para `potential_duplicates`;
+        * segunda passagem: importada só se a linha estiver em
+          `force_import_lines`, senão é ignorada.
+    - Demais linhas: vão para `novos`.
+
+    Retorna {'novos': [...], 'potential_duplicates': [...], 'skipped_count': int}.
+    """
+    indice = carregar_pagamentos_existentes(company, linhas)
+    forcadas = set(force_import_lines or ())
+
+    novos = []
+    potential_duplicates = []
+    skipped_count = 0
+
+    for linha in linhas:
+        idx, data_pagamento, valor, tipo, observacao = linha
+        candidatos = indice.get((data_pagamento, valor, tipo), ())
+
+        if any(c[1] == observacao for c in candidatos):
+            skipped_count += 1
+            continue
+
+        if candidatos:
+            if not confirmed:
+                existente_id, existente_obs, existente_banco = candidatos[0]
+                potential_duplicates.append({
+                    'line_index': idx,
+                    'new_payment': {
+                        'data': data_pagamento.strftime('%Y-%m-%d'),
+                        'valor': str(valor),
+                        'tipo': tipo,
+                        'observacao': observacao or '',
+                        'banco': conta_bancaria.nome
+                    },
+                    'existing_payment': {
+                        'id': existente_id,
+                        'data': data_pagamento.strftime('%Y-%m-%d'),
+                        'valor': str(valor),
+                        'tipo': tipo,
+                        'observacao': existente_obs or '',
+                        'banco': existente_banco
+                    }
+                })
+                continue
+
+            if idx not in forcadas:
+                skipped_count += 1
+                continue
+
+        novos.append(linha)
+
+    return {
+        'novos': novos,
+        'potential_duplicates': potential_duplicates,
+        'skipped_count': skipped_count,
+    }
+
+
+def gravar_pagamentos(company, conta_bancaria, novos, batch_size=1000) -> dict:
+    """
+    Cria os pagamentos novos com bulk_create e aplica um único UPDATE líquido
+    no saldo da conta e os movimentos por dia no saldo diário, atomicamente.
+
+    Retorna {'created_count', 'total_entradas', 'total_saidas'}.
+    """
+    total_entradas = sum((linha[2] for linha in novos if linha[3] == 'E'), Decimal('0.00'))
+    total_saidas = sum((linha[2] for linha in novos if linha[3] == 'S'), Decimal('0.00'))
+
+    if not novos:
+        return {'created_count': 0, 'total_entradas': total_entradas, 'total_saidas': total_saidas}
+
+    with transaction.atomic():
+        Payment.objects.bulk_create(
+            (
+                Payment(
+                    company=company,
+                    conta_bancaria=conta_bancaria,
+                    tipo=tipo,
+                    valor=valor,
+                    data_pagamento=data_pagamento,
+                    observacao=observacao,
+                    busca=documento_busca([observacao]),  # bulk_create não passa pelo save()
+                )
+                for _, data_pagamento, valor, tipo, observacao in novos
+            ),
+            batch_size=batch_size,
+        )
+
+        ContaBancaria.objects.select_for_update().filter(pk=conta_bancaria.pk).update(
+            saldo_atual=F('saldo_atual') + (total_entradas - total_saidas)
+        )
+
+        movimentos = {}
+        for _, data_pagamento, valor, tipo, _ in novos:
+            entradas, saidas = movimentos.get(data_pagamento, (Decimal('0.00'), Decimal('0.00')))
+            movimentos[data_pagamento] = (entradas + valor, saidas) if tipo == 'E' else (entradas, saidas + valor)
+        registrar_movimentos(company.pk, conta_bancaria.pk, movimentos)
+        somar_caixa(
+            (company.pk, data_pagamento, conta_bancaria.pk, tipo, 'NA', valor)
+            for _, data_pagamento, valor, tipo, _ in novos
+        )
+        incrementar_versao(company.pk)  # bulk_create não dispara os sinais
+
+    return {
+        'created_count': len(novos),
+        'total_entradas': total_entradas,
+        'total_saidas': total_saidas,
+    }
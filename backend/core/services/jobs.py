@@ -0,0 +1,295 @@
+"""
+Fila de jobs em banco de dados (sem broker externo).
+
+Fluxo:
+  1. Um endpoint marcado com `@aceita_async` recebe `?async=1` e, em vez de
+     executar, grava um Job com o request (método, path, query, corpo e
+     arquivo enviado) via `enfileirar_request`, respondendo 202 com o id.
+  2. O comando `run_worker` reserva o próximo job pendente com
+     SELECT ... FOR UPDATE SKIP LOCKED (`reservar_proximo_job`) e o executa
+     (`executar_job`): o request é reconstruído e despachado para a MESMA view,
+     autenticado como o usuário que o criou. Assim cada endpoint tem um único
+     código para os modos síncrono e assíncrono.
+  3. A resposta da view vira o resultado do job: JSON em `resultado` ou o
+     binário (PDF) em `resultado_arquivo`, consultados por GET /api/jobs/<id>/.
+
+Durante a execução o worker renova `atualizado_em` (a cada
+JOBS_HEARTBEAT_SEGUNDOS e a cada progresso informado); só jobs sem esse sinal
+há mais de --timeout-travado voltam para a fila. Todas as gravações do worker
+são condicionadas a o job ainda ser dele, então um job devolvido à fila não
+tem o resultado sobrescrito pela execução anterior.
+"""
+
+import json
+import logging
+import os
+import re
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test.client import RequestFactory
+from django.urls import resolve
+from django.utils import timezone
+
+from ..models import Job
+
+logger = logging.getLogger(__name__)
+
+PARAMETRO_ASYNC = 'async'
+MAX_TENTATIVAS = 3
+RETENCAO_DIAS = 7
+
+FILENAME_RE = re.compile(r'filename="?([^";]+)"?')
+
+
+def pedido_assincrono(request) -> bool:
+    """True quando o cliente pediu execução em background (?async=1)."""
+    return request.query_params.get(PARAMETRO_ASYNC) in ('1', 'true', 'True')
+
+
+class ArquivoGrandeDemais(ValueError):
+    """O arquivo enviado passa de settings.JOBS_MAX_ARQUIVO_MB."""
+
+
+def nome_worker() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# ──────────────────────────────────────────────
+# Enfileiramento
+# ──────────────────────────────────────────────
+
+def enfileirar_request(request, tipo: str) -> Job:
+    """
+    Grava o request atual (sem o ?async) como um Job pendente. O arquivo
+    enviado vai para o banco junto com o job (o worker pode rodar em outra
+    máquina, sem disco compartilhado); acima de JOBS_MAX_ARQUIVO_MB levanta
+    ArquivoGrandeDemais sem ler o upload.
+    """
+    query = request.query_params.copy()
+    query.pop(PARAMETRO_ASYNC, None)
+
+    arquivo = None
+    arquivo_nome = ''
+    arquivo_campo = None
+    if request.FILES:
+        arquivo_campo, upload = next(iter(request.FILES.items()))
+        limite = settings.JOBS_MAX_ARQUIVO_MB * 1024 * 1024
+        if upload.size > limite:
+            raise ArquivoGrandeDemais(
+                f'Arquivo maior que {settings.JOBS_MAX_ARQUIVO_MB} MB não pode ser processado em background.'
+            )
+        arquivo = upload.read()
+        arquivo_nome = upload.name
+
+    if hasattr(request.data, 'getlist'):
+        # multipart/form: preserva valores repetidos, sem os arquivos
+        formato_corpo = 'multipart'
+        dados = {k: request.data.getlist(k) for k in request.data.keys() if k not in request.FILES}
+    elif request.data:
+        formato_corpo = 'json'
+        dados = request.data
+    else:
+        formato_corpo = None
+        dados = None
+
+    return Job.objects.create(
+        company=request.user.company,
+        usuario=request.user,
+        tipo=tipo,
+        parametros={
+            'method': request.method,
+            'path': request.path,
+            'query': query.urlencode(),
+            'formato_corpo': formato_corpo,
+            'dados': dados,
+            'arquivo_campo': arquivo_campo,
+        },
+        arquivo=arquivo,
+        arquivo_nome=arquivo_nome,
+    )
+
+
+def _do_worker(job: Job):
+    """Linhas do job enquanto ele ainda está em execução por este worker."""
+    return Job.objects.filter(pk=job.pk, worker=job.worker, status='executando')
+
+
+def informar_progresso(request, progresso: int):
+    """Atualiza o progresso (0-100) quando a view está rodando dentro de um job."""
+    job = getattr(request, 'job', None)
+    if job is None:
+        return
+    _do_worker(job).update(progresso=max(0, min(100, int(progresso))), atualizado_em=timezone.now())
+
+
+# ──────────────────────────────────────────────
+# Worker
+# ──────────────────────────────────────────────
+
+def reservar_proximo_job(worker: str):
+    """
+    Reserva o job pendente mais antigo. Em PostgreSQL, SKIP LOCKED deixa vários
+    workers disputarem a fila sem bloquear uns aos outros; o UPDATE condicionado
+    ao status garante a exclusividade também em bancos sem FOR UPDATE (SQLite).
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='pendente')
+            .order_by('criado_em', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        agora = timezone.now()
+        reservado = Job.objects.filter(pk=job.pk, status='pendente').update(
+            status='executando',
+            worker=worker,
+            iniciado_em=agora,
+            atualizado_em=agora,
+            tentativas=F('tentativas') + 1,
+            progresso=0,
+        )
+    if not reservado:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def _montar_request(job: Job):
+    params = job.parametros
+    path = params['path']
+    if params.get('query'):
+        path = f"{path}?{params['query']}"
+
+    factory = RequestFactory()
+    method = params['method'].lower()
+    formato_corpo = params.get('formato_corpo')
+
+    if formato_corpo == 'multipart':
+        dados = dict(params.get('dados') or {})
+        if job.arquivo is not None and params.get('arquivo_campo'):
+            dados[params['arquivo_campo']] = SimpleUploadedFile(job.arquivo_nome, bytes(job.arquivo))
+        http_request = getattr(factory, method)(path, dados)
+    elif formato_corpo == 'json':
+        http_request = factory.generic(
+            params['method'], path, json.dumps(params.get('dados')), content_type='application/json'
+        )
+    else:
+        http_request = factory.generic(params['method'], path)
+
+    # Autentica como o usuário que criou o job (mesmas permissões do request original)
+    http_request._force_auth_user = job.usuario
+    http_request.job = job
+    return http_request
+
+
+def _salvar_resposta(job: Job, response):
+    if hasattr(response, 'render'):
+        response.render()
+
+    content_type = response.get('Content-Type', '')
+    job.resultado_status_code = response.status_code
+    job.resultado_content_type = content_type
+
+    if 'json' in content_type:
+        job.resultado = json.loads(response.content or b'null')
+    else:
+        job.resultado_arquivo = bytes(response.content)
+        match = FILENAME_RE.search(response.get('Content-Disposition', ''))
+        job.resultado_nome = match.group(1) if match else f'{job.tipo}-{job.pk}'
+
+    if response.status_code >= 400:
+        job.status = 'erro'
+        if isinstance(job.resultado, dict):
+            job.erro = str(job.resultado.get('error') or job.resultado.get('erro') or job.resultado)
+        else:
+            job.erro = f'HTTP {response.status_code}'
+    else:
+        job.status = 'concluido'
+        job.progresso = 100
+
+
+def _manter_vivo(job: Job, parar: threading.Event):
+    """Renova `atualizado_em` a cada JOBS_HEARTBEAT_SEGUNDOS até `parar` (thread própria)."""
+    try:
+        while not parar.wait(settings.JOBS_HEARTBEAT_SEGUNDOS):
+            if not _do_worker(job).update(atualizado_em=timezone.now()):
+                return
+    except Exception:
+        logger.exception('Erro ao renovar o sinal de vida do job %s', job.pk)
+    finally:
+        # A thread tem a sua própria conexão
+        connection.close()
+
+
+def executar_job(job: Job) -> Job:
+    """
+    Despacha o request do job para a view original e grava a resposta, se o
+    job ainda for deste worker (não foi dado como travado e devolvido à fila).
+    """
+    parar = threading.Event()
+    sinal_de_vida = threading.Thread(target=_manter_vivo, args=(job, parar), daemon=True)
+    sinal_de_vida.start()
+    try:
+        if job.usuario is None:
+            raise RuntimeError('Usuário que criou o job não existe mais.')
+        http_request = _montar_request(job)
+        match = resolve(job.parametros['path'])
+        response = match.func(http_request, *match.args, **match.kwargs)
+        _salvar_resposta(job, response)
+    except Exception as e:
+        logger.exception('Erro ao executar job %s', job.pk)
+        job.status = 'erro'
+        job.erro = str(e)
+    finally:
+        parar.set()
+        sinal_de_vida.join()
+
+    job.finalizado_em = timezone.now()
+    # Não sobrescreve o progresso informado pela view durante a execução
+    campos = [
+        'status', 'resultado', 'resultado_status_code', 'resultado_arquivo',
+        'resultado_content_type', 'resultado_nome', 'erro', 'finalizado_em',
+    ]
+    if job.status == 'concluido':
+        campos.append('progresso')
+    if not _do_worker(job).update(**{campo: getattr(job, campo) for campo in campos}):
+        logger.warning('Job %s deixou de ser do worker %s; resultado descartado', job.pk, job.worker)
+        job.refresh_from_db()
+    return job
+
+
+def reenfileirar_travados(minutos: int = 30) -> int:
+    """
+    Devolve para a fila jobs em execução sem sinal de vida há mais de
+    `minutos` (worker morreu no meio). Depois de MAX_TENTATIVAS o job é
+    marcado como erro.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    travados = Job.objects.filter(
+        Q(atualizado_em__lt=limite) | Q(atualizado_em__isnull=True, iniciado_em__lt=limite),
+        status='executando',
+    )
+    falhos = travados.filter(tentativas__gte=MAX_TENTATIVAS).update(
+        status='erro',
+        erro='Job interrompido repetidamente (tempo limite excedido).',
+        finalizado_em=timezone.now(),
+    )
+    reenfileirados = travados.filter(tentativas__lt=MAX_TENTATIVAS).update(status='pendente', worker='')
+    return falhos + reenfileirados
+
+
+def limpar_jobs_antigos(dias: int = RETENCAO_DIAS) -> int:
+    """Apaga jobs finalizados há mais de `dias` (resultados e arquivos ocupam espaço no banco)."""
+    limite = timezone.now() - timedelta(days=dias)
+    apagados, _ = Job.objects.filter(
+        status__in=['concluido', 'erro'], finalizado_em__lt=limite
+    ).delete()
+    return apagados
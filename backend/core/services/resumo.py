@@ -0,0 +1,654 @@
+"""
+Resumo mensal de caixa e competência (tabela ResumoMensal).
+
+A unidade de atualização é o mês da empresa, em duas partes independentes:
+- caixa: pagamentos do mês (exceto os com alocação em transferência) por
+  conta bancária e categoria da alocação; a parte do pagamento sem alocação
+  entra como 'NA';
+- competência: valor das receitas e despesas com vencimento no mês, por tipo.
+
+As gravações comuns somam deltas nas linhas afetadas (mês, conta bancária,
+categoria), com UPDATE ... SET campo = campo + delta, criando a linha que
+falta:
+- sinais de Payment, Receita e Despesa: inclusão, exclusão e mudança de
+  valor no mesmo mês/conta/tipo;
+- `aplicar_totais` (toda alocação gravada ou apagada, inclusive em lote),
+  via `somar_alocacoes`: a parte alocada sai de 'NA' e entra na categoria;
+- os caminhos com bulk_create de pagamentos (importação de extrato).
+
+O que muda uma linha de lugar marca o mês para recálculo, que refaz as
+linhas daquela parte com DELETE + INSERT a partir de consultas agrupadas:
+mudança de data, conta bancária ou tipo (o mês antigo e o novo; mudar o
+tipo de uma receita/despesa marca também o caixa dos pagamentos alocados a
+ela), alocação em transferência (tira ou devolve o pagamento inteiro do
+caixa) e `_recalcular_contas` (status em lote) quando o valor da conta sobe
+até o total alocado.
+
+Concorrência: o recálculo trava a empresa com FOR UPDATE; as somas, só com
+FOR KEY SHARE (PostgreSQL). Gravações com deltas não esperam umas pelas
+outras, só por um recálculo em andamento da mesma empresa.
+
+Unidade de trabalho: dentro de `resumo_em_lote()` marcações e deltas só
+acumulam e são aplicados uma vez, na saída do bloco mais externo
+(`status_em_lote` abre uma); os deltas de um mês recalculado são
+descartados, porque o recálculo já os inclui. Fora de um bloco, aplica na
+hora.
+
+`reconstruir_resumo` refaz a empresa inteira (comando rebuild_resumo_mensal).
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+
+from ..models import Allocation, Company, Despesa, Payment, Receita, ResumoMensal
+from .versao import incrementar_versao
+
+ZERO = Decimal('0.00')
+DINHEIRO = DecimalField(max_digits=14, decimal_places=2)
+PARTES = ('caixa', 'competencia')
+# Campos somados pelos deltas, na ordem das tuplas (entradas, saidas, competencia)
+CAMPOS_VALOR = ('entradas', 'saidas', 'competencia')
+ROTULOS = dict(ResumoMensal.CATEGORIA_CHOICES)
+# Custódia muda de nome conforme o lado do caixa
+ROTULO_CUSTODIA = {'E': 'Valores Reembolsados', 'S': 'Valores Reembolsáveis'}
+# Ordem dos tipos no balanço (os não listados vão ao final)
+ORDEM_ENTRADAS = ['Receita Fixa', 'Receita Variável', 'Valores Reembolsados', 'Estorno', 'Não Alocado']
+ORDEM_SAIDAS = [
+    'Despesa Fixa', 'Despesa Variável', 'Valores Reembolsáveis', 'Comissionamento', 'Reembolso', 'Não Alocado',
+]
+
+
+def inicio_do_mes(dia) -> date:
+    """Primeiro dia do mês de uma data (aceita a string de um objeto ainda não relido)."""
+    if isinstance(dia, str):
+        dia = parse_date(dia[:10])
+    return date(dia.year, dia.month, 1)
+
+
+def _proximo_mes(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _nos_meses(campo, meses) -> Q:
+    """Q: `campo` dentro de algum dos meses (None: sem filtro)."""
+    if meses is None:
+        return Q()
+    condicao = Q(pk__in=[])
+    for mes in meses:
+        condicao |= Q(**{f'{campo}__gte': mes, f'{campo}__lt': _proximo_mes(mes)})
+    return condicao
+
+
+def _categoria_alocacao(receita_tipo, despesa_tipo):
+    if receita_tipo:
+        return f'R{receita_tipo}'
+    if despesa_tipo:
+        return f'D{despesa_tipo}'
+    # Transferências ficam de fora: o que sobra é custódia
+    return 'CU'
+
+
+def _linhas_caixa(company_id, meses=None) -> list:
+    pagamentos = Payment.objects.filter(
+        _nos_meses('data_pagamento', meses), company_id=company_id,
+    ).exclude(allocations__transfer__isnull=False)
+
+    totais = defaultdict(lambda: [ZERO, ZERO])  # (mês, conta, categoria) -> [entradas, saídas]
+
+    def somar(mes, conta_id, tipo, categoria, valor):
+        totais[(inicio_do_mes(mes), conta_id, categoria)][0 if tipo == 'E' else 1] += valor
+
+    nao_alocados = (
+        pagamentos.filter(total_alocado__lt=F('valor'))
+        .annotate(mes=TruncMonth('data_pagamento'))
+        .values('mes', 'conta_bancaria', 'tipo')
+        .annotate(total=Sum(F('valor') - F('total_alocado')))
+        .order_by()
+    )
+    for linha in nao_alocados:
+        somar(linha['mes'], linha['conta_bancaria'], linha['tipo'], 'NA', linha['total'])
+
+    alocados = (
+        Allocation.objects.filter(payment__in=pagamentos)
+        .annotate(mes=TruncMonth('payment__data_pagamento'))
+        .values('mes', 'payment__conta_bancaria', 'payment__tipo', 'receita__tipo', 'despesa__tipo')
+        .annotate(total=Sum('valor'))
+        .order_by()
+    )
+    for linha in alocados:
+        categoria = _categoria_alocacao(linha['receita__tipo'], linha['despesa__tipo'])
+        somar(linha['mes'], linha['payment__conta_bancaria'], linha['payment__tipo'], categoria, linha['total'])
+
+    return [
+        ResumoMensal(
+            company_id=company_id, mes=mes, conta_bancaria_id=conta_id,
+            categoria=categoria, entradas=entradas, saidas=saidas,
+        )
+        for (mes, conta_id, categoria), (entradas, saidas) in totais.items()
+        if entradas or saidas
+    ]
+
+
+def _linhas_competencia(company_id, meses=None) -> list:
+    linhas = []
+    for model, prefixo in ((Receita, 'R'), (Despesa, 'D')):
+        totais = (
+            model.objects.filter(_nos_meses('data_vencimento', meses), company_id=company_id)
+            .annotate(mes=TruncMonth('data_vencimento'))
+            .values('mes', 'tipo')
+            .annotate(total=Sum('valor'))
+            .order_by()
+        )
+        linhas += [
+            ResumoMensal(
+                company_id=company_id, mes=inicio_do_mes(linha['mes']),
+                categoria=f"{prefixo}{linha['tipo']}", competencia=linha['total'],
+            )
+            for linha in totais
+            if linha['total']
+        ]
+    return linhas
+
+
+def _travar_empresa(company_id, compartilhada=False):
+    # DELETE + INSERT do mesmo mês em duas transações violaria a unicidade, e
+    # uma soma no meio do recálculo se perderia: o recálculo trava a empresa
+    # com exclusividade. As somas pegam FOR KEY SHARE, que não conflita entre
+    # si, só com o FOR UPDATE (no SQLite a escrita já é serializada).
+    if not compartilhada:
+        list(Company.objects.select_for_update().filter(pk=company_id).values_list('pk', flat=True))
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {Company._meta.db_table} WHERE id = %s FOR KEY SHARE', [company_id])
+
+
+def _recalcular_empresa(company_id, caixa=None, competencia=None):
+    """
+    Refaz as linhas de caixa dos meses `caixa` e as de competência dos meses
+    `competencia` (None: todos os meses; conjunto vazio: nenhum).
+    """
+    apagar = Q(pk__in=[])
+    linhas = []
+    if caixa is None or caixa:
+        apagar |= _nos_meses('mes', caixa) & Q(conta_bancaria__isnull=False)
+        linhas += _linhas_caixa(company_id, caixa)
+    if competencia is None or competencia:
+        apagar |= _nos_meses('mes', competencia) & Q(conta_bancaria__isnull=True)
+        linhas += _linhas_competencia(company_id, competencia)
+
+    ResumoMensal.objects.filter(apagar, company_id=company_id).delete()
+    ResumoMensal.objects.bulk_create(linhas, batch_size=1000)
+    return len(linhas)
+
+
+def _parte(conta_id):
+    return 'competencia' if conta_id is None else 'caixa'
+
+
+def _chave_q(chave) -> Q:
+    company_id, mes, conta_id, categoria = chave
+    return Q(company_id=company_id, mes=mes, conta_bancaria_id=conta_id, categoria=categoria)
+
+
+def _somar_na_linha(chave, valores):
+    """Soma os valores na linha da chave, criando-a se não existe (uma linha, com retentativa)."""
+    somas = {campo: F(campo) + valor for campo, valor in zip(CAMPOS_VALOR, valores) if valor}
+    if ResumoMensal.objects.filter(_chave_q(chave)).update(**somas):
+        return
+    # Linha ausente com delta negativo: a origem saiu junto com a linha
+    # (exclusão em cascata da empresa); não há o que estornar
+    if min(valores) < 0:
+        return
+    company_id, mes, conta_id, categoria = chave
+    try:
+        with transaction.atomic():
+            ResumoMensal.objects.create(
+                company_id=company_id, mes=mes, conta_bancaria_id=conta_id, categoria=categoria,
+                **dict(zip(CAMPOS_VALOR, valores)),
+            )
+    except IntegrityError:
+        # Outra gravação criou a mesma linha entre o UPDATE e o INSERT
+        ResumoMensal.objects.filter(_chave_q(chave)).update(**somas)
+
+
+def _aplicar_deltas(deltas):
+    """
+    Soma {(company_id, mês, conta_id, categoria): (entradas, saidas,
+    competencia)} nas linhas: as existentes num UPDATE com CASE por linha, as
+    que faltam num INSERT. Linhas que zeram saem da tabela.
+    """
+    deltas = {chave: valores for chave, valores in deltas.items() if any(valores)}
+    if not deltas:
+        return
+    for company_id in sorted({chave[0] for chave in deltas}):
+        _travar_empresa(company_id, compartilhada=True)
+
+    procura = Q(pk__in=[])
+    for chave in deltas:
+        procura |= _chave_q(chave)
+    existentes = {
+        (company_id, mes, conta_id, categoria): pk
+        for pk, company_id, mes, conta_id, categoria in ResumoMensal.objects.filter(procura).values_list(
+            'pk', 'company_id', 'mes', 'conta_bancaria_id', 'categoria'
+        )
+    }
+
+    if existentes:
+        somas = {
+            campo: F(campo) + Case(
+                *[When(pk=pk, then=Value(deltas[chave][i])) for chave, pk in existentes.items()],
+                default=Value(ZERO),
+                output_field=DINHEIRO,
+            )
+            for i, campo in enumerate(CAMPOS_VALOR)
+            if any(deltas[chave][i] for chave in existentes)
+        }
+        if ResumoMensal.objects.filter(pk__in=existentes.values()).update(**somas) < len(existentes):
+            # Outra gravação apagou uma linha zerada entre a leitura e o UPDATE:
+            # as que sumiram não receberam a soma e voltam a ser criadas
+            restantes = set(ResumoMensal.objects.filter(pk__in=existentes.values()).values_list('pk', flat=True))
+            existentes = {chave: pk for chave, pk in existentes.items() if pk in restantes}
+
+    faltantes = [chave for chave in deltas if chave not in existentes and min(deltas[chave]) >= 0]
+    if faltantes:
+        try:
+            with transaction.atomic():
+                ResumoMensal.objects.bulk_create([
+                    ResumoMensal(
+                        company_id=company_id, mes=mes, conta_bancaria_id=conta_id, categoria=categoria,
+                        **dict(zip(CAMPOS_VALOR, deltas[(company_id, mes, conta_id, categoria)])),
+                    )
+                    for company_id, mes, conta_id, categoria in faltantes
+                ])
+        except IntegrityError:
+            for chave in faltantes:
+                _somar_na_linha(chave, deltas[chave])
+
+    if any(min(deltas[chave]) < 0 for chave in existentes):
+        ResumoMensal.objects.filter(pk__in=existentes.values(), entradas=0, saidas=0, competencia=0).delete()
+
+
+def recalcular_resumo(caixa=(), competencia=(), payment_ids=(), deltas=None):
+    """
+    Recalcula os meses marcados e soma os deltas: `caixa` e `competencia` são
+    pares (company_id, mês); `payment_ids`, pagamentos cujo mês de caixa
+    mudou; `deltas`, {(company_id, mês, conta_id, categoria): (entradas,
+    saidas, competencia)}. Deltas de uma parte de mês recalculada são
+    descartados (o recálculo lê o estado já gravado).
+    """
+    meses = defaultdict(lambda: {parte: set() for parte in PARTES})
+    for company_id, mes in caixa:
+        meses[company_id]['caixa'].add(mes)
+    for company_id, mes in competencia:
+        meses[company_id]['competencia'].add(mes)
+
+    with transaction.atomic():
+        if payment_ids:
+            resolvidos = (
+                Payment.objects.filter(pk__in=payment_ids)
+                .annotate(mes=TruncMonth('data_pagamento'))
+                .values_list('company_id', 'mes')
+                .order_by()
+                .distinct()
+            )
+            for company_id, mes in resolvidos:
+                meses[company_id]['caixa'].add(inicio_do_mes(mes))
+
+        for company_id in sorted(meses):
+            _travar_empresa(company_id)
+            _recalcular_empresa(company_id, **meses[company_id])
+
+        _aplicar_deltas({
+            chave: valores
+            for chave, valores in (deltas or {}).items()
+            if chave[0] not in meses or chave[1] not in meses[chave[0]][_parte(chave[2])]
+        })
+
+
+def reconstruir_resumo(company) -> int:
+    """Refaz todas as linhas da empresa e sobe a versão dos dados. Retorna a quantidade gravada."""
+    with transaction.atomic():
+        _travar_empresa(company.pk)
+        linhas = _recalcular_empresa(company.pk)
+        incrementar_versao(company.pk)
+    return linhas
+
+
+# Marcações da unidade de trabalho aberta, ou None fora de uma
+_pendentes = ContextVar('resumo_pendentes', default=None)
+
+
+@contextmanager
+def resumo_em_lote():
+    """
+    Junta as marcações do bloco e recalcula cada mês uma vez ao final.
+    Blocos aninhados entram no de fora. Se o bloco levantar exceção dentro
+    de uma transação (que vai ser desfeita), nada é recalculado; fora de
+    transação as gravações já feitas valem e o recálculo roda assim mesmo.
+    """
+    if _pendentes.get() is not None:
+        yield
+        return
+
+    pendentes = {'caixa': set(), 'competencia': set(), 'payment_ids': set(), 'deltas': {}}
+    token = _pendentes.set(pendentes)
+    try:
+        yield
+    except BaseException:
+        _pendentes.reset(token)
+        token = None
+        if not transaction.get_connection().in_atomic_block and any(pendentes.values()):
+            recalcular_resumo(**pendentes)
+        raise
+    else:
+        _pendentes.reset(token)
+        token = None
+        if any(pendentes.values()):
+            recalcular_resumo(**pendentes)
+    finally:
+        if token is not None:
+            _pendentes.reset(token)
+
+
+def _acumular(destino, chave, valores):
+    atual = destino.get(chave, (ZERO, ZERO, ZERO))
+    destino[chave] = tuple(a + b for a, b in zip(atual, valores))
+
+
+def _marcar(caixa=(), competencia=(), payment_ids=(), deltas=None):
+    marcados = {'caixa': set(caixa), 'competencia': set(competencia), 'payment_ids': set(payment_ids)}
+    pendentes = _pendentes.get()
+    if pendentes is None:
+        if any(marcados.values()) or deltas:
+            recalcular_resumo(**marcados, deltas=deltas)
+        return
+    for nome, itens in marcados.items():
+        pendentes[nome].update(itens)
+    for chave, valores in (deltas or {}).items():
+        _acumular(pendentes['deltas'], chave, valores)
+
+
+def marcar_caixa(pares):
+    """Marca o caixa dos meses de (company_id, data) para recálculo."""
+    _marcar(caixa={(company_id, inicio_do_mes(data)) for company_id, data in pares})
+
+
+def marcar_competencia(pares):
+    """Marca a competência dos meses de (company_id, data de vencimento)."""
+    _marcar(competencia={(company_id, inicio_do_mes(data)) for company_id, data in pares})
+
+
+def marcar_pagamentos(payment_ids):
+    """Marca o caixa do mês de cada pagamento (resolvido no recálculo)."""
+    _marcar(payment_ids=payment_ids)
+
+
+def somar_caixa(itens):
+    """
+    Soma no caixa (company_id, data do pagamento, conta_id, tipo do
+    pagamento, categoria, valor); valor negativo estorna.
+    """
+    deltas = {}
+    for company_id, data, conta_id, tipo_payment, categoria, valor in itens:
+        valores = (valor, ZERO, ZERO) if tipo_payment == 'E' else (ZERO, valor, ZERO)
+        _acumular(deltas, (company_id, inicio_do_mes(data), conta_id, categoria), valores)
+    _marcar(deltas=deltas)
+
+
+def somar_competencia(itens):
+    """Soma na competência (company_id, data de vencimento, categoria, valor); valor negativo estorna."""
+    deltas = {}
+    for company_id, data, categoria, valor in itens:
+        _acumular(deltas, (company_id, inicio_do_mes(data), None, categoria), (ZERO, ZERO, valor))
+    _marcar(deltas=deltas)
+
+
+def _em_transferencia():
+    return Exists(Allocation.objects.filter(payment=OuterRef('pk'), transfer__isnull=False))
+
+
+def somar_alocacoes(movimentos, sinal: int = 1):
+    """
+    Caixa das alocações gravadas (sinal=1) ou apagadas (sinal=-1), no formato
+    de `aplicar_totais`: o valor sai de 'NA' e entra na categoria da conta, no
+    mês e na conta bancária do pagamento. Alocação em transferência marca o
+    mês do pagamento para recálculo; pagamentos com transferência não estão
+    no caixa e os que já foram apagados (a exclusão estorna a contribuição
+    inteira, ver `_payment_apagado`) são ignorados.
+    """
+    movimentos = list(movimentos)
+    transferencias = {payment_id for payment_id, _, campo, _, _ in movimentos if campo is None}
+    if transferencias:
+        marcar_pagamentos(transferencias)
+    movimentos = [m for m in movimentos if m[2] is not None and m[0] not in transferencias]
+    if not movimentos:
+        return
+
+    pagamentos = {
+        pk: (company_id, data, conta_id)
+        for pk, company_id, data, conta_id in Payment.objects.filter(
+            pk__in={payment_id for payment_id, *_ in movimentos}
+        ).alias(em_transferencia=_em_transferencia()).filter(em_transferencia=False).values_list(
+            'pk', 'company_id', 'data_pagamento', 'conta_bancaria_id'
+        )
+    }
+    tipos = {}
+    for campo, model, prefixo in (('receita', Receita, 'R'), ('despesa', Despesa, 'D')):
+        ids = {entidade_id for _, _, c, entidade_id, _ in movimentos if c == campo}
+        if ids:
+            tipos[campo] = {pk: f'{prefixo}{tipo}' for pk, tipo in model.objects.filter(pk__in=ids).values_list('pk', 'tipo')}
+
+    itens = []
+    for payment_id, tipo_payment, campo, entidade_id, valor in movimentos:
+        if payment_id not in pagamentos:
+            continue
+        company_id, data, conta_id = pagamentos[payment_id]
+        categoria = 'CU' if campo == 'custodia' else tipos[campo][entidade_id]
+        itens.append((company_id, data, conta_id, tipo_payment, 'NA', -valor * sinal))
+        itens.append((company_id, data, conta_id, tipo_payment, categoria, valor * sinal))
+    somar_caixa(itens)
+
+
+# ──────────────────────────────────────────────
+# Sinais
+# ──────────────────────────────────────────────
+
+CAMPOS_ANTERIORES = {
+    Payment: ('company_id', 'data_pagamento', 'conta_bancaria_id', 'tipo', 'valor'),
+    Receita: ('company_id', 'data_vencimento', 'tipo', 'valor'),
+    Despesa: ('company_id', 'data_vencimento', 'tipo', 'valor'),
+}
+
+
+def _decimal(model, campo, valor):
+    # Model.objects.create(valor='10.00') mantém a string no objeto
+    return model._meta.get_field(campo).to_python(valor)
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Receita)
+@receiver(pre_save, sender=Despesa)
+def _guardar_anterior(sender, instance, **kwargs):
+    """Numa alteração, guarda o mês/tipo/valor gravado (o mês antigo também muda)."""
+    instance._resumo_anterior = None
+    if not instance._state.adding and instance.pk is not None:
+        linhas = sender.objects.filter(pk=instance.pk)
+        campos = CAMPOS_ANTERIORES[sender]
+        if sender is Payment:
+            linhas = linhas.annotate(em_transferencia=_em_transferencia())
+            campos += ('em_transferencia',)
+        instance._resumo_anterior = linhas.values(*campos).first()
+
+
+@receiver(post_save, sender=Payment)
+def _payment_gravado(sender, instance, **kwargs):
+    valor = _decimal(Payment, 'valor', instance.valor)
+    anterior = getattr(instance, '_resumo_anterior', None)
+    if anterior is None:
+        # Pagamento novo ainda não tem alocações: entra inteiro como 'NA'
+        somar_caixa([(
+            instance.company_id, instance.data_pagamento, instance.conta_bancaria_id, instance.tipo, 'NA', valor,
+        )])
+        return
+
+    lugar = (instance.company_id, inicio_do_mes(instance.data_pagamento), instance.conta_bancaria_id, instance.tipo)
+    lugar_anterior = (
+        anterior['company_id'], inicio_do_mes(anterior['data_pagamento']),
+        anterior['conta_bancaria_id'], anterior['tipo'],
+    )
+    if lugar != lugar_anterior:
+        marcar_caixa({
+            (instance.company_id, instance.data_pagamento),
+            (anterior['company_id'], anterior['data_pagamento']),
+        })
+    elif valor != anterior['valor'] and not anterior['em_transferencia']:
+        # Só o valor mudou: a diferença é da parte não alocada
+        somar_caixa([(
+            instance.company_id, instance.data_pagamento, instance.conta_bancaria_id, instance.tipo,
+            'NA', valor - anterior['valor'],
+        )])
+
+
+@receiver(pre_delete, sender=Payment)
+def _guardar_contribuicao(sender, instance, **kwargs):
+    """Antes da exclusão (as alocações ainda existem): o que o pagamento soma no caixa."""
+    alocacoes = list(
+        Allocation.objects.filter(payment_id=instance.pk).values_list(
+            'receita__tipo', 'despesa__tipo', 'transfer_id', 'valor'
+        )
+    )
+    instance._resumo_contribuicao = None
+    if any(transfer_id for _, _, transfer_id, _ in alocacoes):
+        return  # Pagamento com transferência não está no caixa
+    contribuicao = defaultdict(Decimal)
+    contribuicao['NA'] = _decimal(Payment, 'valor', instance.valor)
+    for receita_tipo, despesa_tipo, _, valor in alocacoes:
+        contribuicao['NA'] -= valor
+        contribuicao[_categoria_alocacao(receita_tipo, despesa_tipo)] += valor
+    instance._resumo_contribuicao = contribuicao
+
+
+@receiver(post_delete, sender=Payment)
+def _payment_apagado(sender, instance, **kwargs):
+    contribuicao = getattr(instance, '_resumo_contribuicao', None)
+    if contribuicao:
+        somar_caixa(
+            (instance.company_id, instance.data_pagamento, instance.conta_bancaria_id, instance.tipo, categoria, -valor)
+            for categoria, valor in contribuicao.items()
+        )
+
+
+def _categoria_conta(sender, tipo):
+    return f"{'R' if sender is Receita else 'D'}{tipo}"
+
+
+@receiver(post_save, sender=Receita)
+@receiver(post_save, sender=Despesa)
+def _conta_gravada(sender, instance, **kwargs):
+    valor = _decimal(sender, 'valor', instance.valor)
+    anterior = getattr(instance, '_resumo_anterior', None)
+    if anterior is None:
+        somar_competencia([
+            (instance.company_id, instance.data_vencimento, _categoria_conta(sender, instance.tipo), valor),
+        ])
+        return
+
+    mesmo_lugar = (
+        (instance.company_id, inicio_do_mes(instance.data_vencimento), instance.tipo)
+        == (anterior['company_id'], inicio_do_mes(anterior['data_vencimento']), anterior['tipo'])
+    )
+    if mesmo_lugar:
+        if valor != anterior['valor']:
+            somar_competencia([(
+                instance.company_id, instance.data_vencimento, _categoria_conta(sender, instance.tipo),
+                valor - anterior['valor'],
+            )])
+        return
+
+    with resumo_em_lote():
+        if anterior['tipo'] != instance.tipo:
+            # A categoria das alocações no caixa segue o tipo da conta
+            marcar_pagamentos(instance.allocations.values_list('payment_id', flat=True))
+        marcar_competencia({
+            (instance.company_id, instance.data_vencimento),
+            (anterior['company_id'], anterior['data_vencimento']),
+        })
+
+
+@receiver(post_delete, sender=Receita)
+@receiver(post_delete, sender=Despesa)
+def _conta_apagada(sender, instance, **kwargs):
+    somar_competencia([(
+        instance.company_id, instance.data_vencimento, _categoria_conta(sender, instance.tipo),
+        -_decimal(sender, 'valor', instance.valor),
+    )])
+
+
+# ──────────────────────────────────────────────
+# Leituras
+# ──────────────────────────────────────────────
+
+def _rotulo(categoria, tipo_payment):
+    if categoria == 'CU':
+        return ROTULO_CUSTODIA[tipo_payment]
+    return ROTULOS[categoria]
+
+
+def caixa_do_mes(company_id, mes, incluir_custodias=True) -> dict:
+    """
+    Fluxo de caixa realizado do mês (balanço), numa consulta, em Decimal:
+    {'entradas'/'saidas': {'por_banco': {nome: valor}, 'por_tipo': {rótulo: valor}, 'total': valor},
+     'resultado': entradas - saídas}.
+    Os bancos vêm em ordem de nome; os tipos, em ORDEM_ENTRADAS/ORDEM_SAIDAS.
+    Sem `incluir_custodias`, as linhas de custódia ficam fora dos dois agrupamentos.
+    """
+    caixa = {lado: {'por_banco': {}, 'por_tipo': {}} for lado in ('entradas', 'saidas')}
+    linhas = ResumoMensal.objects.filter(
+        company_id=company_id, mes=inicio_do_mes(mes), conta_bancaria__isnull=False
+    )
+    if not incluir_custodias:
+        linhas = linhas.exclude(categoria='CU')
+    linhas = linhas.values_list('conta_bancaria__nome', 'categoria', 'entradas', 'saidas').order_by(
+        'conta_bancaria__nome', 'conta_bancaria_id'
+    )
+    for banco, categoria, entradas, saidas in linhas:
+        for lado, tipo_payment, valor in (('entradas', 'E', entradas), ('saidas', 'S', saidas)):
+            if not valor:
+                continue
+            grupos = caixa[lado]
+            grupos['por_banco'][banco] = grupos['por_banco'].get(banco, ZERO) + valor
+            rotulo = _rotulo(categoria, tipo_payment)
+            grupos['por_tipo'][rotulo] = grupos['por_tipo'].get(rotulo, ZERO) + valor
+
+    for lado, ordem in (('entradas', ORDEM_ENTRADAS), ('saidas', ORDEM_SAIDAS)):
+        por_tipo = caixa[lado]['por_tipo']
+        tipos = [tipo for tipo in ordem if tipo in por_tipo] + [tipo for tipo in por_tipo if tipo not in ordem]
+        caixa[lado]['por_tipo'] = {tipo: por_tipo[tipo] for tipo in tipos}
+        caixa[lado]['total'] = sum(caixa[lado]['por_banco'].values(), ZERO)
+    caixa['resultado'] = caixa['entradas']['total'] - caixa['saidas']['total']
+    return caixa
+
+
+def competencia_por_mes(company_id, inicio, fim) -> dict:
+    """
+    {mês: {categoria: valor}} das receitas (R*) e despesas (D*) com
+    vencimento entre os meses `inicio` e `fim` (inclusive), numa consulta.
+    """
+    resultado = defaultdict(dict)
+    linhas = ResumoMensal.objects.filter(
+        company_id=company_id, mes__gte=inicio_do_mes(inicio), mes__lte=inicio_do_mes(fim),
+        conta_bancaria__isnull=True,
+    ).values_list('mes', 'categoria', 'competencia')
+    for mes, categoria, valor in linhas:
+        resultado[mes][categoria] = valor
+    return resultado
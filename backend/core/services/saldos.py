@@ -0,0 +1,258 @@
+"""
+Saldo diário por conta bancária (tabela SaldoDiario).
+
+Cada linha guarda, para um dia com movimentação, as entradas, as saídas e o
+saldo de fechamento da conta. Invariante:
+
+    saldo de fechamento em D = saldo_atual - líquido dos pagamentos depois de D
+
+Por isso um pagamento novo na data D só muda as linhas >= D, que andam o
+valor do pagamento num UPDATE (saldo = saldo + líquido), e a linha do dia D;
+as anteriores ficam como estão. A tabela é mantida junto com `ContaBancaria.saldo_atual` por
+`aplicar_payment` (um pagamento) e `registrar_movimentos` (lote, na
+importação de extrato) e pode ser refeita a partir dos pagamentos com
+`reconstruir_saldos` (comando rebuild_saldos_diarios).
+
+O próprio `saldo_atual` é conferido contra `saldo_inicial` + líquido dos
+pagamentos por `verificar_saldos`/`corrigir_saldo` (comando verify_balances).
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+
+from ..models import ContaBancaria, Payment, SaldoDiario
+from .versao import incrementar_versao
+
+ZERO = Decimal('0.00')
+DINHEIRO = DecimalField(max_digits=12, decimal_places=2)
+
+
+def registrar_movimentos(company_id, conta_bancaria_id, movimentos: dict):
+    """
+    Aplica {data: (entradas, saidas)} aos saldos diários da conta (valores
+    negativos estornam). Deve rodar na mesma transação e DEPOIS do ajuste de
+    `saldo_atual`, com a conta travada.
+
+    Os fechamentos a partir de cada data andam o líquido dos movimentos até
+    ela num único UPDATE (saldo = saldo + líquido). Depois só o trecho entre
+    a primeira e a última data movimentada é lido: os dias que já têm linha
+    somam os movimentos (ou saem da tabela, se ficarem zerados) e os dias
+    novos fecham na abertura do dia seguinte - ou no saldo atual, se não há
+    dia seguinte.
+    """
+    movimentos = {data: mov for data, mov in movimentos.items() if mov[0] or mov[1]}
+    if not movimentos:
+        return
+    linhas = SaldoDiario.objects.filter(conta_bancaria_id=conta_bancaria_id)
+    inicio, fim = min(movimentos), max(movimentos)
+
+    # Líquido acumulado até cada data; a linha usa o da maior data <= a dela
+    acumulado = ZERO
+    faixas = []
+    for data in sorted(movimentos):
+        entradas, saidas = movimentos[data]
+        acumulado += entradas - saidas
+        faixas.append(When(data__gte=data, then=F('saldo') + acumulado))
+    if acumulado or len(faixas) > 1:
+        linhas.filter(data__gte=inicio).update(
+            saldo=Case(*reversed(faixas), default=F('saldo'), output_field=DINHEIRO)
+        )
+
+    # Abertura do primeiro dia depois do trecho (já com o UPDATE), ou o saldo atual
+    seguinte = linhas.filter(data__gt=fim).order_by('data').annotate(
+        abertura=F('saldo') - F('entradas') + F('saidas')
+    )
+    saldo_atual, abertura = ContaBancaria.objects.filter(pk=conta_bancaria_id).annotate(
+        abertura_seguinte=Subquery(seguinte.values('abertura')[:1], output_field=DINHEIRO)
+    ).values_list('saldo_atual', 'abertura_seguinte').get()
+    fechamento = saldo_atual if abertura is None else abertura
+
+    existentes = {linha.data: linha for linha in linhas.filter(data__gte=inicio, data__lte=fim)}
+    alteradas, vazias, novas = [], [], []
+    for data in sorted(set(existentes) | set(movimentos), reverse=True):
+        entradas, saidas = movimentos.get(data, (ZERO, ZERO))
+        linha = existentes.get(data)
+        if linha is None:
+            linha = SaldoDiario(
+                company_id=company_id,
+                conta_bancaria_id=conta_bancaria_id,
+                data=data,
+                entradas=entradas,
+                saidas=saidas,
+                saldo=fechamento,
+            )
+            novas.append(linha)
+        elif data in movimentos:
+            linha.entradas += entradas
+            linha.saidas += saidas
+            (alteradas if linha.entradas or linha.saidas else vazias).append(linha)
+        fechamento = linha.saldo - (linha.entradas - linha.saidas)
+
+    if alteradas:
+        SaldoDiario.objects.bulk_update(alteradas, ['entradas', 'saidas'])
+    if vazias:
+        SaldoDiario.objects.filter(pk__in=[linha.pk for linha in vazias]).delete()
+    if novas:
+        SaldoDiario.objects.bulk_create(novas, batch_size=1000)
+
+
+def aplicar_payment(payment, sinal: int = 1):
+    """
+    Soma (sinal=1) ou estorna (sinal=-1) um pagamento no saldo atual da conta
+    e no saldo diário.
+    """
+    valor = payment.valor * sinal
+    liquido = valor if payment.tipo == 'E' else -valor
+    # Payment.objects.create(data_pagamento='2026-01-31') mantém a string no objeto
+    data = Payment._meta.get_field('data_pagamento').to_python(payment.data_pagamento)
+    with transaction.atomic():
+        # select_for_update() serializa os ajustes de saldo da mesma conta
+        ContaBancaria.objects.select_for_update().filter(
+            pk=payment.conta_bancaria_id
+        ).update(saldo_atual=F('saldo_atual') + liquido)
+
+        entradas, saidas = (valor, ZERO) if payment.tipo == 'E' else (ZERO, valor)
+        registrar_movimentos(
+            payment.company_id, payment.conta_bancaria_id, {data: (entradas, saidas)}
+        )
+
+
+def ajustar_saldo_manual(conta_bancaria, diferenca: Decimal):
+    """
+    Saldo atual editado à mão: o saldo inicial e todos os fechamentos andam a
+    mesma diferença (não é divergência para o verify_balances).
+    """
+    if diferenca:
+        ContaBancaria.objects.filter(pk=conta_bancaria.pk).update(saldo_inicial=F('saldo_inicial') + diferenca)
+        SaldoDiario.objects.filter(conta_bancaria=conta_bancaria).update(saldo=F('saldo') + diferenca)
+
+
+def _liquido_pagamentos(prefixo=''):
+    """Soma das entradas menos as saídas dos pagamentos (0 sem pagamentos)."""
+    return Coalesce(
+        Sum(Case(
+            When(**{f'{prefixo}tipo': 'E'}, then=F(f'{prefixo}valor')),
+            When(**{f'{prefixo}tipo': 'S'}, then=-F(f'{prefixo}valor')),
+        )),
+        ZERO,
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def verificar_saldos(company_id) -> list:
+    """
+    Compara o saldo atual de cada conta da empresa com saldo_inicial +
+    líquido dos pagamentos, numa única consulta agrupada e sem travas.
+    Retorna as contas divergentes.
+    """
+    contas = (
+        ContaBancaria.objects.filter(company_id=company_id)
+        .annotate(liquido=_liquido_pagamentos('payments__'))
+        .values_list('id', 'nome', 'saldo_atual', 'saldo_inicial', 'liquido')
+        .order_by('id')
+    )
+    return [
+        {
+            'conta_id': conta_id,
+            'nome': nome,
+            'saldo_atual': saldo_atual,
+            'saldo_calculado': saldo_inicial + liquido,
+            'diferenca': saldo_inicial + liquido - saldo_atual,
+        }
+        for conta_id, nome, saldo_atual, saldo_inicial, liquido in contas
+        if saldo_atual != saldo_inicial + liquido
+    ]
+
+
+def corrigir_saldo(conta_bancaria_id) -> Decimal:
+    """
+    Grava o saldo calculado na conta e refaz os saldos diários. O cálculo é
+    repetido com a conta travada (um pagamento pode ter entrado depois da
+    verificação). Retorna a diferença aplicada (zero se já estava certo).
+    """
+    with transaction.atomic():
+        conta = ContaBancaria.objects.select_for_update().get(pk=conta_bancaria_id)
+        liquido = Payment.objects.filter(conta_bancaria_id=conta.pk).aggregate(liquido=_liquido_pagamentos())['liquido']
+        diferenca = conta.saldo_inicial + liquido - conta.saldo_atual
+        if diferenca:
+            ContaBancaria.objects.filter(pk=conta.pk).update(saldo_atual=conta.saldo_inicial + liquido)
+            reconstruir_saldos(conta)
+    return diferenca
+
+
+def reconstruir_saldos(conta_bancaria) -> int:
+    """
+    Refaz as linhas da conta a partir dos pagamentos, do dia mais recente para
+    o mais antigo (fechamento = saldo_atual - líquido dos dias seguintes).
+    Retorna a quantidade de dias gravados. Sobe a versão dos dados da empresa
+    (dashboard e fluxo de caixa em cache leem os saldos diários).
+    """
+    dias = (
+        Payment.objects.filter(conta_bancaria=conta_bancaria)
+        .values('data_pagamento')
+        .annotate(
+            entradas=Coalesce(Sum('valor', filter=Q(tipo='E')), ZERO),
+            saidas=Coalesce(Sum('valor', filter=Q(tipo='S')), ZERO),
+        )
+        .order_by('-data_pagamento')
+    )
+
+    with transaction.atomic():
+        # Saldo lido do banco com a conta travada (o objeto pode estar desatualizado)
+        saldo = ContaBancaria.objects.select_for_update().filter(
+            pk=conta_bancaria.pk
+        ).values_list('saldo_atual', flat=True).get()
+        linhas = []
+        for dia in dias:
+            linhas.append(SaldoDiario(
+                company_id=conta_bancaria.company_id,
+                conta_bancaria_id=conta_bancaria.pk,
+                data=dia['data_pagamento'],
+                entradas=dia['entradas'],
+                saidas=dia['saidas'],
+                saldo=saldo,
+            ))
+            saldo -= dia['entradas'] - dia['saidas']
+
+        SaldoDiario.objects.filter(conta_bancaria=conta_bancaria).delete()
+        SaldoDiario.objects.bulk_create(linhas, batch_size=1000)
+        incrementar_versao(conta_bancaria.company_id)
+    return len(linhas)
+
+
+def contas_com_saldo_em(company, data, conta_ids=None):
+    """
+    Contas da empresa anotadas com `saldo_na_data` (saldo no fim do dia `data`),
+    numa única consulta: o fechamento do último dia com movimento até a data;
+    antes do primeiro movimento, a abertura do primeiro dia; sem movimento
+    algum, o saldo atual.
+    """
+    ultimo = SaldoDiario.objects.filter(
+        conta_bancaria=OuterRef('pk'), data__lte=data
+    ).order_by('-data').values('saldo')[:1]
+    abertura = SaldoDiario.objects.filter(
+        conta_bancaria=OuterRef('pk')
+    ).order_by('data').annotate(
+        abertura=F('saldo') - F('entradas') + F('saidas')
+    ).values('abertura')[:1]
+
+    contas = ContaBancaria.objects.filter(company=company)
+    if conta_ids is not None:
+        contas = contas.filter(id__in=conta_ids)
+    return contas.annotate(
+        saldo_na_data=Coalesce(
+            Subquery(ultimo), Subquery(abertura), F('saldo_atual'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    ).order_by('nome', 'id')
+
+
+def saldo_em(company, data, conta_ids=None) -> Decimal:
+    """Soma do saldo das contas (ou de `conta_ids`) no fim do dia `data`."""
+    return sum(
+        contas_com_saldo_em(company, data, conta_ids).values_list('saldo_na_data', flat=True),
+        ZERO,
+    )
@@ -0,0 +1,287 @@
+"""
+Recálculo de status em lote, o equivalente em conjunto dos
+`atualizar_status()` de Receita, Despesa, Custódia e Transferência.
+
+Receitas, despesas e custódias são atualizadas por um único UPDATE sobre o
+conjunto (ids informados ou a empresa inteira), a partir dos totais alocados
+gravados na própria linha (ver services/alocacoes.py). As transferências não
+guardam total: entradas e saídas vêm de subconsultas agregadas numa leitura
+e o UPDATE é feito por status resultante. Só as linhas cujo resultado muda
+são gravadas (e têm `atualizado_em` renovado, como no save()).
+
+Regras (as mesmas dos métodos dos modelos):
+- Receita/Despesa: valor sobe até o total alocado; paga se alocado >= valor,
+  senão vencida se o vencimento passou, senão em aberto.
+- Custódia: valor_liquidado = min(entradas, saídas); liquidada, parcial ou aberta.
+- Transferência: pendente sem alocações, completa se saídas = entradas, senão mismatch.
+
+Unidade de trabalho: dentro de `status_em_lote()`, `marcar_status` e
+`marcar_alocacoes` só acumulam os ids sujos (sem repetição); o recálculo roda
+uma vez, na saída do bloco mais externo, ainda dentro da transação. Fora de um
+bloco, marcar recalcula na hora.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, CharField, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from ..models import Allocation, Custodia, Despesa, Receita, Transfer
+from .alocacoes import recalcular_totais
+from .resumo import marcar_competencia, resumo_em_lote
+from .versao import incrementar_versao, incrementar_versoes
+
+ZERO = Decimal('0.00')
+CONJUNTOS = ('receita_ids', 'despesa_ids', 'custodia_ids', 'transfer_ids')
+DINHEIRO = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _escopo(model, company=None, ids=None):
+    linhas = model.objects.all()
+    if company is not None:
+        linhas = linhas.filter(company=company)
+    if ids is not None:
+        linhas = linhas.filter(pk__in=ids)
+    return linhas
+
+
+def _recalcular_contas(model, company=None, ids=None) -> int:
+    """Receitas ou despesas: `valor` e `situacao` a partir de total_alocado."""
+    hoje = timezone.now().date()
+    valor = Case(
+        When(total_alocado__gt=F('valor'), then=F('total_alocado')),
+        default=F('valor'),
+        output_field=DINHEIRO,
+    )
+    situacao = Case(
+        When(total_alocado__gte=F('valor'), then=Value('P')),
+        When(data_vencimento__lt=hoje, then=Value('V')),
+        default=Value('A'),
+        output_field=CharField(),
+    )
+    linhas = _escopo(model, company, ids)
+    # O valor que sobe até o total alocado muda a competência do mês
+    marcar_competencia(linhas.filter(total_alocado__gt=F('valor')).values_list('company_id', 'data_vencimento'))
+    return linhas.alias(
+        novo_valor=valor, nova_situacao=situacao,
+    ).filter(
+        ~Q(valor=F('novo_valor')) | ~Q(situacao=F('nova_situacao'))
+    ).update(valor=valor, situacao=situacao)
+
+
+def recalcular_receitas(company=None, ids=None) -> int:
+    return _recalcular_contas(Receita, company, ids)
+
+
+def recalcular_despesas(company=None, ids=None) -> int:
+    return _recalcular_contas(Despesa, company, ids)
+
+
+def recalcular_custodias(company=None, ids=None) -> int:
+    valor_liquidado = Least(F('total_entradas'), F('total_saidas'))
+    status = Case(
+        When(Q(valor_total__lte=valor_liquidado), then=Value('L')),
+        When(Q(total_entradas__gt=ZERO, total_saidas__gt=ZERO), then=Value('P')),
+        default=Value('A'),
+        output_field=CharField(),
+    )
+    return _escopo(Custodia, company, ids).alias(
+        novo_liquidado=valor_liquidado, novo_status=status,
+    ).filter(
+        ~Q(valor_liquidado=F('novo_liquidado')) | ~Q(status=F('novo_status'))
+    ).update(valor_liquidado=valor_liquidado, status=status, atualizado_em=timezone.now())
+
+
+def _soma_transfer(tipo_payment):
+    alocacoes = Allocation.objects.filter(transfer=OuterRef('pk'), payment__tipo=tipo_payment)
+    return Coalesce(
+        Subquery(alocacoes.values('transfer').annotate(total=Sum('valor')).values('total')),
+        Value(ZERO),
+        output_field=DINHEIRO,
+    )
+
+
+def recalcular_transferencias(company=None, ids=None) -> int:
+    saidas = _soma_transfer('S')
+    entradas = _soma_transfer('E')
+    linhas = _escopo(Transfer, company, ids).alias(saidas=saidas, entradas=entradas)
+    status = Case(
+        When(Q(saidas=ZERO, entradas=ZERO), then=Value('P')),
+        When(saidas=F('entradas'), then=Value('C')),
+        default=Value('M'),
+        output_field=CharField(),
+    )
+    ids_mudados = list(
+        linhas.annotate(novo_status=status).exclude(status=F('novo_status')).values_list('pk', 'novo_status')
+    )
+    if not ids_mudados:
+        return 0
+    # O UPDATE não aceita as subconsultas anotadas: um UPDATE por status resultante
+    agora = timezone.now()
+    for novo_status in {s for _, s in ids_mudados}:
+        Transfer.objects.filter(
+            pk__in=[pk for pk, s in ids_mudados if s == novo_status]
+        ).update(status=novo_status, atualizado_em=agora)
+    return len(ids_mudados)
+
+
+def recalcular_status(company=None, receita_ids=None, despesa_ids=None, custodia_ids=None,
+                      transfer_ids=None, recalcular_totais_alocados=False) -> dict:
+    """
+    Recalcula o status das contas informadas (ou de todas as da empresa, ou de
+    todas, quando nenhum conjunto de ids é passado). Um conjunto vazio pula o
+    modelo. Com `recalcular_totais_alocados`, os totais são refeitos a partir
+    das alocações antes (reparo depois de migrações de dados).
+
+    O recálculo da empresa inteira (ou de todas) é um reparo e sobe a versão
+    dos dados quando algo muda; o por ids roda dentro de uma gravação, que já
+    subiu a versão.
+
+    Retorna {modelo: linhas alteradas}.
+    """
+    por_ids = any(ids is not None for ids in (receita_ids, despesa_ids, custodia_ids, transfer_ids))
+    conjuntos = {
+        'receitas': (Receita, receita_ids, recalcular_receitas),
+        'despesas': (Despesa, despesa_ids, recalcular_despesas),
+        'custodias': (Custodia, custodia_ids, recalcular_custodias),
+        'transferencias': (Transfer, transfer_ids, recalcular_transferencias),
+    }
+
+    resultado = {}
+    with transaction.atomic():
+        for nome, (model, ids, recalcular) in conjuntos.items():
+            if (por_ids and ids is None) or (ids is not None and not ids):
+                resultado[nome] = 0
+                continue
+            if recalcular_totais_alocados and model is not Transfer:
+                recalcular_totais(model, _escopo(model, company, ids).values('pk'))
+            resultado[nome] = recalcular(company, ids)
+        if not por_ids and any(resultado.values()):
+            if company is not None:
+                incrementar_versao(company.pk)
+            else:
+                incrementar_versoes()
+    return resultado
+
+
+def recalcular_status_das_alocacoes(allocations) -> dict:
+    """Recalcula as contas tocadas por uma lista de alocações (já gravadas ou apagadas)."""
+    return recalcular_status(
+        receita_ids={a.receita_id for a in allocations if a.receita_id},
+        despesa_ids={a.despesa_id for a in allocations if a.despesa_id},
+        custodia_ids={a.custodia_id for a in allocations if a.custodia_id},
+        transfer_ids={a.transfer_id for a in allocations if a.transfer_id},
+    )
+
+
+# Ids sujos da unidade de trabalho aberta ({conjunto: set()}), ou None fora de uma
+_pendentes = ContextVar('status_pendentes', default=None)
+
+
+@contextmanager
+def status_em_lote():
+    """
+    Abre uma unidade de trabalho (transação) que junta as marcações de
+    status e recalcula cada conta uma vez ao final. Blocos aninhados entram
+    na unidade de fora. Se o bloco levantar exceção, nada é recalculado.
+    Abre também a unidade do resumo mensal, recalculado depois dos status.
+    """
+    if _pendentes.get() is not None:
+        yield
+        return
+
+    pendentes = {nome: set() for nome in CONJUNTOS}
+    token = _pendentes.set(pendentes)
+    try:
+        with transaction.atomic(), resumo_em_lote():
+            yield
+            _pendentes.reset(token)
+            token = None
+            if any(pendentes.values()):
+                recalcular_status(**pendentes)
+    finally:
+        if token is not None:
+            _pendentes.reset(token)
+
+
+def marcar_status(receita_ids=(), despesa_ids=(), custodia_ids=(), transfer_ids=()):
+    """Marca contas para recálculo (na unidade de trabalho aberta, ou já)."""
+    marcados = dict(zip(CONJUNTOS, (receita_ids, despesa_ids, custodia_ids, transfer_ids)))
+    pendentes = _pendentes.get()
+    if pendentes is None:
+        if any(marcados.values()):
+            recalcular_status(**{nome: set(ids) for nome, ids in marcados.items()})
+        return
+    for nome, ids in marcados.items():
+        pendentes[nome].update(ids)
+
+
+def marcar_alocacoes(allocations):
+    """Marca as contas tocadas por alocações (já gravadas ou apagadas)."""
+    marcar_status(
+        receita_ids={a.receita_id for a in allocations if a.receita_id},
+        despesa_ids={a.despesa_id for a in allocations if a.despesa_id},
+        custodia_ids={a.custodia_id for a in allocations if a.custodia_id},
+        transfer_ids={a.transfer_id for a in allocations if a.transfer_id},
+    )
+
+
+# ──────────────────────────────────────────────
+# Vencidas: calculadas na leitura, gravadas uma vez por dia
+# ──────────────────────────────────────────────
+
+def situacao_vigente(hoje=None):
+    """
+    Situação de Receita/Despesa como vale hoje: em aberto com vencimento
+    passado conta como vencida ('V') mesmo antes da varredura diária
+    (`marcar_vencidas`) gravar a mudança. Para anotar nas leituras.
+    """
+    hoje = hoje or timezone.now().date()
+    return Case(
+        When(situacao='A', data_vencimento__lt=hoje, then=Value('V')),
+        default=F('situacao'),
+        output_field=CharField(),
+    )
+
+
+def filtro_situacao(situacoes, hoje=None, prefixo='') -> Q:
+    """
+    Q das linhas cuja situação vigente está em `situacoes` (prefixo para
+    filtrar por relação, ex.: 'allocations__receita__'). Compara as colunas
+    situacao/data_vencimento direto, para usar o índice (empresa, situação,
+    vencimento) em vez de filtrar pela anotação.
+    """
+    hoje = hoje or timezone.now().date()
+    condicao = Q(pk__in=[])
+    for situacao in set(situacoes):
+        if situacao == 'A':
+            condicao |= Q(**{f'{prefixo}situacao': 'A', f'{prefixo}data_vencimento__gte': hoje})
+        elif situacao == 'V':
+            condicao |= Q(**{f'{prefixo}situacao': 'V'}) | Q(
+                **{f'{prefixo}situacao': 'A', f'{prefixo}data_vencimento__lt': hoje}
+            )
+        else:
+            condicao |= Q(**{f'{prefixo}situacao': situacao})
+    return condicao
+
+
+def marcar_vencidas(company=None, hoje=None) -> dict:
+    """
+    Grava 'V' nas receitas e despesas em aberto já vencidas (varredura
+    diária, comando `marcar_vencidas`). As leituras não dependem dela: usam
+    `situacao_vigente`/`filtro_situacao`.
+
+    Retorna {modelo: linhas alteradas}.
+    """
+    hoje = hoje or timezone.now().date()
+    resultado = {}
+    with transaction.atomic():
+        for nome, model in (('receitas', Receita), ('despesas', Despesa)):
+            resultado[nome] = _escopo(model, company).filter(
+                situacao='A', data_vencimento__lt=hoje
+            ).update(situacao='V')
+    return resultado
@@ -0,0 +1,111 @@
+"""
+Versão dos dados da empresa (tabela VersaoDados) e assinatura de um GET,
+usada como chave do cache de relatórios e como ETag.
+
+Toda gravação que afeta relatórios sobe o contador da empresa com um UPDATE
+no banco, dentro da transação da gravação quando há uma: os sinais abaixo
+cobrem save()/delete() dos modelos lidos pelos relatórios, e os caminhos em
+lote que não disparam sinais (bulk_create, UPDATE em conjunto) e os reparos
+dos comandos de manutenção chamam `incrementar_versao`/`incrementar_versoes`.
+
+Como a assinatura leva a versão lida *antes* de calcular, uma resposta
+guardada (no cache ou no navegador) nunca responde por dados mais novos que
+ela: a gravação seguinte muda a assinatura e a entrada antiga só espera ser
+descartada.
+"""
+
+import hashlib
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ..models import (
+    Allocation,
+    Cliente,
+    Company,
+    ContaBancaria,
+    Custodia,
+    Despesa,
+    Funcionario,
+    Payment,
+    Receita,
+    Transfer,
+    VersaoDados,
+)
+from .jobs import PARAMETRO_ASYNC
+
+# Parâmetros que não mudam o conteúdo do relatório
+PARAMETROS_IGNORADOS = {PARAMETRO_ASYNC}
+
+
+def versao_dados(company_id):
+    """Versão atual dos dados da empresa (None se a empresa não tem contador)."""
+    return VersaoDados.objects.filter(company_id=company_id).values_list('versao', flat=True).first()
+
+
+def incrementar_versao(company_id):
+    """Sobe a versão dos dados da empresa (na transação corrente, se houver)."""
+    VersaoDados.objects.filter(company_id=company_id).update(versao=F('versao') + 1)
+
+
+def incrementar_versoes(company_ids=None):
+    """
+    Sobe a versão de várias empresas num único UPDATE: `company_ids` pode ser
+    uma lista ou uma subconsulta (`queryset.values('company_id')`); None sobe
+    todas.
+    """
+    versoes = VersaoDados.objects.all() if company_ids is None else VersaoDados.objects.filter(company_id__in=company_ids)
+    versoes.update(versao=F('versao') + 1)
+
+
+def normalizar_parametros(query_params) -> list:
+    """Parâmetros do request em ordem estável, sem os que não afetam o resultado."""
+    return sorted(
+        (nome, sorted(valores))
+        for nome, valores in query_params.lists()
+        if nome not in PARAMETROS_IGNORADOS
+    )
+
+
+def assinatura_dados(request, nome, kwargs=None):
+    """
+    Assinatura do resultado de um GET: empresa, nome do endpoint, versão dos
+    dados, dia (vencidas e juros mudam com a data) e hash dos parâmetros da
+    URL e da query string. None quando o request não pode usá-la
+    (superusuário vê todas as empresas; empresa sem contador).
+    """
+    user = request.user
+    if user.is_superuser or not user.company_id:
+        return None
+    versao = versao_dados(user.company_id)
+    if versao is None:
+        return None
+    parametros = repr((sorted((kwargs or {}).items()), normalizar_parametros(request.query_params)))
+    resumo = hashlib.sha1(parametros.encode()).hexdigest()
+    return f'{user.company_id}:{nome}:v{versao}:{timezone.localdate().isoformat()}:{resumo}'
+
+
+# Modelos lidos pelos relatórios (JSON e PDF) e pelo dashboard
+@receiver([post_save, post_delete], sender=Payment)
+@receiver([post_save, post_delete], sender=Allocation)
+@receiver([post_save, post_delete], sender=Receita)
+@receiver([post_save, post_delete], sender=Despesa)
+@receiver([post_save, post_delete], sender=ContaBancaria)
+@receiver([post_save, post_delete], sender=Transfer)
+@receiver([post_save, post_delete], sender=Custodia)
+@receiver([post_save, post_delete], sender=Cliente)
+@receiver([post_save, post_delete], sender=Funcionario)
+def _versao_ao_gravar(sender, instance, **kwargs):
+    if instance.company_id:
+        incrementar_versao(instance.company_id)
+
+
+@receiver(post_save, sender=Company)
+def _versao_da_empresa(sender, instance, created, **kwargs):
+    # Nome, logo e percentual de comissão aparecem nos relatórios
+    if created:
+        VersaoDados.objects.get_or_create(company=instance)
+    else:
+        incrementar_versao(instance.pk)
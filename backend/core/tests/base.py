@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework.test import APIClient
 
@@ -8,6 +9,8 @@ class APITestBase(TestCase):
     password = "Senha@1234"
 
     def setUp(self):
+        # O cache local (dashboard) sobrevive entre testes; ids se repetem após o rollback
+        cache.clear()
         self.client = APIClient()
 
         self.company = Company.objects.create(name="Empresa A", cnpj="11.222.333/0001-81")
@@ -1,8 +1,18 @@
 from datetime import date, timedelta
+from decimal import Decimal
 
-from core.models import Allocation
+from core.models import Allocation, Payment, Receita
 from core.tests.base import APITestBase
-from core.tests.factories import make_cliente, make_conta, make_despesa, make_funcionario, make_payment, make_receita
+from core.tests.factories import (
+    make_allocation,
+    make_cliente,
+    make_conta,
+    make_custodia,
+    make_despesa,
+    make_funcionario,
+    make_payment,
+    make_receita,
+)
 
 
 class AllocationViewSetTests(APITestBase):
@@ -82,3 +92,188 @@ class AllocationViewSetTests(APITestBase):
 
         receita.refresh_from_db()
         self.assertEqual(receita.situacao, "A")
+
+
+class BulkAllocationTests(APITestBase):
+    def test_split_payment_across_many_receitas(self):
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="200.00")
+        receitas = [make_receita(self.company, cliente, valor="10.00") for _ in range(20)]
+        itens = [{"payment_id": payment.id, "receita_id": r.id, "valor": "10.00"} for r in receitas]
+
+        # payment travado, receitas, um INSERT, totais (payment e receitas), um
+        # UPDATE de status e a releitura das criadas, mais 3 pares de savepoint;
+        # deltas do resumo mensal: payment, tipos das receitas, contas cujo
+        # valor sobe, linhas existentes, UPDATE, INSERT e DELETE; versão dos dados
+        with self.assertNumQueries(23):
+            resp = self.client.post("/api/alocacoes/bulk/", {"alocacoes": itens}, format="json")
+
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(len(resp.data), 20)
+        payment.refresh_from_db()
+        self.assertEqual(payment.total_alocado, Decimal("200.00"))
+        self.assertEqual(
+            set(Receita.objects.filter(pk__in=[r.id for r in receitas]).values_list("situacao", flat=True)),
+            {"P"},
+        )
+
+    def test_invalid_items_reject_the_whole_batch(self):
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="100.00")
+        receita = make_receita(self.company, cliente, valor="100.00")
+        outra_empresa = make_receita(self.company_b, make_cliente(self.company_b), valor="10.00")
+        make_allocation(self.company, payment, "40.00", receita=receita)
+
+        resp = self.client.post(
+            "/api/alocacoes/bulk/",
+            {
+                "alocacoes": [
+                    {"payment_id": payment.id, "receita_id": receita.id, "valor": "50.00"},
+                    {"payment_id": payment.id, "receita_id": receita.id, "valor": "20.00"},
+                    {"payment_id": payment.id, "receita_id": outra_empresa.id, "valor": "1.00"},
+                    {"payment_id": payment.id, "valor": "1.00"},
+                    {"payment_id": payment.id, "receita_id": receita.id, "valor": "0"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(sorted(resp.data["erros"]), [1, 2, 3, 4])
+        self.assertIn("excede o valor do pagamento", resp.data["erros"][1])
+        self.assertEqual(Allocation.objects.filter(payment=payment).count(), 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.total_alocado, Decimal("40.00"))
+
+
+class AllocationConstraintTests(APITestBase):
+    def test_database_rejects_allocation_without_exactly_one_target(self):
+        from django.db import IntegrityError, transaction
+
+        cliente = make_cliente(self.company)
+        funcionario = make_funcionario(self.company)
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="100.00")
+        receita = make_receita(self.company, cliente, valor="100.00")
+        despesa = make_despesa(self.company, funcionario, valor="100.00")
+
+        for contas in ({}, {"receita": receita, "despesa": despesa}):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Allocation.objects.bulk_create([
+                    Allocation(company=self.company, payment=payment, valor=Decimal("10.00"), **contas)
+                ])
+
+    def test_over_allocation_is_rejected_by_the_payment_constraint(self):
+        from django.core.exceptions import ValidationError
+
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="100.00")
+        receita = make_receita(self.company, cliente, valor="200.00")
+        make_allocation(self.company, payment, "60.00", receita=receita)
+
+        with self.assertRaisesMessage(ValidationError, "excede o valor do pagamento"):
+            make_allocation(self.company, payment, "50.00", receita=receita)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.total_alocado, Decimal("60.00"))
+        self.assertEqual(Allocation.objects.filter(payment=payment).count(), 1)
+
+    def test_payment_value_cannot_drop_below_allocated_total(self):
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="100.00")
+        make_allocation(self.company, payment, "60.00", receita=make_receita(self.company, cliente, valor="60.00"))
+
+        resp = self.client.patch(f"/api/pagamentos/{payment.id}/", {"valor": "50.00"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("valor", resp.data)
+
+
+class TotaisAlocadosTests(APITestBase):
+    def _totais(self, *objs):
+        for obj in objs:
+            obj.refresh_from_db()
+        return [obj.total_alocado for obj in objs]
+
+    def test_totals_follow_allocation_create_update_delete(self):
+        cliente = make_cliente(self.company)
+        receita_a = make_receita(self.company, cliente, valor="100.00")
+        receita_b = make_receita(self.company, cliente, valor="100.00")
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="150.00")
+
+        resp = self.client.post(
+            "/api/alocacoes/",
+            {"payment_id": payment.id, "receita_id": receita_a.id, "valor": "60.00"},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        make_allocation(self.company, payment, valor="40.00", receita=receita_b)
+        self.assertEqual(self._totais(payment, receita_a, receita_b), [Decimal("100.00"), Decimal("60.00"), Decimal("40.00")])
+
+        # Move a primeira alocação para a outra receita com outro valor
+        update = self.client.patch(
+            f"/api/alocacoes/{resp.data['id']}/",
+            {"receita_id": receita_b.id, "valor": "60.00"},
+            format="json",
+        )
+        self.assertEqual(update.status_code, 200, update.data)
+        self.assertEqual(self._totais(payment, receita_a, receita_b), [Decimal("100.00"), Decimal("0.00"), Decimal("100.00")])
+        self.assertEqual(receita_b.situacao, "P")
+
+        self.assertEqual(self.client.delete(f"/api/alocacoes/{resp.data['id']}/").status_code, 204)
+        self.assertEqual(self._totais(payment, receita_b), [Decimal("40.00"), Decimal("40.00")])
+
+        # Excluir o pagamento apaga as alocações em cascata e estorna os totais
+        self.assertEqual(self.client.delete(f"/api/pagamentos/{payment.id}/").status_code, 204)
+        self.assertEqual(self._totais(receita_b), [Decimal("0.00")])
+        self.assertEqual(receita_b.situacao, "A")
+
+    def test_stale_instance_save_keeps_total_and_custodia_follows_payment_tipo(self):
+        cliente = make_cliente(self.company)
+        receita = make_receita(self.company, cliente, valor="100.00")
+        custodia = make_custodia(self.company, cliente=cliente, tipo="A", valor_total="50.00")
+        conta = make_conta(self.company)
+        entrada = make_payment(self.company, conta, tipo="E", valor="100.00")
+        saida = make_payment(self.company, conta, tipo="S", valor="30.00")
+
+        carregada = Receita.objects.get(pk=receita.pk)
+        make_allocation(self.company, entrada, valor="70.00", receita=receita)
+        carregada.descricao = "editada"
+        carregada.save()
+        self.assertEqual(self._totais(receita), [Decimal("70.00")])
+
+        make_allocation(self.company, saida, valor="30.00", custodia=custodia)
+        custodia.refresh_from_db()
+        self.assertEqual((custodia.total_entradas, custodia.total_saidas), (Decimal("0.00"), Decimal("30.00")))
+
+        resp = self.client.patch(f"/api/pagamentos/{saida.id}/", {"tipo": "E"}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        custodia.refresh_from_db()
+        self.assertEqual((custodia.total_entradas, custodia.total_saidas), (Decimal("30.00"), Decimal("0.00")))
+
+    def test_verificar_totais_alocados_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        cliente = make_cliente(self.company)
+        receita = make_receita(self.company, cliente, valor="100.00")
+        conta = make_conta(self.company)
+        payment = make_payment(self.company, conta, tipo="E", valor="100.00")
+        make_allocation(self.company, payment, valor="100.00", receita=receita)
+        Receita.objects.filter(pk=receita.pk).update(total_alocado=Decimal("5.00"))
+        Payment.objects.filter(pk=payment.pk).update(total_alocado=Decimal("0.00"))
+
+        out = StringIO()
+        call_command("verificar_totais_alocados", stdout=out)
+        self.assertIn("Receita: 1, Despesa: 0", out.getvalue())
+        self.assertIn("0 linha(s) corrigida(s)", out.getvalue())
+
+        out = StringIO()
+        call_command("verificar_totais_alocados", "--corrigir", stdout=out)
+        self.assertIn("2 linha(s) corrigida(s)", out.getvalue())
+        self.assertEqual(self._totais(receita, payment), [Decimal("100.00"), Decimal("100.00")])
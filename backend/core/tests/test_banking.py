@@ -1,11 +1,14 @@
 import json
 from datetime import date, timedelta
 from decimal import Decimal
-from io import BytesIO
+from io import BytesIO, StringIO
 
+from django.core.management import call_command
+from django.db.models import F
+from django.test import override_settings
 from openpyxl import Workbook
 
-from core.models import Allocation, Payment
+from core.models import Allocation, ContaBancaria, Payment
 from core.tests.base import APITestBase
 from core.tests.factories import (
     make_allocation,
@@ -61,6 +64,212 @@ class PaymentLifecycleTests(APITestBase):
         self.assertEqual(str(conta_b.saldo_atual), "50.00")
 
 
+class SaldoDiarioTests(APITestBase):
+    def _saldos(self, conta):
+        return list(conta.saldos_diarios.order_by("data").values_list("data", "entradas", "saidas", "saldo"))
+
+    def _saldo_em(self, data, conta=None):
+        params = {"data": str(data)}
+        if conta is not None:
+            params["conta_bancaria_id"] = conta.id
+        resp = self.client.get("/api/contas-bancarias/saldo-em/", params)
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return resp.data["total"]
+
+    def _post_payment(self, conta, tipo, valor, data_pagamento):
+        resp = self.client.post(
+            "/api/pagamentos/",
+            {"tipo": tipo, "conta_bancaria": conta.id, "valor": valor, "data_pagamento": str(data_pagamento)},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp.data["id"]
+
+    def test_daily_balance_follows_payment_create_update_delete(self):
+        from core.services.saldos import reconstruir_saldos
+
+        conta = make_conta(self.company, saldo="1000.00")
+        d1, d2, d3 = date(2025, 3, 10), date(2025, 3, 12), date(2025, 3, 15)
+
+        self._post_payment(conta, "E", "200.00", d1)
+        saida_id = self._post_payment(conta, "S", "50.00", d3)
+        # Pagamento retroativo: só os dias >= d2 mudam
+        self._post_payment(conta, "E", "25.00", d2)
+
+        self.assertEqual(self._saldos(conta), [
+            (d1, Decimal("200.00"), Decimal("0.00"), Decimal("1200.00")),
+            (d2, Decimal("25.00"), Decimal("0.00"), Decimal("1225.00")),
+            (d3, Decimal("0.00"), Decimal("50.00"), Decimal("1175.00")),
+        ])
+        self.assertEqual(self._saldo_em(d1 - timedelta(days=1), conta), "1000.00")
+        self.assertEqual(self._saldo_em(d2 + timedelta(days=1), conta), "1225.00")
+        self.assertEqual(self._saldo_em(date(2026, 1, 1), conta), "1175.00")
+
+        update = self.client.patch(
+            f"/api/pagamentos/{saida_id}/", {"valor": "80.00", "data_pagamento": str(d1)}, format="json"
+        )
+        self.assertEqual(update.status_code, 200, update.data)
+        self.assertEqual(self._saldos(conta), [
+            (d1, Decimal("200.00"), Decimal("80.00"), Decimal("1120.00")),
+            (d2, Decimal("25.00"), Decimal("0.00"), Decimal("1145.00")),
+        ])
+
+        self.assertEqual(self.client.delete(f"/api/pagamentos/{saida_id}/").status_code, 204)
+        incremental = self._saldos(conta)
+        reconstruir_saldos(conta)
+        self.assertEqual(self._saldos(conta), incremental)
+        self.assertEqual(incremental[-1][3], Decimal("1225.00"))
+
+    def test_batch_movements_touch_only_moved_days(self):
+        from core.services.saldos import registrar_movimentos
+
+        conta = make_conta(self.company, saldo="100.00")
+        d1, d2, d3, d4, d5 = (date(2025, 5, dia) for dia in (1, 3, 5, 7, 9))
+        for tipo, valor, dia in (("E", "10.00", d1), ("S", "4.00", d3), ("E", "6.00", d5)):
+            self._post_payment(conta, tipo, valor, dia)
+
+        # d3 zera (estorno), d2 e d4 são dias novos entre linhas, d5 soma
+        movimentos = {
+            d2: (Decimal("20.00"), Decimal("0.00")),
+            d3: (Decimal("0.00"), Decimal("-4.00")),
+            d4: (Decimal("0.00"), Decimal("7.00")),
+            d5: (Decimal("1.00"), Decimal("0.00")),
+        }
+        liquido = sum((e - s for e, s in movimentos.values()), Decimal("0.00"))
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo_atual=F("saldo_atual") + liquido)
+        registrar_movimentos(self.company.id, conta.id, movimentos)
+
+        self.assertEqual(self._saldos(conta), [
+            (d1, Decimal("10.00"), Decimal("0.00"), Decimal("110.00")),
+            (d2, Decimal("20.00"), Decimal("0.00"), Decimal("130.00")),
+            (d4, Decimal("0.00"), Decimal("7.00"), Decimal("123.00")),
+            (d5, Decimal("7.00"), Decimal("0.00"), Decimal("130.00")),
+        ])
+
+    def test_manual_balance_edit_and_import_keep_daily_balance(self):
+        conta = make_conta(self.company, saldo="0.00")
+        self._post_payment(conta, "E", "100.00", date(2025, 1, 5))
+
+        patch = self.client.patch(f"/api/contas-bancarias/{conta.id}/", {"saldo_atual": "150.00"}, format="json")
+        self.assertEqual(patch.status_code, 200, patch.data)
+        self.assertEqual(self._saldo_em(date(2025, 1, 5), conta), "150.00")
+        self.assertEqual(self._saldo_em(date(2025, 1, 4), conta), "50.00")
+
+        csv_content = "Data;Descrição;Valor\n04/01/2025;PIX A;10,00\n06/01/2025;TARIFA;-5,00\n06/01/2025;PIX B;7,00\n"
+        upload = BytesIO(csv_content.encode("utf-8"))
+        upload.name = "extrato.csv"
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/", {"file": upload, "conta_bancaria_id": conta.id}, format="multipart"
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+
+        self.assertEqual(self._saldos(conta), [
+            (date(2025, 1, 4), Decimal("10.00"), Decimal("0.00"), Decimal("60.00")),
+            (date(2025, 1, 5), Decimal("100.00"), Decimal("0.00"), Decimal("160.00")),
+            (date(2025, 1, 6), Decimal("7.00"), Decimal("5.00"), Decimal("162.00")),
+        ])
+        conta.refresh_from_db()
+        self.assertEqual(conta.saldo_atual, Decimal("162.00"))
+
+    def test_saldo_em_validations_and_company_total(self):
+        conta_a = make_conta(self.company, saldo="10.00")
+        make_conta(self.company, saldo="5.00")
+        conta_b = make_conta(self.company_b, saldo="999.00")
+
+        self.assertEqual(self.client.get("/api/contas-bancarias/saldo-em/").status_code, 400)
+        self.assertEqual(
+            self.client.get("/api/contas-bancarias/saldo-em/", {"data": "31/01/2025"}).status_code, 400
+        )
+        self.assertEqual(
+            self.client.get(
+                "/api/contas-bancarias/saldo-em/", {"data": "2025-01-31", "conta_bancaria_id": conta_b.id}
+            ).status_code,
+            404,
+        )
+        # Sem movimentação: o saldo atual vale para qualquer data
+        self.assertEqual(self._saldo_em(date(2025, 1, 31)), "15.00")
+        self.assertEqual(self._saldo_em(date(2025, 1, 31), conta_a), "10.00")
+
+    def test_rebuild_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        conta = make_conta(self.company, saldo="0.00")
+        self._post_payment(conta, "E", "100.00", date(2025, 2, 1))
+        self._post_payment(conta, "S", "40.00", date(2025, 2, 3))
+        esperado = self._saldos(conta)
+        conta.saldos_diarios.all().delete()
+
+        out = StringIO()
+        call_command("rebuild_saldos_diarios", "--conta", str(conta.id), stdout=out)
+        self.assertIn("2 dia(s)", out.getvalue())
+        self.assertEqual(self._saldos(conta), esperado)
+
+
+class VerifyBalancesTests(APITestBase):
+    def _call(self, *args):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("verify_balances", *args, stdout=out)
+        return out.getvalue()
+
+    def test_detects_and_repairs_drift(self):
+        conta = make_conta(self.company, saldo="100.00")
+        outra = make_conta(self.company_b, saldo="10.00")
+        for tipo, valor, dia in (("E", "50.00", 1), ("S", "20.00", 2)):
+            resp = self.client.post(
+                "/api/pagamentos/",
+                {"tipo": tipo, "conta_bancaria": conta.id, "valor": valor, "data_pagamento": f"2025-04-0{dia}"},
+                format="json",
+            )
+            self.assertEqual(resp.status_code, 201, resp.data)
+        # Edição manual do saldo não é divergência
+        self.client.patch(f"/api/contas-bancarias/{conta.id}/", {"saldo_atual": "200.00"}, format="json")
+        self.assertIn("0 conta(s) divergente(s)", self._call())
+
+        # Pagamento gravado sem atualizar o saldo (caminho que falhou no meio)
+        make_payment(self.company, conta, tipo="E", valor="30.00", data_pagamento=date(2025, 4, 3))
+        ContaBancaria.objects.filter(pk=outra.pk).update(saldo_atual=Decimal("12.00"))
+
+        out = self._call()
+        self.assertIn("2 conta(s) divergente(s), 0 corrigida(s)", out)
+        self.assertIn("calculado 230.00 (diferença 30.00)", out)
+        conta.refresh_from_db()
+        self.assertEqual(conta.saldo_atual, Decimal("200.00"))
+
+        out = self._call("--corrigir", "--company", str(self.company.id))
+        self.assertIn("1 conta(s) divergente(s), 1 corrigida(s)", out)
+        conta.refresh_from_db()
+        self.assertEqual(conta.saldo_atual, Decimal("230.00"))
+        self.assertEqual(
+            list(conta.saldos_diarios.order_by("data").values_list("saldo", flat=True)),
+            [Decimal("220.00"), Decimal("200.00"), Decimal("230.00")],
+        )
+        self.assertIn("0 conta(s) divergente(s)", self._call("--company", str(self.company.id)))
+
+    def test_checkpoint_resumes_after_last_company(self):
+        import os
+        import tempfile
+
+        make_conta(self.company, saldo="1.00")
+        drift = make_conta(self.company_b, saldo="1.00")
+        ContaBancaria.objects.filter(pk=drift.pk).update(saldo_atual=Decimal("5.00"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = os.path.join(tmp, "verify.json")
+            with open(checkpoint, "w") as f:
+                json.dump({"ultima_company_id": self.company.id}, f)
+
+            out = self._call("--checkpoint", checkpoint, "--batch-size", "1")
+            self.assertIn(f"Retomando depois da empresa {self.company.id}", out)
+            self.assertIn(f"conta {drift.id}", out)
+            self.assertFalse(os.path.exists(checkpoint))
+
+
 class PaymentQueryFilterTests(APITestBase):
     def setUp(self):
         super().setUp()
@@ -126,6 +335,62 @@ class PaymentQueryFilterTests(APITestBase):
         self.assertEqual(ids, {self.p2.id})
 
 
+class CursorPaginationTests(APITestBase):
+    def _percorrer(self, url):
+        """Segue os links `next` e devolve (ids na ordem, queries de cada página)."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        ids, consultas = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200, resp.data)
+            self.assertNotIn("count", resp.data)
+            ids += [item["id"] for item in resp.data["results"]]
+            consultas.append([q["sql"] for q in ctx.captured_queries])
+            url = resp.data["next"]
+        return ids, consultas
+
+    def test_cursor_walks_every_payment_once_in_view_order_without_count(self):
+        conta = make_conta(self.company)
+        hoje = date.today()
+        for i in range(25):
+            # Datas e valores repetidos: o desempate fica com o id
+            make_payment(self.company, conta, "E", str(10 + i % 3), data_pagamento=hoje - timedelta(days=i % 4))
+
+        for ordering in ("", "&ordering=valor", "&ordering=-data_pagamento"):
+            ids, consultas = self._percorrer(f"/api/pagamentos/?paginacao=cursor&page_size=10{ordering}")
+            esperado = self.client.get(f"/api/pagamentos/?page_size=100{ordering}").data["results"]
+            self.assertEqual(ids, [item["id"] for item in esperado])
+            self.assertEqual(len(consultas), 3)
+            self.assertFalse(any("COUNT(" in sql for pagina in consultas for sql in pagina))
+
+    def test_estimated_count_and_invalid_cursor(self):
+        conta = make_conta(self.company)
+        for _ in range(3):
+            make_payment(self.company, conta, "E", "10.00")
+        make_payment(self.company_b, make_conta(self.company_b), "E", "10.00")
+
+        resp = self.client.get("/api/pagamentos/?paginacao=cursor&page_size=2&contagem=estimada")
+        self.assertEqual(resp.data["estimated_count"], 3)
+        self.assertIsNotNone(resp.data["next"])
+
+        self.assertEqual(self.client.get("/api/pagamentos/?cursor=adulterado").status_code, 404)
+        cursor = resp.data["next"].split("cursor=")[1]
+        self.assertEqual(self.client.get(f"/api/pagamentos/?cursor={cursor}&ordering=valor").status_code, 404)
+
+    def test_cursor_keeps_nulls_last_on_nullable_ordering(self):
+        cliente = make_cliente(self.company)
+        receitas = [make_receita(self.company, cliente) for _ in range(7)]
+        for i, receita in enumerate(receitas[:3]):
+            receita.data_pagamento = date.today() - timedelta(days=i)
+            receita.save()
+
+        ids, _ = self._percorrer("/api/receitas/?paginacao=cursor&page_size=2&ordering=-data_pagamento")
+        self.assertEqual(ids, [r.id for r in receitas[:3]] + sorted(r.id for r in receitas[3:]))
+
+
 class PaymentImportExtratoTests(APITestBase):
     def _xlsx(self, header, rows):
         wb = Workbook()
@@ -263,6 +528,187 @@ class PaymentImportExtratoTests(APITestBase):
         self.assertEqual(resp.status_code, 201, resp.data)
         self.assertEqual(resp.data["created_count"], 1)
 
+    def test_import_extrato_many_rows_uses_constant_queries_and_net_balance(self):
+        conta = make_conta(self.company, saldo="10.00")
+        make_payment(
+            self.company,
+            conta,
+            tipo="E",
+            valor="5.00",
+            data_pagamento=date.today(),
+            observacao="PIX 0",
+        )
+        rows = [
+            [date.today().strftime("%d/%m/%Y"), f"PIX {i}", f"{i + 5},00" if i % 2 == 0 else f"-{i},00"]
+            for i in range(200)
+        ]
+        xlsx = self._xlsx(["Data", "Descrição do lançamento", "Entradas / Saídas (R$)"], rows)
+
+        # inclui o UPDATE que salva o layout detectado na conta, as 4 consultas do saldo
+        # diário, as 4 do resumo mensal do mês (linhas existentes e UPDATE dos deltas) com
+        # savepoint e o UPDATE da versão dos dados da empresa
+        with self.assertNumQueries(19):
+            resp = self.client.post(
+                "/api/pagamentos/import-extrato/",
+                {"conta_bancaria_id": conta.id, "file": xlsx},
+                format="multipart",
+            )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["created_count"], 199)
+        self.assertEqual(resp.data["skipped_count"], 1)
+        self.assertEqual(resp.data["diferenca"], "0.00")
+
+        conta.refresh_from_db()
+        entradas = sum(Decimal(i + 5) for i in range(2, 200, 2))
+        saidas = sum(Decimal(i) for i in range(1, 200, 2))
+        self.assertEqual(conta.saldo_atual, Decimal("10.00") + entradas - saidas)
+        self.assertEqual(Payment.objects.filter(conta_bancaria=conta).count(), 200)
+
+    def test_import_extrato_header_after_preamble_and_numeric_values(self):
+        conta = make_conta(self.company, saldo="0.00")
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["Extrato de conta corrente"])
+        ws.append([])
+        ws.append(["Data de lançamento", "Descrição do lançamento", "Entradas / Saídas (R$)", "Saldo (R$)"])
+        ws.append([date.today(), "PIX RECEBIDO", 250.5, 250.5])
+        ws.append([date.today(), "TARIFA", -10, 240.5])
+        ws.append([date.today(), "DATA RUIM", "abc", 0])
+        bio = BytesIO()
+        wb.save(bio)
+        bio.seek(0)
+        bio.name = "extrato.xlsx"
+
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/",
+            {"conta_bancaria_id": conta.id, "file": bio},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["created_count"], 2)
+        self.assertEqual(resp.data["total_entradas"], "250.50")
+        self.assertEqual(resp.data["total_saidas"], "10.00")
+        self.assertEqual(resp.data["total_errors"], 1)
+        self.assertTrue(resp.data["errors"][0].startswith("Linha 6:"))
+
+    def test_import_extrato_rejects_non_xlsx_file(self):
+        conta = make_conta(self.company, saldo="0.00")
+        bio = BytesIO(b"isto nao e um xlsx")
+        bio.name = "extrato.xlsx"
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/",
+            {"conta_bancaria_id": conta.id, "file": bio},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    def _upload(self, conta, conteudo: bytes, nome: str):
+        bio = BytesIO(conteudo)
+        bio.name = nome
+        return self.client.post(
+            "/api/pagamentos/import-extrato/",
+            {"conta_bancaria_id": conta.id, "file": bio},
+            format="multipart",
+        )
+
+    def test_import_extrato_csv_semicolon_latin1(self):
+        conta = make_conta(self.company, saldo="0.00")
+        hoje = date.today().strftime("%d/%m/%Y")
+        conteudo = (
+            "Data;Histórico;Valor\r\n"
+            f"{hoje};PIX RECEBIDO JOÃO;1.234,56\r\n"
+            f"{hoje};TARIFA;-10,00\r\n"
+        ).encode("cp1252")
+
+        resp = self._upload(conta, conteudo, "extrato.csv")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["created_count"], 2)
+        self.assertEqual(resp.data["total_entradas"], "1234.56")
+        self.assertEqual(resp.data["total_saidas"], "10.00")
+        self.assertTrue(
+            Payment.objects.filter(conta_bancaria=conta, observacao="PIX RECEBIDO JOÃO").exists()
+        )
+
+        conta.refresh_from_db()
+        self.assertEqual(conta.mapeamento_extrato["formato"], "csv")
+        self.assertEqual(conta.mapeamento_extrato["delimitador"], ";")
+
+    def test_import_extrato_ofx(self):
+        conta = make_conta(self.company, saldo="0.00")
+        hoje = date.today().strftime("%Y%m%d")
+        conteudo = (
+            "OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nCHARSET:1252\n\n"
+            "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+            f"<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>{hoje}120000[-3:BRT]<TRNAMT>250.00<FITID>1<MEMO>PIX RECEBIDO</STMTTRN>"
+            f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>{hoje}<TRNAMT>-40.10<FITID>2<NAME>BOLETO LUZ</STMTTRN>"
+            "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+        ).encode("cp1252")
+
+        resp = self._upload(conta, conteudo, "extrato.ofx")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["created_count"], 2)
+        self.assertEqual(resp.data["saldo_final"], "209.90")
+        self.assertTrue(
+            Payment.objects.filter(conta_bancaria=conta, tipo="S", observacao="BOLETO LUZ").exists()
+        )
+
+    def test_import_extrato_ofx_utf8_header_with_charset_none(self):
+        conta = make_conta(self.company, saldo="0.00")
+        hoje = date.today().strftime("%Y%m%d")
+        conteudo = (
+            "OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nENCODING:UTF-8\nCHARSET:NONE\n\n"
+            "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+            f"<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>{hoje}<TRNAMT>10.00<FITID>1<MEMO>PIX JOÃO CONCEIÇÃO</STMTTRN>"
+            "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+        ).encode("utf-8")
+
+        resp = self._upload(conta, conteudo, "extrato.ofx")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertTrue(Payment.objects.filter(conta_bancaria=conta, observacao="PIX JOÃO CONCEIÇÃO").exists())
+
+    def test_import_extrato_unsupported_extension_returns_400(self):
+        conta = make_conta(self.company, saldo="0.00")
+        resp = self._upload(conta, b"%PDF-1.4", "extrato.pdf")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_import_extrato_reuses_saved_mapping_and_falls_back_on_new_layout(self):
+        conta = make_conta(self.company, saldo="0.00")
+        conta.mapeamento_extrato = {
+            "formato": "xlsx", "header_row": 2, "date_col": 1, "value_col": 3, "desc_col": 2,
+        }
+        conta.save()
+        hoje = date.today().strftime("%d/%m/%Y")
+
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["Extrato"])
+        ws.append(["", "Data", "Descrição", "Valor"])
+        ws.append(["", hoje, "PIX A", "10,00"])
+        bio = BytesIO()
+        wb.save(bio)
+        bio.seek(0)
+        bio.name = "extrato.xlsx"
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/",
+            {"conta_bancaria_id": conta.id, "file": bio},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["created_count"], 1)
+
+        # Layout diferente do salvo: detecta de novo e atualiza o mapeamento
+        xlsx = self._xlsx(["Data", "Descrição", "Valor"], [[hoje, "PIX B", "20,00"]])
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/",
+            {"conta_bancaria_id": conta.id, "file": xlsx},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["created_count"], 1)
+        conta.refresh_from_db()
+        self.assertEqual(conta.mapeamento_extrato["header_row"], 1)
+        self.assertEqual(conta.mapeamento_extrato["date_col"], 0)
+
 
 class PaymentConciliationAndSuggestionTests(APITestBase):
     def test_conciliar_bancario_validates_params(self):
@@ -338,6 +784,292 @@ class PaymentConciliationAndSuggestionTests(APITestBase):
         self.assertEqual(resp.status_code, 200, resp.data)
         self.assertGreaterEqual(resp.data["total_sugestoes"], 1)
 
+    def test_conciliar_custodia_match_and_value_suggestion(self):
+        cliente = make_cliente(self.company, nome="Maria Custodia")
+        custodia_match = make_custodia(self.company, cliente=cliente, tipo="A", valor_total="300.00")
+        custodia_sugerida = make_custodia(self.company, cliente=cliente, tipo="A", valor_total="500.00")
+        conta = make_conta(self.company, saldo="0.00")
+        # Só a saída alocada: nada liquidado ainda, a custódia segue aberta
+        saida = make_payment(self.company, conta, tipo="S", valor="200.00", data_pagamento=date.today())
+        make_allocation(self.company, saida, custodia=custodia_sugerida, valor="200.00")
+
+        p_match = make_payment(
+            self.company, conta, tipo="E", valor="300.00",
+            data_pagamento=date.today(), observacao="PIX RECEBIDO MARIA CUSTODIA",
+        )
+        p_sugestao = make_payment(
+            self.company, conta, tipo="E", valor="500.00",
+            data_pagamento=date.today(), observacao="sem nome",
+        )
+
+        resp = self.client.post(
+            "/api/pagamentos/conciliar-bancario/",
+            {"mes": date.today().month, "ano": date.today().year},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["matches"]["custodias"], 1)
+        self.assertTrue(Allocation.objects.filter(payment=p_match, custodia=custodia_match).exists())
+
+        sugestao = next(s for s in resp.data["sugestoes"] if s["payment_id"] == p_sugestao.id)
+        self.assertEqual(
+            [(o["tipo"], o["entidade_id"], o["entidade_valor"]) for o in sugestao["opcoes"]],
+            [("custodia", custodia_sugerida.id, "500.00")],
+        )
+
+    def test_conciliar_many_same_value_receitas_with_constant_queries(self):
+        conta = make_conta(self.company, saldo="0.00")
+        hoje = date.today()
+        inicio_mes = hoje.replace(day=1)
+        receitas = []
+        for i in range(20):
+            cliente = make_cliente(self.company, nome=f"Cliente Lote {i:02d}")
+            receitas.append(
+                make_receita(
+                    self.company, cliente, valor="100.00", nome=f"Mensalidade {i:02d}",
+                    vencimento=inicio_mes + timedelta(days=i % 3),
+                )
+            )
+            make_payment(
+                self.company, conta, tipo="E", valor="100.00",
+                data_pagamento=hoje, observacao=f"PIX CLIENTE LOTE {i:02d}",
+            )
+
+        # carga (payments, receitas, despesas, custódias) + gravação em lote (alocações e totais
+        # alocados) + deltas do resumo mensal (payments, tipos das receitas, contas cujo valor
+        # sobe, linhas existentes, UPDATE, INSERT e DELETE com savepoints) + versão dos dados
+        with self.assertNumQueries(22):
+            resp = self.client.post(
+                "/api/pagamentos/conciliar-bancario/",
+                {"mes": hoje.month, "ano": hoje.year},
+                format="json",
+            )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["matches"]["receitas"], 20)
+        self.assertEqual(resp.data["total_sugestoes"], 0)
+        for receita in receitas:
+            receita.refresh_from_db()
+            self.assertEqual(receita.situacao, "P")
+            self.assertEqual(receita.allocations.count(), 1)
+
+    def test_conciliar_grouped_suggestion_one_payment_many_receitas(self):
+        conta = make_conta(self.company, saldo="0.00")
+        inicio_mes = date.today().replace(day=1)
+        cliente = make_cliente(self.company, nome="Maria Souza Lima")
+        outro = make_cliente(self.company, nome="Pedro Alves Rocha")
+        mensalidades = [
+            make_receita(self.company, cliente, valor="150.00", nome=f"Mensalidade {i}", vencimento=inicio_mes)
+            for i in range(3)
+        ]
+        make_receita(self.company, outro, valor="150.00", vencimento=inicio_mes)
+        payment = make_payment(
+            self.company, conta, tipo="E", valor="450.00",
+            data_pagamento=date.today(), observacao="PIX RECEBIDO MARIA SOUZA LIMA",
+        )
+
+        resp = self.client.post(
+            "/api/pagamentos/conciliar-bancario/",
+            {"mes": date.today().month, "ano": date.today().year},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["matches"]["total"], 0)
+        self.assertEqual(resp.data["total_sugestoes_agrupadas"], 1)
+        grupo = resp.data["sugestoes_agrupadas"][0]
+        self.assertEqual(grupo["tipo"], "receita")
+        self.assertEqual(grupo["payment_ids"], [payment.id])
+        self.assertEqual(grupo["entidade_ids"], [r.id for r in mensalidades])
+        self.assertEqual(grupo["valor_total"], "450.00")
+
+        sem_grupo = self.client.post(
+            "/api/pagamentos/conciliar-bancario/",
+            {"mes": date.today().month, "ano": date.today().year, "agrupar": False},
+            format="json",
+        )
+        self.assertEqual(sem_grupo.data["sugestoes_agrupadas"], [])
+
+        ok = self.client.post(
+            "/api/pagamentos/confirmar-sugestao/",
+            {"payment_ids": grupo["payment_ids"], "tipo": "receita", "entidade_ids": grupo["entidade_ids"]},
+            format="json",
+        )
+        self.assertEqual(ok.status_code, 200, ok.data)
+        for receita in mensalidades:
+            receita.refresh_from_db()
+            self.assertEqual(receita.situacao, "P")
+            self.assertEqual(receita.allocations.get().valor, Decimal("150.00"))
+
+    def test_conciliar_grouped_suggestion_many_payments_one_despesa(self):
+        conta = make_conta(self.company, saldo="0.00")
+        inicio_mes = date.today().replace(day=1)
+        fornecedor = make_funcionario(self.company, tipo="O", nome="Grafica Horizonte Azul")
+        despesa = make_despesa(self.company, fornecedor, valor="1000.00", vencimento=inicio_mes)
+        parcelas = [
+            make_payment(
+                self.company, conta, tipo="S", valor=valor,
+                data_pagamento=date.today(), observacao="PIX ENVIADO GRAFICA HORIZONTE AZUL",
+            )
+            for valor in ("600.00", "400.00")
+        ]
+
+        resp = self.client.post(
+            "/api/pagamentos/conciliar-bancario/",
+            {"mes": date.today().month, "ano": date.today().year},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        grupo = resp.data["sugestoes_agrupadas"][0]
+        self.assertEqual(grupo["tipo"], "despesa")
+        self.assertEqual(grupo["payment_ids"], [p.id for p in parcelas])
+        self.assertEqual(grupo["entidade_ids"], [despesa.id])
+
+        url = "/api/pagamentos/confirmar-sugestao/"
+        soma_errada = self.client.post(
+            url, {"payment_ids": [parcelas[0].id], "tipo": "despesa", "entidade_ids": [despesa.id]}, format="json"
+        )
+        self.assertEqual(soma_errada.status_code, 400)
+
+        muitos_para_muitos = self.client.post(
+            url,
+            {"payment_ids": [p.id for p in parcelas], "tipo": "despesa", "entidade_ids": [despesa.id, 999999]},
+            format="json",
+        )
+        self.assertEqual(muitos_para_muitos.status_code, 400)
+
+        nao_encontrada = self.client.post(
+            url, {"payment_ids": [p.id for p in parcelas], "tipo": "despesa", "entidade_ids": [999999]}, format="json"
+        )
+        self.assertEqual(nao_encontrada.status_code, 404)
+
+        ok = self.client.post(
+            url, {"payment_ids": [p.id for p in parcelas], "tipo": "despesa", "entidade_ids": [despesa.id]}, format="json"
+        )
+        self.assertEqual(ok.status_code, 200, ok.data)
+        despesa.refresh_from_db()
+        self.assertEqual(despesa.situacao, "P")
+        self.assertEqual(despesa.allocations.count(), 2)
+
+        ja_alocado = self.client.post(
+            url, {"payment_ids": [p.id for p in parcelas], "tipo": "despesa", "entidade_ids": [despesa.id]}, format="json"
+        )
+        self.assertEqual(ja_alocado.status_code, 400)
+
+    def test_combinacao_por_soma_respects_size_cap_and_deadline(self):
+        from core.services.conciliacao import combinacao_por_soma
+
+        valores = [Decimal("10.00")] * 8 + [Decimal("30.00"), Decimal("50.00")]
+        self.assertEqual(combinacao_por_soma(valores, Decimal("80.00")), (8, 9))
+        self.assertEqual(combinacao_por_soma(valores, Decimal("20.00")), (0, 1))
+        self.assertIsNone(combinacao_por_soma(valores[:8], Decimal("80.00"), max_itens=6))
+        self.assertIsNone(combinacao_por_soma(valores, Decimal("80.00"), prazo=0))
+
+    def test_conciliar_periodo_merges_months_and_accounts_deterministically(self):
+        conta_a = make_conta(self.company, nome="Conta A")
+        conta_b = make_conta(self.company, nome="Conta B")
+        cliente = make_cliente(self.company, nome="Beatriz Moura Campos")
+        janeiro = make_receita(self.company, cliente, valor="300.00", vencimento=date(2025, 1, 5))
+        fevereiro = make_receita(self.company, cliente, valor="300.00", vencimento=date(2025, 2, 5))
+        p_jan = make_payment(
+            self.company, conta_a, tipo="E", valor="300.00",
+            data_pagamento=date(2025, 1, 10), observacao="PIX BEATRIZ MOURA CAMPOS",
+        )
+        # Fevereiro: o mesmo valor entra nas duas contas; a receita fica com o payment mais antigo
+        p_fev_b = make_payment(
+            self.company, conta_b, tipo="E", valor="300.00",
+            data_pagamento=date(2025, 2, 8), observacao="PIX BEATRIZ MOURA CAMPOS",
+        )
+        p_fev_a = make_payment(
+            self.company, conta_a, tipo="E", valor="300.00",
+            data_pagamento=date(2025, 2, 9), observacao="PIX BEATRIZ MOURA CAMPOS",
+        )
+
+        resp = self.client.post(
+            "/api/pagamentos/conciliar-periodo/",
+            {"mes_inicio": 1, "ano_inicio": 2025, "mes_fim": 3, "ano_fim": 2025},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["total_payments_processados"], 3)
+        self.assertEqual(resp.data["matches"]["receitas"], 2)
+        self.assertEqual(resp.data["conflitos"], [p_fev_a.id])
+        self.assertEqual(
+            [(p["conta_bancaria_id"], p["mes"], p["matches"]) for p in resp.data["particoes"]],
+            [(conta_a.id, 1, 1), (conta_a.id, 2, 0), (conta_b.id, 2, 1)],
+        )
+        self.assertEqual(janeiro.allocations.get().payment_id, p_jan.id)
+        self.assertEqual(fevereiro.allocations.get().payment_id, p_fev_b.id)
+        self.assertFalse(p_fev_a.allocations.exists())
+
+    def test_conciliar_periodo_validations_and_account_filter(self):
+        url = "/api/pagamentos/conciliar-periodo/"
+        conta_a = make_conta(self.company)
+        conta_b = make_conta(self.company)
+        cliente = make_cliente(self.company, nome="Rafael Torres Dias")
+        make_receita(self.company, cliente, valor="80.00", vencimento=date(2025, 3, 1))
+        make_payment(
+            self.company, conta_b, tipo="E", valor="80.00",
+            data_pagamento=date(2025, 3, 2), observacao="PIX RAFAEL TORRES DIAS",
+        )
+
+        missing = self.client.post(url, {"mes_inicio": 1, "ano_inicio": 2025}, format="json")
+        self.assertEqual(missing.status_code, 400)
+
+        invertido = self.client.post(
+            url, {"mes_inicio": 5, "ano_inicio": 2025, "mes_fim": 1, "ano_fim": 2025}, format="json"
+        )
+        self.assertEqual(invertido.status_code, 400)
+
+        longo = self.client.post(
+            url, {"mes_inicio": 1, "ano_inicio": 2020, "mes_fim": 1, "ano_fim": 2025}, format="json"
+        )
+        self.assertEqual(longo.status_code, 400)
+
+        conta_outra_empresa = make_conta(self.company_b)
+        outra = self.client.post(
+            url,
+            {"mes_inicio": 1, "ano_inicio": 2025, "mes_fim": 3, "ano_fim": 2025, "contas": [conta_outra_empresa.id]},
+            format="json",
+        )
+        self.assertEqual(outra.status_code, 404)
+
+        so_a = self.client.post(
+            url,
+            {"mes_inicio": 1, "ano_inicio": 2025, "mes_fim": 3, "ano_fim": 2025, "contas": [conta_a.id]},
+            format="json",
+        )
+        self.assertEqual(so_a.status_code, 200, so_a.data)
+        self.assertEqual(so_a.data["total_payments_processados"], 0)
+        self.assertEqual(so_a.data["particoes"], [])
+
+        so_b = self.client.post(
+            url,
+            {"mes_inicio": 1, "ano_inicio": 2025, "mes_fim": 3, "ano_fim": 2025, "contas": [conta_b.id]},
+            format="json",
+        )
+        self.assertEqual(so_b.data["matches"]["receitas"], 1)
+
+    @override_settings(CONCILIACAO_WORKERS=4)
+    def test_conciliar_periodo_uses_process_pool_only_in_worker(self):
+        from unittest import mock
+
+        from core.services import conciliacao_periodo
+
+        conta_a = make_conta(self.company)
+        conta_b = make_conta(self.company)
+        for conta in (conta_a, conta_b):
+            make_payment(self.company, conta, tipo="E", valor="10.00", data_pagamento=date(2025, 1, 10))
+        corpo = {"mes_inicio": 1, "ano_inicio": 2025, "mes_fim": 1, "ano_fim": 2025}
+
+        with mock.patch.object(
+            conciliacao_periodo, "_calcular_particoes", wraps=conciliacao_periodo._calcular_particoes
+        ) as calcular:
+            self.client.post("/api/pagamentos/conciliar-periodo/", corpo, format="json")
+            self.client.post("/api/pagamentos/conciliar-periodo/?async=1", corpo, format="json")
+            call_command("run_worker", "--once", stdout=StringIO())
+
+        # (company_id, particoes, agrupar, workers): em série no request, pool no worker
+        self.assertEqual([chamada.args[3] for chamada in calcular.call_args_list], [1, 2])
+
     def test_confirmar_sugestao_validations_and_success(self):
         cliente = make_cliente(self.company)
         receita = make_receita(self.company, cliente, valor="120.00", nome="Rec Confirm")
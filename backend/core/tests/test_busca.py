@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.models import Receita
+from core.tests.base import APITestBase
+from core.tests.factories import (
+    make_allocation,
+    make_cliente,
+    make_conta,
+    make_funcionario,
+    make_payment,
+    make_receita,
+)
+
+
+class ListSearchTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.cliente = make_cliente(self.company, nome="José Araújo")
+        self.honorarios = make_receita(self.company, self.cliente, nome="Honorários Março", valor="1500.00")
+        self.consultoria = make_receita(
+            self.company, make_cliente(self.company), nome="Consultoria", valor="1500.40",
+            vencimento=date(2024, 3, 15),
+        )
+        make_receita(self.company_b, make_cliente(self.company_b), nome="Honorários", valor="1500.00")
+
+    def search(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return {item["id"] for item in self.results(resp)}
+
+    def test_text_terms_are_accent_folded_and_all_required(self):
+        self.assertEqual(self.search("/api/receitas/?search=HONORARIOS marco"), {self.honorarios.id})
+        # Termo casando pelo nome do cliente
+        self.assertEqual(self.search("/api/receitas/?search=araujo honor"), {self.honorarios.id})
+        self.assertEqual(self.search("/api/receitas/?search=honorarios consultoria"), set())
+
+    def test_money_and_date_terms(self):
+        self.assertEqual(self.search("/api/receitas/?search=1.500,00"), {self.honorarios.id})
+        # Sem centavos: o real inteiro
+        self.assertEqual(self.search("/api/receitas/?search=R$ 1500"), {self.honorarios.id, self.consultoria.id})
+        self.assertEqual(self.search("/api/receitas/?search=15/03/2024"), {self.consultoria.id})
+        self.assertEqual(self.search("/api/receitas/?search=03/2024"), {self.consultoria.id})
+
+    def test_payment_search_through_allocations_returns_each_payment_once(self):
+        conta = make_conta(self.company, nome="Banco Central")
+        payment = make_payment(self.company, conta, "E", "200.00", observacao="credito")
+        outra = make_receita(self.company, self.cliente, nome="Honorários Abril", valor="100.00")
+        make_allocation(self.company, payment, "100.00", receita=make_receita(self.company, self.cliente, nome="Honorários Maio", valor="100.00"))
+        make_allocation(self.company, payment, "100.00", receita=outra)
+        make_payment(self.company, conta, "E", "50.00", observacao="outro")
+
+        resp = self.client.get("/api/pagamentos/?search=honorarios")
+        self.assertEqual([item["id"] for item in self.results(resp)], [payment.id])
+        self.assertEqual(len(self.search("/api/pagamentos/?search=central")), 2)
+
+    def test_reindex_command_rebuilds_documents(self):
+        Receita.objects.filter(pk=self.honorarios.pk).update(nome="Taxa Única", busca="")
+
+        out = StringIO()
+        call_command("reindexar_busca", stdout=out)
+        self.assertIn("Receita: 1 atualizado(s)", out.getvalue())
+        self.honorarios.refresh_from_db()
+        self.assertEqual(self.honorarios.busca, "taxa unica")
+
+
+class UnifiedSearchTests(APITestBase):
+    def test_ranked_hits_across_entity_types(self):
+        cliente = make_cliente(self.company, nome="Silva Advogados")
+        funcionario = make_funcionario(self.company, nome="Ana Silvana")
+        receita = make_receita(self.company, cliente, nome="Parecer", valor="300.00", vencimento=date.today() + timedelta(days=1))
+        make_cliente(self.company_b, nome="Silva Outra Empresa")
+
+        resp = self.client.get("/api/busca/?q=silva")
+        self.assertEqual(resp.status_code, 200)
+        hits = [(r["tipo"], r["id"]) for r in resp.data["resultados"]]
+        # Palavra inteira (no título ou no detalhe) vem antes de começo de palavra
+        self.assertEqual(hits, [("cliente", cliente.id), ("receita", receita.id), ("funcionario", funcionario.id)])
+        self.assertEqual([r["relevancia"] for r in resp.data["resultados"]], [3, 3, 2])
+
+        so_receitas = self.client.get("/api/busca/?q=silva 300&tipos=receita")
+        self.assertEqual([(r["tipo"], r["id"]) for r in so_receitas.data["resultados"]], [("receita", receita.id)])
+
+    def test_best_match_survives_the_per_type_limit(self):
+        exato = make_cliente(self.company, nome="Silva")
+        for i in range(3):
+            make_cliente(self.company, nome=f"Silvana {i}")
+
+        resp = self.client.get("/api/busca/?q=silva&limite=2")
+        self.assertEqual(resp.data["resultados"][0]["id"], exato.id)
+        self.assertEqual([r["relevancia"] for r in resp.data["resultados"]], [3, 2])
+
+    def test_validation(self):
+        self.assertEqual(self.client.get("/api/busca/?q=a").status_code, 400)
+        self.assertEqual(self.client.get("/api/busca/?q=silva&tipos=banco").status_code, 400)
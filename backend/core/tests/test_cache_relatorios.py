@@ -0,0 +1,115 @@
+from datetime import date
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.models import VersaoDados
+from core.services.alocacoes import criar_alocacoes_em_lote
+from core.services.versao import versao_dados
+from core.tests.base import APITestBase
+from core.tests.factories import make_cliente, make_conta, make_payment, make_receita
+
+MARCO = date(2026, 3, 10)
+
+
+class CacheRelatoriosTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.cliente = make_cliente(self.company)
+        self.conta = make_conta(self.company, nome="Banco A")
+        self.receita = make_receita(self.company, self.cliente, valor="300.00", vencimento=MARCO)
+
+    def test_json_report_served_from_cache_until_a_write(self):
+        primeira = self.client.get("/api/relatorios/dre/?mes=3&ano=2026")
+        # Mesmos parâmetros em outra ordem: só a leitura da versão
+        with self.assertNumQueries(1):
+            segunda = self.client.get("/api/relatorios/dre/?ano=2026&mes=3")
+        self.assertEqual(primeira.data, segunda.data)
+        self.assertEqual(self.client.get("/api/relatorios/dre/?mes=4&ano=2026").data["receitas"]["fixas"], 0.0)
+
+        make_receita(self.company, self.cliente, valor="50.00", vencimento=MARCO)
+        self.assertEqual(self.client.get("/api/relatorios/dre/?mes=3&ano=2026").data["receitas"]["fixas"], 350.0)
+
+    def test_pdf_served_from_cache_with_headers(self):
+        primeira = self.client.get("/api/pdf/receitas-a-receber/")
+        self.assertEqual(primeira.status_code, 200)
+        with self.assertNumQueries(1):
+            segunda = self.client.get("/api/pdf/receitas-a-receber/")
+        self.assertEqual(segunda.content, primeira.content)
+        self.assertEqual(segunda["Content-Type"], "application/pdf")
+        self.assertEqual(segunda["Content-Disposition"], primeira["Content-Disposition"])
+
+    def test_async_request_still_enqueues_when_cached(self):
+        self.client.get("/api/pdf/receitas-a-receber/")
+        self.assertEqual(self.client.get("/api/pdf/receitas-a-receber/?async=1").status_code, 202)
+
+    def test_version_follows_company_writes_and_transactions(self):
+        inicial = versao_dados(self.company.id)
+        outra = versao_dados(self.company_b.id)
+
+        make_payment(self.company_b, make_conta(self.company_b), "E", "10.00")
+        self.assertEqual(versao_dados(self.company.id), inicial)
+        self.assertGreater(versao_dados(self.company_b.id), outra)
+
+        # Lote com bulk_create (sem sinais de Allocation) também sobe
+        payment = make_payment(self.company, self.conta, "E", "300.00", data_pagamento=MARCO)
+        antes = versao_dados(self.company.id)
+        criar_alocacoes_em_lote(self.company, [{"payment_id": payment.id, "receita_id": self.receita.id, "valor": "300.00"}])
+        self.assertGreater(versao_dados(self.company.id), antes)
+
+        # Desfeita junto com a gravação
+        antes = versao_dados(self.company.id)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            make_payment(self.company, self.conta, "E", "1.00")
+            raise RuntimeError
+        self.assertEqual(versao_dados(self.company.id), antes)
+
+    def test_company_without_counter_is_not_cached(self):
+        VersaoDados.objects.filter(company=self.company).delete()
+        self.client.get("/api/relatorios/dre/?mes=3&ano=2026")
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get("/api/relatorios/dre/?mes=3&ano=2026")
+        self.assertGreater(len(consultas), 1)
+
+
+class RespostaCondicionalTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.cliente = make_cliente(self.company)
+        self.conta = make_conta(self.company)
+        make_receita(self.company, self.cliente, valor="300.00", vencimento=MARCO)
+
+    def test_list_answers_304_until_a_write(self):
+        primeira = self.client.get("/api/receitas/?page_size=10")
+        etag = primeira["ETag"]
+        self.assertIn("no-cache", primeira["Cache-Control"])
+
+        resp = self.client.get("/api/receitas/?page_size=10", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], etag)
+        self.assertEqual(resp.content, b"")
+        # Lista de ETags e forma fraca também valem; outros parâmetros, não
+        lista = f'"outra", W/{etag}'
+        self.assertEqual(self.client.get("/api/receitas/?page_size=10", HTTP_IF_NONE_MATCH=lista).status_code, 304)
+        self.assertEqual(self.client.get("/api/receitas/?page_size=20", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        make_payment(self.company, self.conta, "E", "10.00")
+        resp = self.client.get("/api/receitas/?page_size=10", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_304_skips_the_queryset(self):
+        etag = self.client.get("/api/pagamentos/")["ETag"]
+        with CaptureQueriesContext(connection) as consultas:
+            resp = self.client.get("/api/pagamentos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertFalse(any("core_payment" in consulta["sql"] for consulta in consultas.captured_queries))
+
+    def test_reports_and_dashboard_send_etag(self):
+        for url in ("/api/relatorios/dre/?mes=3&ano=2026", "/api/dashboard/"):
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Outra empresa com a mesma URL tem outra assinatura
+        self.auth_as(self.user_b)
+        self.assertEqual(self.client.get("/api/dashboard/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
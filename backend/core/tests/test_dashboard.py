@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F, Sum
+
+from core.models import ContaBancaria, Receita
+from core.services.dashboard import _somar_meses
+from core.tests.base import APITestBase
+from core.tests.factories import (
+    make_allocation,
+    make_cliente,
+    make_conta,
+    make_despesa,
+    make_funcionario,
+    make_payment,
+    make_receita,
+    make_transfer,
+)
+
+
+class DashboardTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        hoje = date.today()
+        self.conta = make_conta(self.company, saldo="1000.00")
+        outra_conta = make_conta(self.company)
+        cliente = make_cliente(self.company, nome="Cliente Aniversário")
+        cliente.aniversario = hoje.replace(year=1992)  # bissexto: vale também para 29/02
+        cliente.save()
+        funcionario = make_funcionario(self.company, tipo="P")
+
+        # Mês atual: entrada de 300 alocada a uma receita fixa, saída de 100
+        receita = make_receita(self.company, cliente, valor="500.00", tipo="F", vencimento=hoje)
+        make_allocation(self.company, make_payment(self.company, self.conta, "E", "300.00"), "300.00", receita=receita)
+        make_payment(self.company, self.conta, "S", "100.00")
+        # Transferência não entra no fluxo
+        transfer = make_transfer(self.company, self.conta, outra_conta, valor="40.00")
+        make_allocation(self.company, make_payment(self.company, self.conta, "S", "40.00"), "40.00", transfer=transfer)
+        # Dois meses atrás
+        self.dois_meses = _somar_meses(hoje.replace(day=1), -2)
+        make_payment(self.company, self.conta, "E", "50.00", data_pagamento=self.dois_meses)
+
+        # Vencida que a varredura ainda não gravou
+        vencida = make_receita(self.company, cliente, valor="200.00", vencimento=hoje - timedelta(days=3))
+        Receita.objects.filter(pk=vencida.pk).update(situacao="A")
+        self.despesa = make_despesa(self.company, funcionario, nome="Aluguel", valor="80.00", vencimento=hoje + timedelta(days=3))
+
+        # Outra empresa não aparece
+        make_payment(self.company_b, make_conta(self.company_b), "E", "999.00")
+
+    def test_payload(self):
+        data = self.client.get("/api/dashboard/").data
+        saldo = ContaBancaria.objects.filter(company=self.company).aggregate(total=Sum("saldo_atual"))["total"]
+
+        self.assertEqual(data["saldoTotal"], float(saldo))
+        self.assertEqual(data["resultadoMesAtual"], 200.0)
+        self.assertEqual(data["receitasVencidas"], 1)
+        self.assertEqual(data["valorReceitasVencidas"], 200.0)
+        self.assertEqual(data["despesasProjetadas"], 80.0)
+        self.assertEqual(data["receitaPorTipoData"], [{"name": "Receita Fixa", "value": 300.0}])
+        self.assertEqual(len(data["fluxoCaixaData"]), 6)
+        self.assertEqual(data["fluxoCaixaData"][-1]["receita"], 300.0)
+        self.assertEqual(data["fluxoCaixaData"][-1]["despesa"], 100.0)
+        self.assertEqual(data["fluxoCaixaData"][-3]["receita"], 50.0)
+        no_mes = self.despesa.data_vencimento.month == date.today().month
+        self.assertEqual(data["receitaVsDespesaData"][-1]["despesa"], 80.0 if no_mes else 0.0)
+        self.assertEqual(
+            [(d["nome"], d["valor"]) for d in data["despesasProximas"]], [("Aluguel", 80.0)]
+        )
+        self.assertEqual([c["nome"] for c in data["aniversariantes"]["clientes"]], ["Cliente Aniversário"])
+        self.assertEqual(data["aniversariantes"]["funcionarios"], [])
+
+    def test_cold_query_budget_and_warm_cache(self):
+        # + a leitura da versão dos dados da empresa (chave do cache)
+        with self.assertNumQueries(7):
+            primeira = self.client.get("/api/dashboard/")
+        with self.assertNumQueries(1):
+            segunda = self.client.get("/api/dashboard/")
+        self.assertEqual(primeira.data, segunda.data)
+
+    def test_writes_invalidate_company_cache(self):
+        antes = self.client.get("/api/dashboard/").data["resultadoMesAtual"]
+
+        make_payment(self.company, self.conta, "E", "25.00")
+        self.assertEqual(self.client.get("/api/dashboard/").data["resultadoMesAtual"], antes + 25.0)
+
+        # Gravação de outra empresa não invalida esta
+        make_payment(self.company_b, make_conta(self.company_b), "E", "1.00")
+        with self.assertNumQueries(1):
+            self.client.get("/api/dashboard/")
+
+        self.despesa.delete()
+        self.assertEqual(self.client.get("/api/dashboard/").data["despesasProximas"], [])
+
+    def test_repair_commands_invalidate_company_cache(self):
+        corrigir = ("verify_balances", "--corrigir", "--company", str(self.company.id))
+        call_command(*corrigir, stdout=StringIO())
+        certo = ContaBancaria.objects.filter(company=self.company).aggregate(total=Sum("saldo_atual"))["total"]
+
+        # Saldo corrompido por fora do ORM (sem sinais) e guardado no cache
+        ContaBancaria.objects.filter(pk=self.conta.pk).update(saldo_atual=F("saldo_atual") + 500)
+        self.assertEqual(self.client.get("/api/dashboard/").data["saldoTotal"], float(certo) + 500)
+
+        # O reparo sobe a versão: o GET seguinte recalcula
+        call_command(*corrigir, stdout=StringIO())
+        self.assertEqual(self.client.get("/api/dashboard/").data["saldoTotal"], float(certo))
@@ -0,0 +1,57 @@
+from datetime import date
+
+from core.services.dre import calcular_dre, periodo_dre
+from core.tests.base import APITestBase
+from core.tests.factories import make_cliente, make_despesa, make_funcionario, make_receita
+
+
+class DRETests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        cliente = make_cliente(self.company)
+        funcionario = make_funcionario(self.company)
+        make_receita(self.company, cliente, valor="300.00", tipo="F", vencimento=date(2026, 1, 10))
+        make_receita(self.company, cliente, valor="100.00", tipo="V", vencimento=date(2026, 3, 5))
+        make_despesa(self.company, funcionario, valor="80.00", tipo="C", vencimento=date(2026, 3, 20))
+        make_despesa(self.company, funcionario, valor="20.00", tipo="R", vencimento=date(2026, 12, 31))
+        make_receita(self.company_b, make_cliente(self.company_b), valor="999.00", vencimento=date(2026, 3, 5))
+
+    def test_year_in_one_query_with_month_columns(self):
+        with self.assertNumQueries(1):
+            dre = calcular_dre(self.company.id, date(2026, 1, 1), date(2026, 12, 1))
+
+        self.assertEqual(len(dre["meses"]), 12)
+        self.assertEqual(dre["receitas"]["total"], 400)
+        self.assertEqual(dre["despesas"]["total"], 100)
+        self.assertEqual(dre["resultado"], 300)
+        marco = dre["meses"][2]
+        self.assertEqual(marco["mes"], date(2026, 3, 1))
+        self.assertEqual((marco["receitas"]["variaveis"], marco["despesas"]["comissoes"], marco["resultado"]), (100, 80, 20))
+        self.assertEqual(dre["meses"][1]["resultado"], 0)
+
+    def test_period_params(self):
+        hoje = date(2026, 5, 17)
+        self.assertEqual(periodo_dre({}, hoje), (date(2026, 5, 1), date(2026, 5, 1)))
+        self.assertEqual(periodo_dre({"mes": "3", "ano": "2026"}), (date(2026, 3, 1), date(2026, 3, 1)))
+        self.assertEqual(periodo_dre({"ano": "2026"}), (date(2026, 1, 1), date(2026, 12, 1)))
+        self.assertEqual(periodo_dre({"inicio": "2025-11", "fim": "2026-02"}), (date(2025, 11, 1), date(2026, 2, 1)))
+        for params in ({"inicio": "2026-03", "fim": "2026-01"}, {"inicio": "2020-01", "fim": "2026-01"}, {"mes": "x", "ano": "2026"}):
+            with self.assertRaises(ValueError):
+                periodo_dre(params)
+
+    def test_json_and_pdf_share_the_engine(self):
+        anual = self.client.get("/api/relatorios/dre/?ano=2026").data
+        self.assertEqual((anual["inicio"], anual["fim"]), ("2026-01", "2026-12"))
+        self.assertEqual((anual["receitas"]["fixas"], anual["despesas"]["reembolsos"], anual["resultado"]), (300.0, 20.0, 300.0))
+        self.assertEqual([m["mes"] for m in anual["meses"]][:3], ["2026-01", "2026-02", "2026-03"])
+
+        mensal = self.client.get("/api/relatorios/dre/?mes=3&ano=2026").data
+        self.assertEqual((len(mensal["meses"]), mensal["resultado"]), (1, 20.0))
+        self.assertEqual(self.client.get("/api/relatorios/dre/?inicio=2026-05&fim=2026-01").status_code, 400)
+
+        pdf = self.client.get("/api/pdf/dre/?ano=2026")
+        self.assertEqual(pdf.status_code, 200)
+        self.assertIn("dre_01_2026_a_12_2026.pdf", pdf["Content-Disposition"])
+        detalhe = self.client.get("/api/pdf/dre-detalhe/?ano=2026&tipo_relatorio=despesa&tipo=R")
+        self.assertEqual(detalhe.status_code, 200)
+        self.assertIn("dre_despesas_r_01_2026_a_12_2026.pdf", detalhe["Content-Disposition"])
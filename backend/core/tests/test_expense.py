@@ -1,4 +1,9 @@
 from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from core.models import Allocation, Despesa, Payment
 from core.tests.base import APITestBase
@@ -33,7 +38,7 @@ class DespesaViewSetTests(APITestBase):
         despesa.refresh_from_db()
         self.assertEqual(despesa.situacao, "P")
 
-    def test_get_queryset_auto_marks_overdue(self):
+    def test_get_queryset_derives_overdue_without_writing(self):
         responsavel = make_funcionario(self.company, tipo="F")
         despesa = Despesa.objects.create(
             company=self.company,
@@ -45,8 +50,22 @@ class DespesaViewSetTests(APITestBase):
             situacao="A",
         )
 
-        response = self.client.get("/api/despesas/")
+        Despesa.objects.filter(pk=despesa.pk).update(situacao="A")
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get("/api/despesas/")
         self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in consultas if q["sql"].lstrip().upper().startswith("UPDATE")])
+        item = self.results(response)[0]
+        self.assertEqual((item["situacao"], item["situacao_display"]), ("V", "Vencida"))
+        self.assertEqual(
+            [r["id"] for r in self.results(self.client.get("/api/despesas/?situacao=V"))], [despesa.id]
+        )
+        self.assertEqual(self.results(self.client.get("/api/despesas/?situacao=A")), [])
+        despesa.refresh_from_db()
+        self.assertEqual(despesa.situacao, "A")
+
+        call_command("marcar_vencidas", stdout=StringIO())
         despesa.refresh_from_db()
         self.assertEqual(despesa.situacao, "V")
 
@@ -0,0 +1,181 @@
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from openpyxl import Workbook
+
+from core.models import Job, Payment
+from core.services.jobs import executar_job, informar_progresso, reenfileirar_travados, reservar_proximo_job
+from core.tests.base import APITestBase
+from core.tests.factories import make_conta
+
+
+def _run_worker():
+    call_command("run_worker", "--once", stdout=StringIO())
+
+
+class JobAsyncEndpointTests(APITestBase):
+    def _xlsx(self, rows):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["Data", "Descrição do lançamento", "Entradas / Saídas (R$)"])
+        for r in rows:
+            ws.append(r)
+        bio = BytesIO()
+        wb.save(bio)
+        bio.seek(0)
+        bio.name = "extrato.xlsx"
+        return bio
+
+    def test_import_extrato_async_enqueues_and_worker_runs_it(self):
+        conta = make_conta(self.company, saldo="0.00")
+        hoje = date.today().strftime("%d/%m/%Y")
+        xlsx = self._xlsx([[hoje, "PIX A", "100,00"], [hoje, "TARIFA", "-5,00"]])
+
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/?async=1",
+            {"conta_bancaria_id": conta.id, "file": xlsx},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 202, resp.data)
+        job_id = resp.data["job_id"]
+        self.assertEqual(resp.data["status_url"], f"/api/jobs/{job_id}/")
+        self.assertEqual(Payment.objects.filter(conta_bancaria=conta).count(), 0)
+
+        status_resp = self.client.get(f"/api/jobs/{job_id}/")
+        self.assertEqual(status_resp.data["status"], "pendente")
+
+        _run_worker()
+
+        status_resp = self.client.get(f"/api/jobs/{job_id}/")
+        self.assertEqual(status_resp.status_code, 200)
+        self.assertEqual(status_resp.data["status"], "concluido", status_resp.data)
+        self.assertEqual(status_resp.data["progresso"], 100)
+        self.assertEqual(status_resp.data["resultado_status_code"], 201)
+        self.assertEqual(status_resp.data["resultado"]["created_count"], 2)
+        self.assertEqual(Payment.objects.filter(conta_bancaria=conta).count(), 2)
+
+    def test_pdf_async_result_is_downloadable(self):
+        resp = self.client.get("/api/pdf/receitas-pagas/?async=1")
+        self.assertEqual(resp.status_code, 202)
+        job_id = resp.data["job_id"]
+
+        pendente = self.client.get(f"/api/jobs/{job_id}/download/")
+        self.assertEqual(pendente.status_code, 409)
+
+        _run_worker()
+
+        status_resp = self.client.get(f"/api/jobs/{job_id}/")
+        self.assertEqual(status_resp.data["status"], "concluido", status_resp.data)
+        self.assertTrue(status_resp.data["tem_arquivo"])
+
+        download = self.client.get(f"/api/jobs/{job_id}/download/")
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download["Content-Type"], "application/pdf")
+        self.assertTrue(download.content.startswith(b"%PDF"))
+
+    def test_failed_request_marks_job_as_error(self):
+        resp = self.client.post("/api/pagamentos/import-extrato/?async=1", {}, format="multipart")
+        self.assertEqual(resp.status_code, 202)
+
+        _run_worker()
+
+        job = Job.objects.get(pk=resp.data["job_id"])
+        self.assertEqual(job.status, "erro")
+        self.assertEqual(job.resultado_status_code, 400)
+        self.assertEqual(job.erro, "Arquivo não fornecido")
+
+    @override_settings(JOBS_MAX_ARQUIVO_MB=0)
+    def test_oversized_upload_is_not_enqueued(self):
+        conta = make_conta(self.company)
+        resp = self.client.post(
+            "/api/pagamentos/import-extrato/?async=1",
+            {"conta_bancaria_id": conta.id, "file": self._xlsx([])},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 413)
+        self.assertFalse(Job.objects.exists())
+
+    def test_jobs_are_scoped_by_company(self):
+        resp = self.client.get("/api/pdf/receitas-pagas/?async=1")
+        job_id = resp.data["job_id"]
+
+        self.auth_as(self.user_b)
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}/").status_code, 404)
+
+    def test_sync_request_still_runs_inline(self):
+        resp = self.client.get("/api/pdf/receitas-pagas/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Job.objects.count(), 0)
+
+
+class JobQueueTests(APITestBase):
+    def _job(self, **kwargs):
+        return Job.objects.create(
+            company=self.company,
+            usuario=self.user,
+            tipo="pdf",
+            parametros={"method": "GET", "path": "/api/pdf/receitas-pagas/", "query": ""},
+            **kwargs,
+        )
+
+    def test_reserva_job_mais_antigo_uma_unica_vez(self):
+        primeiro = self._job()
+        segundo = self._job()
+
+        reservado = reservar_proximo_job("w1")
+        self.assertEqual(reservado.pk, primeiro.pk)
+        self.assertEqual(reservado.status, "executando")
+        self.assertEqual(reservado.tentativas, 1)
+
+        self.assertEqual(reservar_proximo_job("w2").pk, segundo.pk)
+        self.assertIsNone(reservar_proximo_job("w3"))
+
+    def test_reenfileirar_travados(self):
+        antigo = timezone.now() - timedelta(hours=2)
+        travado = self._job(status="executando", iniciado_em=antigo, tentativas=1)
+        esgotado = self._job(status="executando", iniciado_em=antigo, tentativas=3)
+        recente = self._job(status="executando", iniciado_em=timezone.now(), tentativas=1)
+
+        self.assertEqual(reenfileirar_travados(30), 2)
+
+        travado.refresh_from_db()
+        esgotado.refresh_from_db()
+        recente.refresh_from_db()
+        self.assertEqual(travado.status, "pendente")
+        self.assertEqual(esgotado.status, "erro")
+        self.assertEqual(recente.status, "executando")
+
+    def test_job_com_sinal_de_vida_nao_volta_para_a_fila(self):
+        antigo = timezone.now() - timedelta(hours=2)
+        longo = self._job(
+            status="executando", worker="w1", iniciado_em=antigo, atualizado_em=antigo, tentativas=1
+        )
+        vivo = self._job(
+            status="executando", worker="w1", iniciado_em=antigo, atualizado_em=antigo, tentativas=1
+        )
+        # A view do job informa progresso: renova o sinal de vida
+        informar_progresso(SimpleNamespace(job=vivo), 50)
+
+        self.assertEqual(reenfileirar_travados(30), 1)
+
+        longo.refresh_from_db()
+        vivo.refresh_from_db()
+        self.assertEqual(longo.status, "pendente")
+        self.assertEqual((vivo.status, vivo.progresso), ("executando", 50))
+
+    def test_execucao_antiga_nao_sobrescreve_job_devolvido_a_fila(self):
+        self._job()
+        job = reservar_proximo_job("w1")
+        # Dado como travado no meio da execução e reservado por outro worker
+        Job.objects.filter(pk=job.pk).update(status="pendente", worker="")
+        reservar_proximo_job("w2")
+
+        executar_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.tentativas), ("executando", "w2", 2))
+        self.assertIsNone(job.finalizado_em)
@@ -86,3 +86,144 @@ class ModelStatusTests(APITestBase):
         make_allocation(self.company, saida2, valor="60.00", custodia=custodia)
         custodia.atualizar_status()
         self.assertEqual(custodia.status, "L")
+
+
+class BulkStatusTests(APITestBase):
+    def test_bulk_recalculation_matches_per_object_rules(self):
+        from core.models import Custodia, Despesa, Receita, Transfer
+        from core.services.status import recalcular_status
+
+        cliente = make_cliente(self.company)
+        responsavel = make_funcionario(self.company)
+        conta = make_conta(self.company)
+        outra_conta = make_conta(self.company)
+        ontem = date.today() - timedelta(days=1)
+
+        paga = make_receita(self.company, cliente, valor="100.00")
+        vencida = make_receita(self.company, cliente, valor="100.00", vencimento=ontem)
+        excedida = make_despesa(self.company, responsavel, valor="50.00")
+        custodia = make_custodia(self.company, cliente=cliente, tipo="P", valor_total="100.00")
+        transfer = make_transfer(self.company, conta, outra_conta, valor="80.00")
+        make_allocation(self.company, make_payment(self.company, conta, "E", "100.00"), "100.00", receita=paga)
+        make_allocation(self.company, make_payment(self.company, conta, "S", "70.00"), "70.00", despesa=excedida)
+        make_allocation(self.company, make_payment(self.company, conta, "E", "40.00"), "40.00", custodia=custodia)
+        make_allocation(self.company, make_payment(self.company, conta, "S", "40.00"), "40.00", custodia=custodia)
+        make_allocation(self.company, make_payment(self.company, conta, "S", "80.00"), "80.00", transfer=transfer)
+
+        outra_empresa = make_receita(self.company_b, make_cliente(self.company_b), valor="10.00", situacao="P")
+
+        # Estado corrompido (ex.: depois de uma migração de dados)
+        Receita.objects.filter(company=self.company).update(situacao="A")
+        Despesa.objects.filter(pk=excedida.pk).update(situacao="A")
+        Custodia.objects.filter(pk=custodia.pk).update(status="A", valor_liquidado=0)
+        Transfer.objects.filter(pk=transfer.pk).update(status="P")
+
+        resultado = recalcular_status(company=self.company)
+        self.assertEqual(resultado, {"receitas": 2, "despesas": 1, "custodias": 1, "transferencias": 1})
+        self.assertEqual(recalcular_status(company=self.company), dict.fromkeys(resultado, 0))
+
+        for obj in (paga, vencida, excedida, custodia, transfer, outra_empresa):
+            obj.refresh_from_db()
+        self.assertEqual((paga.situacao, vencida.situacao), ("P", "V"))
+        self.assertEqual((excedida.situacao, str(excedida.valor)), ("P", "70.00"))
+        self.assertEqual((custodia.status, str(custodia.valor_liquidado)), ("P", "40.00"))
+        self.assertEqual(transfer.status, "M")
+        self.assertEqual(outra_empresa.situacao, "P")
+
+    def test_command_rebuilds_totals_before_status(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from core.models import Receita
+
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        receita = make_receita(self.company, cliente, valor="100.00")
+        make_allocation(self.company, make_payment(self.company, conta, "E", "100.00"), "100.00", receita=receita)
+        Receita.objects.filter(pk=receita.pk).update(total_alocado=0, situacao="A")
+
+        out = StringIO()
+        call_command("recalcular_status", "--company", str(self.company.id), "--recalcular-totais", stdout=out)
+        self.assertIn("receitas: 1 alterada(s)", out.getvalue())
+        receita.refresh_from_db()
+        self.assertEqual((receita.situacao, str(receita.total_alocado)), ("P", "100.00"))
+
+
+class StatusEmLoteTests(APITestBase):
+    def test_marks_are_deduplicated_and_flushed_once_at_the_end(self):
+        from unittest import mock
+
+        from core.models import Receita
+        from core.services import status as status_service
+
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        receita = make_receita(self.company, cliente, valor="100.00")
+        make_allocation(self.company, make_payment(self.company, conta, "E", "100.00"), "100.00", receita=receita)
+        Receita.objects.filter(pk=receita.pk).update(situacao="A")
+
+        with mock.patch.object(
+            status_service, "recalcular_status", wraps=status_service.recalcular_status
+        ) as recalcular:
+            with status_service.status_em_lote():
+                status_service.marcar_status(receita_ids=[receita.id])
+                with status_service.status_em_lote():
+                    status_service.marcar_status(receita_ids=[receita.id])
+                receita.refresh_from_db()
+                self.assertEqual(receita.situacao, "A")
+
+        recalcular.assert_called_once_with(
+            receita_ids={receita.id}, despesa_ids=set(), custodia_ids=set(), transfer_ids=set()
+        )
+        receita.refresh_from_db()
+        self.assertEqual(receita.situacao, "P")
+
+    def test_nothing_is_recalculated_when_the_block_fails(self):
+        from core.models import Receita
+        from core.services.status import marcar_status, status_em_lote
+
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        receita = make_receita(self.company, cliente, valor="100.00")
+        make_allocation(self.company, make_payment(self.company, conta, "E", "100.00"), "100.00", receita=receita)
+        Receita.objects.filter(pk=receita.pk).update(situacao="A")
+
+        with self.assertRaises(ValueError):
+            with status_em_lote():
+                marcar_status(receita_ids=[receita.id])
+                raise ValueError
+
+        receita.refresh_from_db()
+        self.assertEqual(receita.situacao, "A")
+
+        # Fora de uma unidade de trabalho, marcar recalcula na hora
+        marcar_status(receita_ids=[receita.id])
+        receita.refresh_from_db()
+        self.assertEqual(receita.situacao, "P")
+
+    def test_payment_update_recalculates_each_account_once(self):
+        from unittest import mock
+
+        from core.services import status as status_service
+
+        cliente = make_cliente(self.company)
+        conta = make_conta(self.company)
+        receita = make_receita(self.company, cliente, valor="90.00")
+        payment = make_payment(self.company, conta, "E", "90.00")
+        for _ in range(3):
+            make_allocation(self.company, payment, "30.00", receita=receita)
+
+        with mock.patch.object(
+            status_service, "recalcular_status", wraps=status_service.recalcular_status
+        ) as recalcular:
+            resp = self.client.patch(
+                f"/api/pagamentos/{payment.id}/", {"observacao": "editado"}, format="json"
+            )
+
+        self.assertEqual(resp.status_code, 200)
+        recalcular.assert_called_once_with(
+            receita_ids={receita.id}, despesa_ids=set(), custodia_ids=set(), transfer_ids=set()
+        )
+        receita.refresh_from_db()
+        self.assertEqual(receita.situacao, "P")
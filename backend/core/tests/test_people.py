@@ -1,6 +1,9 @@
 from datetime import date
+from io import StringIO
 
-from core.models import Despesa
+from django.core.management import call_command
+
+from core.models import Cliente, Despesa
 from core.tests.base import APITestBase
 from core.tests.factories import (
     make_allocation,
@@ -88,3 +91,31 @@ class CommissionGenerationTests(APITestBase):
         despesa = Despesa.objects.get(company=self.company, tipo="C")
         self.assertIn("Func Receita", despesa.nome)
         self.assertEqual(str(despesa.valor), "100.00")
+
+
+class NomeIndexadoTests(APITestBase):
+    def test_save_keeps_normalized_name_and_tokens(self):
+        cliente = make_cliente(self.company, nome="João da Silva Pereira")
+        self.assertEqual(cliente.nome_normalizado, "joao da silva pereira")
+        self.assertEqual(cliente.nome_tokens, ["joao", "pereira", "silva"])
+
+        cliente.nome = "Ana Souza"
+        cliente.save(update_fields=["nome"])
+        cliente.refresh_from_db()
+        self.assertEqual(cliente.nome_normalizado, "ana souza")
+        self.assertEqual(cliente.nome_tokens, ["ana", "souza"])
+
+    def test_backfill_command_updates_rows_written_without_save(self):
+        cliente = make_cliente(self.company, nome="Cliente Antigo")
+        funcionario = make_funcionario(self.company, nome="Fornecedor Antigo")
+        Cliente.objects.filter(pk=cliente.pk).update(nome="Márcia Lima", nome_normalizado="", nome_tokens=[])
+
+        out = StringIO()
+        call_command("backfill_nomes_normalizados", stdout=out)
+
+        cliente.refresh_from_db()
+        funcionario.refresh_from_db()
+        self.assertEqual(cliente.nome_normalizado, "marcia lima")
+        self.assertEqual(cliente.nome_tokens, ["lima", "marcia"])
+        self.assertEqual(funcionario.nome_normalizado, "fornecedor antigo")
+        self.assertIn("clientes: 1 atualizado(s)", out.getvalue())
@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+
+from django.db import connection
+
+from core.models import Despesa, Payment, Receita
+from core.tests.base import APITestBase
+from core.tests.factories import (
+    make_allocation,
+    make_cliente,
+    make_conta,
+    make_despesa,
+    make_funcionario,
+    make_payment,
+    make_receita,
+    make_transfer,
+)
+
+
+class QueryPlanTests(APITestBase):
+    """
+    Regressão de planos das consultas por empresa mais frequentes (listas,
+    dashboard, relatórios, conciliação): nenhuma pode voltar a varrer a
+    tabela inteira.
+
+    No PostgreSQL o EXPLAIN roda com enable_seqscan desligado, então um
+    "Seq Scan" só aparece quando nenhum índice serve à consulta. Nos dois
+    bancos também se confere que o plano usa o índice esperado, e não outro
+    índice que só por acaso evita a varredura.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cliente = make_cliente(self.company)
+        funcionario = make_funcionario(self.company)
+        conta = make_conta(self.company)
+        outra_conta = make_conta(self.company)
+        hoje = date.today()
+        for i in range(20):
+            dia = hoje - timedelta(days=i * 3)
+            make_receita(self.company, cliente, valor="10.00", vencimento=dia)
+            make_despesa(self.company, funcionario, valor="10.00", vencimento=dia, tipo="FV"[i % 2])
+            make_payment(self.company, conta, "ES"[i % 2], "10.00", data_pagamento=dia)
+        transfer = make_transfer(self.company, conta, outra_conta, valor="10.00")
+        make_allocation(self.company, make_payment(self.company, conta, "S", "10.00"), "10.00", transfer=transfer)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    def _plano(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}", params)
+                plano = "\n".join(linha[0] for linha in cursor.fetchall())
+                cursor.execute("RESET enable_seqscan")
+                return plano
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return "\n".join(str(linha[-1]) for linha in cursor.fetchall())
+
+    def assertSemVarredura(self, queryset, tabela, indice):
+        plano = self._plano(queryset)
+        if connection.vendor == "postgresql":
+            self.assertNotIn(f"Seq Scan on {tabela}", plano, plano)
+        else:
+            self.assertNotRegex(plano, rf"(?m)^SCAN {tabela}$", plano)
+        self.assertIn(indice, plano, plano)
+
+    def test_payment_list_and_period_totals(self):
+        inicio = date.today() - timedelta(days=30)
+        lista = Payment.objects.filter(company=self.company, data_pagamento__gte=inicio).order_by("-data_pagamento", "-id")
+        self.assertSemVarredura(lista, "core_payment", "payment_emp_data_idx")
+
+        entradas = Payment.objects.filter(
+            company=self.company, tipo="E", data_pagamento__gte=inicio, data_pagamento__lte=date.today()
+        ).values("valor")
+        self.assertSemVarredura(entradas, "core_payment", "payment_emp_tipo_data_idx")
+
+    def test_unreconciled_payments_use_partial_index(self):
+        hoje = date.today()
+        pendentes = Payment.objects.filter(
+            company=self.company, data_pagamento__year=hoje.year, data_pagamento__month=hoje.month, total_alocado=0
+        ).order_by("data_pagamento", "id")
+        self.assertSemVarredura(pendentes, "core_payment", "payment_pendente_idx")
+
+    def test_receitas_by_situacao_and_due_date(self):
+        hoje = date.today()
+        vencidas = Receita.objects.filter(company=self.company, situacao="A", data_vencimento__lt=hoje)
+        self.assertSemVarredura(vencidas, "core_receita", "receita_emp_sit_venc_idx")
+
+        do_mes = Receita.objects.filter(
+            company=self.company, data_vencimento__gte=hoje.replace(day=1), data_vencimento__lte=hoje
+        )
+        self.assertSemVarredura(do_mes, "core_receita", "receita_emp_venc_idx")
+
+    def test_despesas_by_tipo_and_situacao(self):
+        hoje = date.today()
+        por_tipo = Despesa.objects.filter(
+            company=self.company, tipo="C", data_vencimento__gte=hoje.replace(day=1), data_vencimento__lte=hoje
+        )
+        self.assertSemVarredura(por_tipo, "core_despesa", "despesa_emp_tipo_venc_idx")
+
+        em_aberto = Despesa.objects.filter(company=self.company, situacao__in=["A", "V"], data_vencimento__lte=hoje)
+        self.assertSemVarredura(em_aberto, "core_despesa", "despesa_emp_sit_venc_idx")
+
+    def test_transfer_exclusion_probe_uses_partial_allocation_index(self):
+        # Mesma forma do dashboard: .exclude(allocations__transfer__isnull=False)
+        sem_transferencia = Payment.objects.filter(company=self.company, tipo="S").exclude(
+            allocations__transfer__isnull=False
+        )
+        self.assertSemVarredura(sem_transferencia, "core_allocation", "alocacao_transfer_pay_idx")
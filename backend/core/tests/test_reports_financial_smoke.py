@@ -1,5 +1,6 @@
-from datetime import date
+from datetime import date, timedelta
 
+from core.models import Receita
 from core.tests.base import APITestBase
 from core.tests.factories import make_cliente, make_despesa, make_funcionario, make_receita
 
@@ -34,3 +35,15 @@ class FinancialReportSmokeTests(APITestBase):
         self.assertEqual(balanco.status_code, 200)
         self.assertIn("resultado", dre.data)
         self.assertIn("resultado", balanco.data)
+
+    def test_dashboard_counts_overdue_without_persisting(self):
+        receita = make_receita(
+            self.company, make_cliente(self.company), valor="200.00", vencimento=date.today() - timedelta(days=2)
+        )
+        Receita.objects.filter(pk=receita.pk).update(situacao="A")
+
+        resp = self.client.get("/api/dashboard/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data["receitasVencidas"], resp.data["valorReceitasVencidas"]), (1, 200.0))
+        receita.refresh_from_db()
+        self.assertEqual(receita.situacao, "A")
@@ -0,0 +1,166 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.models import ResumoMensal
+from core.services.resumo import caixa_do_mes, reconstruir_resumo, resumo_em_lote
+from core.tests.base import APITestBase
+from core.tests.factories import (
+    make_allocation,
+    make_cliente,
+    make_conta,
+    make_custodia,
+    make_despesa,
+    make_funcionario,
+    make_payment,
+    make_receita,
+    make_transfer,
+)
+
+MARCO = date(2026, 3, 10)
+ABRIL = date(2026, 4, 20)
+
+
+def linhas(company):
+    return sorted(
+        ResumoMensal.objects.filter(company=company).values_list(
+            "mes", "conta_bancaria_id", "categoria", "entradas", "saidas", "competencia"
+        ),
+        key=lambda linha: (linha[0], linha[1] or 0, linha[2]),
+    )
+
+
+class ResumoMensalTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.cliente = make_cliente(self.company)
+        self.funcionario = make_funcionario(self.company)
+        self.banco = make_conta(self.company, nome="Banco A")
+        self.caixa = make_conta(self.company, nome="Caixa")
+
+    def test_writes_keep_rows_equal_to_a_rebuild(self):
+        receita = make_receita(self.company, self.cliente, valor="300.00", tipo="F", vencimento=MARCO)
+        despesa = make_despesa(self.company, self.funcionario, valor="80.00", tipo="V", vencimento=MARCO)
+        entrada = make_payment(self.company, self.banco, "E", "500.00", data_pagamento=MARCO)
+        make_allocation(self.company, entrada, "300.00", receita=receita)
+        saida = make_payment(self.company, self.caixa, "S", "80.00", data_pagamento=MARCO)
+        alocacao_despesa = make_allocation(self.company, saida, "80.00", despesa=despesa)
+        custodia = make_allocation(
+            self.company, make_payment(self.company, self.banco, "S", "40.00", data_pagamento=MARCO), "40.00",
+            custodia=make_custodia(self.company, cliente=self.cliente),
+        )
+        transfer = make_transfer(self.company, self.banco, self.caixa, valor="70.00")
+        make_allocation(
+            self.company, make_payment(self.company, self.banco, "S", "70.00", data_pagamento=MARCO), "70.00",
+            transfer=transfer,
+        )
+
+        self.assertEqual(
+            [(l[1], l[2], l[3], l[4], l[5]) for l in linhas(self.company)],
+            [
+                (None, "DV", 0, 0, Decimal("80.00")),
+                (None, "RF", 0, 0, Decimal("300.00")),
+                (self.banco.id, "CU", 0, Decimal("40.00"), 0),
+                (self.banco.id, "NA", Decimal("200.00"), 0, 0),
+                (self.banco.id, "RF", Decimal("300.00"), 0, 0),
+                (self.caixa.id, "DV", 0, Decimal("80.00"), 0),
+            ],
+        )
+
+        # Alterações que mudam mês, categoria e valores
+        entrada.data_pagamento = ABRIL
+        entrada.save()
+        receita.tipo = "V"
+        receita.data_vencimento = ABRIL
+        receita.save()
+        alocacao_despesa.delete()
+        custodia.payment.delete()
+        make_receita(self.company, self.cliente, valor="25.00", tipo="E", vencimento=ABRIL).delete()
+
+        incremental = linhas(self.company)
+        reconstruir_resumo(self.company)
+        self.assertEqual(incremental, linhas(self.company))
+        self.assertIn((date(2026, 4, 1), self.banco.id, "RV", Decimal("300.00"), 0, 0), incremental)
+        self.assertIn((date(2026, 3, 1), self.caixa.id, "NA", 0, Decimal("80.00"), 0), incremental)
+        self.assertFalse(ResumoMensal.objects.filter(company=self.company, categoria="CU").exists())
+
+    def test_unit_of_work_recalculates_once_at_the_end(self):
+        with resumo_em_lote():
+            make_payment(self.company, self.banco, "E", "10.00", data_pagamento=MARCO)
+            make_payment(self.company, self.banco, "E", "15.00", data_pagamento=MARCO)
+            self.assertFalse(ResumoMensal.objects.filter(company=self.company).exists())
+
+        self.assertEqual(
+            list(ResumoMensal.objects.filter(company=self.company).values_list("categoria", "entradas")),
+            [("NA", Decimal("25.00"))],
+        )
+
+    def test_simple_writes_apply_deltas_without_recomputing_the_month(self):
+        from unittest import mock
+
+        receita = make_receita(self.company, self.cliente, valor="300.00", tipo="F", vencimento=MARCO)
+        with mock.patch("core.services.resumo._recalcular_empresa") as recalcular:
+            entrada = make_payment(self.company, self.banco, "E", "500.00", data_pagamento=MARCO)
+            make_allocation(self.company, entrada, "120.00", receita=receita)
+            entrada.valor = Decimal("450.00")
+            entrada.save()
+            receita.valor = Decimal("320.00")
+            receita.save()
+        recalcular.assert_not_called()
+
+        incremental = linhas(self.company)
+        reconstruir_resumo(self.company)
+        self.assertEqual(incremental, linhas(self.company))
+        self.assertIn((date(2026, 3, 1), self.banco.id, "NA", Decimal("330.00"), 0, 0), incremental)
+
+    def test_reports_read_the_summary(self):
+        receita = make_receita(self.company, self.cliente, valor="300.00", tipo="F", vencimento=MARCO)
+        make_despesa(self.company, self.funcionario, valor="50.00", tipo="C", vencimento=MARCO)
+        make_allocation(
+            self.company, make_payment(self.company, self.banco, "E", "300.00", data_pagamento=MARCO), "300.00",
+            receita=receita,
+        )
+        make_payment(self.company, self.caixa, "S", "20.00", data_pagamento=MARCO)
+        make_payment(self.company_b, make_conta(self.company_b), "E", "999.00", data_pagamento=MARCO)
+
+        dre = self.client.get("/api/relatorios/dre/?mes=3&ano=2026").data
+        self.assertEqual((dre["receitas"]["fixas"], dre["despesas"]["comissoes"], dre["resultado"]), (300.0, 50.0, 250.0))
+
+        balanco = self.client.get("/api/relatorios/balanco/?mes=3&ano=2026").data
+        self.assertEqual(balanco["entradas"]["por_banco"], [{"banco": "Banco A", "valor": 300.0}])
+        self.assertEqual(balanco["entradas"]["por_tipo"], [{"tipo": "Receita Fixa", "valor": 300.0}])
+        self.assertEqual(balanco["saidas"]["por_tipo"], [{"tipo": "Não Alocado", "valor": 20.0}])
+        self.assertEqual(balanco["resultado"], 280.0)
+
+        mensal = self.client.get("/api/relatorios/resultado-mensal/?year=2026&month=3").data
+        self.assertEqual((mensal["total_receitas_pagas"], mensal["total_despesas_pagas"]), (Decimal("300.00"), 0))
+
+    def test_balanco_totals_are_exact_and_shared_with_pdf(self):
+        for _ in range(3):
+            make_payment(self.company, self.banco, "E", "0.10", data_pagamento=MARCO)
+        make_allocation(
+            self.company, make_payment(self.company, self.caixa, "S", "40.00", data_pagamento=MARCO), "40.00",
+            custodia=make_custodia(self.company, cliente=self.cliente),
+        )
+
+        with self.assertNumQueries(1):
+            caixa = caixa_do_mes(self.company.id, MARCO)
+        self.assertEqual(caixa["entradas"]["total"], Decimal("0.30"))
+        self.assertEqual(caixa["resultado"], Decimal("-39.70"))
+        self.assertEqual(caixa_do_mes(self.company.id, MARCO, incluir_custodias=False)["saidas"]["por_banco"], {})
+
+        balanco = self.client.get("/api/relatorios/balanco/?mes=3&ano=2026&incluir_custodias=false").data
+        self.assertEqual((balanco["saidas"]["total"], balanco["resultado"]), (0.0, 0.3))
+        pdf = self.client.get("/api/pdf/balanco/?mes=3&ano=2026&agrupamento=tipo")
+        self.assertEqual(pdf.status_code, 200)
+
+    def test_rebuild_command(self):
+        make_payment(self.company, self.banco, "E", "10.00", data_pagamento=MARCO)
+        ResumoMensal.objects.all().delete()
+
+        out = StringIO()
+        call_command("rebuild_resumo_mensal", "--company", str(self.company.id), stdout=out)
+        self.assertIn("1 linha(s) de resumo gravadas em 1 empresa(s)", out.getvalue())
+        self.assertEqual(ResumoMensal.objects.filter(company=self.company).count(), 1)
@@ -4,7 +4,7 @@ from .views import (
     CompanyViewSet, CustomUserViewSet, password_reset_request, password_reset_confirm, verify_email, ClienteViewSet,
     FuncionarioViewSet, ReceitaViewSet, ReceitaRecorrenteViewSet, DespesaViewSet, DespesaRecorrenteViewSet,
     FornecedorViewSet, ContaBancariaViewSet, CustodiaViewSet, TransferViewSet, PaymentViewSet, AllocationViewSet,
-    FavorecidoViewSet, dashboard_view,
+    FavorecidoViewSet, JobViewSet, dashboard_view, busca_view,
     # Import Report Views
     RelatorioClienteView, RelatorioFuncionarioView, RelatorioTipoPeriodoView,
     RelatorioResultadoFinanceiroView, RelatorioFolhaSalarialView,
@@ -51,6 +51,7 @@ router.register(r'alocacoes', AllocationViewSet, basename='allocation')
 router.register(r'favorecidos', FavorecidoViewSet, basename='favorecido')
 router.register(r'planos', PlanoAssinaturaViewSet, basename='plano')
 router.register(r'assinatura', AssinaturaViewSet, basename='assinatura')
+router.register(r'jobs', JobViewSet, basename='job')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -71,6 +72,7 @@ urlpatterns = [
     path('relatorios/balanco/', balanco_patrimonial, name='balanco-patrimonial'),
     path('relatorios/conciliacao-bancaria/', relatorio_conciliacao_bancaria, name='relatorio-conciliacao-bancaria'),
     path('dashboard/', dashboard_view, name='dashboard'),
+    path('busca/', busca_view, name='busca'),
 
     # PDF Urls
     # 1. Relatório de Receitas Pagas
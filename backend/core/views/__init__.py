@@ -5,6 +5,8 @@ from .revenue import ReceitaViewSet, ReceitaRecorrenteViewSet
 from .expense import DespesaViewSet, DespesaRecorrenteViewSet
 from .banking import PaymentViewSet, ContaBancariaViewSet, CustodiaViewSet, TransferViewSet, AllocationViewSet
 from .subscription import PlanoAssinaturaViewSet, AssinaturaViewSet, register_view, asaas_webhook
+from .jobs import JobViewSet, aceita_async
 from .reports.dashboard import dashboard_view
+from .busca import busca_view
 from .reports.people import RelatorioClienteView, RelatorioFuncionarioView, RelatorioFolhaSalarialView, RelatorioComissionamentoView
 from .reports.financial import RelatorioTipoPeriodoView, RelatorioResultadoFinanceiroView, RelatorioResultadoMensalView, dre_consolidado, balanco_patrimonial, relatorio_conciliacao_bancaria
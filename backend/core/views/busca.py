@@ -0,0 +1,45 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def busca_view(request):
+    """
+    Busca unificada em clientes, funcionários, receitas, despesas, custódias
+    e pagamentos da empresa, com os resultados ordenados por relevância.
+
+    Query params:
+    - q: texto da busca (palavras, valores como "1.500,00" e datas como "15/03/2024")
+    - tipos: restringe os tipos, separados por vírgula (ex.: receita,despesa)
+    - limite: quantidade de resultados (padrão 20, máximo 50)
+    """
+    from ..services.busca import LIMITE_MAXIMO, LIMITE_PADRAO, TIPOS, buscar
+
+    q = (request.query_params.get('q') or '').strip()
+    if len(q) < 2:
+        return Response(
+            {'error': 'Parâmetro q é obrigatório (mínimo de 2 caracteres)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    tipos = TIPOS
+    if request.query_params.get('tipos'):
+        tipos = tuple(t.strip() for t in request.query_params['tipos'].split(',') if t.strip())
+        invalidos = sorted(set(tipos) - set(TIPOS))
+        if invalidos:
+            return Response(
+                {'error': f'Tipos inválidos: {", ".join(invalidos)}. Use: {", ".join(TIPOS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    try:
+        limite = min(int(request.query_params.get('limite', LIMITE_PADRAO)), LIMITE_MAXIMO)
+    except ValueError:
+        limite = LIMITE_PADRAO
+    if limite < 1:
+        limite = LIMITE_PADRAO
+
+    return Response({'q': q, 'resultados': buscar(request.user.company, q, tipos, limite)})
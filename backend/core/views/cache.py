@@ -0,0 +1,114 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+
+def resposta_condicional(nome):
+    """
+    GET condicional: a resposta 200 leva um ETag da assinatura dos dados
+    (services.versao.assinatura_dados) e um If-None-Match igual recebe 304
+    antes de a view montar o queryset.
+
+    Funciona em métodos de APIView/ViewSet e em views @api_view (abaixo de
+    @api_view/@permission_classes, para rodar já autenticado).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            from ..services.versao import assinatura_dados
+
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            assinatura = assinatura_dados(request, nome, kwargs)
+            if assinatura is None:
+                return func(*args, **kwargs)
+
+            etag = _etag(request, assinatura)
+            if _nao_modificado(request, etag):
+                return _resposta_304(etag)
+            return _com_etag(func(*args, **kwargs), etag)
+        return wrapper
+    return decorator
+
+
+def relatorio_em_cache(nome):
+    """
+    Como @resposta_condicional, e ainda guarda a resposta 200 (JSON ou
+    arquivo) no cache com a assinatura dos dados como chave: qualquer
+    gravação da empresa sobe a versão e o próximo GET recalcula, sem
+    invalidação explícita.
+
+    Deve ficar abaixo de @aceita_async, para que o pedido assíncrono continue
+    virando job e o job aproveite o cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            from ..services.versao import assinatura_dados
+
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            assinatura = assinatura_dados(request, nome, kwargs)
+            if assinatura is None:
+                return func(*args, **kwargs)
+
+            etag = _etag(request, assinatura)
+            if _nao_modificado(request, etag):
+                return _resposta_304(etag)
+
+            chave = f'relatorio:{assinatura}'
+            guardado = cache.get(chave)
+            if guardado is not None:
+                return _com_etag(_remontar(guardado), etag)
+
+            response = func(*args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(chave, _guardar(response), settings.RELATORIOS_CACHE_TTL)
+            return _com_etag(response, etag)
+        return wrapper
+    return decorator
+
+
+def _etag(request, assinatura):
+    # O formato negociado (JSON, API navegável) muda o corpo
+    representacao = f'{assinatura}:{getattr(request, "accepted_media_type", "")}'
+    return quote_etag(hashlib.sha1(representacao.encode()).hexdigest())
+
+
+def _nao_modificado(request, etag):
+    recebidas = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in recebidas or etag in (recebida.removeprefix('W/') for recebida in recebidas)
+
+
+def _resposta_304(etag):
+    return _com_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+
+def _com_etag(response, etag):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        # O navegador pode guardar, mas revalida a cada uso
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _guardar(response):
+    if isinstance(response, Response):
+        return ('dados', response.data)
+    return ('arquivo', response.content, response['Content-Type'], response.get('Content-Disposition'))
+
+
+def _remontar(guardado):
+    if guardado[0] == 'dados':
+        return Response(guardado[1])
+    _, conteudo, content_type, disposition = guardado
+    response = HttpResponse(conteudo, content_type=content_type)
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
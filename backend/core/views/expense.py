@@ -4,7 +4,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
 from django.utils import timezone
-from .mixins import CompanyScopedViewSetMixin, normalize_money_search
+from .mixins import CompanyScopedViewSetMixin
+from .cache import resposta_condicional
+from .jobs import aceita_async
 from ..models import Despesa, DespesaRecorrente
 from ..serializers import DespesaSerializer, DespesaAbertaSerializer, DespesaRecorrenteSerializer
 from ..pagination import DynamicPageSizePagination
@@ -26,23 +28,12 @@ class DespesaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
 
             return DespesaSerializer
 
-    def _atualizar_vencidas(self):
-        """Atualiza automaticamente despesas vencidas (on-the-fly)."""
-        hoje = timezone.now().date()
-        Despesa.objects.filter(
-            company=self.request.user.company,
-            situacao='A',
-            data_vencimento__lt=hoje
-        ).update(situacao='V')
-
     def get_queryset(self):
-        # Atualiza vencidas antes de retornar o queryset
-        self._atualizar_vencidas()
+        from ..services.status import filtro_situacao, situacao_vigente
 
-        queryset = super().get_queryset().select_related(
+        # Vencidas calculadas na leitura (a varredura diária grava; o GET não escreve)
+        queryset = super().get_queryset().annotate(situacao_vigente=situacao_vigente()).select_related(
             "responsavel", "company"
-        ).prefetch_related(
-            "allocations"
         )
 
         params = self.request.query_params
@@ -50,19 +41,13 @@ class DespesaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         # BUSCA
         search = params.get("search")
         if search:
-            search_money = normalize_money_search(search)
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(descricao__icontains=search) |
-                Q(responsavel__nome__icontains=search) |
-                Q(valor__icontains=search_money) |
-                Q(data_vencimento__icontains=search)
-            )
+            from ..services.busca import filtro_busca
+            queryset = queryset.filter(filtro_busca(Despesa, search, self.request.user.company))
 
         # filtros
         situacoes = params.getlist("situacao")
         if situacoes:
-            queryset = queryset.filter(situacao__in=situacoes)
+            queryset = queryset.filter(filtro_situacao(situacoes))
 
         responsavel_id = params.get("responsavel_id")
         if responsavel_id:
@@ -89,6 +74,10 @@ class DespesaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
 
         return queryset
 
+    @resposta_condicional('despesas')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         import calendar
         from datetime import date
@@ -120,16 +109,19 @@ class DespesaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         valor_parcela = round(Decimal(str(valor_total)) / num_parcelas, 2)
         common = {k: v for k, v in vdata.items() if k not in ('nome', 'valor', 'data_vencimento')}
 
-        for i in range(num_parcelas):
-            nome_i = f"{nome_base} ({i + 1}/{num_parcelas})"
-            valor_i = valor_parcela if i < num_parcelas - 1 else (valor_total - valor_parcela * (num_parcelas - 1))
-            Despesa.objects.create(
-                company=request.user.company,
-                nome=nome_i,
-                valor=valor_i,
-                data_vencimento=add_months(data_base, i),
-                **common
-            )
+        from ..services.resumo import resumo_em_lote
+
+        with resumo_em_lote():
+            for i in range(num_parcelas):
+                nome_i = f"{nome_base} ({i + 1}/{num_parcelas})"
+                valor_i = valor_parcela if i < num_parcelas - 1 else (valor_total - valor_parcela * (num_parcelas - 1))
+                Despesa.objects.create(
+                    company=request.user.company,
+                    nome=nome_i,
+                    valor=valor_i,
+                    data_vencimento=add_months(data_base, i),
+                    **common
+                )
 
         return Response({'parcelas_criadas': num_parcelas}, status=status.HTTP_201_CREATED)
 
@@ -145,6 +137,7 @@ class DespesaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
 
             if data_pagamento and conta_bancaria_id:
                 from ..models import Payment, ContaBancaria, Allocation
+                from ..services.saldos import aplicar_payment
 
                 try:
                     conta_bancaria = ContaBancaria.objects.get(
@@ -170,9 +163,8 @@ class DespesaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
                         valor=despesa.valor
                     )
 
-                    # Atualiza saldo da conta bancária (saída de dinheiro)
-                    conta_bancaria.saldo_atual -= payment.valor
-                    conta_bancaria.save()
+                    # Atualiza saldo atual e saldo diário da conta bancária (saída de dinheiro)
+                    aplicar_payment(payment)
 
                     # Atualiza status da despesa
                     despesa.atualizar_status()
@@ -237,6 +229,7 @@ class DespesaRecorrenteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet)
         return queryset.order_by('nome', 'id')
 
     @action(detail=False, methods=['post'], url_path='gerar-mes')
+    @aceita_async('gerar_mes_despesas')
     def gerar_mes(self, request):
         """
         Gera despesas individuais para o mês atual baseado nas recorrentes ativas.
@@ -284,63 +277,66 @@ class DespesaRecorrenteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet)
         detalhes = []
         total_recorrentes = recorrentes.count()
 
-        for recorrente in recorrentes:
-            # Verifica se já existe despesa para este mês
-            nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
-
-            despesa_existente = Despesa.objects.filter(
-                company=request.user.company,
-                nome=nome_esperado,
-                responsavel=recorrente.responsavel
-            ).exists()
-
-            if despesa_existente:
-                ignoradas += 1
-                detalhes.append({
-                    'nome': recorrente.nome,
-                    'status': 'ignorada',
-                    'motivo': 'Já gerada para este mês'
-                })
-                continue
-
-            # Calcula data de vencimento
-            ultimo_dia_mes = calendar.monthrange(
-                mes_referencia.year,
-                mes_referencia.month
-            )[1]
-            dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
-            data_vencimento = date(
-                mes_referencia.year,
-                mes_referencia.month,
-                dia_vencimento
-            )
+        from ..services.resumo import resumo_em_lote
 
-            # Cria despesa individual
-            try:
-                Despesa.objects.create(
+        with resumo_em_lote():
+            for recorrente in recorrentes:
+                # Verifica se já existe despesa para este mês
+                nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
+
+                despesa_existente = Despesa.objects.filter(
                     company=request.user.company,
-                    responsavel=recorrente.responsavel,
-                    nome=f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}",
-                    descricao=recorrente.descricao or '',
-                    valor=recorrente.valor,
-                    tipo=recorrente.tipo,
-                    data_vencimento=data_vencimento,
-                    situacao='A'
+                    nome=nome_esperado,
+                    responsavel=recorrente.responsavel
+                ).exists()
+
+                if despesa_existente:
+                    ignoradas += 1
+                    detalhes.append({
+                        'nome': recorrente.nome,
+                        'status': 'ignorada',
+                        'motivo': 'Já gerada para este mês'
+                    })
+                    continue
+
+                # Calcula data de vencimento
+                ultimo_dia_mes = calendar.monthrange(
+                    mes_referencia.year,
+                    mes_referencia.month
+                )[1]
+                dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
+                data_vencimento = date(
+                    mes_referencia.year,
+                    mes_referencia.month,
+                    dia_vencimento
                 )
 
-                criadas += 1
-                detalhes.append({
-                    'nome': recorrente.nome,
-                    'status': 'criada',
-                    'data_vencimento': str(data_vencimento)
-                })
+                # Cria despesa individual
+                try:
+                    Despesa.objects.create(
+                        company=request.user.company,
+                        responsavel=recorrente.responsavel,
+                        nome=f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}",
+                        descricao=recorrente.descricao or '',
+                        valor=recorrente.valor,
+                        tipo=recorrente.tipo,
+                        data_vencimento=data_vencimento,
+                        situacao='A'
+                    )
+
+                    criadas += 1
+                    detalhes.append({
+                        'nome': recorrente.nome,
+                        'status': 'criada',
+                        'data_vencimento': str(data_vencimento)
+                    })
 
-            except Exception as e:
-                detalhes.append({
-                    'nome': recorrente.nome,
-                    'status': 'erro',
-                    'motivo': str(e)
-                })
+                except Exception as e:
+                    detalhes.append({
+                        'nome': recorrente.nome,
+                        'status': 'erro',
+                        'motivo': str(e)
+                    })
 
         return Response({
             'criadas': criadas,
@@ -395,88 +391,91 @@ class DespesaRecorrenteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet)
         ignoradas = 0
         detalhes = []
 
-        for i in range(quantidade_meses):
-            mes_referencia = add_months(mes_inicial, i)
-
-            # Verifica se está dentro do período de validade (compara apenas ano/mês)
-            if (recorrente.data_inicio.year > mes_referencia.year or
-                (recorrente.data_inicio.year == mes_referencia.year and
-                 recorrente.data_inicio.month > mes_referencia.month)):
-                ignoradas += 1
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'ignorada',
-                    'motivo': 'Antes da data de início'
-                })
-                continue
-
-            if recorrente.data_fim:
-                if (recorrente.data_fim.year < mes_referencia.year or
-                    (recorrente.data_fim.year == mes_referencia.year and
-                     recorrente.data_fim.month < mes_referencia.month)):
+        from ..services.resumo import resumo_em_lote
+
+        with resumo_em_lote():
+            for i in range(quantidade_meses):
+                mes_referencia = add_months(mes_inicial, i)
+
+                # Verifica se está dentro do período de validade (compara apenas ano/mês)
+                if (recorrente.data_inicio.year > mes_referencia.year or
+                    (recorrente.data_inicio.year == mes_referencia.year and
+                     recorrente.data_inicio.month > mes_referencia.month)):
                     ignoradas += 1
                     detalhes.append({
                         'mes': mes_referencia.strftime('%Y-%m'),
                         'status': 'ignorada',
-                        'motivo': 'Depois da data de fim'
+                        'motivo': 'Antes da data de início'
                     })
                     continue
 
-            # Verifica se já existe
-            nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
-            despesa_existente = Despesa.objects.filter(
-                company=request.user.company,
-                nome=nome_esperado,
-                responsavel=recorrente.responsavel
-            ).exists()
-
-            if despesa_existente:
-                ignoradas += 1
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'ignorada',
-                    'motivo': 'Já existe'
-                })
-                continue
-
-            # Calcula data de vencimento
-            ultimo_dia_mes = calendar.monthrange(
-                mes_referencia.year,
-                mes_referencia.month
-            )[1]
-            dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
-            data_vencimento = date(
-                mes_referencia.year,
-                mes_referencia.month,
-                dia_vencimento
-            )
-
-            # Cria despesa individual
-            try:
-                Despesa.objects.create(
+                if recorrente.data_fim:
+                    if (recorrente.data_fim.year < mes_referencia.year or
+                        (recorrente.data_fim.year == mes_referencia.year and
+                         recorrente.data_fim.month < mes_referencia.month)):
+                        ignoradas += 1
+                        detalhes.append({
+                            'mes': mes_referencia.strftime('%Y-%m'),
+                            'status': 'ignorada',
+                            'motivo': 'Depois da data de fim'
+                        })
+                        continue
+
+                # Verifica se já existe
+                nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
+                despesa_existente = Despesa.objects.filter(
                     company=request.user.company,
-                    responsavel=recorrente.responsavel,
                     nome=nome_esperado,
-                    descricao=recorrente.descricao or '',
-                    valor=recorrente.valor,
-                    tipo=recorrente.tipo,
-                    data_vencimento=data_vencimento,
-                    situacao='A'
+                    responsavel=recorrente.responsavel
+                ).exists()
+
+                if despesa_existente:
+                    ignoradas += 1
+                    detalhes.append({
+                        'mes': mes_referencia.strftime('%Y-%m'),
+                        'status': 'ignorada',
+                        'motivo': 'Já existe'
+                    })
+                    continue
+
+                # Calcula data de vencimento
+                ultimo_dia_mes = calendar.monthrange(
+                    mes_referencia.year,
+                    mes_referencia.month
+                )[1]
+                dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
+                data_vencimento = date(
+                    mes_referencia.year,
+                    mes_referencia.month,
+                    dia_vencimento
                 )
 
-                criadas += 1
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'criada',
-                    'data_vencimento': str(data_vencimento)
-                })
-
-            except Exception as e:
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'erro',
-                    'motivo': str(e)
-                })
+                # Cria despesa individual
+                try:
+                    Despesa.objects.create(
+                        company=request.user.company,
+                        responsavel=recorrente.responsavel,
+                        nome=nome_esperado,
+                        descricao=recorrente.descricao or '',
+                        valor=recorrente.valor,
+                        tipo=recorrente.tipo,
+                        data_vencimento=data_vencimento,
+                        situacao='A'
+                    )
+
+                    criadas += 1
+                    detalhes.append({
+                        'mes': mes_referencia.strftime('%Y-%m'),
+                        'status': 'criada',
+                        'data_vencimento': str(data_vencimento)
+                    })
+
+                except Exception as e:
+                    detalhes.append({
+                        'mes': mes_referencia.strftime('%Y-%m'),
+                        'status': 'erro',
+                        'motivo': str(e)
+                    })
 
         return Response({
             'criadas': criadas,
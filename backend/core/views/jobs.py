@@ -0,0 +1,90 @@
+import functools
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.http import HttpResponse
+from django.urls import reverse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.request import Request
+from rest_framework.response import Response
+from .mixins import CompanyScopedViewSetMixin
+from ..models import Job
+from ..serializers import JobSerializer
+from ..pagination import DynamicPageSizePagination
+
+
+def aceita_async(tipo):
+    """
+    Habilita a variante `?async=1` de um endpoint pesado: em vez de executar,
+    o request é enfileirado como Job e a resposta é 202 com o id para polling.
+
+    Funciona em actions de ViewSet e em views @api_view (deve ficar abaixo
+    de @api_view/@permission_classes, para rodar já autenticado).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            from ..services.jobs import ArquivoGrandeDemais, enfileirar_request, pedido_assincrono
+
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            if not pedido_assincrono(request):
+                return func(*args, **kwargs)
+
+            try:
+                job = enfileirar_request(request, tipo)
+            except ArquivoGrandeDemais as e:
+                return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            return Response(
+                {
+                    'job_id': job.id,
+                    'status': job.status,
+                    'status_url': reverse('job-detail', args=[job.id]),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+        return wrapper
+    return decorator
+
+
+class JobViewSet(CompanyScopedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de jobs em background da empresa.
+
+    GET /api/jobs/<id>/           → status, progresso e resultado (JSON)
+    GET /api/jobs/<id>/download/  → arquivo gerado (ex.: PDF)
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    pagination_class = DynamicPageSizePagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset().defer('arquivo', 'resultado_arquivo').annotate(
+            tem_arquivo=ExpressionWrapper(Q(resultado_arquivo__isnull=False), output_field=BooleanField())
+        )
+
+        status_param = self.request.query_params.get('status')
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+
+        tipo = self.request.query_params.get('tipo')
+        if tipo:
+            queryset = queryset.filter(tipo=tipo)
+
+        return queryset.order_by('-criado_em', '-id')
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'concluido':
+            return Response(
+                {'error': 'O job ainda não foi concluído.', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        if job.resultado_arquivo is None:
+            return Response(
+                {'error': 'Este job não gerou arquivo.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        response = HttpResponse(bytes(job.resultado_arquivo), content_type=job.resultado_content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.resultado_nome}"'
+        return response
@@ -1,9 +1,9 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
 from decimal import Decimal
 from .mixins import CompanyScopedViewSetMixin
+from .jobs import aceita_async
 from ..models import Cliente, Funcionario
 from ..serializers import ClienteSerializer, FuncionarioSerializer
 from ..pagination import DynamicPageSizePagination
@@ -24,12 +24,8 @@ class ClienteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         # Search filter
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(cpf__icontains=search) |
-                Q(email__icontains=search) |
-                Q(telefone__icontains=search)
-            )
+            from ..services.busca import filtro_busca
+            queryset = queryset.filter(filtro_busca(Cliente, search, self.request.user.company))
 
         ordering = self.request.query_params.get('ordering')
         if ordering and ordering in self.ORDERING_FIELDS:
@@ -40,6 +36,7 @@ class ClienteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         return queryset
 
     @action(detail=False, methods=['post'], url_path='gerar-comissoes')
+    @aceita_async('gerar_comissoes')
     def gerar_comissoes(self, request):
         """
         Gera despesas de comissão para o mês/ano especificado.
@@ -99,12 +96,8 @@ class FuncionarioViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         # Search filter
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(cpf__icontains=search) |
-                Q(email__icontains=search) |
-                Q(telefone__icontains=search)
-            )
+            from ..services.busca import filtro_busca
+            queryset = queryset.filter(filtro_busca(Funcionario, search, self.request.user.company))
 
         ordering = self.request.query_params.get('ordering')
         if ordering and ordering in self.ORDERING_FIELDS:
@@ -127,12 +120,8 @@ class FornecedorViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         # Search filter
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(cpf__icontains=search) |
-                Q(email__icontains=search) |
-                Q(telefone__icontains=search)
-            )
+            from ..services.busca import filtro_busca
+            queryset = queryset.filter(filtro_busca(Funcionario, search, self.request.user.company))
 
         ordering = self.request.query_params.get('ordering')
         if ordering and ordering in self.ORDERING_FIELDS:
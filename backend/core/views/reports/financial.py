@@ -2,16 +2,18 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count
+from django.db.models import Q, Sum
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from .base import BaseReportView
-from ...models import Receita, Despesa, Payment, Allocation
+from ..cache import relatorio_em_cache
+from ...models import Receita, Despesa, Payment, Allocation, ResumoMensal
 from ...serializers import ReceitaSerializer, DespesaSerializer
 
 
 class RelatorioTipoPeriodoView(BaseReportView):
     """Relatório de Receitas ou Despesas por Tipo e/ou Período."""
+    @relatorio_em_cache('tipo_periodo')
     def get(self, request):
         params = request.query_params
         tipo_relatorio = params.get('tipo_relatorio', '').lower() # 'receita' or 'despesa'
@@ -37,6 +39,7 @@ class RelatorioTipoPeriodoView(BaseReportView):
 
 class RelatorioResultadoFinanceiroView(BaseReportView):
     """Relatório de Resultado Financeiro (Receitas Pagas - Despesas Pagas) por Período."""
+    @relatorio_em_cache('resultado_financeiro')
     def get(self, request):
         filters_pagamento = {}
         params = request.query_params
@@ -65,26 +68,25 @@ class RelatorioResultadoFinanceiroView(BaseReportView):
 
 class RelatorioResultadoMensalView(BaseReportView):
     """Relatório de Resultado Financeiro Mensal."""
+    @relatorio_em_cache('resultado_mensal')
     def get(self, request):
         params = request.query_params
         try:
             year = int(params.get('year', date.today().year))
             month = int(params.get('month', date.today().month))
+            mes = date(year, month, 1)
         except ValueError:
             return Response({"detail": "Ano e/ou mês inválidos."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Filter by payment date within the specific month/year
-        filters_pagamento = {
-            'situacao': 'P',
-            'data_pagamento__year': year,
-            'data_pagamento__month': month
-        }
-
-        receitas_qs = self.get_company_queryset(Receita).filter(**filters_pagamento)
-        despesas_qs = self.get_company_queryset(Despesa).filter(**filters_pagamento)
-
-        total_receitas_pagas = receitas_qs.aggregate(total=Sum('valor_pago'))['total'] or Decimal('0.00')
-        total_despesas_pagas = despesas_qs.aggregate(total=Sum('valor_pago'))['total'] or Decimal('0.00')
+        # Caixa do mês alocado a receitas (entradas) e a despesas (saídas), do resumo mensal
+        totais = ResumoMensal.objects.filter(
+            company=request.user.company, mes=mes, conta_bancaria__isnull=False
+        ).aggregate(
+            receitas=Sum('entradas', filter=Q(categoria__startswith='R')),
+            despesas=Sum('saidas', filter=Q(categoria__startswith='D')),
+        )
+        total_receitas_pagas = totais['receitas'] or Decimal('0.00')
+        total_despesas_pagas = totais['despesas'] or Decimal('0.00')
 
         resultado = total_receitas_pagas - total_despesas_pagas
 
@@ -98,16 +100,22 @@ class RelatorioResultadoMensalView(BaseReportView):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@relatorio_em_cache('dre_consolidado')
 def dre_consolidado(request):
     """
-    Retorna a DRE consolidada com Receitas e Despesas agrupadas por tipo.
+    Retorna a DRE consolidada com Receitas e Despesas agrupadas por tipo,
+    para um mês ou um intervalo de meses (ver services/dre.py).
 
     Query Parameters:
-    - mes: Mês (1-12)
-    - ano: Ano (YYYY)
+    - mes: Mês (1-12) e ano: Ano (YYYY) → um mês
+    - ano sem mes → o ano inteiro
+    - inicio / fim: AAAA-MM → intervalo de meses (até 36)
+    - sem parâmetros → mês atual
 
     Retorna:
     {
+        "inicio": "2026-01",
+        "fim": "2026-12",
         "receitas": {
             "fixas": 10000.00,
             "variaveis": 5000.00,
@@ -118,83 +126,34 @@ def dre_consolidado(request):
             "fixas": 3000.00,
             "variaveis": 2000.00,
             "comissoes": 1000.00,
+            "reembolsos": 0.00,
             "total": 6000.00
         },
-        "resultado": 8500.00
+        "resultado": 8500.00,
+        "meses": [
+            {"mes": "2026-01", "receitas": {...}, "despesas": {...}, "resultado": ...},
+            ...
+        ]
     }
     """
+    from ...services.dre import calcular_dre, periodo_dre
 
-    try:
-        # Pegar parâmetros de mês e ano
-        mes = request.query_params.get('mes')
-        ano = request.query_params.get('ano')
-
-        # Se não tiver mês/ano, usar mês atual
-        if not mes or not ano:
-            hoje = datetime.now()
-            mes = hoje.month
-            ano = hoje.year
-        else:
-            mes = int(mes)
-            ano = int(ano)
-
-        # Calcular data de início e fim do mês
-        data_inicio = f"{ano}-{str(mes).zfill(2)}-01"
-        # Último dia do mês
-        if mes == 12:
-            data_fim = f"{ano + 1}-01-01"
-        else:
-            data_fim = f"{ano}-{str(mes + 1).zfill(2)}-01"
-        data_fim = (datetime.strptime(data_fim, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-
-        # Filtrar receitas por período do mês
-        receitas = Receita.objects.filter(
-            company=request.user.company,
-            data_vencimento__gte=data_inicio,
-            data_vencimento__lte=data_fim
-        )
-
-        # Filtrar despesas por período do mês
-        despesas = Despesa.objects.filter(
-            company=request.user.company,
-            data_vencimento__gte=data_inicio,
-            data_vencimento__lte=data_fim
-        )
-
-        # Agrupar receitas por tipo
-        receitas_fixas = receitas.filter(tipo='F').aggregate(Sum('valor'))['valor__sum'] or 0
-        receitas_variaveis = receitas.filter(tipo='V').aggregate(Sum('valor'))['valor__sum'] or 0
-        estornos = receitas.filter(tipo='E').aggregate(Sum('valor'))['valor__sum'] or 0
-
-        total_receitas = float(receitas_fixas) + float(receitas_variaveis) + float(estornos)
-
-        # Agrupar despesas por tipo
-        despesas_fixas = despesas.filter(tipo='F').aggregate(Sum('valor'))['valor__sum'] or 0
-        despesas_variaveis = despesas.filter(tipo='V').aggregate(Sum('valor'))['valor__sum'] or 0
-        comissoes = despesas.filter(tipo='C').aggregate(Sum('valor'))['valor__sum'] or 0
-        reembolsos = despesas.filter(tipo='R').aggregate(Sum('valor'))['valor__sum'] or 0
-
-        total_despesas = float(despesas_fixas) + float(despesas_variaveis) + float(comissoes) + float(reembolsos)
+    def como_float(coluna):
+        return {
+            'receitas': {chave: float(valor) for chave, valor in coluna['receitas'].items()},
+            'despesas': {chave: float(valor) for chave, valor in coluna['despesas'].items()},
+            'resultado': float(coluna['resultado']),
+        }
 
-        # Calcular resultado
-        resultado = total_receitas - total_despesas
+    try:
+        inicio, fim = periodo_dre(request.query_params)
+        dre = calcular_dre(request.user.company_id, inicio, fim)
 
-        # Retornar dados formatados
         return Response({
-            'receitas': {
-                'fixas': float(receitas_fixas),
-                'variaveis': float(receitas_variaveis),
-                'estornos': float(estornos),
-                'total': total_receitas
-            },
-            'despesas': {
-                'fixas': float(despesas_fixas),
-                'variaveis': float(despesas_variaveis),
-                'comissoes': float(comissoes),
-                'reembolsos': float(reembolsos),
-                'total': total_despesas
-            },
-            'resultado': resultado
+            'inicio': f'{inicio:%Y-%m}',
+            'fim': f'{fim:%Y-%m}',
+            **como_float(dre),
+            'meses': [{'mes': f"{coluna['mes']:%Y-%m}", **como_float(coluna)} for coluna in dre['meses']],
         }, status=status.HTTP_200_OK)
 
     except ValueError as e:
@@ -205,6 +164,7 @@ def dre_consolidado(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@relatorio_em_cache('balanco_patrimonial')
 def balanco_patrimonial(request):
     """
     Retorna o Fluxo de Caixa Realizado (Regime de Caixa) com dois agrupamentos:
@@ -217,6 +177,7 @@ def balanco_patrimonial(request):
     Query Parameters:
     - mes: Mês (1-12)
     - ano: Ano (YYYY)
+    - incluir_custodias: 'true' | 'false' (padrão: 'true')
 
     Retorna:
     {
@@ -248,179 +209,28 @@ def balanco_patrimonial(request):
             mes = int(mes)
             ano = int(ano)
 
-        # Calcular data de início e fim do mês
-        data_inicio = f"{ano}-{str(mes).zfill(2)}-01"
-        if mes == 12:
-            data_fim = f"{ano + 1}-01-01"
-        else:
-            data_fim = f"{ano}-{str(mes + 1).zfill(2)}-01"
-        data_fim = (datetime.strptime(data_fim, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-
-        # Buscar todos os pagamentos do mês, excluindo transferências
-        # (Transferências se anulam: saída de uma conta = entrada em outra)
-        # Primeiro, obter os IDs dos pagamentos que são transferências
-        payment_ids_com_transferencia = Allocation.objects.filter(
-            payment__company=request.user.company,
-            payment__data_pagamento__gte=data_inicio,
-            payment__data_pagamento__lte=data_fim,
-            transfer__isnull=False
-        ).values_list('payment_id', flat=True)
-
-        # Agora buscar pagamentos excluindo os que são transferências
-        pagamentos = Payment.objects.filter(
-            company=request.user.company,
-            data_pagamento__gte=data_inicio,
-            data_pagamento__lte=data_fim
-        ).exclude(
-            id__in=payment_ids_com_transferencia
-        ).select_related('conta_bancaria').prefetch_related('allocations__receita', 'allocations__despesa', 'allocations__custodia')
+        from ...services.resumo import caixa_do_mes
 
-        # Buscar todas as alocações dos pagamentos do mês (exceto transferências)
-        allocations = Allocation.objects.filter(
-            payment__company=request.user.company,
-            payment__data_pagamento__gte=data_inicio,
-            payment__data_pagamento__lte=data_fim,
-            transfer__isnull=True
-        ).select_related('payment', 'payment__conta_bancaria', 'receita', 'despesa', 'custodia')
-
-        # Dicionários para agrupamentos
-        # Por banco
-        entradas_por_banco = {}
-        saidas_por_banco = {}
-
-        # Por tipo
-        entradas_por_tipo = {}
-        saidas_por_tipo = {}
-
-        # Mapas de nomes para tipos
-        TIPO_RECEITA_MAP = {
-            'F': 'Receita Fixa',
-            'V': 'Receita Variável',
-            'E': 'Estorno',
-        }
-        TIPO_DESPESA_MAP = {
-            'F': 'Despesa Fixa',
-            'V': 'Despesa Variável',
-            'C': 'Comissionamento',
-            'R': 'Reembolso',
-        }
+        # Totais do mês por conta e categoria (resumo mensal), já sem as
+        # transferências entre contas (se anulam: saída de uma = entrada em outra)
+        incluir_custodias = request.query_params.get('incluir_custodias', 'true').lower() == 'true'
+        caixa = caixa_do_mes(request.user.company_id, date(ano, mes, 1), incluir_custodias)
 
-        # Processar pagamentos para agrupamento por banco
-        for pagamento in pagamentos:
-            banco_nome = pagamento.conta_bancaria.nome
-            valor = float(pagamento.valor)
-
-            if pagamento.tipo == 'E':  # Entrada
-                if banco_nome not in entradas_por_banco:
-                    entradas_por_banco[banco_nome] = 0
-                entradas_por_banco[banco_nome] += valor
-            elif pagamento.tipo == 'S':  # Saída
-                if banco_nome not in saidas_por_banco:
-                    saidas_por_banco[banco_nome] = 0
-                saidas_por_banco[banco_nome] += valor
-
-        # Processar alocações para agrupamento por tipo
-        # Rastrear valor total alocado por pagamento
-        valor_alocado_por_pagamento = {}  # payment_id -> total alocado
-
-        for allocation in allocations:
-            valor = float(allocation.valor)
-            tipo_pagamento = allocation.payment.tipo
-            pid = allocation.payment.id
-
-            valor_alocado_por_pagamento[pid] = valor_alocado_por_pagamento.get(pid, 0) + valor
-
-            # Determinar tipo
-            if allocation.receita:
-                tipo_receita = allocation.receita.tipo
-                tipo_nome = TIPO_RECEITA_MAP.get(tipo_receita, 'Outro')
-            elif allocation.despesa:
-                tipo_despesa = allocation.despesa.tipo
-                tipo_nome = TIPO_DESPESA_MAP.get(tipo_despesa, 'Outro')
-            elif allocation.custodia:
-                # Diferenciar custódia por tipo de pagamento (entrada ou saída)
-                if tipo_pagamento == 'E':
-                    tipo_nome = 'Valores Reembolsados'
-                else:
-                    tipo_nome = 'Valores Reembolsáveis'
-            else:
-                # Alocação sem vínculo definido
-                tipo_nome = 'Não Alocado'
-
-            # Agrupar por tipo
-            if tipo_pagamento == 'E':
-                if tipo_nome not in entradas_por_tipo:
-                    entradas_por_tipo[tipo_nome] = 0
-                entradas_por_tipo[tipo_nome] += valor
-            elif tipo_pagamento == 'S':
-                if tipo_nome not in saidas_por_tipo:
-                    saidas_por_tipo[tipo_nome] = 0
-                saidas_por_tipo[tipo_nome] += valor
-
-        # Adicionar pagamentos não alocados (total ou parcialmente)
-        for pagamento in pagamentos:
-            valor_total = float(pagamento.valor)
-            valor_alocado = valor_alocado_por_pagamento.get(pagamento.id, 0)
-            valor_nao_alocado = round(valor_total - valor_alocado, 2)
-
-            if valor_nao_alocado > 0:
-                tipo_nome = 'Não Alocado'
-
-                if pagamento.tipo == 'E':
-                    if tipo_nome not in entradas_por_tipo:
-                        entradas_por_tipo[tipo_nome] = 0
-                    entradas_por_tipo[tipo_nome] += valor_nao_alocado
-                elif pagamento.tipo == 'S':
-                    if tipo_nome not in saidas_por_tipo:
-                        saidas_por_tipo[tipo_nome] = 0
-                    saidas_por_tipo[tipo_nome] += valor_nao_alocado
-
-        # Converter dicionários em listas
-        entradas_banco_list = [{"banco": banco, "valor": valor} for banco, valor in entradas_por_banco.items()]
-        saidas_banco_list = [{"banco": banco, "valor": valor} for banco, valor in saidas_por_banco.items()]
-
-        # Ordem desejada para entradas e saídas
-        ORDEM_ENTRADAS = ['Receita Fixa', 'Receita Variável', 'Valores Reembolsados', 'Estorno', 'Não Alocado']
-        ORDEM_SAIDAS = ['Despesa Fixa', 'Despesa Variável', 'Valores Reembolsáveis', 'Comissionamento', 'Reembolso', 'Não Alocado']
-
-        # Ordenar entradas conforme ordem especificada
-        entradas_tipo_list = []
-        for tipo in ORDEM_ENTRADAS:
-            if tipo in entradas_por_tipo:
-                entradas_tipo_list.append({"tipo": tipo, "valor": entradas_por_tipo[tipo]})
-        # Adicionar tipos não mapeados ao final
-        for tipo, valor in entradas_por_tipo.items():
-            if tipo not in ORDEM_ENTRADAS:
-                entradas_tipo_list.append({"tipo": tipo, "valor": valor})
-
-        # Ordenar saídas conforme ordem especificada
-        saidas_tipo_list = []
-        for tipo in ORDEM_SAIDAS:
-            if tipo in saidas_por_tipo:
-                saidas_tipo_list.append({"tipo": tipo, "valor": saidas_por_tipo[tipo]})
-        # Adicionar tipos não mapeados ao final
-        for tipo, valor in saidas_por_tipo.items():
-            if tipo not in ORDEM_SAIDAS:
-                saidas_tipo_list.append({"tipo": tipo, "valor": valor})
+        def como_lista(totais, chave):
+            return [{chave: nome, "valor": float(valor)} for nome, valor in totais.items()]
 
-        # Calcular totais
-        total_entradas = sum(entradas_por_banco.values())
-        total_saidas = sum(saidas_por_banco.values())
-        resultado = total_entradas - total_saidas
+        # Somas em Decimal no serviço; float só na saída
+        def lado(nome):
+            return {
+                'por_banco': como_lista(caixa[nome]['por_banco'], "banco"),
+                'por_tipo': como_lista(caixa[nome]['por_tipo'], "tipo"),
+                'total': float(caixa[nome]['total']),
+            }
 
-        # Retornar dados formatados
         return Response({
-            'entradas': {
-                'por_banco': entradas_banco_list,
-                'por_tipo': entradas_tipo_list,
-                'total': total_entradas
-            },
-            'saidas': {
-                'por_banco': saidas_banco_list,
-                'por_tipo': saidas_tipo_list,
-                'total': total_saidas
-            },
-            'resultado': resultado
+            'entradas': lado('entradas'),
+            'saidas': lado('saidas'),
+            'resultado': float(caixa['resultado']),
         }, status=status.HTTP_200_OK)
 
     except ValueError as e:
@@ -431,6 +241,7 @@ def balanco_patrimonial(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@relatorio_em_cache('relatorio_conciliacao_bancaria')
 def relatorio_conciliacao_bancaria(request):
     """
     Retorna relatório completo da conciliação bancária mensal.
@@ -483,19 +294,13 @@ def relatorio_conciliacao_bancaria(request):
         if conta_bancaria_id:
             pagamentos_query = pagamentos_query.filter(conta_bancaria_id=conta_bancaria_id)
 
-        # Anotar número de alocações e soma dos valores alocados
-        from django.db.models import Sum
-        pagamentos_query = pagamentos_query.annotate(
-            num_allocations=Count('allocations'),
-            total_alocado=Sum('allocations__valor')
-        )
-
+        # Soma dos valores alocados: coluna Payment.total_alocado
         pagamentos = list(pagamentos_query)
 
         # Separar conciliados vs não conciliados
         # Um pagamento está completamente conciliado se a soma das alocações = valor do pagamento
-        conciliados = [p for p in pagamentos if p.total_alocado is not None and abs(float(p.total_alocado) - float(p.valor)) < 0.01]
-        nao_conciliados = [p for p in pagamentos if p.total_alocado is None or abs(float(p.total_alocado) - float(p.valor)) >= 0.01]
+        conciliados = [p for p in pagamentos if abs(float(p.total_alocado) - float(p.valor)) < 0.01]
+        nao_conciliados = [p for p in pagamentos if abs(float(p.total_alocado) - float(p.valor)) >= 0.01]
 
         # Calcular totais
         total_lancamentos = len(pagamentos)
@@ -545,7 +350,7 @@ def relatorio_conciliacao_bancaria(request):
                 }
 
             contas_resumo[banco_id]['total_lancamentos'] += 1
-            if p.num_allocations > 0:
+            if p.total_alocado > 0:
                 contas_resumo[banco_id]['conciliados'] += 1
             else:
                 contas_resumo[banco_id]['pendentes'] += 1
@@ -5,6 +5,7 @@ from django.shortcuts import get_object_or_404
 from decimal import Decimal
 from datetime import date
 from .base import BaseReportView
+from ..cache import relatorio_em_cache
 from ...models import Cliente, Funcionario, Receita, Despesa, Allocation, Custodia
 from ...serializers import ClienteSerializer, FuncionarioSerializer, AllocationSerializer
 
@@ -14,6 +15,7 @@ class RelatorioClienteView(BaseReportView):
     Resumo financeiro do cliente baseado em ALLOCATIONS (fonte da verdade)
     """
 
+    @relatorio_em_cache('cliente')
     def get(self, request, cliente_id):
         # Cliente (com escopo da empresa)
         cliente_qs = self.get_company_queryset(Cliente)
@@ -128,6 +130,7 @@ class RelatorioFuncionarioView(BaseReportView):
     Resumo financeiro do funcionário baseado em ALLOCATIONS (fonte da verdade)
     """
 
+    @relatorio_em_cache('funcionario')
     def get(self, request, funcionario_id):
         # Funcionário (escopo da empresa)
         funcionario_qs = self.get_company_queryset(Funcionario)
@@ -283,6 +286,7 @@ class RelatorioFuncionarioView(BaseReportView):
 
 class RelatorioFolhaSalarialView(BaseReportView):
     """Relatório de Folha Salarial Mensal."""
+    @relatorio_em_cache('folha_salarial')
     def get(self, request):
         params = request.query_params
         try:
@@ -327,6 +331,7 @@ class RelatorioComissionamentoView(BaseReportView):
     pagas no período e o valor da comissão calculada, usando a hierarquia
     ReceitaComissao → ClienteComissao.
     """
+    @relatorio_em_cache('comissionamento')
     def get(self, request):
         params = request.query_params
         try:
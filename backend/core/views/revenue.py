@@ -4,7 +4,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q, Exists, OuterRef
 from django.utils import timezone
-from .mixins import CompanyScopedViewSetMixin, normalize_money_search
+from .mixins import CompanyScopedViewSetMixin
+from .cache import resposta_condicional
+from .jobs import aceita_async
 from ..models import Receita, ReceitaRecorrente, ReceitaComissao, ClienteComissao
 from ..serializers import ReceitaSerializer, ReceitaAbertaSerializer, ReceitaRecorrenteSerializer
 from ..pagination import DynamicPageSizePagination
@@ -26,23 +28,14 @@ class ReceitaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
 
         return ReceitaSerializer
 
-    def _atualizar_vencidas(self):
-        """Atualiza automaticamente receitas vencidas (on-the-fly)."""
-        hoje = timezone.now().date()
-        Receita.objects.filter(
-            company=self.request.user.company,
-            situacao='A',
-            data_vencimento__lt=hoje
-        ).update(situacao='V')
-
     def get_queryset(self):
-        # Atualiza vencidas antes de retornar o queryset
-        self._atualizar_vencidas()
+        from ..services.status import filtro_situacao, situacao_vigente
 
-        queryset = super().get_queryset().select_related(
+        # Vencidas calculadas na leitura (a varredura diária grava; o GET não escreve)
+        queryset = super().get_queryset().annotate(situacao_vigente=situacao_vigente()).select_related(
             "cliente", "company"
         ).prefetch_related(
-            "allocations", "comissoes__funcionario"
+            "comissoes__funcionario"
         )
 
         params = self.request.query_params
@@ -50,19 +43,13 @@ class ReceitaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         # FILTRO GLOBAL
         search = params.get("search")
         if search:
-            search_money = normalize_money_search(search)
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(descricao__icontains=search) |
-                Q(cliente__nome__icontains=search) |
-                Q(valor__icontains=search_money) |
-                Q(data_vencimento__icontains=search)
-            )
+            from ..services.busca import filtro_busca
+            queryset = queryset.filter(filtro_busca(Receita, search, self.request.user.company))
 
         # filtros
         situacoes = params.getlist("situacao")
         if situacoes:
-            queryset = queryset.filter(situacao__in=situacoes)
+            queryset = queryset.filter(filtro_situacao(situacoes))
 
         cliente_id = params.get("cliente_id")
         if cliente_id:
@@ -113,6 +100,10 @@ class ReceitaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
 
         return queryset
 
+    @resposta_condicional('receitas')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         import calendar
         from datetime import date
@@ -146,18 +137,21 @@ class ReceitaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
         common = {k: v for k, v in vdata.items() if k not in ('nome', 'valor', 'data_vencimento', 'comissoes')}
 
         from ..models import ReceitaComissao
-        for i in range(num_parcelas):
-            nome_i = f"{nome_base} ({i + 1}/{num_parcelas})"
-            valor_i = valor_parcela if i < num_parcelas - 1 else (valor_total - valor_parcela * (num_parcelas - 1))
-            receita = Receita.objects.create(
-                company=request.user.company,
-                nome=nome_i,
-                valor=valor_i,
-                data_vencimento=add_months(data_base, i),
-                **common
-            )
-            for c in comissoes_data:
-                ReceitaComissao.objects.create(receita=receita, **c)
+        from ..services.resumo import resumo_em_lote
+
+        with resumo_em_lote():
+            for i in range(num_parcelas):
+                nome_i = f"{nome_base} ({i + 1}/{num_parcelas})"
+                valor_i = valor_parcela if i < num_parcelas - 1 else (valor_total - valor_parcela * (num_parcelas - 1))
+                receita = Receita.objects.create(
+                    company=request.user.company,
+                    nome=nome_i,
+                    valor=valor_i,
+                    data_vencimento=add_months(data_base, i),
+                    **common
+                )
+                for c in comissoes_data:
+                    ReceitaComissao.objects.create(receita=receita, **c)
 
         return Response({'parcelas_criadas': num_parcelas}, status=status.HTTP_201_CREATED)
 
@@ -173,6 +167,7 @@ class ReceitaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
 
             if data_pagamento and conta_bancaria_id:
                 from ..models import Payment, ContaBancaria, Allocation
+                from ..services.saldos import aplicar_payment
 
                 try:
                     conta_bancaria = ContaBancaria.objects.get(
@@ -198,9 +193,8 @@ class ReceitaViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet):
                         valor=receita.valor
                     )
 
-                    # Atualiza saldo da conta bancária (entrada de dinheiro)
-                    conta_bancaria.saldo_atual += payment.valor
-                    conta_bancaria.save()
+                    # Atualiza saldo atual e saldo diário da conta bancária (entrada de dinheiro)
+                    aplicar_payment(payment)
 
                     # Atualiza status da receita
                     receita.atualizar_status()
@@ -265,6 +259,7 @@ class ReceitaRecorrenteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet)
         return queryset.order_by('nome', 'id')
 
     @action(detail=False, methods=['post'], url_path='gerar-mes')
+    @aceita_async('gerar_mes_receitas')
     def gerar_mes(self, request):
         """
         Gera receitas individuais para o mês atual baseado nas recorrentes ativas.
@@ -311,73 +306,76 @@ class ReceitaRecorrenteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet)
         ignoradas = 0
         detalhes = []
 
-        for recorrente in recorrentes:
-            # Verifica se já existe receita para este mês
-            nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
-
-            receita_existente = Receita.objects.filter(
-                company=request.user.company,
-                nome=nome_esperado,
-                cliente=recorrente.cliente
-            ).exists()
-
-            if receita_existente:
-                ignoradas += 1
-                detalhes.append({
-                    'nome': recorrente.nome,
-                    'status': 'ignorada',
-                    'motivo': 'Já gerada para este mês'
-                })
-                continue
-
-            # Calcula data de vencimento
-            ultimo_dia_mes = calendar.monthrange(
-                mes_referencia.year,
-                mes_referencia.month
-            )[1]
-            dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
-            data_vencimento = date(
-                mes_referencia.year,
-                mes_referencia.month,
-                dia_vencimento
-            )
+        from ..services.resumo import resumo_em_lote
 
-            # Cria receita individual
-            try:
-                receita = Receita.objects.create(
+        with resumo_em_lote():
+            for recorrente in recorrentes:
+                # Verifica se já existe receita para este mês
+                nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
+
+                receita_existente = Receita.objects.filter(
                     company=request.user.company,
-                    cliente=recorrente.cliente,
-                    nome=f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}",
-                    descricao=recorrente.descricao or '',
-                    valor=recorrente.valor,
-                    tipo=recorrente.tipo,
-                    data_vencimento=data_vencimento,
-                    situacao='A',
-                    forma_pagamento=recorrente.forma_pagamento
+                    nome=nome_esperado,
+                    cliente=recorrente.cliente
+                ).exists()
+
+                if receita_existente:
+                    ignoradas += 1
+                    detalhes.append({
+                        'nome': recorrente.nome,
+                        'status': 'ignorada',
+                        'motivo': 'Já gerada para este mês'
+                    })
+                    continue
+
+                # Calcula data de vencimento
+                ultimo_dia_mes = calendar.monthrange(
+                    mes_referencia.year,
+                    mes_referencia.month
+                )[1]
+                dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
+                data_vencimento = date(
+                    mes_referencia.year,
+                    mes_referencia.month,
+                    dia_vencimento
                 )
 
-                # Copia regras de comissão da recorrente para a receita gerada
-                from ..models import ReceitaComissao
-                for regra in recorrente.comissoes.all():
-                    ReceitaComissao.objects.create(
-                        receita=receita,
-                        funcionario=regra.funcionario,
-                        percentual=regra.percentual
+                # Cria receita individual
+                try:
+                    receita = Receita.objects.create(
+                        company=request.user.company,
+                        cliente=recorrente.cliente,
+                        nome=f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}",
+                        descricao=recorrente.descricao or '',
+                        valor=recorrente.valor,
+                        tipo=recorrente.tipo,
+                        data_vencimento=data_vencimento,
+                        situacao='A',
+                        forma_pagamento=recorrente.forma_pagamento
                     )
 
-                criadas += 1
-                detalhes.append({
-                    'nome': recorrente.nome,
-                    'status': 'criada',
-                    'data_vencimento': str(data_vencimento)
-                })
+                    # Copia regras de comissão da recorrente para a receita gerada
+                    from ..models import ReceitaComissao
+                    for regra in recorrente.comissoes.all():
+                        ReceitaComissao.objects.create(
+                            receita=receita,
+                            funcionario=regra.funcionario,
+                            percentual=regra.percentual
+                        )
+
+                    criadas += 1
+                    detalhes.append({
+                        'nome': recorrente.nome,
+                        'status': 'criada',
+                        'data_vencimento': str(data_vencimento)
+                    })
 
-            except Exception as e:
-                detalhes.append({
-                    'nome': recorrente.nome,
-                    'status': 'erro',
-                    'motivo': str(e)
-                })
+                except Exception as e:
+                    detalhes.append({
+                        'nome': recorrente.nome,
+                        'status': 'erro',
+                        'motivo': str(e)
+                    })
 
         return Response({
             'criadas': criadas,
@@ -431,89 +429,92 @@ class ReceitaRecorrenteViewSet(CompanyScopedViewSetMixin, viewsets.ModelViewSet)
         ignoradas = 0
         detalhes = []
 
-        for i in range(quantidade_meses):
-            mes_referencia = add_months(mes_inicial, i)
-
-            # Verifica se está dentro do período de validade (compara apenas ano/mês)
-            if (recorrente.data_inicio.year > mes_referencia.year or
-                (recorrente.data_inicio.year == mes_referencia.year and
-                 recorrente.data_inicio.month > mes_referencia.month)):
-                ignoradas += 1
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'ignorada',
-                    'motivo': 'Antes da data de início'
-                })
-                continue
-
-            if recorrente.data_fim:
-                if (recorrente.data_fim.year < mes_referencia.year or
-                    (recorrente.data_fim.year == mes_referencia.year and
-                     recorrente.data_fim.month < mes_referencia.month)):
+        from ..services.resumo import resumo_em_lote
+
+        with resumo_em_lote():
+            for i in range(quantidade_meses):
+                mes_referencia = add_months(mes_inicial, i)
+
+                # Verifica se está dentro do período de validade (compara apenas ano/mês)
+                if (recorrente.data_inicio.year > mes_referencia.year or
+                    (recorrente.data_inicio.year == mes_referencia.year and
+                     recorrente.data_inicio.month > mes_referencia.month)):
                     ignoradas += 1
                     detalhes.append({
                         'mes': mes_referencia.strftime('%Y-%m'),
                         'status': 'ignorada',
-                        'motivo': 'Depois da data de fim'
+                        'motivo': 'Antes da data de início'
                     })
                     continue
 
-            # Verifica se já existe
-            nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
-            receita_existente = Receita.objects.filter(
-                company=request.user.company,
-                nome=nome_esperado,
-                cliente=recorrente.cliente
-            ).exists()
-
-            if receita_existente:
-                ignoradas += 1
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'ignorada',
-                    'motivo': 'Já existe'
-                })
-                continue
-
-            # Calcula data de vencimento
-            ultimo_dia_mes = calendar.monthrange(
-                mes_referencia.year,
-                mes_referencia.month
-            )[1]
-            dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
-            data_vencimento = date(
-                mes_referencia.year,
-                mes_referencia.month,
-                dia_vencimento
-            )
-
-            # Cria receita individual
-            try:
-                receita = Receita.objects.create(
+                if recorrente.data_fim:
+                    if (recorrente.data_fim.year < mes_referencia.year or
+                        (recorrente.data_fim.year == mes_referencia.year and
+                         recorrente.data_fim.month < mes_referencia.month)):
+                        ignoradas += 1
+                        detalhes.append({
+                            'mes': mes_referencia.strftime('%Y-%m'),
+                            'status': 'ignorada',
+                            'motivo': 'Depois da data de fim'
+                        })
+                        continue
+
+                # Verifica se já existe
+                nome_esperado = f"{recorrente.nome} - {mes_referencia.strftime('%m/%Y')}"
+                receita_existente = Receita.objects.filter(
                     company=request.user.company,
-                    cliente=recorrente.cliente,
                     nome=nome_esperado,
-                    descricao=recorrente.descricao or '',
-                    valor=recorrente.valor,
-                    tipo=recorrente.tipo,
-                    data_vencimento=data_vencimento,
-                    situacao='A',
-                    forma_pagamento=recorrente.forma_pagamento
+                    cliente=recorrente.cliente
+                ).exists()
+
+                if receita_existente:
+                    ignoradas += 1
+                    detalhes.append({
+                        'mes': mes_referencia.strftime('%Y-%m'),
+                        'status': 'ignorada',
+                        'motivo': 'Já existe'
+                    })
+                    continue
+
+                # Calcula data de vencimento
+                ultimo_dia_mes = calendar.monthrange(
+                    mes_referencia.year,
+                    mes_referencia.month
+                )[1]
+                dia_vencimento = min(recorrente.dia_vencimento, ultimo_dia_mes)
+                data_vencimento = date(
+                    mes_referencia.year,
+                    mes_referencia.month,
+                    dia_vencimento
                 )
 
-                criadas += 1
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'criada',
-                    'data_vencimento': str(data_vencimento)
-                })
-
-            except Exception as e:
-                detalhes.append({
-                    'mes': mes_referencia.strftime('%Y-%m'),
-                    'status': 'erro',
-                    'motivo': str(e)
-                })
+                # Cria receita individual
+                try:
+                    receita = Receita.objects.create(
+                        company=request.user.company,
+                        cliente=recorrente.cliente,
+                        nome=nome_esperado,
+                        descricao=recorrente.descricao or '',
+                        valor=recorrente.valor,
+                        tipo=recorrente.tipo,
+                        data_vencimento=data_vencimento,
+                        situacao='A',
+                        forma_pagamento=recorrente.forma_pagamento
+                    )
+
+                    criadas += 1
+                    detalhes.append({
+                        'mes': mes_referencia.strftime('%Y-%m'),
+                        'status': 'criada',
+                        'data_vencimento': str(data_vencimento)
+                    })
+
+                except Exception as e:
+                    detalhes.append({
+                        'mes': mes_referencia.strftime('%Y-%m'),
+                        'status': 'erro',
+                        'motivo': str(e)
+                    })
 
         return Response({
             'criadas': criadas,
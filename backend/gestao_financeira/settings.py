@@ -15,6 +15,7 @@ from datetime import timedelta
 import os
 from dotenv import load_dotenv
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -128,6 +129,54 @@ CORS_ALLOWED_ORIGINS = _csv_env(
     "http://localhost:3000,http://127.0.0.1:3000",
 )
 
+# GET condicional (core/views/cache.py): o front lê o ETag e o devolve no
+# If-None-Match para receber 304
+CORS_EXPOSE_HEADERS = ["ETag"]
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match")
+
+# Cache de relatórios e dashboard (core/views/cache.py). A chave leva a versão
+# dos dados da empresa, então nada fica desatualizado: a validade e o limite
+# de entradas só servem para descartar as versões antigas.
+# - REDIS_URL: cache compartilhado entre os workers (requer o pacote redis; o
+#   limite de memória vem do maxmemory/allkeys-lru do servidor);
+# - CACHE_DIR: arquivos em disco, compartilhados pelos workers da máquina;
+# - sem nenhum dos dois: memória local de cada processo.
+RELATORIOS_CACHE_TTL = int(os.getenv("RELATORIOS_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "500"))
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "TIMEOUT": RELATORIOS_CACHE_TTL,
+        }
+    }
+elif os.getenv("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR"),
+            "TIMEOUT": RELATORIOS_CACHE_TTL,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES, "CULL_FREQUENCY": 3},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": RELATORIOS_CACHE_TTL,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES, "CULL_FREQUENCY": 3},
+        }
+    }
+
+# Fila de jobs (core/services/jobs.py): o arquivo de um ?async=1 fica no
+# próprio Job (BinaryField) até o worker processá-lo, então é limitado.
+JOBS_MAX_ARQUIVO_MB = int(os.getenv("JOBS_MAX_ARQUIVO_MB", "10"))
+# Intervalo do sinal de vida de um job em execução; o run_worker só devolve à
+# fila jobs sem sinal há mais de --timeout-travado minutos.
+JOBS_HEARTBEAT_SEGUNDOS = int(os.getenv("JOBS_HEARTBEAT_SEGUNDOS", "60"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -245,6 +294,12 @@ ASAAS_WEBHOOK_TOKEN = os.getenv('ASAAS_WEBHOOK_TOKEN', '')
 RESEND_API_KEY = os.getenv('RESEND_API_KEY', '')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
+# ──────────────────────────────────────────────
+# Conciliação bancária por período
+# ──────────────────────────────────────────────
+# Processos usados para as partições (conta x mês); 0 = um por núcleo
+CONCILIACAO_WORKERS = int(os.getenv('CONCILIACAO_WORKERS', '0'))
+
 if ENV == "production":
     if not ASAAS_API_KEY:
         raise RuntimeError("ASAAS_API_KEY obrigatório em produção")
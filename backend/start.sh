@@ -1,9 +1,21 @@
 #!/bin/bash
 # Script de inicialização para Railway
-# Roda migrações e collectstatic antes de iniciar o servidor
+#
+#   bash start.sh          -> web: collectstatic, migrações e gunicorn
+#   bash start.sh worker   -> worker: fila de jobs (?async=1) e varredura
+#                             diária de vencidas (python manage.py run_worker)
+#
+# Cada papel é um serviço do Railway apontando para este repositório: o web
+# usa railway.toml e o worker usa railway.worker.toml (Settings > Config-as-code
+# do serviço). Só o web roda as migrações.
 
 set -e  # Para na primeira falha
 
+if [ "${1:-web}" = "worker" ]; then
+    echo "✅ Starting job worker..."
+    exec python manage.py run_worker
+fi
+
 echo "🔄 Running collectstatic..."
 python manage.py collectstatic --noinput
 